@@ -0,0 +1,225 @@
+"""Ad-hoc SQL from the "Run Queries" page, kept away from the app's pool.
+
+Every ad-hoc statement gets its own connection, outside ``db.ConnectionPool``,
+in a read-only transaction with a ``statement_timeout``. It runs on a background
+thread, so the page stays responsive and can ``cancel()`` it.
+
+* ``AdhocQuery`` declares a server-side (named) cursor. The preview fetches
+  ``PREVIEW_ROWS`` rows, and each "fetch more" pulls the next page from the
+  same cursor, up to ``MAX_PREVIEW_ROWS`` in memory. The transaction stays
+  open between pages. ``idle_in_transaction_session_timeout`` lets the
+  server drop it if the session goes away without closing it.
+* ``AdhocExport`` streams the full result into a temporary file:
+  ``COPY ... TO STDOUT`` for CSV, and COPY blocks parsed into Arrow batches
+  for Parquet (``frames.copy_batches``). The rows never exist as Python
+  objects.
+"""
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import psycopg2
+import pyarrow.parquet as pq
+
+import db
+import frames
+
+STATEMENT_TIMEOUT = float(os.environ.get("ADHOC_STATEMENT_TIMEOUT", "30"))    # seconds per statement
+EXPORT_TIMEOUT = float(os.environ.get("ADHOC_EXPORT_TIMEOUT", "300"))
+IDLE_TIMEOUT = 300          # seconds an open preview cursor may sit unused before the server drops it
+PREVIEW_ROWS = 200
+MAX_PREVIEW_ROWS = 10_000
+
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+class AdhocError(Exception):
+    pass
+
+
+def check(query):
+    """The statement without trailing semicolons; only plain reads are accepted."""
+    query = (query or "").strip().rstrip(";").strip()
+    if not query:
+        raise AdhocError("Enter a query first.")
+    if not frames.is_read(query):
+        raise AdhocError("Only read queries (SELECT, WITH, VALUES, TABLE) can run here; "
+                         "use the Add/Update/Delete page for changes.")
+    return query
+
+
+class _Job:
+    """One statement on a dedicated read-only connection, run on a background thread."""
+
+    def __init__(self, query, timeout, connect=None, on_done=None):
+        self.query = check(query)
+        self.timeout = timeout
+        self.on_done = on_done            # on_done(job) after each step, from the worker thread
+        self.error = None
+        self.cancelled = False
+        self.seconds = 0.0
+        self._connect = connect or psycopg2.connect
+        self._conn = None
+        self._thread = None
+        self._started = None
+
+    def _open(self):
+        options = (f"-c statement_timeout={int(self.timeout * 1000)} "
+                   f"-c idle_in_transaction_session_timeout={IDLE_TIMEOUT * 1000}")
+        self._conn = self._connect(**db.DB_CONFIG, options=options, application_name="adhoc")
+        self._conn.set_session(readonly=True)
+        return self._conn
+
+    def _run(self, step):
+        if self.running:
+            raise AdhocError("The previous step is still running.")
+        self.error = None
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._guarded, args=(step,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _guarded(self, step):
+        try:
+            step()
+        except Exception as e:
+            self.error = e
+            self.close()
+        finally:
+            self.seconds = time.monotonic() - self._started
+            if self.on_done is not None:
+                self.on_done(self)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started if self.running else self.seconds
+
+    @property
+    def status(self):
+        if self.running:
+            return "running"
+        if self.cancelled:
+            return "cancelled"
+        return "failed" if self.error else "done"
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.running
+
+    def cancel(self):
+        """Stop the running statement on the server; the job ends with ``status == "cancelled"``."""
+        self.cancelled = True
+        conn = self._conn
+        if conn is not None and not conn.closed:
+            try:
+                conn.cancel()
+            except psycopg2.Error:
+                pass
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class AdhocQuery(_Job):
+    """A paged preview of a read query through a server-side cursor."""
+
+    def __init__(self, query, timeout=STATEMENT_TIMEOUT, page_rows=PREVIEW_ROWS, max_rows=MAX_PREVIEW_ROWS,
+                 connect=None, on_done=None):
+        super().__init__(query, timeout, connect, on_done)
+        self.page_rows = page_rows
+        self.max_rows = max_rows
+        self.columns = []
+        self.rows = []
+        self.exhausted = False
+        self._cursor = None
+
+    def start(self):
+        return self._run(self._declare)
+
+    def _declare(self):
+        self._cursor = self._open().cursor(name="adhoc_preview")
+        self._cursor.execute(self.query)
+        self._fetch()
+
+    def fetch_more(self):
+        """Fetch the next page in the background."""
+        if not self.can_fetch_more:
+            raise AdhocError("Nothing more to fetch.")
+        return self._run(self._fetch)
+
+    def _fetch(self):
+        wanted = min(self.page_rows, self.max_rows - len(self.rows))
+        rows = self._cursor.fetchmany(wanted)
+        if not self.columns and self._cursor.description:
+            self.columns = [d.name for d in self._cursor.description]
+        self.rows.extend(rows)
+        if len(rows) < wanted:
+            self.exhausted = True
+            self.close()
+
+    @property
+    def can_fetch_more(self):
+        return (self._conn is not None and not self.running and not self.exhausted
+                and len(self.rows) < self.max_rows)
+
+    def frame(self):
+        return pd.DataFrame(self.rows, columns=self.columns or None)
+
+
+class AdhocExport(_Job):
+    """The full result of a read query streamed to a temporary CSV or Parquet file."""
+
+    def __init__(self, query, fmt="csv", timeout=EXPORT_TIMEOUT, connect=None, on_done=None):
+        if fmt not in EXPORT_FORMATS:
+            raise AdhocError(f"Unknown export format {fmt!r}")
+        super().__init__(query, timeout, connect, on_done)
+        self.fmt = fmt
+        self.mime = EXPORT_FORMATS[fmt]
+        self.path = None
+        self.rows_written = 0
+
+    def start(self):
+        return self._run(self._export)
+
+    def _export(self):
+        fd, self.path = tempfile.mkstemp(prefix="adhoc-", suffix=f".{self.fmt}")
+        os.close(fd)
+        with self._open().cursor() as cur:
+            if self.fmt == "csv":
+                with open(self.path, "wb") as sink:
+                    cur.copy_expert(f"COPY ({self.query}) TO STDOUT WITH (FORMAT csv, HEADER)", sink)
+                self.rows_written = cur.rowcount
+            else:
+                schema = frames.query_schema(cur, self.query)
+                with pq.ParquetWriter(self.path, schema) as writer:
+                    for batch in frames.copy_batches(cur, self.query, schema):
+                        writer.write_batch(batch)
+                        self.rows_written += batch.num_rows
+        self.close()
+
+    @property
+    def bytes(self):
+        return os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0
+
+    def close(self):
+        super().close()
+        if self.error is not None or self.cancelled:
+            self.discard()
+
+    def discard(self):
+        """Remove the export file."""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
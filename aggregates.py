@@ -0,0 +1,105 @@
+import threading
+import time
+
+# Materialized views from migrations/R__aggregates.sql and the tables they are built from.
+MATERIALIZED_VIEWS = {
+    "mv_claims_by_listing": {"claims"},
+    "mv_claim_status_counts": {"claims"},
+    "mv_receiver_claim_totals": {"claims", "receivers", "food_listings"},
+}
+
+REFRESH_INTERVAL = 30  # seconds between refreshes of views whose tables were written
+MAX_AGE = 600          # seconds before a view is refreshed anyway (writes from api.py, ingest.py, psql, ...)
+
+
+def views_depending_on(tables):
+    tables = set(tables)
+    return {view for view, deps in MATERIALIZED_VIEWS.items() if deps & tables}
+
+
+def available(pool):
+    """True when the aggregate migration has been applied to this database."""
+    _, rows = pool.fetch("SELECT to_regclass('mv_claims_by_listing') IS NOT NULL")
+    return bool(rows and rows[0][0])
+
+
+def refresh(pool, views=None, concurrently=True):
+    """Refresh ``views`` (default: all); returns ``{view: seconds}``."""
+    timings = {}
+    for view in views or MATERIALIZED_VIEWS:
+        if view not in MATERIALIZED_VIEWS:
+            raise ValueError(f"unknown materialized view {view!r}")
+        start = time.perf_counter()
+        with pool.cursor() as cur:
+            cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{view}")
+        timings[view] = time.perf_counter() - start
+    return timings
+
+
+class AggregateRefresher:
+    """Tracks which views are stale after writes and refreshes them in the background.
+
+    Writes call ``mark_dirty(tables)``; pages call ``refresh_if_due(pool)`` which
+    starts at most one background refresh per ``interval`` seconds. Writes this
+    process doesn't see (other servers, the API, the ingest CLI, psql) are
+    caught by refreshing every view at least every ``max_age`` seconds, and
+    once when the process starts. ``on_refresh`` receives the refreshed view
+    names (used to invalidate cached results).
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL, on_refresh=None, max_age=MAX_AGE):
+        self.interval = interval
+        self.max_age = max_age
+        self.on_refresh = on_refresh
+        self.last_refresh = 0.0
+        self.last_error = None
+        self._dirty = set()
+        self._refreshed = {}          # view -> time.monotonic() of its last refresh
+        self._lock = threading.Lock()
+        self._running = False
+
+    def mark_dirty(self, tables):
+        views = views_depending_on(tables)
+        with self._lock:
+            self._dirty |= views
+        return views
+
+    @property
+    def dirty(self):
+        with self._lock:
+            return set(self._dirty)
+
+    def refresh_if_due(self, pool, force=False):
+        with self._lock:
+            now = time.monotonic()
+            self._dirty |= {view for view in MATERIALIZED_VIEWS
+                            if view not in self._refreshed or now - self._refreshed[view] >= self.max_age}
+            if self._running or not self._dirty:
+                return False
+            if not force and now - self.last_refresh < self.interval:
+                return False
+            views, self._dirty = self._dirty, set()
+            self._running = True
+        thread = threading.Thread(target=self._refresh, args=(pool, views), daemon=True)
+        thread.start()
+        if force:
+            thread.join()
+        return True
+
+    def _refresh(self, pool, views):
+        try:
+            refresh(pool, sorted(views))
+            refreshed_at = time.monotonic()
+            with self._lock:
+                self._refreshed.update(dict.fromkeys(views, refreshed_at))
+            self.last_error = None
+            if self.on_refresh:
+                self.on_refresh(views)
+        except Exception as e:
+            self.last_error = e
+            with self._lock:
+                self._dirty |= views
+        finally:
+            with self._lock:
+                self.last_refresh = time.monotonic()
+                self._running = False
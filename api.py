@@ -0,0 +1,308 @@
+"""JSON API over current listings, the KPI totals and claims, for partner apps and kiosks.
+
+A Starlette app (Starlette and uvicorn come with Streamlit) on the same data
+layer as the Streamlit pages: the ``db`` pool, ``QueryCache`` for results,
+``reservations`` for claims and the ``change_feed`` listener for KPIs.
+
+    GET  /listings?city=&food_type=&expires_from=&expires_to=&limit=&after=
+    GET  /kpis
+    GET  /search?q=&tables=&limit=&after=
+    POST /claims    [{"food_id": 12, "receiver_id": 3, "quantity": 2},
+                     {"receiver_id": 4, "quantity": 1, "city": "Saint Louis"}, ...]
+
+``/listings`` pages through listings by expiry date, then id. It returns
+``limit`` items (default ``PAGE_SIZE``) expiring from ``expires_from``
+(default today) to ``expires_to``, plus a ``next`` cursor to pass back as
+``after``. ``/claims`` makes the claims with ``reservations.reserve_many``,
+one transaction per request: a claim naming a city instead of a listing takes
+the soonest-expiring listing there with enough left. Every claim is made
+Pending; a body asking for any other status is refused. It returns one result
+or error per claim. ``/search`` is ``search.search``: ranked, typo-tolerant
+matches over food names, providers and receivers, paged with ``next``.
+
+Conditional GETs: the change feed counts the committed writes to
+food_listings and claims, and ``/listings`` and ``/kpis`` carry an ETag built
+from those counts. A client polling with ``If-None-Match`` gets an empty 304
+until either table changes, without a query. Cached bodies are keyed by the
+same counts, so they never outlive a change. While the feed is not
+listening (e.g. migrations not applied) responses carry no ETag and are not
+cached. ``/search`` also reads providers and receivers, which the feed doesn't
+count, so its results are never cached.
+
+    python api.py --port 8000
+"""
+import argparse
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import date
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import change_feed
+import db
+import reservations
+import search
+from query_cache import QueryCache
+
+PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = 1000
+MAX_BULK_CLAIMS = int(os.environ.get("API_MAX_BULK_CLAIMS", "500"))
+TABLES = ("food_listings", "claims")     # every response reads these (listings show the units left)
+
+LISTING_COLUMNS = """
+    f.food_id, f.food_name, f.food_type, f.meal_type, f.quantity, {remaining} AS remaining,
+    f.expiry_date, f.location AS city, f.provider_id, f.provider_type
+"""
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _int(value, name, minimum=None, maximum=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(f"{name} must be an integer") from None
+    if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+        raise ApiError(f"{name} must be between {minimum} and {maximum}")
+    return number
+
+
+def _date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ApiError(f"{name} must be a YYYY-MM-DD date") from None
+
+
+def _cursor(value):
+    """``after`` = "<expiry date>,<food_id>" of the last listing of the previous page."""
+    expiry, _, food_id = value.partition(",")
+    return _date(expiry, "after"), _int(food_id, "after")
+
+
+def _json(value):
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+def listings_query(params, stock=True):
+    """``(sql, params)`` for one page of listings, and the page size; raises ApiError on bad input."""
+    limit = _int(params.get("limit", PAGE_SIZE), "limit", 1, MAX_PAGE_SIZE)
+    values = {"expires_from": _date(params["expires_from"], "expires_from") if "expires_from" in params
+              else date.today(), "limit": limit + 1}
+    conditions = ["f.expiry_date >= %(expires_from)s"]
+    if "expires_to" in params:
+        values["expires_to"] = _date(params["expires_to"], "expires_to")
+        conditions.append("f.expiry_date <= %(expires_to)s")
+    for name, column in (("city", "f.location"), ("food_type", "f.food_type")):
+        if params.get(name):
+            values[name] = params[name]
+            conditions.append(f"{column} = %({name})s")
+    if params.get("after"):
+        values["after_expiry"], values["after_id"] = _cursor(params["after"])
+        conditions.append("(f.expiry_date, f.food_id) > (%(after_expiry)s, %(after_id)s)")
+    columns = LISTING_COLUMNS.format(remaining="GREATEST(s.quantity - s.reserved, 0)" if stock else "NULL")
+    join = "LEFT JOIN listing_stock s ON s.food_id = f.food_id" if stock else ""
+    sql = f"""
+        SELECT {columns}
+        FROM food_listings f {join}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY f.expiry_date, f.food_id
+        LIMIT %(limit)s
+    """
+    return sql, values, limit
+
+
+def claim_requests(body):
+    """Validate a bulk claim body (a list, or ``{"claims": [...]}``) before anything is written."""
+    claims = body.get("claims") if isinstance(body, dict) else body
+    if not isinstance(claims, list) or not claims:
+        raise ApiError("expected a non-empty list of claims")
+    if len(claims) > MAX_BULK_CLAIMS:
+        raise ApiError(f"at most {MAX_BULK_CLAIMS} claims per request", status=413)
+    parsed = []
+    for index, claim in enumerate(claims):
+        if not isinstance(claim, dict):
+            raise ApiError(f"claim {index}: expected an object")
+        try:
+            if claim.get("status", "Pending") != "Pending":
+                raise ApiError("status must be Pending; claims are completed or cancelled by the provider")
+            item = {"receiver_id": _int(claim.get("receiver_id"), "receiver_id"),
+                    "quantity": _int(claim.get("quantity"), "quantity", 1),
+                    "status": "Pending"}
+            if claim.get("food_id") is not None:
+                item["food_id"] = _int(claim["food_id"], "food_id")
+            elif claim.get("city"):
+                item["location"] = str(claim["city"])
+            else:
+                raise ApiError("needs a food_id or a city")
+        except ApiError as e:
+            raise ApiError(f"claim {index}: {e}") from None
+        parsed.append(item)
+    return parsed
+
+
+class Api:
+    """The pool, result cache and change feed one server process shares between requests."""
+
+    def __init__(self, pool=None, feed=None, cache=None):
+        self.pool = pool
+        self.feed = feed
+        self.cache = cache or QueryCache()
+        self.stock = False
+
+    def start(self):
+        self.pool = self.pool or db.create_pool()
+        if self.feed is None:
+            self.feed = change_feed.ChangeFeed().start()
+            self.feed.wait_ready(5)
+        self.stock = reservations.available(self.pool)
+
+    def stop(self):
+        if self.feed is not None:
+            self.feed.stop()
+        if self.pool is not None:
+            self.pool.closeall()
+
+    def etag(self):
+        version = self.feed.version(TABLES) if self.feed is not None else None
+        return f'"{version}"' if version else None
+
+    def cached(self, key, params, etag, load):
+        """``load()``'s body, cached under the current table versions (not at all without them)."""
+        return self.cache.get_or_load(key, (params, etag), load, ttl=None if etag else 0, page="api",
+                                      tables=TABLES)
+
+    def listings(self, params, etag):
+        sql, values, limit = listings_query(params, self.stock)
+
+        def load():
+            columns, rows = self.pool.fetch(sql, values)
+            items = [dict(zip(columns, row)) for row in rows[:limit]]
+            last = items[-1] if len(rows) > limit else None
+            return _json({"items": items,
+                          "next": f"{last['expiry_date']},{last['food_id']}" if last else None})
+        return self.cached(sql, values, etag, load)
+
+    def kpis(self, etag):
+        def load():
+            if self.feed is not None and self.feed.ready:
+                totals = self.feed.kpis()
+            else:
+                state = change_feed.KpiState()
+                with self.pool.cursor(readonly=True) as cur:
+                    state.load(cur)
+                totals = state.kpis()
+            return _json(totals)
+        return self.cached("kpis", None, etag, load)
+
+    def search(self, params):
+        limit = _int(params.get("limit", search.PAGE_SIZE), "limit", 1, MAX_PAGE_SIZE)
+        tables = params["tables"].split(",") if params.get("tables") else None
+        unknown = set(tables or ()) - set(search.FIELDS)
+        if unknown:
+            raise ApiError(f"tables must be among {', '.join(search.FIELDS)}")
+        try:
+            items, next_cursor = search.search(self.pool, params.get("q", ""), limit, params.get("after"), tables)
+        except ValueError as e:
+            raise ApiError(str(e)) from None
+        return _json({"items": items, "next": next_cursor})
+
+    def claim(self, items):
+        results = []
+        for result in reservations.reserve_many(self.pool, items):
+            if isinstance(result, reservations.ReservationError):
+                results.append({"error": str(result)})
+            else:
+                results.append({"claim_id": result.claim_id, "food_id": result.food_id,
+                                "quantity": result.quantity, "remaining": result.remaining})
+        return results
+
+
+# ---------------- HTTP ----------------
+def _not_modified(request, etag):
+    if etag is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    return etag in tags or "*" in tags
+
+
+def _body(body, etag, status=200):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else {"Cache-Control": "no-store"}
+    return Response(body, status_code=status, media_type="application/json", headers=headers)
+
+
+def _error(e):
+    return JSONResponse({"error": str(e)}, status_code=e.status)
+
+
+def create_app(api=None):
+    api = api or Api()
+
+    async def listings(request):
+        etag = api.etag()
+        if _not_modified(request, etag):
+            return _body(None, etag, status=304)
+        try:
+            return _body(await run_in_threadpool(api.listings, dict(request.query_params), etag), etag)
+        except ApiError as e:
+            return _error(e)
+
+    async def kpis(request):
+        etag = api.etag()
+        if _not_modified(request, etag):
+            return _body(None, etag, status=304)
+        return _body(await run_in_threadpool(api.kpis, etag), etag)
+
+    async def search_results(request):
+        try:
+            return _body(await run_in_threadpool(api.search, dict(request.query_params)), None)
+        except ApiError as e:
+            return _error(e)
+
+    async def claims(request):
+        try:
+            items = claim_requests(json.loads(await request.body()))
+        except json.JSONDecodeError:
+            return _error(ApiError("the body must be JSON"))
+        except ApiError as e:
+            return _error(e)
+        results = await run_in_threadpool(api.claim, items)
+        claimed = sum("claim_id" in result for result in results)
+        return _body(_json({"claimed": claimed, "failed": len(results) - claimed, "results": results}), None)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await run_in_threadpool(api.start)
+        yield
+        await run_in_threadpool(api.stop)
+
+    app = Starlette(routes=[Route("/listings", listings), Route("/kpis", kpis), Route("/search", search_results),
+                            Route("/claims", claims, methods=["POST"])], lifespan=lifespan)
+    app.state.api = api
+    return app
+
+
+app = create_app()
+
+
+# ---------------- CLI ----------------
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="server processes, each with its own pool")
+    args = parser.parse_args()
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Multi-row inserts, updates and deletes in one transaction per batch.
+
+Each call sends the whole batch with ``execute_values`` (one statement per
+distinct column set) inside a savepoint. If that fails, the batch is replayed
+row by row, each row in its own savepoint, so the caller learns exactly which
+records were rejected and why. With ``on_error="abort"`` (the default) nothing
+is committed when any row fails; ``on_error="skip"`` commits the good rows.
+``apply`` runs a mix of inserts, updates and deletes (e.g. a data-editor diff)
+as one transaction.
+"""
+import psycopg2
+from psycopg2.extras import execute_values
+
+from ingest import TABLES, to_date, to_int, to_text, to_timestamp
+
+PAGE_SIZE = 1000
+
+# ingest converter -> SQL type, for casting VALUES lists in UPDATE ... FROM
+SQL_TYPES = {to_int: "integer", to_text: "text", to_date: "date", to_timestamp: "timestamp"}
+
+
+class BatchError(Exception):
+    """Raised (after rolling back) when ``on_error="abort"`` and any row was rejected."""
+
+    def __init__(self, results):
+        super().__init__("; ".join(r.summary() for r in results))
+        self.results = results
+
+    @property
+    def errors(self):
+        return [(r.action, index, message) for r in self.results for index, message in r.errors]
+
+
+class BatchResult:
+    def __init__(self, table, action):
+        self.table = table
+        self.action = action
+        self.requested = 0
+        self.ids = []              # primary keys written (RETURNING)
+        self.errors = []           # (record index, message)
+
+    @property
+    def applied(self):
+        return len(self.ids)
+
+    def summary(self):
+        text = f"{self.table}: {self.action} {self.applied:,} of {self.requested:,} rows"
+        return text + (f", {len(self.errors):,} rejected" if self.errors else "")
+
+
+def _spec(table):
+    if table not in TABLES:
+        raise ValueError(f"unknown table {table!r}")
+    return TABLES[table]
+
+
+def _check_columns(table, columns):
+    unknown = set(columns) - set(_spec(table)["columns"])
+    if unknown:
+        raise ValueError(f"{table} has no column(s) {', '.join(sorted(unknown))}")
+
+
+def _message(error):
+    return (error.pgerror or str(error)).strip().splitlines()[0]
+
+
+def _groups(records, key):
+    """Group ``(index, record)`` pairs by ``key(record)``, keeping first-seen order."""
+    groups = {}
+    for index, record in enumerate(records):
+        groups.setdefault(key(record), []).append((index, record))
+    return groups.items()
+
+
+def _run(cur, statement, template, indexed, result):
+    """Run one execute_values statement for ``indexed`` records; fall back to per-row savepoints."""
+    cur.execute("SAVEPOINT batch")
+    try:
+        rows = execute_values(cur, statement, [values for _, values in indexed], template=template,
+                              page_size=PAGE_SIZE, fetch=True)
+        cur.execute("RELEASE SAVEPOINT batch")
+        result.ids.extend(row[0] for row in rows)
+        return
+    except psycopg2.Error:
+        cur.execute("ROLLBACK TO SAVEPOINT batch")
+    for index, values in indexed:
+        cur.execute("SAVEPOINT batch_row")
+        try:
+            rows = execute_values(cur, statement, [values], template=template, fetch=True)
+            cur.execute("RELEASE SAVEPOINT batch_row")
+            result.ids.extend(row[0] for row in rows)
+        except psycopg2.Error as e:
+            cur.execute("ROLLBACK TO SAVEPOINT batch_row")
+            result.errors.append((index, _message(e)))
+
+
+# ---------------- Statements ----------------
+def _insert(cur, table, records):
+    """Insert ``records`` (dicts of column -> value). A missing or None primary key uses the id default."""
+    spec = _spec(table)
+    pk = spec["pk"]
+    result = BatchResult(table, "inserted")
+    result.requested = len(records)
+
+    def columns_of(record):
+        _check_columns(table, record)
+        columns = tuple(c for c in spec["columns"] if c in record and not (c == pk and record[c] is None))
+        if not columns:
+            raise ValueError(f"empty {table} record")
+        return columns
+
+    for columns, indexed in _groups(records, columns_of):
+        statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s RETURNING {pk}"
+        _run(cur, statement, None, [(i, tuple(r[c] for c in columns)) for i, r in indexed], result)
+    return result
+
+
+def _update(cur, table, records):
+    """Apply ``records`` (dicts with the primary key plus the columns to change)."""
+    spec = _spec(table)
+    pk = spec["pk"]
+    result = BatchResult(table, "updated")
+    result.requested = len(records)
+
+    def changed(record):
+        if record.get(pk) is None:
+            raise ValueError(f"every {table} update needs a {pk}")
+        return tuple(sorted(c for c in record if c != pk))
+
+    for columns, indexed in _groups(records, changed):
+        _check_columns(table, columns)
+        if not columns:
+            continue
+        names = (pk, *columns)
+        template = "(" + ", ".join(f"%s::{SQL_TYPES[spec['columns'][c]]}" for c in names) + ")"
+        statement = (f"UPDATE {table} t SET {', '.join(f'{c} = v.{c}' for c in columns)} "
+                     f"FROM (VALUES %s) AS v({', '.join(names)}) "
+                     f"WHERE t.{pk} = v.{pk} RETURNING t.{pk}")
+        _run(cur, statement, template, [(i, tuple(r[c] for c in names)) for i, r in indexed], result)
+    return result
+
+
+def _delete(cur, table, ids):
+    """Delete the rows whose primary key is in ``ids``."""
+    pk = _spec(table)["pk"]
+    result = BatchResult(table, "deleted")
+    result.requested = len(ids)
+    statement = f"DELETE FROM {table} t USING (VALUES %s) AS v(id) WHERE t.{pk} = v.id RETURNING t.{pk}"
+    _run(cur, statement, "(%s::integer)", [(i, (id_,)) for i, id_ in enumerate(ids)], result)
+    return result
+
+
+# ---------------- Batch API ----------------
+def apply(pool, table, inserts=(), updates=(), deletes=(), on_error="abort"):
+    """Run inserts, then updates, then deletes on ``table`` in one transaction; returns their BatchResults."""
+    if on_error not in ("abort", "skip"):
+        raise ValueError(f"on_error must be 'abort' or 'skip', not {on_error!r}")
+    results = []
+    with pool.cursor() as cur:
+        if inserts:
+            results.append(_insert(cur, table, list(inserts)))
+        if updates:
+            results.append(_update(cur, table, list(updates)))
+        if deletes:
+            results.append(_delete(cur, table, list(deletes)))
+        for result in results:
+            result.errors.sort()
+        if on_error == "abort" and any(r.errors for r in results):
+            raise BatchError(results)       # rolls the whole transaction back
+    return results
+
+
+def insert_rows(pool, table, records, on_error="abort"):
+    return apply(pool, table, inserts=records, on_error=on_error)[0]
+
+
+def update_rows(pool, table, records, on_error="abort"):
+    return apply(pool, table, updates=records, on_error=on_error)[0]
+
+
+def delete_rows(pool, table, ids, on_error="abort"):
+    return apply(pool, table, deletes=ids, on_error=on_error)[0]
@@ -0,0 +1,218 @@
+"""Requests/sec and latency of the JSON API (api.py) under concurrent keep-alive clients.
+
+Starts ``uvicorn api:app`` against the benchmark database (filled with
+``--scale`` x the seed data, expiring around today) and drives it from
+``--processes`` client processes with ``--connections`` keep-alive
+connections each, for ``--seconds`` per scenario:
+
+* listings, uncached: a random city and expiry window per request, so every request runs its query
+* listings, cached: one of 20 cities per request, served from the result cache after the first
+* listings, If-None-Match: the cached scenario's ETags sent back, answered 304 without a query
+* kpis, If-None-Match: the same for /kpis
+* bulk claims: POST /claims with ``--batch`` one-unit claims on random current listings
+
+The client is a minimal HTTP/1.1 loop on asyncio streams, so it adds little
+per request; give it more processes if it saturates before the server.
+
+    python -m benchmarks.bench_api --scale 100 --connections 32 --seconds 10
+    python -m benchmarks.bench_api --skip-load --workers 4 --processes 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+import db
+from benchmarks.synthetic import build, recreate_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["listings, uncached", "listings, cached", "listings, If-None-Match", "kpis, If-None-Match",
+             "bulk claims"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(database, port, workers):
+    env = {**os.environ, "PGDATABASE": database}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port),
+                               "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+                              cwd=ROOT, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            status, headers, _ = asyncio.run(_one(port, _get("/kpis")))
+            if status == 200 and headers.get("etag"):     # the change feed is listening
+                return server
+        except OSError:
+            pass
+        if server.poll() is not None:
+            raise SystemExit("the API server exited during startup")
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("the API server did not become ready")
+
+
+# ---------------- HTTP client ----------------
+def _get(path, etag=None):
+    extra = f"If-None-Match: {etag}\r\n" if etag else ""
+    return f"GET {path} HTTP/1.1\r\nHost: bench\r\n{extra}\r\n".encode()
+
+
+def _post(path, body):
+    data = json.dumps(body).encode()
+    return (f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n").encode() + data
+
+
+async def _exchange(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+
+async def _one(port, request):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        return await _exchange(reader, writer, request)
+    finally:
+        writer.close()
+
+
+async def _connection(port, requests, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status, _, _ = await _exchange(reader, writer, requests())
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def _drive(args):
+    """One client process: ``connections`` keep-alive loops until ``seconds`` pass."""
+    port, scenario, context, connections, seconds, seed = args
+    rng = random.Random(seed)
+    make = REQUESTS[scenario]
+    latencies, statuses = [], {}
+
+    async def run():
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(_connection(port, lambda: make(rng, context), deadline, latencies, statuses)
+                               for _ in range(connections)))
+    asyncio.run(run())
+    return latencies, statuses
+
+
+REQUESTS = {
+    "listings, uncached": lambda rng, c: _get(
+        f"/listings?city={rng.choice(c['cities'])}&expires_to={c['today'] + timedelta(days=rng.randint(1, 5000))}"
+        f"&limit=50"),
+    "listings, cached": lambda rng, c: _get(f"/listings?city={rng.choice(c['cities'][:20])}&limit=50"),
+    "listings, If-None-Match": lambda rng, c: _get(*rng.choice(c["etags"])),
+    "kpis, If-None-Match": lambda rng, c: _get("/kpis", c["kpi_etag"]),
+    "bulk claims": lambda rng, c: _post("/claims", [
+        {"food_id": rng.choice(c["food_ids"]), "receiver_id": rng.randint(1, c["receivers"]), "quantity": 1}
+        for _ in range(c["batch"])]),
+}
+
+
+def context_for(pool, port, batch):
+    """Cities, current listing ids and the ETags the scenarios use."""
+    today = date.today()
+    _, rows = pool.fetch("SELECT location FROM food_listings WHERE expiry_date >= %s AND location IS NOT NULL "
+                         "GROUP BY location ORDER BY COUNT(*) DESC LIMIT 500", (today,))
+    cities = [city.replace(" ", "%20") for city, in rows]
+    _, rows = pool.fetch("SELECT food_id FROM food_listings WHERE expiry_date >= %s LIMIT 100000", (today,))
+    food_ids = [food_id for food_id, in rows]
+    _, rows = pool.fetch("SELECT MAX(receiver_id) FROM receivers")
+    context = {"today": today, "cities": cities, "food_ids": food_ids, "receivers": rows[0][0], "batch": batch}
+    context["etags"] = []
+    for city in cities[:20]:
+        path = f"/listings?city={city}&limit=50"
+        context["etags"].append((path, asyncio.run(_one(port, _get(path)))[1]["etag"]))
+    context["kpi_etag"] = asyncio.run(_one(port, _get("/kpis")))[1]["etag"]
+    return context
+
+
+def run_scenario(port, scenario, context, processes, connections, seconds):
+    jobs = [(port, scenario, context, connections, seconds, seed) for seed in range(processes)]
+    with multiprocessing.Pool(processes) as workers:
+        results = workers.map(_drive, jobs)
+    latencies = sorted(ms for result, _ in results for ms in result)
+    statuses = {}
+    for _, counts in results:
+        for status, n in counts.items():
+            statuses[status] = statuses.get(status, 0) + n
+    return {"scenario": scenario, "requests": len(latencies), "rps": len(latencies) / seconds,
+            "p50_ms": statistics.median(latencies), "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+            "statuses": statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=100, help="synthetic data size, multiple of the seed CSVs")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--processes", type=int, default=2, help="client processes")
+    parser.add_argument("--connections", type=int, default=16, help="keep-alive connections per client process")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each scenario")
+    parser.add_argument("--batch", type=int, default=10, help="claims per bulk request")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"]:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    server = None
+    try:
+        if not args.skip_load:
+            # the seed's expiry dates span two weeks; start them a week ago so half are current
+            build(pool, args.scale, anchor=date.today() - timedelta(days=7))
+        port = free_port()
+        server = start_server(args.database, port, args.workers)
+        context = context_for(pool, port, args.batch)
+        print(f"{args.workers} server worker(s), {args.processes} x {args.connections} connections, "
+              f"{args.seconds:.0f}s per scenario")
+        print(f"{'scenario':<26} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+        results = []
+        for scenario in args.scenarios:
+            result = run_scenario(port, scenario, context, args.processes, args.connections, args.seconds)
+            results.append(result)
+            print(f"{scenario:<26} {result['requests']:>9,} {result['rps']:>9,.0f} {result['p50_ms']:>8.2f} "
+                  f"{result['p99_ms']:>8.2f}  " + ", ".join(f"{s}: {n:,}" for s, n in sorted(result["statuses"].items())))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        pool.closeall()
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Dashboard KPI queries per minute with many sessions: rerun queries vs. the change feed.
+
+Simulates ``--sessions`` operators each refreshing the Dashboard every
+``--refresh`` seconds while claims are added and completed at
+``--writes`` per minute, for ``--seconds`` of wall time. The KPIs
+(Total Listings, Total Food Quantity, Total Claims, Claimed Quantity and
+the claim status counts) are read three ways, and the statements sent to
+Postgres are counted and scaled to a minute:
+
+* rerun, no cache: every refresh runs the KPI queries;
+* rerun, query cache: as the app did, through a ``QueryCache`` shared by
+  all sessions and invalidated by each write;
+* change feed: every refresh reads ``change_feed.ChangeFeed`` state, and
+  only the feed's own loads reach the database.
+
+Also reports the feed's notification lag, and checks that its KPIs match
+a fresh query at the end.
+
+    python -m benchmarks.bench_change_feed --sessions 50
+    python -m benchmarks.bench_change_feed --skip-load --seconds 60 --writes 600
+"""
+import argparse
+import random
+import statistics
+import time
+
+import change_feed
+import db
+from benchmarks.synthetic import build, recreate_database
+from query_cache import QueryCache
+
+KPI_QUERIES = [
+    "SELECT COUNT(*) AS listings, COALESCE(SUM(quantity), 0) AS quantity FROM food_listings",
+    "SELECT COUNT(*) AS claims FROM claims",
+    "SELECT SUM(c.quantity) AS claimed_qty FROM claims c JOIN food_listings f ON c.food_id = f.food_id",
+    "SELECT status, COUNT(*) AS count FROM claims GROUP BY status",
+]
+
+
+def query_kpis(pool):
+    (listings, quantity), = pool.fetch(KPI_QUERIES[0])[1]
+    (claims,), = pool.fetch(KPI_QUERIES[1])[1]
+    (claimed,), = pool.fetch(KPI_QUERIES[2])[1]
+    statuses = dict(pool.fetch(KPI_QUERIES[3])[1])
+    return {"listings": listings, "quantity": int(quantity), "claims": claims, "claimed": int(claimed or 0),
+            "statuses": statuses}
+
+
+class Writer:
+    """Adds Pending claims and completes them, as receivers do during distribution hours."""
+
+    def __init__(self, pool, rng):
+        self.pool = pool
+        self.rng = rng
+        _, rows = pool.fetch("SELECT food_id FROM food_listings")
+        self.food_ids = [row[0] for row in rows]
+        _, rows = pool.fetch("SELECT receiver_id FROM receivers")
+        self.receiver_ids = [row[0] for row in rows]
+        self.pending = []
+
+    def write(self):
+        with self.pool.cursor() as cur:
+            if self.pending and self.rng.random() < 0.5:
+                cur.execute("UPDATE claims SET status = 'Completed' WHERE claim_id = %s",
+                            (self.pending.pop(self.rng.randrange(len(self.pending))),))
+            else:
+                cur.execute("INSERT INTO claims (food_id, receiver_id, status, timestamp) "
+                            "VALUES (%s, %s, 'Pending', NOW()) RETURNING claim_id",
+                            (self.rng.choice(self.food_ids), self.rng.choice(self.receiver_ids)))
+                self.pending.append(cur.fetchone()[0])
+        return {"claims"}
+
+
+def simulate(seconds, sessions, refresh, writes_per_minute, read, write, rng):
+    """Run the refresh/write schedule in real time; returns the number of refreshes."""
+    events = [(rng.uniform(0, refresh), "read") for _ in range(sessions)]
+    if writes_per_minute:
+        events.append((rng.expovariate(writes_per_minute / 60), "write"))
+    start = time.monotonic()
+    refreshes = 0
+    while True:
+        events.sort()
+        at, kind = events.pop(0)
+        if at >= seconds:
+            return refreshes
+        delay = start + at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if kind == "read":
+            read()
+            refreshes += 1
+            events.append((at + refresh, "read"))
+        else:
+            write()
+            events.append((at + rng.expovariate(writes_per_minute / 60), "write"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1, help="synthetic data size, multiple of the seed CSVs")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--refresh", type=float, default=5.0, help="seconds between one session's refreshes")
+    parser.add_argument("--writes", type=float, default=120, help="claim writes per minute")
+    parser.add_argument("--seconds", type=float, default=30, help="wall time per mode")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"] and not args.skip_load:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    feed = None
+    try:
+        if not args.skip_load:
+            build(pool, args.scale, log=lambda msg: None)
+        per_minute = 60 / args.seconds
+        print(f"{args.sessions} sessions refreshing every {args.refresh:g} s, {args.writes:g} claim writes/min, "
+              f"{args.seconds:g} s per mode")
+        print(f"{'mode':<22} {'refreshes/min':>14} {'queries/min':>12} {'ms/refresh':>11}")
+
+        def report(mode, refreshes, queries, read_ms):
+            print(f"{mode:<22} {refreshes * per_minute:>14,.0f} {queries * per_minute:>12,.0f} "
+                  f"{statistics.mean(read_ms) if read_ms else 0:>11.2f}")
+
+        # Rerun, with and without the shared query cache
+        for mode in ("rerun, no cache", "rerun, query cache"):
+            cache = QueryCache() if mode.endswith("query cache") else None
+            writer = Writer(pool, random.Random(1))
+            queries, read_ms = [0], []
+
+            def fetch(query, cache=cache, queries=queries):
+                def load():
+                    queries[0] += 1
+                    return pool.fetch(query)
+                return cache.get_or_load(query, None, load) if cache is not None else load()
+
+            def read(fetch=fetch, read_ms=read_ms):
+                start = time.perf_counter()
+                for query in KPI_QUERIES:
+                    fetch(query)
+                read_ms.append((time.perf_counter() - start) * 1000)
+
+            def write(writer=writer, cache=cache):
+                tables = writer.write()
+                if cache is not None:
+                    cache.invalidate(tables)
+
+            refreshes = simulate(args.seconds, args.sessions, args.refresh, args.writes, read, write,
+                                 random.Random(0))
+            report(mode, refreshes, queries[0], read_ms)
+
+        # Change feed: one listener, sessions read its state
+        feed = change_feed.ChangeFeed(dsn={**db.DB_CONFIG, "dbname": args.database}).start()
+        if not feed.wait_ready():
+            raise SystemExit(f"change feed not ready: {feed.last_error or 'migrations not applied'}")
+        writer, read_ms, lags = Writer(pool, random.Random(1)), [], {}
+        before = feed.queries
+
+        def read_feed():
+            start = time.perf_counter()
+            feed.kpis()
+            read_ms.append((time.perf_counter() - start) * 1000)
+            if feed.lag is not None:
+                lags[feed.events] = feed.lag * 1000         # one sample per applied notification seen
+
+        refreshes = simulate(args.seconds, args.sessions, args.refresh, args.writes, read_feed, writer.write,
+                             random.Random(0))
+        report("change feed", refreshes, feed.queries - before, read_ms)
+        time.sleep(change_feed.POLL_SECONDS)
+        fresh, live = query_kpis(pool), feed.kpis()
+        print(f"feed: {feed.events:,} notifications applied, last-change lag median "
+              f"{statistics.median(lags.values()) if lags else 0:.1f} ms; KPIs match a fresh query: {fresh == live}")
+    finally:
+        if feed is not None:
+            feed.stop()
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
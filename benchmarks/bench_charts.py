@@ -0,0 +1,97 @@
+"""Plotly payload size per chart as the tables grow: raw rows vs. the chart-data layer.
+
+Builds synthetic listings/claims frames at each size, draws the Dashboard and
+EDA figures both ways, and prints the JSON payload and build time. Once the
+category/point caps are reached the chart-layer payload must stop growing: the
+script exits with status 1 if any chart grows by more than ``--tolerance``
+between the two largest sizes, so it doubles as a regression check.
+
+    python -m benchmarks.bench_charts --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+import chart_data
+
+FOODS = ["Rice", "Bread", "Soup", "Salad", "Chicken", "Fish", "Pasta", "Fruits", "Dairy", "Vegetables"]
+FOOD_TYPES = ["Vegetarian", "Non-Vegetarian", "Vegan"]
+
+
+def synthetic(n, seed=3):
+    rng = np.random.default_rng(seed)
+    listings = pd.DataFrame({
+        "food_name": rng.choice(FOODS, n),
+        "food_type": rng.choice(FOOD_TYPES, n),
+        "quantity": rng.integers(1, 51, n),
+        "city": [f"City {i}" for i in rng.integers(0, max(1, n // 10), n)],
+        "expiry_date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, max(30, n // 10), n), "D"),
+    })
+    receivers = pd.DataFrame({
+        "receiver_name": [f"Receiver {i}" for i in range(max(1, n // 2))],
+        "total_claimed": rng.integers(1, 200, max(1, n // 2)),
+    })
+    return listings, receivers
+
+
+def figures(listings, receivers, layer):
+    """(title, builder) for each chart; ``layer`` selects the chart-data path."""
+    by_city = listings.groupby("city").size().reset_index(name="listings")
+    daily = listings.groupby("expiry_date").size().reset_index(name="donations")
+    if layer:
+        foods = chart_data.top_n(listings.groupby("food_name")["quantity"].sum().reset_index(),
+                                 "food_name", "quantity")
+        receivers = chart_data.top_n(receivers, "receiver_name", "total_claimed")
+        by_city = chart_data.top_n(by_city, "city", "listings")
+        daily = chart_data.downsample(daily, "expiry_date", "donations")
+        bubbles = chart_data.largest(listings, "quantity")
+    else:
+        foods, bubbles = listings, listings
+    return [
+        ("food listings bar", lambda: px.bar(foods, x="food_name", y="quantity")),
+        ("receivers pie", lambda: px.pie(receivers, names="receiver_name", values="total_claimed")),
+        ("listings by city", lambda: px.bar(by_city, x="city", y="listings")),
+        ("expiry scatter", lambda: px.scatter(bubbles, x="expiry_date", y="quantity", size="quantity")),
+        ("donation trend", lambda: px.line(daily, x="expiry_date", y="donations")),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--raw-limit", type=int, default=100_000,
+                        help="skip the raw-row figures above this many rows (they get very slow)")
+    parser.add_argument("--tolerance", type=float, default=1.1)
+    args = parser.parse_args()
+
+    payloads = {}
+    print(f"{'rows':>9} {'chart':<20} {'raw KiB':>10} {'raw ms':>9} {'layer KiB':>10} {'layer ms':>9}")
+    for n in sorted(args.sizes):
+        listings, receivers = synthetic(n)
+        raw = figures(listings, receivers, layer=False) if n <= args.raw_limit else None
+        for i, (title, build) in enumerate(figures(listings, receivers, layer=True)):
+            start = time.perf_counter()
+            size = chart_data.payload_bytes(build())
+            layer_ms = (time.perf_counter() - start) * 1000
+            payloads.setdefault(title, []).append(size)
+            raw_cols = f"{'-':>10} {'-':>9}"
+            if raw is not None:
+                start = time.perf_counter()
+                raw_size = chart_data.payload_bytes(raw[i][1]())
+                raw_cols = f"{raw_size / 1024:>10,.1f} {(time.perf_counter() - start) * 1000:>9.0f}"
+            print(f"{n:>9,} {title:<20} {raw_cols} {size / 1024:>10,.1f} {layer_ms:>9.0f}")
+
+    unbounded = [title for title, sizes in payloads.items()
+                 if sizes[-1] > sizes[max(len(sizes) - 2, 0)] * args.tolerance]
+    if unbounded:
+        print(f"payload still growing (> {args.tolerance}x between the two largest sizes): {', '.join(unbounded)}")
+        sys.exit(1)
+    print(f"chart payloads bounded: within {args.tolerance}x between the two largest sizes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Render-data cost of the EDA page: SQL pushdown vs. the legacy pandas path.
+
+Times ``eda.sql_aggregates`` and ``eda.pandas_aggregates`` (no result cache)
+for all cities and for one city, and reports the size of everything fetched
+from PostgreSQL.
+
+    python -m benchmarks.bench_eda --city "East Sheena" --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+import db
+import eda
+import frames
+from query_cache import frame_size
+
+
+def make_loader(pool):
+    def load(query, params=None):
+        return frames.fetch_frame(pool, query, params)
+    return load
+
+
+def measure(compute, load, city, repeat):
+    timings, fetched = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = compute(load, city)
+        timings.append(time.perf_counter() - start)
+        fetched = sum(frame_size(df) for df in data["source_frames"])
+    return statistics.median(timings), fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--city", help="city to filter on (default: the most common provider city)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pool = db.create_pool()
+    load = make_loader(pool)
+    city = args.city or load("SELECT city FROM providers GROUP BY city ORDER BY COUNT(*) DESC LIMIT 1")["city"].iloc[0]
+
+    print(f"{'engine':<10} {'filter':<24} {'ms':>10} {'KiB fetched':>12}")
+    for name, compute in [("sql", eda.sql_aggregates), ("pandas", eda.pandas_aggregates)]:
+        for label, value in [("all cities", None), (city, city)]:
+            seconds, fetched = measure(compute, load, value, args.repeat)
+            print(f"{name:<10} {label[:24]:<24} {seconds * 1000:>10.1f} {fetched / 1024:>12,.1f}")
+    pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Main Dashboard filter options: four ``SELECT DISTINCT`` scans vs. the facet index.
+
+Loads a database whose ``food_listings`` table has ``--rows`` rows (other
+tables at seed size), builds a ``facets.FacetIndex``, then for a series of
+random filter selections times the four DISTINCT queries the page used to run
+against ``FacetIndex.counts`` (which also returns the cross-filtered counts).
+Also reports the build time and the cost of keeping the index in step with a
+batch of listing writes.
+
+    python -m benchmarks.bench_facets --rows 1000000
+    python -m benchmarks.bench_facets --skip-load
+"""
+import argparse
+import random
+import statistics
+import time
+
+import db
+import facets
+from benchmarks.synthetic import build, recreate_database
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - start) * 1000
+
+
+def distinct_scans(pool):
+    return {name: pool.fetch(f"SELECT DISTINCT {name} FROM food_listings")[1] for name in facets.FACETS}
+
+
+def selections(index, n, rng):
+    """Random picks of 0-3 options in 0-2 facets, drawn from the index's own values."""
+    options = index.counts()
+    picks = []
+    for _ in range(n):
+        chosen = {}
+        for name in rng.sample(facets.FACETS, rng.randint(0, 2)):
+            values = options[name]["value"].tolist()
+            chosen[name] = rng.sample(values, min(len(values), rng.randint(1, 3)))
+        picks.append(chosen)
+    return picks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="food_listings rows to load")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--selections", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=1000, help="listings updated for the incremental step")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"] and not args.skip_load:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    try:
+        if not args.skip_load:
+            build(pool, 1, rows={"food_listings": args.rows}, log=lambda msg: None)
+        rng = random.Random(0)
+
+        index = facets.FacetIndex()
+        (_, rows), fetch_ms = _timed(lambda: pool.fetch(facets.FACET_ROWS_SQL))
+        _, build_ms = _timed(lambda: index.build(rows))
+        index.set_labels("provider_id", pool.fetch(facets.PROVIDER_NAMES_SQL)[1])
+        print(f"{len(index):,} listings: fetch {fetch_ms:,.0f} ms, build {build_ms:,.0f} ms")
+
+        picks = selections(index, args.selections, rng)
+        scan_ms = [_timed(lambda: distinct_scans(pool))[1] for _ in picks]
+        facet_ms = [_timed(lambda: index.counts(chosen))[1] for chosen in picks]
+        print(f"{'method':<28} {'median ms':>10} {'p95 ms':>8}")
+        for method, samples in (("4x SELECT DISTINCT", scan_ms), ("FacetIndex.counts (x-filter)", facet_ms)):
+            p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+            print(f"{method:<28} {statistics.median(samples):>10.2f} {p95:>8.2f}")
+
+        food_ids = rng.sample([row[0] for row in rows], min(args.writes, len(rows)))
+        with pool.cursor() as cur:
+            cur.execute("UPDATE food_listings SET location = location || ' (moved)' WHERE food_id = ANY(%s)",
+                        (food_ids,))
+        (_, fresh), refetch_ms = _timed(lambda: pool.fetch(facets.FACET_ROWS_SQL + " WHERE f.food_id = ANY(%s)",
+                                                           (food_ids,)))
+        _, upsert_ms = _timed(lambda: index.upsert(fresh))
+        print(f"incremental update of {len(food_ids):,} listings: re-read {refetch_ms:,.1f} ms, "
+              f"upsert {upsert_ms:,.1f} ms (full rebuild: {fetch_ms + build_ms:,.0f} ms)")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Result fetching: ``fetchall()`` tuples + ``pd.DataFrame`` vs. ``frames.fetch_frame``.
+
+Loads a database whose ``claims`` table has ``--rows`` rows (parents at seed
+size), then pulls ``SELECT * FROM claims`` with each method in a fresh
+subprocess, so peak RSS (``ru_maxrss``) belongs to that one pull. Reports
+wall time, peak RSS growth, and the DataFrame's own memory and dtypes.
+
+    python -m benchmarks.bench_fetch --rows 5000000
+    python -m benchmarks.bench_fetch --skip-load
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+import db
+import frames
+from benchmarks.synthetic import build, recreate_database
+
+QUERY = "SELECT * FROM claims"
+
+
+def legacy(pool):
+    """What ``load_data`` did: every row as a tuple, then inferred columns."""
+    columns, rows = pool.fetch(QUERY)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def typed(pool):
+    return frames.fetch_frame(pool, QUERY)
+
+
+METHODS = {"fetchall + DataFrame": legacy, "fetch_frame": typed}
+
+
+def worker(method, database):
+    pool = db.create_pool(dbname=database, minconn=1)
+    try:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        df = METHODS[method](pool)
+        seconds = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    finally:
+        pool.closeall()
+    print(json.dumps({"rows": len(df), "seconds": seconds, "peak_mib": (peak - before) / 1024,
+                      "frame_mib": df.memory_usage(deep=True).sum() / 2**20,
+                      "dtypes": {c: str(t) for c, t in df.dtypes.items()}}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000, help="claims rows to load")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--worker", choices=list(METHODS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.worker, args.database)
+    if args.database == db.DB_CONFIG["dbname"] and not args.skip_load:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+        pool = db.create_pool(dbname=args.database)
+        try:
+            build(pool, 1, rows={"claims": args.rows}, migrations=False)
+        finally:
+            pool.closeall()
+
+    print(f"{'method':<22} {'rows':>10} {'seconds':>8} {'peak MiB':>9} {'frame MiB':>10}  dtypes")
+    for method in METHODS:
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_fetch", "--worker", method,
+                              "--database", args.database], capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{method:<22} {r['rows']:>10,} {r['seconds']:>8.2f} {r['peak_mib']:>9,.0f} {r['frame_mib']:>10,.0f}  "
+              + ", ".join(f"{c}={t}" for c, t in r["dtypes"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Trend reports from the rollup tables, and batch forecasting of many series.
+
+Part 1 loads a database whose ``food_listings`` table has ``--rows`` rows and
+times the trend queries against the base tables (query 16's monthly
+``GROUP BY``, and weekly listings per city x food type) against the same
+results read from the rollups, plus what the rollup triggers add to a batch
+insert of listings and claims.
+
+Part 2 fits ``--series`` synthetic weekly series (level, trend, yearly cycle
+and Poisson noise; the generated database only spans a few weeks, too short
+to forecast) with ``forecast.fit`` in one batch and one series at a time, and
+backtests the batch fit against the naive mean-of-last-3 forecast.
+
+    python -m benchmarks.bench_forecast --rows 1000000
+    python -m benchmarks.bench_forecast --skip-load --series 5000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+import db
+import forecast
+import rollups
+from benchmarks.synthetic import build, recreate_database
+
+SCAN_QUERIES = {
+    "monthly donations": """
+        SELECT TO_CHAR(expiry_date, 'YYYY-MM') AS month, COUNT(*) AS donation_count
+        FROM food_listings
+        GROUP BY month
+        ORDER BY month
+    """,
+    "weekly city x food_type": """
+        SELECT location AS city, food_type, date_trunc('week', expiry_date)::date AS period, COUNT(*) AS listings
+        FROM food_listings
+        WHERE expiry_date IS NOT NULL
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+    """,
+}
+ROLLUP_QUERIES = {
+    "monthly donations": rollups.series_sql("listings", "month"),
+    "weekly city x food_type": rollups.series_sql("listings", "week", by=("city", "food_type")),
+}
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def insert_ms(pool, rows, triggers):
+    """One batch insert of ``rows`` listings and as many claims, rolled back afterwards."""
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            if not triggers:
+                cur.execute("ALTER TABLE food_listings DISABLE TRIGGER USER")
+                cur.execute("ALTER TABLE claims DISABLE TRIGGER USER")
+            cur.execute("SELECT (SELECT COALESCE(MAX(food_id), 0) FROM food_listings), "
+                        "(SELECT COALESCE(MAX(claim_id), 0) FROM claims)")
+            food_base, claim_base = cur.fetchone()
+            start = time.perf_counter()
+            cur.execute("""
+                INSERT INTO food_listings (food_id, food_name, quantity, expiry_date, provider_id, location, food_type)
+                SELECT %(food)s + g, f.food_name, f.quantity, f.expiry_date + (g %% 60), f.provider_id,
+                       f.location, f.food_type
+                FROM generate_series(1, %(rows)s) g
+                JOIN food_listings f ON f.food_id = (SELECT MIN(food_id) FROM food_listings) + g %% 1000
+            """, {"food": food_base, "rows": rows})
+            cur.execute("""
+                INSERT INTO claims (claim_id, food_id, receiver_id, status, timestamp)
+                SELECT %(claim)s + g, %(food)s + g, (SELECT MIN(receiver_id) FROM receivers), 'Pending',
+                       TIMESTAMP '2025-03-01' + g * INTERVAL '1 minute'
+                FROM generate_series(1, %(rows)s) g
+            """, {"claim": claim_base, "food": food_base, "rows": rows})
+            elapsed = (time.perf_counter() - start) * 1000
+        conn.rollback()
+    return elapsed
+
+
+def synthetic_series(n, periods, season=52, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(periods)
+    base = rng.gamma(2.0, 10.0, (n, 1)) + 1
+    growth = rng.normal(0, 0.15, (n, 1)) * base / season
+    amplitude = rng.uniform(0, 0.6, (n, 1)) * base
+    phase = rng.uniform(0, 2 * np.pi, (n, 1))
+    rate = np.maximum(base + growth * t + amplitude * np.sin(2 * np.pi * t / season + phase), 0.1)
+    return rng.poisson(rate).astype(float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="food_listings rows to load")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--insert-rows", type=int, default=1000, help="batch size for the trigger overhead")
+    parser.add_argument("--series", type=int, default=3000, help="synthetic series to fit")
+    parser.add_argument("--periods", type=int, default=156, help="weekly periods per synthetic series")
+    parser.add_argument("--loop-sample", type=int, default=200, help="series fitted one at a time")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"] and not args.skip_load:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    try:
+        if not args.skip_load:
+            build(pool, 1, rows={"food_listings": args.rows}, log=lambda msg: None)
+        _, rows = pool.fetch("SELECT COUNT(*) FROM food_listings")
+        print(f"{rows[0][0]:,} listings")
+        print(f"{'report':<26} {'base tables ms':>15} {'rollups ms':>11} {'speedup':>8}")
+        for name, scan in SCAN_QUERIES.items():
+            scan_ms = _median_ms(lambda: pool.fetch(scan), args.repeat)
+            rollup_ms = _median_ms(lambda: pool.fetch(*ROLLUP_QUERIES[name]), args.repeat)
+            print(f"{name:<26} {scan_ms:>15.1f} {rollup_ms:>11.1f} {scan_ms / rollup_ms:>7.0f}x")
+        plain = _median_ms(lambda: insert_ms(pool, args.insert_rows, triggers=False), args.repeat)
+        maintained = _median_ms(lambda: insert_ms(pool, args.insert_rows, triggers=True), args.repeat)
+        print(f"insert {args.insert_rows:,} listings + claims: {plain:.1f} ms without rollup triggers, "
+              f"{maintained:.1f} ms with")
+    finally:
+        pool.closeall()
+
+    values = synthetic_series(args.series, args.periods)
+    season, horizon = rollups.SEASON["week"], rollups.HORIZON["week"]
+    metrics, fitted = forecast.backtest(values, horizon, season)
+    sample = values[:args.loop_sample, :-horizon]
+    start = time.perf_counter()
+    for row in sample:
+        forecast.fit(row[None, :], season)
+    loop_s = (time.perf_counter() - start) * len(values) / len(sample)
+    print(f"\n{args.series:,} weekly series x {args.periods - horizon} periods: batch fit {fitted.seconds:.2f} s, "
+          f"one at a time ~{loop_s:.1f} s (extrapolated from {len(sample)})")
+    print(f"backtest over the last {horizon} weeks:")
+    print(metrics.round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
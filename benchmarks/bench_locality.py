@@ -0,0 +1,113 @@
+"""locality.py at scale: grid radius lookups vs. a brute-force distance scan.
+
+Listings are generated in memory (no database). In the "localities" layout
+they sit at ``--places`` gazetteer points drawn from a skewed distribution,
+as geocoded city names do. In the "distinct points" layout every listing has
+its own point (street-level geocoding). Receivers are placed the same way.
+For each radius, ``--queries`` lookups go through ``locality.SpatialIndex``
+and ``--scan-queries`` through a haversine scan of every listing. The two
+must return the same listings. Also times ``LocalityIndex`` lookups with
+``--pending`` row-level updates waiting beside the grid.
+
+    python -m benchmarks.bench_locality --listings 1000000
+    python -m benchmarks.bench_locality --listings 5000000 --km 5 25 100
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import locality
+
+
+def synthetic(n_listings, n_places, layout, seed=11):
+    rng = np.random.default_rng(seed)
+    (lat_lo, lat_hi), (lon_lo, lon_hi) = locality.SYNTHETIC_BOUNDS
+    place_lat = rng.uniform(lat_lo, lat_hi, n_places)
+    place_lon = rng.uniform(lon_lo, lon_hi, n_places)
+    weight = 1 / np.arange(1, n_places + 1)            # Zipf-like: a few big cities
+    weight /= weight.sum()
+    place = rng.choice(n_places, n_listings, p=weight)
+    lat, lon = place_lat[place], place_lon[place]
+    if layout == "distinct points":
+        lat = lat + rng.normal(0, 0.1, n_listings)     # ~10 km around the city centre
+        lon = lon + rng.normal(0, 0.1, n_listings)
+    queries = rng.choice(n_places, 10_000)
+    return place, place_lat, place_lon, lat, lon, place_lat[queries], place_lon[queries]
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1e6
+
+
+def brute_force(lat, lon, query_lat, query_lon, km):
+    distance = locality.haversine_km(query_lat, query_lon, lat, lon)
+    near = np.flatnonzero(distance <= km)
+    return near, distance[near]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=1_000_000)
+    parser.add_argument("--places", type=int, default=2_500, help="distinct gazetteer points")
+    parser.add_argument("--km", type=float, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--queries", type=int, default=2_000, help="index lookups per radius")
+    parser.add_argument("--scan-queries", type=int, default=20, help="brute-force scans per radius")
+    parser.add_argument("--pending", type=int, default=1_000, help="row-level updates beside the grid")
+    parser.add_argument("--budget-us", type=float, default=1000, help="fail if the median lookup is slower")
+    args = parser.parse_args()
+
+    slow = False
+    for layout in ("localities", "distinct points"):
+        _, _, _, lat, lon, query_lat, query_lon = synthetic(args.listings, args.places, layout)
+        ids = np.arange(len(lat), dtype=np.int64)
+        grid = locality.SpatialIndex(ids, lat, lon)
+        print(f"\n{layout}: {len(grid):,} listings at {grid.points:,} points, grid built in {grid.seconds:.2f} s")
+        print(f"{'km':>6} {'listings found':>15} {'index p50 us':>13} {'index p95 us':>13} "
+              f"{'scan p50 ms':>12} {'speedup':>8}")
+        for km in args.km:
+            found, index_us = [], []
+            for q in range(args.queries):
+                (hits, _), us = _timed(grid.within, query_lat[q], query_lon[q], km)
+                found.append(len(hits))
+                index_us.append(us)
+            scan_us = []
+            for q in range(args.scan_queries):
+                (expected, _), us = _timed(brute_force, lat, lon, query_lat[q], query_lon[q], km)
+                scan_us.append(us)
+                hits, _ = grid.within(query_lat[q], query_lon[q], km)
+                if not np.array_equal(np.sort(hits), expected):
+                    sys.exit(f"index and scan disagree at ({query_lat[q]:.4f}, {query_lon[q]:.4f}), {km:g} km")
+            p50 = statistics.median(index_us)
+            slow |= p50 > args.budget_us
+            print(f"{km:>6g} {statistics.mean(found):>15,.0f} {p50:>13.0f} "
+                  f"{np.percentile(index_us, 95):>13.0f} {statistics.median(scan_us) / 1000:>12.1f} "
+                  f"{statistics.median(scan_us) / p50:>7.0f}x")
+
+    # LocalityIndex as the app uses it: names through the gazetteer, plus row-level updates
+    place, place_lat, place_lon, _, _, query_lat, query_lon = synthetic(args.listings, args.places, "localities")
+    rng = np.random.default_rng(3)
+    names = np.array([f"City {i}" for i in range(args.places)], dtype=object)
+    index = locality.LocalityIndex(compact_after=args.pending + 1)
+    start = time.perf_counter()
+    index.build(zip(range(args.listings), names[place], [None] * args.listings),
+                [(locality.normalize(name), name, a, b) for name, a, b in zip(names, place_lat, place_lon)])
+    build_s = time.perf_counter() - start
+    moved = rng.choice(args.listings, args.pending, replace=False)
+    index.upsert((int(food_id), names[rng.integers(args.places)], None) for food_id in moved)
+    km = args.km[len(args.km) // 2]
+    lookup_us = [_timed(index.within, query_lat[q], query_lon[q], km)[1] for q in range(args.queries)]
+    print(f"\nLocalityIndex: built from {args.listings:,} named listings in {build_s:.2f} s; {km:g} km lookups "
+          f"with {args.pending:,} pending updates: p50 {statistics.median(lookup_us):.0f} us, "
+          f"p95 {np.percentile(lookup_us, 95):.0f} us (sorted by distance)")
+    if slow:
+        print(f"median grid lookup over the {args.budget_us:g} us budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
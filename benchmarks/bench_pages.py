@@ -0,0 +1,211 @@
+"""Headless timing of every App.py page code path, with baseline regression checks.
+
+Each scenario (a page plus the widget values it needs) is driven through
+``streamlit.testing.v1.AppTest``, so the real script runs without a browser.
+A scenario is timed cold (all ``st.cache_resource`` objects dropped first:
+pool, result cache, risk index, ...) and warm (an immediate rerun), ``--repeat``
+times each, and the medians are written as JSON.
+
+    python -m benchmarks.bench_pages --scale 100 --out results.json
+    python -m benchmarks.bench_pages --skip-load --baseline baseline.json
+    python -m benchmarks.bench_pages --compare results.json --baseline baseline.json
+
+``--baseline`` marks a scenario as a regression when its median is more than
+``--tolerance`` slower than the baseline and by at least ``--min-ms``; the
+exit status is 1 if anything regressed or raised.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import db
+from benchmarks.synthetic import build, recreate_database
+from predefined_queries import queries
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "App.py")
+TABLES = ["providers", "receivers", "food_listings", "claims"]
+
+
+# ---------------- Scenarios ----------------
+def _select(at, label, value):
+    next(w for w in at.selectbox if w.label == label).set_value(value)
+
+
+def _filter(at, label):
+    """Pick the first option of a sidebar multiselect (Main Dashboard filters)."""
+    widget = next(w for w in at.sidebar.multiselect if w.label == label)
+    if widget.options:
+        widget.set_value([widget.options[0]])
+
+
+def _click(at, key):
+    next(b for b in at.button if b.key == key).click()
+
+
+def scenarios():
+    """``(name, page, action)``; ``action(at)`` sets widgets after the page's first run."""
+    yield "Dashboard", "Dashboard", None
+    yield "Main Dashboard", "Main Dashboard", None
+    yield "Main Dashboard: location filter", "Main Dashboard", lambda at: _filter(at, "Filter by Location")
+    yield "Main Dashboard: food+meal filter", "Main Dashboard", lambda at: (
+        _filter(at, "Filter by Food Type"), _filter(at, "Filter by Meal Type"))
+    for table in TABLES:
+        yield f"View Tables: {table}", "View Tables", lambda at, t=table: _select(at, "Select Table", t)
+    for name in queries:
+        yield f"Run Queries: {name}", "Run Queries", lambda at, n=name: (
+            _select(at, "Choose a predefined query", n), _click(at, "run_predefined"))
+    for engine in ("SQL (pushdown)", "pandas (legacy)"):
+        yield f"EDA: {engine}", "EDA & Predictions", lambda at, e=engine: at.radio(key="eda_engine").set_value(e)
+    yield "EDA: SQL one city", "EDA & Predictions", lambda at: (
+        at.sidebar.selectbox[0].set_value(at.sidebar.selectbox[0].options[1]))
+    for page in ("Dashboard", "Main Dashboard", "EDA & Predictions"):
+        yield f"{page}: snapshot", page, lambda at: at.sidebar.toggle(key="use_snapshot").set_value(True)
+
+
+def _timed_run(at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    return (time.perf_counter() - start) * 1000
+
+
+def run_scenario(page, action, repeat, timeout):
+    cold, warm = [], []
+    for _ in range(repeat):
+        at = AppTest.from_file(APP, default_timeout=timeout)
+        at.session_state["menu"] = page
+        at.run()
+        if action is not None:
+            action(at)
+        st.cache_resource.clear()
+        cold.append(_timed_run(at, timeout))
+        warm.append(_timed_run(at, timeout))
+        if at.exception:
+            return cold, warm, at.exception[0].value
+    return cold, warm, None
+
+
+def run(repeat, timeout, only=None, log=print):
+    results = []
+    for name, page, action in scenarios():
+        if only and not any(term.lower() in name.lower() for term in only):
+            continue
+        cold, warm, error = run_scenario(page, action, repeat, timeout)
+        results.append({"scenario": name, "page": page,
+                        "cold_ms": round(statistics.median(cold), 2), "warm_ms": round(statistics.median(warm), 2),
+                        "cold_runs": [round(v, 2) for v in cold], "warm_runs": [round(v, 2) for v in warm],
+                        "error": error})
+        log(f"{name[:60]:<60} {results[-1]['cold_ms']:>10.1f} {results[-1]['warm_ms']:>10.1f}"
+            + (f"  ERROR {error}" if error else ""))
+    return results
+
+
+def table_counts(pool):
+    return {table: pool.fetch(f"SELECT COUNT(*) FROM {table}")[1][0][0] for table in TABLES}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(APP), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------- Baseline comparison ----------------
+def compare(results, baseline, tolerance=0.25, min_ms=5.0):
+    """Rows of ``(scenario, metric, baseline ms, current ms, ratio, regressed)``."""
+    base = {r["scenario"]: r for r in baseline["results"]}
+    rows = []
+    for result in results["results"]:
+        old = base.get(result["scenario"])
+        if old is None:
+            continue
+        for metric in ("cold_ms", "warm_ms"):
+            before, after = old[metric], result[metric]
+            ratio = after / before if before else float("inf")
+            regressed = after > before * (1 + tolerance) and after - before >= min_ms
+            rows.append((result["scenario"], metric, before, after, ratio, regressed))
+    return rows
+
+
+def report(rows):
+    print(f"{'scenario':<60} {'metric':<8} {'base ms':>9} {'now ms':>9} {'ratio':>6}")
+    for scenario, metric, before, after, ratio, regressed in rows:
+        print(f"{scenario[:60]:<60} {metric[:-3]:<8} {before:>9.1f} {after:>9.1f} {ratio:>5.2f}x"
+              + ("  REGRESSION" if regressed else ""))
+    regressions = [r for r in rows if r[-1]]
+    print(f"{len(regressions)} regression(s) in {len(rows)} comparisons")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1, help="synthetic data size, multiple of the seed CSVs")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--anchor-days", type=int, default=-7,
+                        help="first expiry date relative to today, so near-expiry views have data")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per script run")
+    parser.add_argument("--only", nargs="+", help="run scenarios whose name contains any of these terms")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--compare", help="compare this results JSON with --baseline without running anything")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    if args.compare and not args.baseline:
+        parser.error("--compare needs --baseline")
+    if args.database == db.DB_CONFIG["dbname"] and not args.skip_load:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if args.compare:
+        with open(args.compare) as f:
+            results = json.load(f)
+    else:
+        if not args.skip_load:
+            recreate_database(args.database)
+            pool = db.create_pool(dbname=args.database)
+            try:
+                build(pool, args.scale, anchor=date.today() + timedelta(days=args.anchor_days))
+            finally:
+                pool.closeall()
+        db.DB_CONFIG["dbname"] = args.database          # App.py's pool uses DB_CONFIG
+        pool = db.create_pool()
+        try:
+            counts = table_counts(pool)
+        finally:
+            pool.closeall()
+        print(f"{'scenario':<60} {'cold ms':>10} {'warm ms':>10}")
+        results = {
+            "meta": {"scale": args.scale, "database": args.database, "rows": counts, "repeat": args.repeat,
+                     "git_commit": _git_commit(), "python": platform.python_version(),
+                     "streamlit": st.__version__, "run_at": datetime.now().isoformat(timespec="seconds")},
+            "results": run(args.repeat, args.timeout, args.only),
+        }
+        st.cache_resource.clear()
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+
+    failed = [r["scenario"] for r in results["results"] if r["error"]]
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = report(compare(results, json.load(f), args.tolerance, args.min_ms))
+    if failed:
+        print(f"scenarios that raised: {', '.join(failed)}")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
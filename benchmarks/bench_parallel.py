@@ -0,0 +1,125 @@
+"""Page latency with a page's independent queries run one by one vs. concurrently.
+
+For each page's query set (the SQL the Dashboard, Main Dashboard and EDA
+pages issue), times ``frames.fetch_frame`` one query after another against
+``parallel.QueryExecutor`` at several per-session concurrency limits, and
+reports the median time until the whole page is loaded, until its first
+result is in, and on average until each result is in (when its chart can be
+drawn). Concurrency only shortens the page time when the server has idle
+cores (or the round trips dominate); on a single core the gain is in the
+per-result times, where cheap queries would otherwise wait behind expensive ones.
+
+    python -m benchmarks.bench_parallel --scale 100
+    python -m benchmarks.bench_parallel --skip-load --limits 1 2 4 8
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import date
+
+import chart_data
+import db
+import eda
+import frames
+import parallel
+from benchmarks.synthetic import build, recreate_database
+
+RECEIVER_TOTALS = """
+    SELECT r.name AS receiver_name, SUM(c.quantity) AS total_claimed
+    FROM claims c
+    JOIN receivers r ON c.receiver_id = r.receiver_id
+    JOIN food_listings f ON c.food_id = f.food_id
+    GROUP BY r.name
+"""
+
+
+def page_queries():
+    """``{page: {name: (sql, params)}}`` as the pages issue them without materialized aggregates."""
+    return {
+        "Dashboard": {
+            "listing_totals": ("SELECT COUNT(*) AS listings, COALESCE(SUM(quantity), 0) AS quantity "
+                               "FROM food_listings", None),
+            "claim_totals": ("SELECT COUNT(*) AS claims FROM claims", None),
+            "claimed": ("SELECT SUM(c.quantity) AS claimed_qty FROM claims c "
+                        "JOIN food_listings f ON c.food_id = f.food_id", None),
+            "food_chart": (chart_data.top_n_sql(
+                "SELECT food_name, SUM(quantity) AS quantity FROM food_listings GROUP BY food_name",
+                "food_name", "quantity"), None),
+            "receiver_chart": (chart_data.top_n_sql(RECEIVER_TOTALS, "receiver_name", "total_claimed"), None),
+        },
+        "Main Dashboard": {
+            **{col: (f"SELECT DISTINCT {col} FROM food_listings", None)
+               for col in ("location", "provider_id", "food_type", "meal_type")},
+            "listings": ("SELECT * FROM food_listings WHERE 1=1", ()),
+            "chart": (chart_data.top_n_sql(
+                "SELECT food_name, food_type, SUM(quantity) AS quantity FROM food_listings WHERE 1=1 "
+                "GROUP BY food_name, food_type", "food_name", "quantity", extra=("food_type",)), ()),
+        },
+        "EDA & Predictions": eda.sql_queries(today=date.today()),
+    }
+
+
+def sequential(pool, queries):
+    """(page ms, first-result ms, mean ms until each result is in)."""
+    start = time.perf_counter()
+    ready = []
+    for sql, params in queries.values():
+        frames.fetch_frame(pool, sql, params)
+        ready.append(time.perf_counter() - start)
+    return ready[-1] * 1000, ready[0] * 1000, statistics.mean(ready) * 1000
+
+
+def concurrent(executor, queries, limit):
+    start = time.perf_counter()
+    ready = []
+    tasks = {name: lambda q=q: frames.fetch_frame(executor.pool, *q) for name, q in queries.items()}
+    for name, _, error in executor.run(tasks, parallel.SessionLimit(limit)):
+        if error is not None:
+            raise error
+        ready.append(time.perf_counter() - start)
+    return ready[-1] * 1000, ready[0] * 1000, statistics.mean(ready) * 1000
+
+
+def median_run(fn, repeat):
+    runs = [fn() for _ in range(repeat)]
+    return [statistics.median(column) for column in zip(*runs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=100, help="synthetic data size, multiple of the seed CSVs")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--limits", type=int, nargs="+", default=[2, 4, 8], help="per-session concurrency limits")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"] and not args.skip_load:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    executor = parallel.QueryExecutor(pool)
+    try:
+        if not args.skip_load:
+            build(pool, args.scale, log=lambda msg: None)
+        print(f"{os.cpu_count()} CPUs, pool of {db.POOL_MAX_CONN} connections")
+        print(f"{'page':<18} {'queries':>7} {'mode':<14} {'page ms':>9} {'first ms':>9} {'mean ready':>11} "
+              f"{'speedup':>8}")
+        for page, queries in page_queries().items():
+            sequential(pool, queries)                       # warm the buffer cache
+            base, first, mean_ready = median_run(lambda: sequential(pool, queries), args.repeat)
+            print(f"{page:<18} {len(queries):>7} {'sequential':<14} {base:>9.1f} {first:>9.1f} {mean_ready:>11.1f} "
+                  f"{1:>7.2f}x")
+            for limit in args.limits:
+                total, first, mean_ready = median_run(lambda: concurrent(executor, queries, limit), args.repeat)
+                print(f"{'':<18} {'':>7} {f'concurrent {limit}':<14} {total:>9.1f} {first:>9.1f} {mean_ready:>11.1f} "
+                      f"{base / total:>7.2f}x")
+    finally:
+        executor.shutdown()
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Date-filtered queries before/after partitioning food_listings and claims by month.
+
+Builds ``--rows`` listings and as many claims spread over ``--years`` of
+history up to today (benchmarks.synthetic ``spread_days``), applies every
+migration except the partitioning ones and times each query; then applies
+V006, V008 and R__partitions (the conversion itself is timed too) and times them again.
+Per query it reports the median latency and how many tables or partitions the
+plan actually scanned (EXPLAIN ANALYZE). The range-filtered queries should
+prune to a partition or two; the full-history reports read everything either
+way, and the id lookup has to probe every partition's index.
+
+    python -m benchmarks.bench_partitions --rows 2000000 --years 3
+
+The benchmark owns its database (default ``food_wastage_bench``; it is dropped
+and recreated) so it never touches the app's data.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import db
+import eda
+import matching
+import migrate
+import partitions
+from benchmarks.synthetic import analyze, build, recreate_database
+
+PARTITION_MIGRATIONS = ("V006__partitions.sql", "V008__partition_keys.sql", "R__partitions.sql")
+
+
+def bench_queries(today):
+    near_expiry, params = eda.sql_queries(today=today)["near_expiry"]
+    params = {**params, "claim_id": 12_345}
+    return {
+        "near-expiry listings (eda)": (near_expiry, params),
+        "open listings (matching)": (matching.OPEN_LISTINGS_SQL, params),
+        "claims last 30 days by status": ("""
+            SELECT status, COUNT(*) AS claims FROM claims
+            WHERE timestamp >= %(today)s::date - 30
+            GROUP BY status
+        """, params),
+        "expired last month by city": ("""
+            SELECT location AS city, COUNT(*) AS listings, SUM(quantity) AS quantity FROM food_listings
+            WHERE expiry_date >= date_trunc('month', %(today)s::date) - interval '1 month'
+              AND expiry_date < date_trunc('month', %(today)s::date)
+            GROUP BY location
+        """, params),
+        "claim by id": ("SELECT * FROM claims WHERE claim_id = %(claim_id)s", params),
+        "listing totals (full history)": (
+            "SELECT COUNT(*) AS listings, COALESCE(SUM(quantity), 0) AS quantity FROM food_listings", params),
+        "monthly donations (full history)": ("""
+            SELECT TO_CHAR(expiry_date, 'YYYY-MM') AS month, COUNT(*) AS donation_count
+            FROM food_listings GROUP BY month ORDER BY month
+        """, params),
+    }
+
+
+def scanned_relations(pool, sql, params):
+    """Distinct tables / partitions the plan read rows from (scan nodes that ran)."""
+    _, rows = pool.fetch("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+    found, stack = set(), [rows[0][0][0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if "Relation Name" in node and node.get("Actual Loops", 0) > 0:
+            found.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return len(found)
+
+
+def measure(pool, queries, repeat):
+    results = {}
+    for name, (sql, params) in queries.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pool.fetch(sql, params)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = {"ms": statistics.median(samples), "scanned": scanned_relations(pool, sql, params)}
+    return results
+
+
+def run(rows, years, repeat, database, log=print):
+    today = date.today()
+    recreate_database(database)
+    pool = db.create_pool(dbname=database)
+    try:
+        with tempfile.TemporaryDirectory() as unpartitioned:
+            for filename in os.listdir(migrate.MIGRATIONS_DIR):
+                if filename.endswith(".sql") and filename not in PARTITION_MIGRATIONS:
+                    shutil.copy(os.path.join(migrate.MIGRATIONS_DIR, filename), unpartitioned)
+            log(f"-- loading {rows:,} listings and claims over {years} years")
+            # the seed's dates span two weeks from its first expiry; end them about a week from today
+            build(pool, 1, anchor=today - timedelta(days=7), log=log, migrations=False,
+                  rows={"food_listings": rows, "claims": rows}, spread_days=int(years * 365))
+            migrate.migrate(pool, directory=unpartitioned, log=lambda msg: None)
+            analyze(pool)
+        queries = bench_queries(today)
+        before = measure(pool, queries, repeat)
+
+        start = time.perf_counter()
+        migrate.migrate(pool, log=lambda msg: None)
+        log(f"-- partitioned in {time.perf_counter() - start:.1f}s "
+            f"({len(partitions.layout(pool))} partitions)")
+        analyze(pool)
+        after = measure(pool, queries, repeat)
+    finally:
+        pool.closeall()
+
+    log(f"{'query':<34} {'before ms':>10} {'scanned':>8} {'after ms':>10} {'scanned':>8} {'speedup':>8}")
+    results = []
+    for name in queries:
+        b, a = before[name], after[name]
+        log(f"{name:<34} {b['ms']:>10.1f} {b['scanned']:>8} {a['ms']:>10.1f} {a['scanned']:>8} "
+            f"{b['ms'] / a['ms']:>7.1f}x")
+        results.append({"query": name, "before_ms": b["ms"], "before_scanned": b["scanned"],
+                        "after_ms": a["ms"], "after_scanned": a["scanned"]})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="listings, and as many claims")
+    parser.add_argument("--years", type=float, default=3, help="history the rows are spread over")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query (median is reported)")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"]:
+        parser.error("refusing to rebuild the application database; pick another --database")
+    results = run(args.rows, args.years, args.repeat, args.database)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Read throughput of the pooled data layer vs. the old single shared cursor.
+
+Runs against an in-process stand-in by default (each query "takes" --latency
+seconds on the server, like a real round trip), or against PostgreSQL with
+--live using the PG* settings from db.py.
+
+    python -m benchmarks.bench_pool
+    python -m benchmarks.bench_pool --live --sessions 1 2 4 8 16
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+import db
+
+READ_QUERY = "SELECT food_type, SUM(quantity) FROM food_listings GROUP BY food_type"
+
+
+# ---------------- In-process stand-in ----------------
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        # psycopg2 serialises all work on one connection behind a lock
+        with self.conn.lock:
+            time.sleep(self.conn.latency)
+        self.description = [("food_type",), ("sum",)]
+        self.rowcount = 4
+
+    def fetchall(self):
+        return [("Vegan", 100), ("Vegetarian", 90), ("Non-Vegetarian", 80), (None, 0)]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConnection:
+    def __init__(self, latency):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.autocommit = False
+        self.readonly = None
+        self.closed = 0
+        self.status = psycopg2.extensions.STATUS_READY
+
+    def set_session(self, readonly=None, autocommit=None):
+        self.readonly = readonly
+        self.autocommit = autocommit
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+# ---------------- Workloads ----------------
+def single_cursor_reader(conn):
+    cur = conn.cursor()
+    lock = threading.Lock()
+
+    def read():
+        # the old App.py shared one cursor across sessions
+        with lock:
+            cur.execute(READ_QUERY)
+            return cur.fetchall()
+    return read
+
+
+def pooled_reader(pool):
+    def read():
+        return pool.fetch(READ_QUERY)
+    return read
+
+
+def measure(read, sessions, duration):
+    stop = time.perf_counter() + duration
+    counts = [0] * sessions
+
+    def worker(i):
+        while time.perf_counter() < stop:
+            read()
+            counts[i] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(worker, range(sessions)))
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="use the real database from db.DB_CONFIG")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per measurement")
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in query time (s)")
+    parser.add_argument("--pool-size", type=int, default=db.POOL_MAX_CONN)
+    args = parser.parse_args()
+
+    if args.live:
+        connect = psycopg2.connect
+    else:
+        def connect(**dsn):
+            return FakeConnection(args.latency)
+
+    single_conn = connect(**db.DB_CONFIG)
+    pool = db.ConnectionPool(minconn=1, maxconn=args.pool_size, connect=connect, **db.DB_CONFIG)
+
+    print(f"{'sessions':>8} {'single cursor q/s':>18} {'pooled q/s':>12} {'speedup':>8}")
+    for sessions in args.sessions:
+        single = measure(single_cursor_reader(single_conn), sessions, args.duration)
+        pooled = measure(pooled_reader(pool), sessions, args.duration)
+        print(f"{sessions:>8} {single:>18.1f} {pooled:>12.1f} {pooled / single:>7.2f}x")
+
+    single_conn.close()
+    pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Latency of the 20 predefined queries before/after the index + aggregate migrations.
+
+For every scale the benchmark database is rebuilt from create_table.sql and
+filled with N x the seed size by benchmarks.synthetic. The original
+queries are timed on the bare schema, then migrate.py is applied and the
+aggregate-backed variants are timed.
+
+    python -m benchmarks.bench_queries --scales 1 100 1000 --out bench_queries.json
+
+The benchmark owns its database (default ``food_wastage_bench``; it is dropped
+and recreated) so it never touches the app's data.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import db
+import migrate
+from benchmarks.synthetic import analyze, build, recreate_database
+from predefined_queries import predefined_queries, queries
+
+
+def time_query(pool, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pool.fetch(sql)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(scales, repeat, database):
+    results = []
+    for scale in scales:
+        recreate_database(database)
+        pool = db.create_pool(dbname=database)
+        try:
+            print(f"-- scale {scale}x: loading")
+            build(pool, scale, log=lambda msg: None, migrations=False)
+            before = {name: time_query(pool, sql, repeat) for name, sql in queries.items()}
+            migrate.migrate(pool, log=lambda msg: None)
+            analyze(pool)
+            after = {name: time_query(pool, sql, repeat)
+                     for name, sql in predefined_queries(use_aggregates=True).items()}
+        finally:
+            pool.closeall()
+        print(f"{'query':<50} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name in queries:
+            print(f"{name[:50]:<50} {before[name] * 1000:>10.2f} {after[name] * 1000:>10.2f} "
+                  f"{before[name] / after[name]:>7.1f}x")
+            results.append({"scale": scale, "query": name,
+                            "before_ms": before[name] * 1000, "after_ms": after[name] * 1000})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query (median is reported)")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"]:
+        parser.error("refusing to rebuild the application database; pick another --database")
+    results = run(args.scales, args.repeat, args.database)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
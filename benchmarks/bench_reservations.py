@@ -0,0 +1,211 @@
+"""Concurrent claims on hot listings: claims per second, and proof of no over-claiming.
+
+Adds ``--hot`` listings of ``--units`` units each to ``--database``. Then
+``--workers`` threads claim 1 to ``--max-claim`` units at a time for random
+receivers until every hot unit is gone. The threads share a pool of
+``--connections`` connections, which the server's max_connections bounds.
+Each run claims the hot listings in one of three ways:
+
+* check, then insert: read the units left, then insert the claim. This is what
+  the app did without locking, and it is the baseline that over-claims;
+* reserve: ``reservations.reserve`` on a random hot listing that still has
+  units (row lock; waits on a busy listing);
+* reserve_any: ``reservations.reserve_any`` in the hot listings' location
+  (``SKIP LOCKED`` queue; busy listings are passed over). Earlier batches
+  there are sold out, so they are not in the queue.
+
+Afterwards each hot listing's Pending units are compared with its quantity,
+and ``listing_stock`` with the claims. The exit status is 1 if either locked
+mode over-claims or the stock table disagrees with the claims.
+
+    python -m benchmarks.bench_reservations --workers 200 --hot 1000
+    python -m benchmarks.bench_reservations --skip-load --modes reserve_any --units 200
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+import db
+import reservations
+from benchmarks.synthetic import build, recreate_database
+
+MODES = ("check, then insert", "reserve", "reserve_any")
+HOT_LOCATION = "Hotville"
+
+HOT_LISTINGS_SQL = """
+    INSERT INTO food_listings (food_name, quantity, expiry_date, provider_id, location, food_type, meal_type)
+    SELECT 'Hot listing ' || g, %(units)s, CURRENT_DATE + 3, (SELECT MIN(provider_id) FROM providers),
+           %(location)s, 'Vegetarian', 'Dinner'
+    FROM generate_series(1, %(hot)s) g
+    RETURNING food_id
+"""
+
+CHECK_SQL = """
+    SELECT f.food_id, f.quantity, COALESCE(SUM(c.quantity) FILTER (WHERE c.status IN ('Pending', 'Completed')), 0),
+           s.quantity, s.reserved
+    FROM food_listings f
+    LEFT JOIN claims c ON c.food_id = f.food_id
+    LEFT JOIN listing_stock s ON s.food_id = f.food_id
+    WHERE f.food_id = ANY(%s)
+    GROUP BY f.food_id, f.quantity, s.quantity, s.reserved
+"""
+
+
+class Run:
+    """Shared state of one mode's workers."""
+
+    def __init__(self, food_ids):
+        self.open = list(food_ids)                # hot listings thought to have units left
+        self.lock = threading.Lock()
+        self.claims = 0
+        self.units = 0
+        self.refused = 0                          # attempts that found too few units, or a busy listing
+        self.latency_ms = []
+        self.errors = []
+
+    def pick(self, rng):
+        with self.lock:
+            return rng.choice(self.open) if self.open else None
+
+    def sold_out(self, food_id):
+        with self.lock:
+            if food_id in self.open:
+                self.open.remove(food_id)
+
+    def record(self, started, claimed):
+        with self.lock:
+            self.latency_ms.append((time.perf_counter() - started) * 1000)
+            if claimed:
+                self.claims += 1
+                self.units += claimed
+            else:
+                self.refused += 1
+
+
+def check_then_insert(pool, run, rng, receivers, max_claim):
+    while (food_id := run.pick(rng)) is not None:
+        quantity = rng.randint(1, max_claim)
+        started = time.perf_counter()
+        left = reservations.remaining(pool, [food_id]).get(food_id, 0)
+        if left <= 0:
+            run.sold_out(food_id)
+            continue
+        quantity = min(quantity, left)
+        pool.execute("INSERT INTO claims (food_id, receiver_id, status, timestamp, quantity) "
+                     "VALUES (%s, %s, 'Pending', NOW(), %s)", (food_id, rng.choice(receivers), quantity))
+        run.record(started, quantity)
+
+
+def reserve(pool, run, rng, receivers, max_claim):
+    while (food_id := run.pick(rng)) is not None:
+        quantity = rng.randint(1, max_claim)
+        started = time.perf_counter()
+        try:
+            reservation = reservations.reserve(pool, food_id, rng.choice(receivers), quantity)
+        except reservations.ReservationError:
+            run.record(started, 0)
+            if reservations.remaining(pool, [food_id]).get(food_id, 0) == 0:
+                run.sold_out(food_id)
+            continue
+        run.record(started, reservation.quantity)
+        if reservation.remaining == 0:
+            run.sold_out(food_id)
+
+
+def reserve_any(pool, run, rng, receivers, max_claim):
+    quantity = rng.randint(1, max_claim)
+    while True:
+        started = time.perf_counter()
+        reservation = reservations.reserve_any(pool, rng.choice(receivers), quantity, location=HOT_LOCATION)
+        run.record(started, reservation.quantity if reservation else 0)
+        if reservation is None:
+            if quantity == 1:
+                return                    # no hot listing has a unit left that nobody else has locked
+            quantity = 1                  # what's left may be less than a full claim
+        else:
+            quantity = rng.randint(1, max_claim)
+
+
+def run_mode(pool, mode, args, receivers):
+    params = {"units": args.units, "hot": args.hot, "location": HOT_LOCATION}
+    food_ids = [row[0] for row in pool.execute_returning(HOT_LISTINGS_SQL, params)]
+    run = Run(food_ids)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            if mode == "check, then insert":
+                check_then_insert(pool, run, rng, receivers, args.max_claim)
+            elif mode == "reserve":
+                reserve(pool, run, rng, receivers, args.max_claim)
+            else:
+                reserve_any(pool, run, rng, receivers, args.max_claim)
+        except Exception as e:
+            with run.lock:
+                run.errors.append(repr(e))
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    _, rows = pool.fetch(CHECK_SQL, (food_ids,))
+    over = [(quantity, claimed) for _, quantity, claimed, _, _ in rows if claimed > quantity]
+    books_agree = all(stock_quantity == quantity and reserved == claimed
+                      for _, quantity, claimed, stock_quantity, reserved in rows)
+    return run, seconds, over, books_agree, sum(claimed for _, _, claimed, _, _ in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1, help="synthetic data size, multiple of the seed CSVs")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--workers", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=80, help="pool size shared by the workers")
+    parser.add_argument("--hot", type=int, default=1000, help="hot listings to claim")
+    parser.add_argument("--units", type=int, default=20, help="units per hot listing")
+    parser.add_argument("--max-claim", type=int, default=3, help="largest claim, in units")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"] and not args.skip_load:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database, maxconn=args.connections, timeout=120)
+    failed = False
+    try:
+        if not args.skip_load:
+            build(pool, args.scale, log=lambda msg: None)
+        _, rows = pool.fetch("SELECT receiver_id FROM receivers")
+        receivers = [row[0] for row in rows]
+        print(f"{args.workers} workers on {args.connections} connections, {args.hot:,} hot listings x "
+              f"{args.units} units, claims of 1-{args.max_claim} units")
+        print(f"{'mode':<20} {'claims':>8} {'claims/s':>9} {'refused':>8} {'p50 ms':>7} {'p99 ms':>7} "
+              f"{'units claimed':>14} {'over-claimed':>15} {'books':>6}")
+        for mode in args.modes:
+            run, seconds, over, books_agree, claimed = run_mode(pool, mode, args, receivers)
+            latency = sorted(run.latency_ms) or [0]
+            total = args.hot * args.units
+            print(f"{mode:<20} {run.claims:>8,} {run.claims / seconds:>9,.0f} {run.refused:>8,} "
+                  f"{statistics.median(latency):>7.1f} {latency[int(len(latency) * 0.99) - 1 if len(latency) > 1 else 0]:>7.1f} "
+                  f"{f'{claimed:,}/{total:,}':>14} "
+                  f"{f'{len(over):,} ({sum(c - q for q, c in over):,} u)':>15} {'ok' if books_agree else 'WRONG':>6}")
+            for error in run.errors[:3]:
+                print(f"  worker error: {error}")
+            if mode != "check, then insert" and (over or not books_agree or run.errors):
+                failed = True
+    finally:
+        pool.closeall()
+    if failed:
+        raise SystemExit("a locked mode over-claimed or left listing_stock out of step")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Waste-risk lookups: standing RiskIndex vs. recomputing in pandas.
+
+Builds synthetic listings in memory (no database needed), then times
+
+* the legacy path: score every row and sort (what the EDA page did per rerun);
+* ``RiskIndex.top_k`` / ``RiskIndex.expiring`` for all cities and one city;
+* single-listing upserts, and a day rollover.
+
+    python -m benchmarks.bench_risk --rows 1000000 --cities 500
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from risk_index import RiskIndex
+
+FOODS = ["Rice", "Bread", "Soup", "Salad", "Chicken", "Fish", "Pasta", "Fruits", "Dairy", "Vegetables"]
+
+
+def synthetic_rows(n, cities, today, seed=7):
+    rng = random.Random(seed)
+    return [(food_id, rng.choice(FOODS), rng.randint(1, 50),
+             today + timedelta(days=rng.randint(-30, 60)), rng.randint(1, 10_000),
+             f"City {rng.randrange(cities)}", rng.random() < 0.3)
+            for food_id in range(1, n + 1)]
+
+
+def pandas_top_k(df, today, k=10, city=None):
+    if city is not None:
+        df = df[df["city"] == city]
+    days = (df["expiry_date"] - today).dt.days
+    score = (df["quantity"] / max(1, df["quantity"].max()) / days.clip(lower=1)).round(3)
+    return df.assign(days_to_expiry=days, risk_score=score).nlargest(k, "risk_score")
+
+
+def pandas_expiring(df, today, days=7, city=None):
+    if city is not None:
+        df = df[df["city"] == city]
+    soon = df[(df["expiry_date"] >= today) & (df["expiry_date"] <= today + pd.Timedelta(days=days))]
+    return soon.sort_values("expiry_date")
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=1000)
+    args = parser.parse_args()
+
+    today = date.today()
+    rows = synthetic_rows(args.rows, args.cities, today)
+    df = pd.DataFrame(rows, columns=["food_id", "food_name", "quantity", "expiry_date",
+                                     "provider_id", "city", "claimed"])
+    df = df[~df["claimed"]].assign(expiry_date=pd.to_datetime(df["expiry_date"]))
+    ts_today = pd.Timestamp(today)
+    city = "City 0"
+
+    index = RiskIndex(today)
+    build_ms = timed(lambda: index.build(rows, today), 1)
+
+    print(f"{args.rows:,} listings, {args.cities} cities")
+    print(f"{'operation':<34} {'ms':>10}")
+    print(f"{'index build':<34} {build_ms:>10.1f}")
+    for label, fn in [
+        ("pandas top-10 (all)", lambda: pandas_top_k(df, ts_today)),
+        ("index top-10 (all)", lambda: index.top_k(10, today=today)),
+        ("pandas top-10 (one city)", lambda: pandas_top_k(df, ts_today, city=city)),
+        ("index top-10 (one city)", lambda: index.top_k(10, city=city, today=today)),
+        ("pandas expiring 7d (one city)", lambda: pandas_expiring(df, ts_today, city=city)),
+        ("index expiring 7d (one city)", lambda: index.expiring(7, city=city, today=today)),
+    ]:
+        print(f"{label:<34} {timed(fn, args.repeat):>10.2f}")
+
+    rng = random.Random(11)
+    changed = [list(rows[rng.randrange(len(rows))]) for _ in range(args.updates)]
+    for row in changed:
+        row[2] = rng.randint(1, 50)
+    start = time.perf_counter()
+    for row in changed:
+        index.upsert([row])
+    per_update = (time.perf_counter() - start) * 1000 / args.updates
+    print(f"{'index upsert (per listing)':<34} {per_update:>10.3f}")
+
+    tomorrow = today + timedelta(days=1)
+    print(f"{'index day rollover + top-10':<34} {timed(lambda: index.top_k(10, today=tomorrow), 1):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Search latency: search.py's indexed search vs ILIKE '%term%' scans over the same columns.
+
+Builds ``--rows`` listings (providers, receivers and claims at ``--scale`` x
+the seed), then times one page (``--limit`` results) for terms picked from
+the data: a food name, a provider name word, the same word misspelt, the
+start and the middle of a city name, and two words of a provider name. The
+ILIKE baseline searches the whole term as a substring of food_listings.food_name,
+providers.name/address/city and receivers.name/city, first page by table
+and id. It has no ranking and no typo tolerance (misspellings find nothing).
+Last, it types a provider name one letter at a time and times the search
+after each letter, as a search box would.
+
+    python -m benchmarks.bench_search --rows 1000000
+    python -m benchmarks.bench_search --skip-load --repeat 20
+
+The benchmark owns its database (default ``food_wastage_bench``; it is dropped
+and recreated) so it never touches the app's data. The synthetic data reuses
+the seed's names, so the search tables stay small however many rows there
+are; a search's cost follows the number of distinct values it matches, not
+the number of rows.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import db
+import search
+from benchmarks.synthetic import analyze, build, recreate_database
+
+ILIKE_SQL = """
+    (SELECT 'food_listings' AS table_name, food_id AS id, food_name AS title FROM food_listings
+     WHERE food_name ILIKE %(pattern)s ORDER BY food_id LIMIT %(limit)s)
+    UNION ALL
+    (SELECT 'providers', provider_id, name FROM providers
+     WHERE name ILIKE %(pattern)s OR address ILIKE %(pattern)s OR city ILIKE %(pattern)s
+     ORDER BY provider_id LIMIT %(limit)s)
+    UNION ALL
+    (SELECT 'receivers', receiver_id, name FROM receivers
+     WHERE name ILIKE %(pattern)s OR city ILIKE %(pattern)s ORDER BY receiver_id LIMIT %(limit)s)
+    LIMIT %(limit)s
+"""
+
+
+def _words(text):
+    return [w for w in "".join(c if c.isalnum() else " " for c in text).split() if len(w) >= 5]
+
+
+def _misspell(word, rng):
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]                 # one letter dropped
+
+
+def pick_terms(pool, seed=7):
+    """``[(kind, term), ...]`` drawn from the data, the same for the same data."""
+    rng = random.Random(seed)
+    _, foods = pool.fetch("SELECT DISTINCT food_name FROM food_listings WHERE food_name IS NOT NULL ORDER BY 1")
+    _, names = pool.fetch("SELECT DISTINCT name FROM providers WHERE name IS NOT NULL ORDER BY 1")
+    _, cities = pool.fetch("SELECT DISTINCT city FROM providers WHERE city IS NOT NULL ORDER BY 1")
+    food = rng.choice(foods)[0].lower()
+    word = rng.choice([w for name, in names for w in _words(name)]).lower()
+    city = rng.choice([w for city, in cities for w in _words(city)]).lower()
+    two_words = rng.choice([name for name, in names if len(name.split()) == 2]).lower()
+    return [("food name", food), ("provider name word", word), ("misspelt word", _misspell(word, rng)),
+            ("start of a city", city[:4]), ("middle of a city", city[1:5]), ("two words", two_words),
+            ("no match", "zzqxj")]
+
+
+def timed(fn, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def compare(pool, terms, limit, repeat):
+    rows = []
+    for kind, term in terms:
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        search_ms, (items, _) = timed(lambda: search.search(pool, term, limit), repeat)
+        ilike_ms, (_, matches) = timed(lambda: pool.fetch(ILIKE_SQL, {"pattern": pattern, "limit": limit}), repeat)
+        rows.append({"kind": kind, "term": term, "search_ms": search_ms, "search_hits": len(items),
+                     "top": items[0]["title"] if items else None, "ilike_ms": ilike_ms, "ilike_hits": len(matches)})
+    return rows
+
+
+def as_you_type(pool, text, limit, repeat):
+    """Median ms of the search after each letter of ``text``."""
+    return [(text[:n], timed(lambda: search.search(pool, text[:n], limit), repeat)[0])
+            for n in range(1, len(text) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="food listings")
+    parser.add_argument("--scale", type=float, default=100, help="providers, receivers and claims x the seed")
+    parser.add_argument("--limit", type=int, default=search.PAGE_SIZE, help="results per page")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per term (median is reported)")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"]:
+        parser.error("refusing to rebuild the application database; pick another --database")
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    try:
+        if not args.skip_load:
+            build(pool, args.scale, rows={"food_listings": args.rows})
+        start = time.perf_counter()
+        search.rebuild(pool)
+        _, sizes = pool.fetch("SELECT (SELECT COUNT(*) FROM search_values), (SELECT COUNT(*) FROM search_words), "
+                              "(SELECT COUNT(*) FROM food_listings)")
+        print(f"search tables rebuilt in {time.perf_counter() - start:.1f}s: {sizes[0][0]:,} values, "
+              f"{sizes[0][1]:,} words over {sizes[0][2]:,} listings")
+        analyze(pool)
+
+        terms = pick_terms(pool)
+        results = compare(pool, terms, args.limit, args.repeat)
+        print(f"{'term':<34} {'search ms':>10} {'hits':>5} {'ILIKE ms':>10} {'hits':>5} {'speedup':>8}  top result")
+        for r in results:
+            print(f"{r['kind'] + ': ' + r['term']:<34} {r['search_ms']:>10.2f} {r['search_hits']:>5} "
+                  f"{r['ilike_ms']:>10.2f} {r['ilike_hits']:>5} {r['ilike_ms'] / r['search_ms']:>7.1f}x  {r['top']}")
+
+        typing = as_you_type(pool, dict(terms)["two words"], args.limit, args.repeat)
+        print("as you type: " + ", ".join(f"{prefix!r} {ms:.1f}" for prefix, ms in typing) + " ms")
+    finally:
+        pool.closeall()
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"terms": results, "as_you_type": typing}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
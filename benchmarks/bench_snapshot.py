@@ -0,0 +1,81 @@
+"""Postgres tuples -> DataFrame vs. the memory-mapped Arrow snapshot: load time and memory.
+
+Builds a synthetic database (``benchmarks.synthetic``), takes a full snapshot,
+then for each table times ``pool.fetch`` + ``pd.DataFrame`` (what the pages
+did) against ``Snapshot.frame`` and reports the DataFrame memory of both
+(``memory_usage(deep=True)``) next to the snapshot file size. It also times
+the EDA pandas aggregates over both sources, and an incremental refresh after
+a handful of writes.
+
+    python -m benchmarks.bench_snapshot --scale 100
+"""
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+
+import db
+import eda
+import frames
+from benchmarks.synthetic import build, recreate_database
+from ingest import TABLES
+from snapshot import Snapshot
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - start) * 1000
+
+
+def postgres_frame(pool, table):
+    columns, rows = pool.fetch(f"SELECT * FROM {table}")
+    return pd.DataFrame(rows, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=100, help="synthetic data size, multiple of the seed CSVs")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --database")
+    args = parser.parse_args()
+
+    if not args.skip_load:
+        recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    try:
+        if not args.skip_load:
+            build(pool, args.scale, log=lambda msg: None)
+        with tempfile.TemporaryDirectory() as directory:
+            snap = Snapshot(directory)
+            _, full_ms = _timed(lambda: snap.refresh(pool))
+            print(f"full snapshot: {full_ms:,.0f} ms")
+
+            print(f"{'table':<14} {'rows':>10} {'pg ms':>9} {'pg MiB':>8} {'snap ms':>9} {'snap MiB':>9} "
+                  f"{'file MiB':>9}")
+            for table in TABLES:
+                pg, pg_ms = _timed(lambda: postgres_frame(pool, table))
+                arrow, snap_ms = _timed(lambda: snap.frame(table))
+                print(f"{table:<14} {len(pg):>10,} {pg_ms:>9.1f} {pg.memory_usage(deep=True).sum() / 2**20:>8.1f} "
+                      f"{snap_ms:>9.1f} {arrow.memory_usage(deep=True).sum() / 2**20:>9.1f} "
+                      f"{snap.file_bytes(table) / 2**20:>9.1f}")
+
+            _, pg_ms = _timed(lambda: eda.pandas_aggregates(lambda q, p=None: frames.fetch_frame(pool, q, p)))
+            snap._frames.clear()
+            _, snap_ms = _timed(lambda: eda.frame_aggregates(*eda.snapshot_raw(snap)))
+            print(f"EDA aggregates: postgres {pg_ms:,.0f} ms, snapshot {snap_ms:,.0f} ms (cold frames)")
+
+            with pool.cursor() as cur:
+                cur.execute("UPDATE claims SET status = 'Cancelled' WHERE claim_id IN (1, 2, 3)")
+                cur.execute("DELETE FROM claims WHERE claim_id = (SELECT MAX(claim_id) FROM claims)")
+            report, inc_ms = _timed(lambda: snap.refresh(pool))
+            rows = sum(r["rows_read"] for r in report.values())
+            print(f"incremental refresh after 4 writes: {inc_ms:,.0f} ms, {rows:,} rows re-read "
+                  f"(full: {full_ms:,.0f} ms)")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
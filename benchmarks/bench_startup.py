@@ -0,0 +1,128 @@
+"""App startup and rerun cost per page: imports, cold first run and per-rerun overhead.
+
+For each page a fresh interpreter (``python -X importtime``) imports
+Streamlit and its test harness, then runs App.py headlessly on that page:
+once cold (compiling App.py, App and page imports, the process-wide
+resources, the page's queries) and then ``--reruns`` more times, which is
+what every widget interaction costs. As in the server, App.py is compiled
+once per process, not per run. The imports App.py and the page trigger are
+summed per top-level package from the ``-X importtime`` report.
+
+``--ref`` measures App.py and its modules as of a git revision as well,
+exported to a temporary directory, for a before/after table. Both run
+against the same database (the app's, or ``--database``).
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --ref HEAD~1 --pages Dashboard "Run Queries" --reruns 20
+"""
+import argparse
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Dashboard", "Main Dashboard", "View Tables", "Add/Update/Delete Data", "Run Queries",
+         "EDA & Predictions", "Query Profile"]
+MARKER = "-- app --"
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+# Runs in the child interpreter: argv = app path, page, reruns.
+CHILD = f"""
+import json, sys, time
+import streamlit.testing.v1.local_script_runner as local_script_runner
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+# the server compiles the script once per process; AppTest would compile it on every run
+script_cache = ScriptCache()
+local_script_runner.ScriptCache = lambda: script_cache
+app, page, reruns = sys.argv[1], sys.argv[2], int(sys.argv[3])
+at = AppTest.from_file(app, default_timeout=300)
+at.session_state["menu"] = page
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+at.run()
+cold = (time.perf_counter() - start) * 1000
+reruns_ms = []
+for _ in range(reruns):
+    start = time.perf_counter()
+    at.run()
+    reruns_ms.append((time.perf_counter() - start) * 1000)
+print(json.dumps({{"cold_ms": cold, "rerun_ms": reruns_ms,
+                  "exceptions": [str(e.value)[:200] for e in at.exception]}}))
+"""
+
+
+def app_imports(stderr):
+    """``{top-level package: ms}`` for the imports after the marker (App.py and the page)."""
+    lines = stderr.split(MARKER, 1)[-1].splitlines()
+    parsed = [m.groups() for m in map(IMPORT_LINE.match, lines) if m]
+    if not parsed:
+        return {}
+    top = min(len(indent) for _, _, indent, _ in parsed)
+    totals = defaultdict(float)
+    for _, cumulative, indent, name in parsed:
+        if len(indent) == top:
+            totals[name.split(".")[0]] += int(cumulative) / 1000
+    return dict(totals)
+
+
+def measure(app_dir, page, reruns, env):
+    env = {**env, "PYTHONPATH": app_dir}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, os.path.join(app_dir, "App.py"),
+                           page, str(reruns)], cwd=app_dir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        tail = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")][-5:]
+        raise SystemExit(f"{page}: the app run failed\n" + "\n".join(tail))
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = app_imports(proc.stderr)
+    return result
+
+
+def export_ref(ref, target):
+    """The tree at ``ref``, written to ``target`` (git archive)."""
+    archive = subprocess.run(["git", "-C", ROOT, "archive", "--format=tar", ref], capture_output=True, check=True)
+    with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar:
+        tar.extractall(target, filter="data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--ref", help="also measure App.py as of this git revision (before/after)")
+    parser.add_argument("--database", help="database the app runs against (default: PGDATABASE or the app's)")
+    parser.add_argument("--top", type=int, default=6, help="heaviest imported packages to list per page")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.database:
+        env["PGDATABASE"] = args.database
+    versions = [("working tree", ROOT)]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.ref:
+            export_ref(args.ref, tmp)
+            versions.insert(0, (args.ref, tmp))
+        print(f"{'page':<24} {'version':<14} {'cold ms':>8} {'imports ms':>11} {'rerun p50 ms':>13} "
+              f"{'rerun max ms':>13}  heaviest imports on the cold run (ms)")
+        for page in args.pages:
+            for label, app_dir in versions:
+                result = measure(app_dir, page, args.reruns, env)
+                imports = sorted(result["imports"].items(), key=lambda item: -item[1])
+                reruns = result["rerun_ms"] or [0]
+                print(f"{page:<24} {label[:14]:<14} {result['cold_ms']:>8.0f} "
+                      f"{sum(ms for _, ms in imports):>11.0f} {statistics.median(reruns):>13.1f} "
+                      f"{max(reruns):>13.1f}  " + ", ".join(f"{name} {ms:.0f}" for name, ms in imports[:args.top]))
+                for error in result["exceptions"]:
+                    print(f"  exception: {error}")
+
+
+if __name__ == "__main__":
+    main()
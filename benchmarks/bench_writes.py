@@ -0,0 +1,93 @@
+"""Write throughput: one statement + commit per row vs. batch.py (one transaction per batch).
+
+Runs against its own database (seed data, migrations applied) and, for each
+batch size, inserts that many listings, updates that many claims and deletes
+the inserted listings again, first row by row through ``pool.execute`` (the
+old CRUD helpers) and then with ``batch.insert_rows`` / ``update_rows`` /
+``delete_rows``.
+
+    python -m benchmarks.bench_writes --sizes 200 2000 20000
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+import batch
+import db
+from benchmarks.synthetic import build, recreate_database
+
+
+def listings(n):
+    return [{"provider_id": 1 + i % 1000, "food_name": f"Surplus {i}", "quantity": 1 + i % 50,
+             "expiry_date": date.today() + timedelta(days=i % 14), "food_type": "Vegetarian"}
+            for i in range(n)]
+
+
+def per_row(pool, n, claim_ids):
+    timings = {}
+    start = time.perf_counter()
+    ids = []
+    for record in listings(n):
+        with pool.cursor() as cur:
+            cur.execute("INSERT INTO food_listings (provider_id, food_name, quantity, expiry_date, food_type) "
+                        "VALUES (%(provider_id)s, %(food_name)s, %(quantity)s, %(expiry_date)s, %(food_type)s) "
+                        "RETURNING food_id", record)
+            ids.append(cur.fetchone()[0])
+    timings["insert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i, claim_id in enumerate(claim_ids[:n]):
+        pool.execute("UPDATE claims SET status=%s WHERE claim_id=%s", ("Completed" if i % 2 else "Pending", claim_id))
+    timings["update"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for food_id in ids:
+        pool.execute("DELETE FROM food_listings WHERE food_id=%s", (food_id,))
+    timings["delete"] = time.perf_counter() - start
+    return timings
+
+
+def batched(pool, n, claim_ids):
+    timings = {}
+    start = time.perf_counter()
+    ids = batch.insert_rows(pool, "food_listings", listings(n)).ids
+    timings["insert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch.update_rows(pool, "claims", [{"claim_id": claim_id, "status": "Completed" if i % 2 else "Pending"}
+                                       for i, claim_id in enumerate(claim_ids[:n])])
+    timings["update"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch.delete_rows(pool, "food_listings", ids)
+    timings["delete"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 20000])
+    parser.add_argument("--scale", type=int, default=20, help="seed data multiplier (needs >= max size claims)")
+    parser.add_argument("--database", default="food_wastage_bench")
+    args = parser.parse_args()
+
+    recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    try:
+        build(pool, args.scale, log=lambda msg: None)
+        _, rows = pool.fetch("SELECT claim_id FROM claims ORDER BY claim_id")
+        claim_ids = [r[0] for r in rows]
+
+        print(f"{'rows':>7} {'op':<7} {'per-row rows/s':>15} {'batched rows/s':>15} {'speedup':>8}")
+        for n in args.sizes:
+            slow, fast = per_row(pool, n, claim_ids), batched(pool, n, claim_ids)
+            for op in ("insert", "update", "delete"):
+                count = min(n, len(claim_ids)) if op == "update" else n
+                print(f"{n:>7,} {op:<7} {count / slow[op]:>15,.0f} {count / fast[op]:>15,.0f} "
+                      f"{slow[op] / fast[op]:>7.1f}x")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
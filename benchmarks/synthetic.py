@@ -0,0 +1,249 @@
+"""Synthetic providers / receivers / food_listings / claims scaled from the seed CSVs.
+
+The seed files are profiled once (empirical frequencies of city, provider and
+receiver type, food name/type, meal type, quantity, claim status, and the
+spread of expiry dates and claim timestamps) and every generated column is
+drawn from those distributions with a fixed random seed, so the same scale
+and anchor always produce the same data. Listings inherit provider_type and
+location from their provider, as in the seed data. Rows are produced in
+chunks and streamed straight into COPY, so memory stays flat at any scale.
+
+    python -m benchmarks.synthetic --scale 100 --database food_wastage_bench
+"""
+import argparse
+import io
+import os
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+import db
+import migrate
+from ingest import SEED_FILES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_ROWS = 100_000
+SEED = 20_250_316
+
+
+def _distribution(series):
+    counts = series.value_counts(dropna=True)
+    return counts.index.to_numpy(), (counts / counts.sum()).to_numpy()
+
+
+class SeedProfile:
+    """Column distributions of the shipped CSVs."""
+
+    def __init__(self, base_dir=ROOT):
+        frames = {table: pd.read_csv(os.path.join(base_dir, filename)) for table, filename in SEED_FILES}
+        providers, receivers = frames["providers"], frames["receivers"]
+        listings, claims = frames["food_listings"], frames["claims"]
+        self.sizes = {table: len(df) for table, df in frames.items()}
+
+        self.provider_type = _distribution(providers["Type"])
+        self.provider_city = _distribution(providers["City"])
+        self.provider_names = providers["Name"].to_numpy()
+        self.provider_addresses = providers["Address"].to_numpy()
+        self.provider_contacts = providers["Contact"].astype(str).to_numpy()
+
+        self.receiver_type = _distribution(receivers["Type"])
+        self.receiver_city = _distribution(receivers["City"])
+        self.receiver_names = receivers["Name"].to_numpy()
+        self.receiver_contacts = receivers["Contact"].astype(str).to_numpy()
+
+        self.food_name = _distribution(listings["Food_Name"])
+        self.food_type = _distribution(listings["Food_Type"])
+        self.meal_type = _distribution(listings["Meal_Type"])
+        self.quantity = _distribution(listings["Quantity"])
+        expiry = pd.to_datetime(listings["Expiry_Date"], format="%m/%d/%Y")
+        self.expiry_start = expiry.min().date()
+        self.expiry_offset = _distribution((expiry - expiry.min()).dt.days)
+
+        self.status = _distribution(claims["Status"])
+        stamps = pd.to_datetime(claims["Timestamp"], format="%m/%d/%Y %H:%M")
+        # claim times relative to the first expiry date, in minutes (usually negative)
+        self.claim_offset_minutes = ((stamps - pd.Timestamp(self.expiry_start)).dt.total_seconds() // 60).to_numpy()
+
+    def rows(self, table, scale):
+        return max(1, int(round(self.sizes[table] * scale)))
+
+
+def _pick(rng, distribution, n):
+    values, probabilities = distribution
+    return values[rng.choice(len(values), size=n, p=probabilities)]
+
+
+class Generator:
+    """Deterministic chunked generator; ``anchor`` is the date the seed's first expiry maps to.
+
+    ``rows`` overrides the row count of individual tables (e.g. 5M claims over seed-sized parents).
+    ``spread_days`` moves each expiry date and claim timestamp back by a uniform 0..spread_days days,
+    turning the seed's two weeks into years of history; 0 leaves the data exactly as without it.
+    """
+
+    def __init__(self, scale, anchor=None, profile=None, seed=SEED, rows=None, spread_days=0):
+        self.profile = profile or SeedProfile()
+        self.scale = scale
+        self.anchor = anchor or self.profile.expiry_start
+        self.spread_days = spread_days
+        self.seed = seed
+        self.counts = {table: self.profile.rows(table, scale) for table, _ in SEED_FILES}
+        self.counts.update(rows or {})
+        # provider attributes are reused by the listings that reference them
+        rng = self._rng("provider_attributes")
+        n = self.counts["providers"]
+        type_values, type_p = self.profile.provider_type
+        city_values, city_p = self.profile.provider_city
+        self._provider_type_values, self._provider_city_values = type_values, city_values
+        self._provider_type = rng.choice(len(type_values), size=n, p=type_p).astype(np.int16)
+        self._provider_city = rng.choice(len(city_values), size=n, p=city_p).astype(np.int32)
+
+    def _rng(self, name):
+        return np.random.default_rng([self.seed, sum(map(ord, name))])
+
+    def _chunks(self, table):
+        total = self.counts[table]
+        rng = self._rng(table)
+        for start in range(0, total, CHUNK_ROWS):
+            ids = np.arange(start + 1, min(start + CHUNK_ROWS, total) + 1)
+            yield rng, ids
+
+    def _spread(self, rng, frame, column):
+        # drawn after every other column, so spread_days=0 leaves the random streams untouched
+        if self.spread_days:
+            frame[column] -= pd.to_timedelta(rng.integers(0, self.spread_days + 1, len(frame)), unit="D")
+        return frame
+
+    def providers(self):
+        p = self.profile
+        for rng, ids in self._chunks("providers"):
+            idx = ids - 1
+            yield pd.DataFrame({
+                "provider_id": ids,
+                "name": rng.choice(p.provider_names, len(ids)),
+                "type": self._provider_type_values[self._provider_type[idx]],
+                "address": rng.choice(p.provider_addresses, len(ids)),
+                "city": self._provider_city_values[self._provider_city[idx]],
+                "contact": rng.choice(p.provider_contacts, len(ids)),
+            })
+
+    def receivers(self):
+        p = self.profile
+        for rng, ids in self._chunks("receivers"):
+            yield pd.DataFrame({
+                "receiver_id": ids,
+                "name": rng.choice(p.receiver_names, len(ids)),
+                "type": _pick(rng, p.receiver_type, len(ids)),
+                "city": _pick(rng, p.receiver_city, len(ids)),
+                "contact": rng.choice(p.receiver_contacts, len(ids)),
+            })
+
+    def food_listings(self):
+        p = self.profile
+        anchor = np.datetime64(self.anchor, "D")
+        for rng, ids in self._chunks("food_listings"):
+            provider_idx = rng.integers(0, self.counts["providers"], len(ids))
+            yield self._spread(rng, pd.DataFrame({
+                "food_id": ids,
+                "food_name": _pick(rng, p.food_name, len(ids)),
+                "quantity": _pick(rng, p.quantity, len(ids)),
+                "expiry_date": anchor + _pick(rng, p.expiry_offset, len(ids)).astype("timedelta64[D]"),
+                "provider_id": provider_idx + 1,
+                "provider_type": self._provider_type_values[self._provider_type[provider_idx]],
+                "location": self._provider_city_values[self._provider_city[provider_idx]],
+                "food_type": _pick(rng, p.food_type, len(ids)),
+                "meal_type": _pick(rng, p.meal_type, len(ids)),
+            }), "expiry_date")
+
+    def claims(self):
+        p = self.profile
+        anchor = np.datetime64(self.anchor, "m")
+        for rng, ids in self._chunks("claims"):
+            minutes = rng.choice(p.claim_offset_minutes, len(ids)) + rng.integers(-30, 31, len(ids))
+            yield self._spread(rng, pd.DataFrame({
+                "claim_id": ids,
+                "food_id": rng.integers(1, self.counts["food_listings"] + 1, len(ids)),
+                "receiver_id": rng.integers(1, self.counts["receivers"] + 1, len(ids)),
+                "status": _pick(rng, p.status, len(ids)),
+                "timestamp": anchor + minutes.astype("timedelta64[m]"),
+            }), "timestamp")
+
+    def frames(self, table):
+        return getattr(self, table)()
+
+
+# ---------------- Loading ----------------
+def recreate_database(name):
+    admin = psycopg2.connect(**{**db.DB_CONFIG, "dbname": "postgres"})
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        cur.execute(f'CREATE DATABASE "{name}"')
+    admin.close()
+
+
+def copy_frames(pool, table, frames):
+    rows = 0
+    with pool.cursor() as cur:
+        for frame in frames:
+            buffer = io.StringIO()
+            frame.to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cur.copy_expert(f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            rows += len(frame)
+    return rows
+
+
+def analyze(pool):
+    with pool.cursor(autocommit=True) as cur:
+        cur.execute("VACUUM ANALYZE")
+
+
+def load(pool, generator, log=print, migrations=True):
+    """Recreate the four tables from create_table.sql and fill them from ``generator``."""
+    with open(os.path.join(ROOT, "create_table.sql"), encoding="utf-8") as f:
+        schema = f.read()
+    with pool.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS claims, food_listings, receivers, providers, "
+                    "rollup_listings, rollup_claims, listing_stock, partition_policy, search_values, search_words, "
+                    "search_word_trigrams, schema_migrations CASCADE")
+        cur.execute(schema)
+    for table, _ in SEED_FILES:
+        start = time.perf_counter()
+        rows = copy_frames(pool, table, generator.frames(table))
+        seconds = time.perf_counter() - start
+        log(f"{table}: {rows:,} rows in {seconds:.1f}s ({rows / seconds:,.0f} rows/s)")
+    if migrations:
+        migrate.migrate(pool, log=lambda msg: None)
+    analyze(pool)
+
+
+def build(pool, scale, anchor=None, log=print, migrations=True, rows=None, spread_days=0):
+    load(pool, Generator(scale, anchor, rows=rows, spread_days=spread_days), log=log, migrations=migrations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1, help="multiple of the seed CSV sizes (1, 100, 10000)")
+    parser.add_argument("--database", default="food_wastage_bench")
+    parser.add_argument("--anchor", type=date.fromisoformat,
+                        help="date the seed's first expiry maps to (default: keep the seed dates)")
+    parser.add_argument("--spread-days", type=int, default=0,
+                        help="spread expiry dates and claim times back over this many days of history")
+    parser.add_argument("--no-migrations", action="store_true", help="leave the bare create_table.sql schema")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["dbname"]:
+        parser.error("refusing to rebuild the application database; pick another --database")
+    recreate_database(args.database)
+    pool = db.create_pool(dbname=args.database)
+    try:
+        build(pool, args.scale, args.anchor, migrations=not args.no_migrations, spread_days=args.spread_days)
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Live dashboard KPIs kept in memory from the food_listings / claims change feed.
+
+The triggers in migrations/R__change_feed.sql publish every committed change to
+those tables on the ``table_changes`` channel. One ``ChangeFeed`` per server
+process LISTENs on its own connection, loads the KPIs once from a consistent
+snapshot, and from then on applies each notification's row deltas to a
+``KpiState``. Every session then reads Total Listings, Total Food Quantity,
+Total Claims, Claimed Quantity and the claim status counts from memory,
+without running a query per rerun.
+
+Notifications from transactions that the loaded snapshot already saw are
+skipped by transaction id, so nothing is counted twice. A resync notice (bulk
+statements, TRUNCATE), a lost connection, or ``RESYNC_INTERVAL`` elapsing
+reloads the state from the tables.
+
+``version(tables)`` counts the notifications per table, so it changes after
+every committed write to any of ``tables`` (api.py builds its ETags from it).
+Every reload starts a new generation, since notifications may have been
+missed while the feed was disconnected.
+"""
+import json
+import os
+import select
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+import psycopg2
+
+import db
+
+CHANNEL = "table_changes"
+RESYNC_INTERVAL = float(os.environ.get("KPI_RESYNC_SECONDS", "600"))   # periodic full reload, as a safety net
+LIVE_REFRESH = float(os.environ.get("KPI_REFRESH_SECONDS", "2"))       # how often the dashboard redraws the KPIs
+POLL_SECONDS = 1.0
+RETRY_SECONDS = 5.0
+
+LOAD_SQL = {
+    "listings": "SELECT COUNT(*), COALESCE(SUM(quantity), 0) FROM food_listings",
+    "statuses": "SELECT status, COUNT(*) FROM claims GROUP BY status",
+    # Claimed Quantity: the units each claim took (claims.quantity), over claims on a listing
+    "claimed": "SELECT COALESCE(SUM(quantity), 0) FROM claims WHERE food_id IS NOT NULL",
+}
+
+
+class KpiState:
+    """Dashboard KPIs, kept exact by adding and taking out the rows each notification carries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.listings = 0
+        self.quantity = 0
+        self.statuses = {}                # status -> claims (None for claims without a status)
+        self.claimed = 0
+
+    def load(self, cur):
+        """Replace the state with the tables as ``cur``'s snapshot sees them; returns the statements run."""
+        with self._lock:
+            self._reset()
+            cur.execute(LOAD_SQL["listings"])
+            self.listings, self.quantity = (int(v) for v in cur.fetchone())
+            cur.execute(LOAD_SQL["statuses"])
+            self.statuses = {status: int(n) for status, n in cur.fetchall()}
+            cur.execute(LOAD_SQL["claimed"])
+            self.claimed = int(cur.fetchone()[0])
+        return len(LOAD_SQL)
+
+    def apply(self, table, rows):
+        """Apply one notification's ``[sign, ...]`` rows (see R__change_feed.sql for the layout)."""
+        with self._lock:
+            if table == "food_listings":
+                for sign, _, quantity in rows:
+                    self.listings += sign
+                    self.quantity += sign * (quantity or 0)
+            elif table == "claims":
+                for sign, _, food_id, status, quantity in rows:
+                    self.statuses[status] = self.statuses.get(status, 0) + sign
+                    if not self.statuses[status]:
+                        del self.statuses[status]
+                    if food_id is not None:       # no listing, no units taken, as in the dashboard query
+                        self.claimed += sign * (quantity or 0)
+
+    def kpis(self):
+        with self._lock:
+            return {
+                "listings": self.listings,
+                "quantity": self.quantity,
+                "claims": sum(self.statuses.values()),
+                "claimed": self.claimed,
+                "statuses": dict(self.statuses),
+            }
+
+
+def _visible(xid, snapshot):
+    """True when transaction ``xid`` had committed in ``snapshot`` ("xmin:xmax:xip,...")."""
+    xmin, xmax, xip = snapshot.split(":")
+    return xid < int(xmin) or (xid < int(xmax) and str(xid) not in xip.split(","))
+
+
+class ChangeFeed:
+    """LISTENs for table changes on a background thread and keeps ``state`` current."""
+
+    def __init__(self, dsn=None, channel=CHANNEL, resync_interval=RESYNC_INTERVAL, connect=None):
+        self.dsn = dict(dsn or db.DB_CONFIG)
+        self.channel = channel
+        self.resync_interval = resync_interval
+        self.state = KpiState()
+        self.loaded_at = None             # time.monotonic() of the last full load
+        self.last_change = None           # time.monotonic() of the last applied notification
+        self.lag = None                   # seconds from the last change's trigger to applying it
+        self.events = 0                   # notifications applied
+        self.queries = 0                  # statements run by the feed (loads)
+        self.last_error = None
+        self.published = None             # whether the triggers exist (None until the first load)
+        self.versions = defaultdict(int)  # table -> notifications received
+        self.generation = 0               # loads so far; versions from before a reload aren't comparable
+        self._instance = uuid.uuid4().hex[:8]
+        self._connect = connect or psycopg2.connect
+        self._conn = None
+        self._snapshot = None
+        self._resync = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(POLL_SECONDS * 2)
+        self._close()
+
+    @property
+    def ready(self):
+        """True while the KPIs are loaded and the feed is listening."""
+        return bool(self.published) and self._snapshot is not None and self._conn is not None
+
+    def kpis(self):
+        return self.state.kpis()
+
+    def version(self, tables):
+        """An opaque token that changes whenever any of ``tables`` does; None while the feed isn't ready."""
+        if not self.ready:
+            return None
+        return f"{self._instance}.{self.generation}." + ".".join(str(self.versions[t]) for t in sorted(tables))
+
+    def wait_ready(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not self.ready and time.monotonic() < deadline and self.published is not False:
+            time.sleep(0.05)
+        return self.ready
+
+    # ---------------- Listener thread ----------------
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                if not self.published:
+                    return                # migration not applied: nothing will ever be published
+                while not self._stop.is_set():
+                    if self._resync or time.monotonic() - self.loaded_at >= self.resync_interval:
+                        self._load()
+                    if select.select([self._conn], [], [], POLL_SECONDS) != ([], [], []):
+                        self._conn.poll()
+                        self._drain()
+            except Exception as e:
+                self.last_error = e
+                self._close()
+                self._stop.wait(RETRY_SECONDS)
+
+    def _listen(self):
+        self._conn = self._connect(**self.dsn, application_name="change_feed")
+        self._conn.autocommit = True
+        with self._conn.cursor() as cur:
+            cur.execute("SELECT to_regprocedure('change_feed_publish()') IS NOT NULL")
+            self.published = cur.fetchone()[0]
+            self.queries += 1
+            if self.published:
+                cur.execute(f"LISTEN {self.channel}")
+        if self.published:
+            self._load()
+
+    def _load(self):
+        """Reload the state in one repeatable-read snapshot; later notifications it already saw are skipped."""
+        with self._conn.cursor() as cur:
+            cur.execute("BEGIN ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cur.execute("SELECT pg_current_snapshot()::text")
+            self._snapshot = cur.fetchone()[0]
+            self.queries += 2 + self.state.load(cur)
+            cur.execute("COMMIT")
+        self._resync = False
+        self.generation += 1
+        self.loaded_at = time.monotonic()
+        self.last_error = None
+
+    def _drain(self):
+        notifies = list(self._conn.notifies)
+        del self._conn.notifies[:]
+        for notify in notifies:
+            payload = json.loads(notify.payload)
+            self.versions[payload["t"]] += 1
+            if _visible(payload["x"], self._snapshot):
+                continue
+            if payload.get("resync"):
+                self._resync = True
+                continue
+            if not self._resync:
+                self.state.apply(payload["t"], payload["rows"])
+            self.events += 1
+            self.last_change = time.monotonic()
+            self.lag = max(0.0, time.time() - datetime.fromisoformat(payload["at"]).timestamp())
+
+    def _close(self):
+        conn, self._conn = self._conn, None
+        self._snapshot = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
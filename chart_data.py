@@ -0,0 +1,92 @@
+"""Chart-sized data for the Plotly figures.
+
+Figures never receive raw rows: categories are grouped in SQL and capped at
+``MAX_CATEGORIES`` with the remainder summed into an "Other" bucket, and
+series with an ordered x axis are downsampled to ``MAX_POINTS`` (largest
+triangle three buckets, so peaks survive). The Plotly JSON sent to the
+browser therefore stays the same size however large the tables get.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_CATEGORIES = 15
+MAX_POINTS = 500
+OTHER = "Other"
+
+
+# ---------------- Categories ----------------
+def top_n_sql(grouped_sql, label, value, n=MAX_CATEGORIES, extra=()):
+    """Wrap a grouped query so it returns at most ``n`` rows plus an "Other" row.
+
+    ``grouped_sql`` yields one row per group with a ``label`` and a ``value``
+    column; ``extra`` columns (e.g. a colour column) are kept for the top rows
+    and set to "Other" in the bucket.
+    """
+    extra_cols = "".join(f", CASE WHEN rn <= {int(n)} THEN {col}::text ELSE '{OTHER}' END AS {col}"
+                         for col in extra)
+    return f"""
+        SELECT CASE WHEN rn <= {int(n)} THEN {label}::text ELSE '{OTHER}' END AS {label}{extra_cols},
+               SUM({value}) AS {value}
+        FROM (
+            SELECT g.*, ROW_NUMBER() OVER (ORDER BY {value} DESC NULLS LAST, {label}) AS rn
+            FROM ({grouped_sql}) g
+        ) ranked
+        GROUP BY 1{''.join(f', {i + 2}' for i in range(len(extra)))}
+        ORDER BY MIN(rn)
+    """
+
+
+def top_n(df, label, value, n=MAX_CATEGORIES, extra=()):
+    """In-memory counterpart of ``top_n_sql`` for frames that are already grouped."""
+    if len(df) <= n:
+        return df
+    ranked = df.sort_values([value, label], ascending=[False, True], na_position="last")
+    head = ranked.iloc[:n]
+    other = pd.DataFrame({label: [OTHER], **{col: [OTHER] for col in extra}, value: [ranked[value].iloc[n:].sum()]})
+    return pd.concat([head[[label, *extra, value]], other], ignore_index=True)
+
+
+def largest(df, value, n=MAX_POINTS):
+    """The ``n`` rows with the largest ``value`` (for scatter plots with no natural order)."""
+    return df if len(df) <= n else df.nlargest(n, value)
+
+
+# ---------------- Series ----------------
+def _lttb_indices(x, y, n):
+    """Largest-triangle-three-buckets: indices of ``n`` points that keep the series' shape."""
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else size
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(df, x, y, n=MAX_POINTS):
+    """Reduce a series ordered by ``x`` to at most ``n`` representative rows."""
+    if len(df) <= n:
+        return df
+    df = df.sort_values(x, kind="stable")
+    xs = df[x]
+    if pd.api.types.is_datetime64_any_dtype(xs):
+        xs = xs.astype("int64")
+    elif not pd.api.types.is_numeric_dtype(xs):
+        xs = pd.Series(np.arange(len(df)), index=df.index)
+    idx = _lttb_indices(xs.to_numpy(dtype=float), df[y].to_numpy(dtype=float), n)
+    return df.iloc[idx]
+
+
+# ---------------- Reporting ----------------
+def payload_bytes(fig):
+    """Size of the figure JSON Streamlit sends to the browser."""
+    return len(fig.to_json().encode())
@@ -0,0 +1,228 @@
+import os
+import threading
+from collections import deque
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+# ---------------- Connection Settings ----------------
+# Defaults match the original App.py settings; PG* environment variables override them.
+DB_CONFIG = {
+    "host": os.environ.get("PGHOST", "localhost"),
+    "dbname": os.environ.get("PGDATABASE", "food_wastage_db"),
+    "user": os.environ.get("PGUSER", "postgres"),
+    "password": os.environ.get("PGPASSWORD", "swara"),
+    "port": os.environ.get("PGPORT", "5432"),
+}
+
+POOL_MIN_CONN = int(os.environ.get("DB_POOL_MIN", "1"))
+POOL_MAX_CONN = int(os.environ.get("DB_POOL_MAX", "10"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# Errors that mean the connection itself is unusable (server restart, network drop, ...)
+BROKEN_CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+# ... except a cancelled statement (statement_timeout, cancel()), which leaves the connection usable.
+CANCELLED_ERRORS = (psycopg2.extensions.QueryCanceledError,)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# ---------------- Connection Pool ----------------
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    Callers check a connection out per request with ``connection()``; it is
+    committed (or rolled back) and returned to the pool when the block exits.
+    Broken connections are discarded instead of being handed out again.
+    When every connection is out, callers wait their turn in arrival order: a
+    returned connection goes to the longest waiter, not to whichever thread
+    asks next, so no caller starves behind busier ones.
+    """
+
+    def __init__(self, minconn=POOL_MIN_CONN, maxconn=POOL_MAX_CONN, timeout=POOL_TIMEOUT,
+                 connect=None, **dsn):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("pool needs 0 <= minconn <= maxconn and maxconn >= 1")
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._dsn = dsn or dict(DB_CONFIG)
+        self._connect = connect or psycopg2.connect
+        self._lock = threading.Lock()
+        self._free = maxconn     # connections not checked out
+        self._waiters = deque()  # one Event per caller waiting for a connection, oldest first
+        self._idle = []
+        self._active = {}        # thread id -> connections it has checked out (for cancel())
+        self._closed = False
+        for _ in range(minconn):
+            self._idle.append(self._connect(**self._dsn))
+
+    def _acquire_slot(self):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            turn = threading.Event()
+            self._waiters.append(turn)
+        if turn.wait(self.timeout):
+            return True
+        with self._lock:
+            if turn.is_set():        # handed a slot just as the wait timed out
+                return True
+            self._waiters.remove(turn)
+            return False
+
+    def _release_slot(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()     # the slot passes straight to the oldest waiter
+            else:
+                self._free += 1
+
+    def _checkout(self):
+        if not self._acquire_slot():
+            raise PoolTimeout(f"no database connection available after {self.timeout}s")
+        try:
+            with self._lock:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                conn = self._idle.pop() if self._idle else None
+            if conn is None or conn.closed:
+                conn = self._connect(**self._dsn)
+            return conn
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def _checkin(self, conn, broken=False):
+        try:
+            if broken or conn.closed:
+                _close_quietly(conn)
+                return
+            with self._lock:
+                if self._closed:
+                    _close_quietly(conn)
+                else:
+                    self._idle.append(conn)
+        finally:
+            self._release_slot()
+
+    @contextmanager
+    def connection(self, readonly=False, autocommit=None):
+        """Check out a connection for one unit of work.
+
+        Reads use ``readonly=True`` which defaults to an autocommit, read-only
+        session so a failed dashboard query can never leave a transaction open.
+        Pass ``autocommit=False`` for reads that need a transaction (named cursors).
+        """
+        if autocommit is None:
+            autocommit = readonly
+        conn = self._checkout()
+        thread = threading.get_ident()
+        with self._lock:
+            self._active.setdefault(thread, []).append(conn)
+        broken = False
+        try:
+            if conn.autocommit != autocommit or bool(conn.readonly) != readonly:
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+                conn.set_session(readonly=readonly, autocommit=autocommit)
+            yield conn
+            if not autocommit:
+                conn.commit()
+        except CANCELLED_ERRORS:
+            if not conn.closed and not conn.autocommit:
+                conn.rollback()
+            raise
+        except BROKEN_CONNECTION_ERRORS:
+            broken = True
+            raise
+        except BaseException:
+            try:
+                if not conn.closed and not conn.autocommit:
+                    conn.rollback()
+            except BROKEN_CONNECTION_ERRORS:
+                broken = True
+            raise
+        finally:
+            with self._lock:
+                held = self._active.get(thread, [])
+                if conn in held:
+                    held.remove(conn)
+                if not held:
+                    self._active.pop(thread, None)
+            self._checkin(conn, broken=broken or bool(conn.closed))
+
+    @contextmanager
+    def cursor(self, readonly=False, autocommit=None):
+        with self.connection(readonly=readonly, autocommit=autocommit) as conn:
+            with conn.cursor() as cur:
+                yield cur
+
+    def fetch(self, query, params=None, retries=1):
+        """Run a read-only query and return ``(column_names, rows)``.
+
+        A read is retried on a fresh connection when the pooled one turns out
+        to be dead (e.g. after a database restart).
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.cursor(readonly=True) as cur:
+                    cur.execute(query, params)
+                    rows = cur.fetchall() if cur.description else []
+                    colnames = [desc[0] for desc in cur.description] if cur.description else []
+                    return colnames, rows
+            except CANCELLED_ERRORS:
+                raise
+            except BROKEN_CONNECTION_ERRORS:
+                if attempt == retries:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+
+    def execute(self, query, params=None):
+        """Run a write statement in its own transaction; returns the row count."""
+        with self.cursor() as cur:
+            cur.execute(query, params)
+            return cur.rowcount
+
+    def execute_returning(self, query, params=None):
+        """Run a write with a RETURNING clause in its own transaction; returns the rows."""
+        with self.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+    def cancel(self, thread):
+        """Cancel whatever statement the connections checked out by ``thread`` are running.
+
+        The statement fails with ``QueryCanceled`` in that thread; returns how many were signalled.
+        """
+        with self._lock:
+            conns = list(self._active.get(thread, ()))
+        for conn in conns:
+            try:
+                conn.cancel()
+            except psycopg2.Error:
+                pass
+        return len(conns)
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            _close_quietly(conn)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def create_pool(**overrides):
+    dsn = dict(DB_CONFIG)
+    dsn.update(overrides)
+    return ConnectionPool(**dsn)
@@ -0,0 +1,251 @@
+"""Data behind the "EDA & Predictions" page.
+
+``sql_aggregates`` pushes the city filter and every groupby into PostgreSQL so
+only chart-sized results leave the database. ``pandas_aggregates`` is the
+original implementation (load everything, filter and group in pandas), kept
+as a fallback and for comparison; ``snapshot_raw`` feeds the same pandas code
+from the Arrow snapshot instead. All return the same dict of DataFrames.
+"""
+import pandas as pd
+
+NEAR_EXPIRY_DAYS = 7
+TOP_N = 10
+
+LISTINGS_FROM = """
+    FROM food_listings f
+    LEFT JOIN providers p ON f.provider_id = p.provider_id
+"""
+
+CLAIMS_FROM = """
+    FROM claims c
+    LEFT JOIN food_listings f ON c.food_id = f.food_id
+    LEFT JOIN providers p ON f.provider_id = p.provider_id
+"""
+
+
+def _where(city, *conditions):
+    conditions = list(conditions)
+    if city is not None:
+        conditions.append("p.city = %(city)s")
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def sql_queries(city=None, today=None, index=None, rollups=False):
+    """``{name: (query, params)}`` behind ``sql_aggregates``; none depends on another.
+
+    With ``rollups`` the monthly trend is read from ``rollup_listings``, where
+    the city is the listing's location rather than its provider's city.
+    """
+    today = today or pd.Timestamp.today().date()
+    params = {"city": city, "today": today, "days": NEAR_EXPIRY_DAYS, "top": TOP_N}
+    queries = {}
+    queries["listing_kpis"] = (f"""
+        SELECT COALESCE(SUM(f.quantity), 0) AS total_quantity, COUNT(*) AS listings
+        {LISTINGS_FROM} {_where(city)}
+    """, params)
+    queries["claim_kpis"] = (f"""
+        SELECT COUNT(*) AS claims,
+               COUNT(*) FILTER (WHERE LOWER(c.status) = 'completed') AS completed
+        {CLAIMS_FROM} {_where(city)}
+    """, params)
+    queries["top_foods"] = (f"""
+        SELECT f.food_name, SUM(f.quantity) AS quantity
+        {LISTINGS_FROM} {_where(city)}
+        GROUP BY f.food_name
+        ORDER BY quantity DESC NULLS LAST
+        LIMIT %(top)s
+    """, params)
+    queries["by_city"] = (f"""
+        SELECT COALESCE(p.city, 'Unknown') AS city, COUNT(f.food_id) AS listings
+        {LISTINGS_FROM} {_where(city)}
+        GROUP BY 1
+        ORDER BY listings DESC
+    """, params)
+    if index is None:
+        queries["near_expiry"] = (f"""
+            SELECT f.food_id, f.provider_id, f.food_name, f.quantity, f.expiry_date,
+                   COALESCE(p.city, 'Unknown') AS city, f.expiry_date - %(today)s::date AS days_left
+            {LISTINGS_FROM}
+            {_where(city, "f.expiry_date BETWEEN %(today)s::date AND %(today)s::date + %(days)s")}
+            ORDER BY days_left, f.quantity DESC
+        """, params)
+    queries["status"] = (f"""
+        SELECT c.status, COUNT(*) AS count
+        {CLAIMS_FROM} {_where(city, "c.status IS NOT NULL")}
+        GROUP BY c.status
+        ORDER BY count DESC
+    """, params)
+    if index is None:
+        queries["risk"] = (f"""
+            WITH l AS (
+                SELECT f.food_id, f.food_name, COALESCE(p.city, 'Unknown') AS city, f.quantity,
+                       f.expiry_date, f.expiry_date - %(today)s::date AS days_to_expiry
+                {LISTINGS_FROM} {_where(city)}
+            )
+            SELECT food_id, food_name, city, quantity, expiry_date, days_to_expiry,
+                   CASE WHEN days_to_expiry IS NOT NULL THEN
+                       ROUND((quantity::numeric / GREATEST(1, MAX(quantity) OVER ()))
+                             / GREATEST(days_to_expiry, 1), 3)::float8
+                   END AS risk_score
+            FROM l
+            ORDER BY risk_score DESC NULLS LAST
+            LIMIT %(top)s
+        """, params)
+    if rollups:
+        queries["monthly"] = (f"""
+            SELECT TO_CHAR(period, 'YYYY-MM') AS month, SUM(listings)::bigint AS donations
+            FROM rollup_listings
+            WHERE grain = 'month' {"AND city = %(city)s" if city is not None else ""}
+            GROUP BY period
+            HAVING SUM(listings) > 0
+            ORDER BY period
+        """, params)
+    else:
+        queries["monthly"] = (f"""
+            SELECT TO_CHAR(f.expiry_date, 'YYYY-MM') AS month, COUNT(*) AS donations
+            {LISTINGS_FROM} {_where(city, "f.expiry_date IS NOT NULL")}
+            GROUP BY month
+            ORDER BY month
+        """, params)
+    return queries
+
+
+def sql_aggregates(load, city=None, today=None, index=None, load_all=None, rollups=False):
+    """Compute the page's KPIs and chart data in SQL.
+
+    ``load(query, params)`` returns a DataFrame (App.load_data). ``city=None``
+    means all cities. When a built ``risk_index.RiskIndex`` is passed as ``index``, the
+    near-expiry list and top risk items come from it instead of a table scan.
+    ``load_all({name: (query, params)})`` may run the queries concurrently and
+    return ``{name: DataFrame}``; by default they run one by one through ``load``.
+    ``rollups`` reads the monthly trend from the rollup tables (see ``sql_queries``).
+    """
+    today = today or pd.Timestamp.today().date()
+    queries = sql_queries(city, today, index, rollups)
+    results = (load_all or (lambda qs: {name: load(*q) for name, q in qs.items()}))(queries)
+    if index is not None:
+        results["near_expiry"] = index.expiring(NEAR_EXPIRY_DAYS, city=city, today=today)
+        results["risk"] = index.top_k(TOP_N, city=city, today=today)
+    listing_kpis, claim_kpis, top_foods, by_city, near_expiry, status, risk, monthly = (
+        results[name] for name in ("listing_kpis", "claim_kpis", "top_foods", "by_city", "near_expiry",
+                                   "status", "risk", "monthly"))
+
+    return {
+        "kpis": {
+            "total_quantity": int(listing_kpis["total_quantity"].iloc[0]),
+            "listings": int(listing_kpis["listings"].iloc[0]),
+            "claims": int(claim_kpis["claims"].iloc[0]),
+            "completed": int(claim_kpis["completed"].iloc[0]),
+        },
+        "top_foods": top_foods,
+        "by_city": by_city,
+        "near_expiry": near_expiry,
+        "status": status,
+        "risk": risk,
+        "monthly": monthly,
+        "source_frames": [listing_kpis, claim_kpis, top_foods, by_city, near_expiry, status, risk, monthly],
+    }
+
+
+# ---------------- Legacy pandas path ----------------
+def load_raw(load):
+    df_listings = load("""
+        SELECT f.food_id, f.provider_id, f.food_name, f.quantity, f.expiry_date,
+               COALESCE(p.city, 'Unknown') AS city
+        FROM food_listings f
+        LEFT JOIN providers p ON f.provider_id = p.provider_id
+        ORDER BY f.food_id DESC
+    """)
+    try:
+        df_claims = load("""
+            SELECT c.claim_id, c.food_id, c.receiver_id, c.status, c.timestamp,
+                   f.food_name, f.quantity, f.expiry_date,
+                   COALESCE(p.city, 'Unknown') AS city
+            FROM claims c
+            LEFT JOIN food_listings f ON c.food_id = f.food_id
+            LEFT JOIN providers p ON f.provider_id = p.provider_id
+            ORDER BY c.claim_id DESC
+        """)
+    except Exception:
+        df_claims = pd.DataFrame()
+    return df_listings, df_claims
+
+
+def snapshot_raw(snapshot):
+    """``load_raw``'s two frames built from a ``snapshot.Snapshot`` instead of Postgres."""
+    providers = snapshot.frame("providers").set_index("provider_id")["city"]
+    listings = snapshot.frame("food_listings")
+    df_listings = listings[["food_id", "provider_id", "food_name", "quantity", "expiry_date"]].assign(
+        city=_unknown(listings["provider_id"].map(providers))).iloc[::-1].reset_index(drop=True)
+    claims = snapshot.frame("claims")
+    df_claims = (claims[["claim_id", "food_id", "receiver_id", "status", "timestamp"]]
+                 .merge(df_listings.drop(columns="provider_id"), on="food_id", how="left")
+                 .assign(city=lambda df: _unknown(df["city"])).iloc[::-1].reset_index(drop=True))
+    return df_listings, df_claims
+
+
+def _unknown(city):
+    if isinstance(city.dtype, pd.CategoricalDtype) and "Unknown" not in city.cat.categories:
+        city = city.cat.add_categories("Unknown")
+    return city.fillna("Unknown")
+
+
+def pandas_aggregates(load, city=None, today=None):
+    """Original implementation: fetch every listing and claim, then filter/group in pandas."""
+    return frame_aggregates(*load_raw(load), city=city, today=today)
+
+
+def frame_aggregates(df_listings, df_claims, city=None, today=None):
+    """The page's KPIs and chart data from raw listing/claim frames (``load_raw`` / ``snapshot_raw``)."""
+    today = pd.Timestamp(today) if today else pd.Timestamp.today().normalize()
+    source_frames = [df_listings, df_claims]
+
+    if city is not None and not df_listings.empty:
+        df_listings = df_listings[df_listings["city"] == city]
+    if city is not None and not df_claims.empty:
+        df_claims = df_claims[df_claims["city"] == city]
+
+    kpis = {
+        "total_quantity": int(df_listings["quantity"].sum()) if not df_listings.empty else 0,
+        "listings": len(df_listings),
+        "claims": len(df_claims),
+        "completed": int((df_claims["status"].str.lower() == "completed").sum()) if "status" in df_claims else 0,
+    }
+
+    top_foods = pd.DataFrame(columns=["food_name", "quantity"])
+    by_city = pd.DataFrame(columns=["city", "listings"])
+    near_expiry = risk = pd.DataFrame()
+    monthly = pd.DataFrame(columns=["month", "donations"])
+    if not df_listings.empty:
+        top_foods = (df_listings.groupby("food_name", dropna=False)["quantity"]
+                     .sum().reset_index().sort_values("quantity", ascending=False).head(TOP_N))
+        by_city = (df_listings.groupby("city")["food_id"].count()
+                   .reset_index().rename(columns={"food_id": "listings"})
+                   .sort_values("listings", ascending=False))
+
+        soon = df_listings[(df_listings["expiry_date"] >= today)
+                           & (df_listings["expiry_date"] <= today + pd.Timedelta(days=NEAR_EXPIRY_DAYS))]
+        near_expiry = (soon.assign(days_left=(soon["expiry_date"] - today).dt.days)
+                       .sort_values(["days_left", "quantity"], ascending=[True, False]))
+
+        risk_df = df_listings.copy()
+        risk_df["days_to_expiry"] = (risk_df["expiry_date"] - today).dt.days
+        qmax = max(1, risk_df["quantity"].max())
+        risk_df["q_norm"] = risk_df["quantity"] / qmax
+        risk_df["risk_score"] = (risk_df["q_norm"] * (1 / (risk_df["days_to_expiry"].clip(lower=1)))).round(3)
+        risk = risk_df.sort_values("risk_score", ascending=False).head(TOP_N)[
+            ["food_id", "food_name", "city", "quantity", "expiry_date", "days_to_expiry", "risk_score"]]
+
+        temp = df_listings.dropna(subset=["expiry_date"]).copy()
+        temp["month"] = temp["expiry_date"].dt.to_period("M").astype(str)
+        monthly = (temp.groupby("month")["food_id"].count().reset_index()
+                   .rename(columns={"food_id": "donations"}).sort_values("month"))
+
+    status = pd.DataFrame(columns=["status", "count"])
+    if not df_claims.empty and "status" in df_claims:
+        counts = df_claims["status"].value_counts()
+        status = counts[counts > 0].reset_index()       # categoricals list unused categories too
+        status.columns = ["status", "count"]
+
+    return {"kpis": kpis, "top_foods": top_foods, "by_city": by_city, "near_expiry": near_expiry,
+            "status": status, "risk": risk, "monthly": monthly, "source_frames": source_frames}
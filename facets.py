@@ -0,0 +1,174 @@
+"""Facet index behind the Main Dashboard filters.
+
+Each listing occupies a slot, and each facet keeps one integer code per slot
+(its value's position in that facet's value list). A cross-filtered count is
+then a ``np.bincount`` over the slots that pass every *other* selected facet,
+so "how many listings would remain if I also picked this option" comes back
+for all four facets in a few array passes instead of four ``SELECT DISTINCT``
+scans. Unfiltered per-option totals are kept up to date on every write, so a
+facet with no other selection applied costs no pass at all. Listing writes re-read only the written rows (``upsert``/``delete``);
+freed slots are reused. Provider options carry the provider's name as label.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+FACETS = ["location", "provider_id", "food_type", "meal_type"]
+
+# One row per listing: food_id, then the FACETS columns in order.
+FACET_ROWS_SQL = "SELECT f.food_id, f.location, f.provider_id, f.food_type, f.meal_type FROM food_listings f"
+PROVIDER_NAMES_SQL = "SELECT provider_id, name FROM providers"
+
+FACET_COLUMNS = ["value", "label", "count"]
+
+
+class _Facet:
+    def __init__(self):
+        self.values = []                  # code -> value
+        self.codes = {}                   # value -> code
+        self.slots = np.zeros(0, np.int32)
+        self.totals = np.zeros(0, np.int64)   # code -> live listings, with no filter applied
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            if code >= len(self.totals):
+                self.totals = np.concatenate([self.totals, np.zeros(max(16, len(self.totals)), np.int64)])
+        return code
+
+    def matching(self, chosen):
+        """Boolean mask of the slots whose value is one of ``chosen``."""
+        wanted = np.zeros(len(self.values), bool)
+        wanted[[self.codes[v] for v in chosen if v in self.codes]] = True
+        return wanted[self.slots]
+
+
+class FacetIndex:
+    """Incrementally maintained distinct values and cross-filtered counts for FACETS."""
+
+    def __init__(self, facets=FACETS):
+        self._lock = threading.RLock()
+        self.facets = list(facets)
+        self._reset()
+        self.labels = {}                  # facet -> {value: label}
+        self.built = False
+        self.labels_built = False
+
+    def _reset(self, capacity=0):
+        self._facets = {name: _Facet() for name in self.facets}
+        for facet in self._facets.values():
+            facet.slots = np.zeros(capacity, np.int32)
+        self._alive = np.zeros(capacity, bool)
+        self._slot = {}                   # food_id -> slot
+        self._free = []
+
+    def __len__(self):
+        return len(self._slot)
+
+    # ---------------- Maintenance ----------------
+    def build(self, rows):
+        """Replace the contents with ``rows`` (see FACET_ROWS_SQL for the column order)."""
+        rows = list(rows)
+        with self._lock:
+            self._reset(len(rows))
+            for i, name in enumerate(self.facets, start=1):
+                facet = self._facets[name]
+                facet.slots[:] = [facet.code(row[i]) for row in rows]
+                facet.totals = np.bincount(facet.slots, minlength=len(facet.totals)).astype(np.int64)
+            self._slot = {row[0]: slot for slot, row in enumerate(rows)}
+            self._alive[:] = True
+            self.built = True
+
+    def set_labels(self, facet, labels):
+        """Display names for ``facet``'s values, e.g. provider names for provider ids."""
+        with self._lock:
+            self.labels[facet] = dict(labels)
+            self.labels_built = True
+
+    def upsert(self, rows):
+        """Insert or replace listings (FACET_ROWS_SQL rows)."""
+        with self._lock:
+            for row in rows:
+                slot = self._slot.get(row[0])
+                if slot is None:
+                    slot = self._slot[row[0]] = self._free.pop() if self._free else self._grow()
+                for i, name in enumerate(self.facets, start=1):
+                    facet = self._facets[name]
+                    if self._alive[slot]:
+                        facet.totals[facet.slots[slot]] -= 1
+                    facet.slots[slot] = code = facet.code(row[i])
+                    facet.totals[code] += 1
+                self._alive[slot] = True
+
+    def delete(self, food_ids):
+        with self._lock:
+            for food_id in food_ids:
+                slot = self._slot.pop(food_id, None)
+                if slot is not None:
+                    for facet in self._facets.values():
+                        facet.totals[facet.slots[slot]] -= 1
+                    self._alive[slot] = False
+                    self._free.append(slot)
+
+    def _grow(self):
+        size = len(self._alive)
+        capacity = max(16, size * 2)
+        for facet in self._facets.values():
+            facet.slots = np.concatenate([facet.slots, np.zeros(capacity - size, np.int32)])
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - size, bool)])
+        self._free.extend(range(capacity - 1, size, -1))
+        return size
+
+    def invalidate(self):
+        """Force a rebuild on next use (after writes the index can't follow, e.g. bulk loads)."""
+        self.built = False
+        self.labels_built = False
+
+    def invalidate_labels(self):
+        self.labels_built = False
+
+    # ---------------- Queries ----------------
+    def _masks(self, selected):
+        return {name: self._facets[name].matching(chosen) for name, chosen in selected.items() if chosen}
+
+    def counts(self, selected=None):
+        """``{facet: DataFrame[value, label, count]}``: listings left per option given the *other* facets' picks.
+
+        Options with no listings left are dropped unless they are themselves selected.
+        """
+        selected = selected or {}
+        with self._lock:
+            masks = self._masks(selected)
+            result = {}
+            for name in self.facets:
+                facet = self._facets[name]
+                others = [mask for other, mask in masks.items() if other != name]
+                if others:
+                    keep = self._alive & others[0]
+                    for mask in others[1:]:
+                        keep &= mask
+                    counts = np.bincount(facet.slots[keep], minlength=len(facet.values))
+                else:
+                    counts = facet.totals
+                chosen = set(selected.get(name) or ())
+                labels = self.labels.get(name, {})
+                records = [(value, labels.get(value, value), int(n)) for value, n in zip(facet.values, counts)
+                           if value is not None and (n or value in chosen)]
+                records += [(value, labels.get(value, value), 0) for value in chosen if value not in facet.codes]
+                records.sort(key=lambda r: (-r[2], str(r[1])))
+                result[name] = pd.DataFrame(records, columns=FACET_COLUMNS)
+            return result
+
+    def total(self, selected=None):
+        """Listings matching every selected facet."""
+        with self._lock:
+            masks = list(self._masks(selected or {}).values())
+            if not masks:
+                return len(self._slot)
+            keep = self._alive & masks[0]
+            for mask in masks[1:]:
+                keep &= mask
+            return int(keep.sum())
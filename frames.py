@@ -0,0 +1,160 @@
+"""Typed DataFrames straight from PostgreSQL, without a list of Python tuples.
+
+``fetch_frame`` streams a read query out with ``COPY (...) TO STDOUT`` through
+a pipe into pyarrow's incremental CSV reader, so each block is parsed
+straight into typed columns:
+
+* the column types Postgres reports (``cursor.description``) pick the
+  storage type: int4 becomes int32, int8 int64, numeric float64, and date or
+  timestamp become datetime64;
+* result columns named like a table column in ``create_table.sql`` take that
+  column's declared type, and the low-cardinality TEXT columns in
+  ``CATEGORICAL`` come back as pandas categoricals.
+
+Integer columns that contain NULLs become nullable ``Int32``/``Int64``
+instead of float. Anything that is not a plain read falls back to
+``pool.fetch``.
+"""
+import os
+import re
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "create_table.sql")
+BLOCK_BYTES = 4 << 20          # CSV bytes parsed per block
+
+# Low-cardinality TEXT columns, stored as dictionaries / pandas categoricals.
+CATEGORICAL = {
+    "providers": ["type", "city"],
+    "receivers": ["type", "city"],
+    "food_listings": ["food_name", "provider_type", "location", "food_type", "meal_type"],
+    "claims": ["status"],
+}
+
+SQL_TYPES = {"INT": pa.int32(), "INTEGER": pa.int32(), "BIGINT": pa.int64(), "SMALLINT": pa.int16(),
+             "TEXT": pa.string(), "VARCHAR": pa.string(), "DATE": pa.date32(), "TIMESTAMP": pa.timestamp("us")}
+
+# pg_type OIDs -> Arrow storage type; unknown types are read as text.
+PG_TYPES = {16: pa.bool_(), 20: pa.int64(), 21: pa.int16(), 23: pa.int32(), 700: pa.float32(),
+            701: pa.float64(), 1700: pa.float64(), 25: pa.string(), 1043: pa.string(), 1042: pa.string(),
+            1082: pa.date32(), 1114: pa.timestamp("us")}
+
+_TABLE_RE = re.compile(r"CREATE\s+TABLE\s+(\w+)\s*\((.*?)\)\s*;", re.IGNORECASE | re.DOTALL)
+_COLUMN_RE = re.compile(r"^\s*(\w+)\s+([A-Za-z]+)", re.MULTILINE)
+
+
+def parse_schema(path=SCHEMA_FILE):
+    """``{table: {column: SQL type}}`` from the CREATE TABLE statements in ``path``."""
+    with open(path, encoding="utf-8") as f:
+        sql = re.sub(r"--[^\n]*", "", f.read())
+    return {table.lower(): {column.lower(): sql_type.upper() for column, sql_type in _COLUMN_RE.findall(body)}
+            for table, body in _TABLE_RE.findall(sql)}
+
+
+SCHEMA = parse_schema()
+
+
+def column_types(schema=SCHEMA):
+    """Column name -> Arrow type, for names whose declared type agrees in every table."""
+    types, conflicts = {}, set()
+    for table, columns in schema.items():
+        for column, sql_type in columns.items():
+            arrow_type = SQL_TYPES.get(sql_type, pa.string())
+            if column in CATEGORICAL.get(table, ()):
+                arrow_type = pa.dictionary(pa.int32(), arrow_type)
+            if types.setdefault(column, arrow_type) != arrow_type:
+                conflicts.add(column)
+    return {column: t for column, t in types.items() if column not in conflicts}
+
+
+COLUMN_TYPES = column_types()
+
+
+def result_type(name, type_code):
+    """Arrow type for one result column: declared table type if the storage matches, else by OID."""
+    stored = PG_TYPES.get(type_code, pa.string())
+    declared = COLUMN_TYPES.get(name)
+    if declared is not None and (declared.value_type if pa.types.is_dictionary(declared) else declared) == stored:
+        return declared
+    return stored
+
+
+NULLABLE_INTS = {pa.int16(): "Int16", pa.int32(): "Int32", pa.int64(): "Int64"}
+
+
+def to_pandas(table):
+    """Arrow table -> DataFrame: datetime64 dates, nullable ints where needed, lexically ordered categoricals."""
+    df = table.to_pandas(date_as_object=False)
+    for name, column in zip(table.column_names, table.columns):
+        if column.type in NULLABLE_INTS and column.null_count:
+            df[name] = df[name].astype(NULLABLE_INTS[column.type])
+        elif pa.types.is_dictionary(column.type):      # lexical order, so groupbys/sorts match plain strings
+            df[name] = df[name].cat.reorder_categories(sorted(df[name].cat.categories))
+    return df
+
+
+def is_read(query):
+    return re.match(r"\s*(\(\s*)*(select|with|values|table)\b", query, re.IGNORECASE) is not None
+
+
+def query_schema(cur, sql):
+    """Arrow schema of ``sql``'s result, from a ``LIMIT 0`` run of it."""
+    cur.execute(f"SELECT * FROM ({sql}) q LIMIT 0")
+    return pa.schema([(d.name, result_type(d.name, d.type_code)) for d in cur.description])
+
+
+def copy_batches(cur, sql, schema, block_size=BLOCK_BYTES):
+    """Yield record batches of ``sql`` parsed block by block from ``COPY ... TO STDOUT`` on ``cur``.
+
+    If parsing fails or the caller stops early, the connection is closed: it is mid-COPY.
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        try:
+            with open(write_fd, "wb") as sink:
+                cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", sink)
+        except Exception as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        with open(read_fd, "rb") as source:
+            if source.peek(1):
+                yield from pa_csv.open_csv(
+                    source,
+                    read_options=pa_csv.ReadOptions(column_names=schema.names, block_size=block_size),
+                    parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                    convert_options=pa_csv.ConvertOptions(
+                        column_types=dict(zip(schema.names, schema.types)), strings_can_be_null=True,
+                        quoted_strings_can_be_null=False, true_values=["t"], false_values=["f"],
+                        timestamp_parsers=[pa_csv.ISO8601]))
+    except BaseException:
+        cur.connection.close()          # mid-COPY; the pool discards closed connections
+        raise
+    finally:
+        producer.join()
+    if errors:
+        raise errors[0]
+
+
+def fetch_arrow(pool, query, params=None, block_size=BLOCK_BYTES):
+    """Run a read query and return an Arrow table built block by block from COPY output."""
+    with pool.cursor(readonly=True) as cur:
+        sql = cur.mogrify(query, params).decode().strip().rstrip(";")
+        schema = query_schema(cur, sql)
+        batches = list(copy_batches(cur, sql, schema, block_size))
+    return pa.Table.from_batches(batches, schema=schema) if batches else schema.empty_table()
+
+
+def fetch_frame(pool, query, params=None, block_size=BLOCK_BYTES):
+    """Typed DataFrame for ``query``; statements that are not plain reads go through ``pool.fetch``."""
+    if not is_read(query):
+        columns, rows = pool.fetch(query, params)
+        return pd.DataFrame(rows, columns=columns)
+    return to_pandas(fetch_arrow(pool, query, params, block_size))
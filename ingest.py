@@ -0,0 +1,424 @@
+"""Streaming CSV ingestion into PostgreSQL via COPY.
+
+Rows are parsed one at a time, converted to the create_table.sql column types,
+and shipped to a temporary staging table in fixed-size COPY batches. Each batch
+is merged into the target table with an INSERT ... SELECT (after an UPDATE of
+the existing ids when overwriting) that drops rows whose foreign keys don't
+exist, and committed, so memory and the open transaction stay bounded by the
+batch size no matter how large the file is. ``load_claims`` instead makes each
+row of a claims CSV a claim through reservations.py, so uploaded claims can't
+take more than their listings have left.
+
+    python ingest.py                        # load the four seed CSVs
+    python ingest.py claims big_claims.csv  # load one file into one table
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from datetime import date, datetime
+from functools import lru_cache
+
+import db
+import reservations
+
+BATCH_ROWS = 50_000
+CLAIM_BATCH_ROWS = 500      # claims reserved per transaction by load_claims (their row locks last until it commits)
+MAX_ERROR_SAMPLES = 20
+
+
+# ---------------- Value Converters ----------------
+# Converters validate one CSV field and return it in COPY text format (NULL is \\N).
+COPY_NULL = "\\N"
+
+
+def to_int(value):
+    value = value.strip()
+    if not value:
+        return COPY_NULL
+    int(value)
+    return value
+
+
+def to_text(value):
+    if value == "":
+        return COPY_NULL
+    if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+        value = (value.replace("\\", "\\\\").replace("\t", "\\t")
+                      .replace("\n", "\\n").replace("\r", "\\r"))
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _iso_date(value):
+    if "-" in value:
+        return date.fromisoformat(value[:10]).isoformat()
+    month, day, year = value.split("/")
+    return date(int(year), int(month), int(day)).isoformat()
+
+
+def to_date(value):
+    value = value.strip()
+    return _iso_date(value) if value else COPY_NULL
+
+
+@lru_cache(maxsize=65536)
+def _iso_timestamp(value):
+    day_part, _, time_part = value.replace("T", " ").partition(" ")
+    pieces = [int(p) for p in time_part.split(":")] if time_part else [0, 0]
+    hour, minute = pieces[0], pieces[1] if len(pieces) > 1 else 0
+    second = pieces[2] if len(pieces) > 2 else 0
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        raise ValueError(f"invalid time {time_part!r}")
+    return f"{_iso_date(day_part)} {hour:02d}:{minute:02d}:{second:02d}"
+
+
+def to_timestamp(value):
+    value = value.strip()
+    return _iso_timestamp(value) if value else COPY_NULL
+
+
+# ---------------- Table Specs ----------------
+# column -> converter, in create_table.sql order; CSV headers are matched case-insensitively.
+# "keys" is the table of ids kept for a partitioned table (migrations/V008), which has no id index of its own.
+TABLES = {
+    "providers": {
+        "pk": "provider_id",
+        "columns": {"provider_id": to_int, "name": to_text, "type": to_text, "address": to_text,
+                    "city": to_text, "contact": to_text},
+        "fks": {},
+    },
+    "receivers": {
+        "pk": "receiver_id",
+        "columns": {"receiver_id": to_int, "name": to_text, "type": to_text, "city": to_text,
+                    "contact": to_text},
+        "fks": {},
+    },
+    "food_listings": {
+        "pk": "food_id",
+        "columns": {"food_id": to_int, "food_name": to_text, "quantity": to_int, "expiry_date": to_date,
+                    "provider_id": to_int, "provider_type": to_text, "location": to_text,
+                    "food_type": to_text, "meal_type": to_text},
+        "fks": {"provider_id": ("providers", "provider_id")},
+        "keys": "listing_keys",
+    },
+    "claims": {
+        "pk": "claim_id",
+        "columns": {"claim_id": to_int, "food_id": to_int, "receiver_id": to_int, "status": to_text,
+                    "timestamp": to_timestamp, "quantity": to_int},
+        "fks": {"food_id": ("food_listings", "food_id"), "receiver_id": ("receivers", "receiver_id")},
+        "keys": "claim_keys",
+    },
+}
+
+# Parents first so foreign keys resolve.
+SEED_FILES = [
+    ("providers", "providers_data_clean.csv"),
+    ("receivers", "receivers_data_clean.csv"),
+    ("food_listings", "food_listings_data.csv"),
+    ("claims", "claims_data.csv"),
+]
+
+
+class IngestError(Exception):
+    pass
+
+
+class LoadReport:
+    def __init__(self, table):
+        self.table = table
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.bad_rows = 0          # failed type conversion
+        self.fk_rejected = 0       # parent row missing
+        self.duplicates = 0        # primary key already present
+        self.batches = 0
+        self.seconds = 0.0
+        self.refused = 0           # claims that didn't fit in their listing's units left (load_claims)
+        self.errors = []           # (csv line, message) samples
+        self.ignored_columns = []
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f"{self.table}: {self.rows_loaded:,} loaded / {self.rows_read:,} read "
+                f"({self.bad_rows:,} bad, {self.fk_rejected:,} FK rejected, {self.duplicates:,} duplicate"
+                f"{f', {self.refused:,} refused' if self.refused else ''}) "
+                f"in {self.seconds:.2f}s = {self.rows_per_sec:,.0f} rows/s")
+
+
+# ---------------- Header Mapping ----------------
+def normalize_header(name):
+    return name.strip().lstrip("\ufeff").lower().replace(" ", "_")
+
+
+def map_header(table, header, require_pk=True):
+    """Return ``[(csv index, column, converter)]`` for the CSV columns that exist in ``table``."""
+    spec = TABLES[table]
+    mapping, ignored = [], []
+    for index, name in enumerate(header):
+        column = normalize_header(name)
+        if column in spec["columns"]:
+            mapping.append((index, column, spec["columns"][column]))
+        else:
+            ignored.append(name)
+    if require_pk and spec["pk"] not in {column for _, column, _ in mapping}:
+        raise IngestError(f"{table} CSV must contain a {spec['pk']} column (got {header})")
+    return mapping, ignored
+
+
+# ---------------- Loader ----------------
+def key_tables(cur):
+    """``{table: key table}`` for the TABLES whose key table exists in this database."""
+    found = {}
+    for table, spec in TABLES.items():
+        if "keys" in spec:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (spec["keys"],))
+            if cur.fetchone()[0]:
+                found[table] = spec["keys"]
+    return found
+
+
+def _merge_sql(table, columns, on_conflict, keys=None):
+    """The statements merging the staging table into ``table``, and the FK-rejection count query.
+
+    Existing ids are matched with an anti-join rather than ON CONFLICT: the
+    partitioned food_listings and claims (migrations/V006) have no unique index
+    on their ids. Ids (the table's own and its parents') are looked up in the
+    ``keys`` tables where there are some, one primary-key probe a row instead
+    of one per partition. "update" first overwrites the rows whose id exists.
+    """
+    keys = keys or {}
+    spec = TABLES[table]
+    pk = spec["pk"]
+    stage = f"ingest_{table}"
+    column_list = ", ".join(columns)
+    fk_checks = " AND ".join(
+        f"(s.{col} IS NULL OR EXISTS (SELECT 1 FROM {keys.get(parent, parent)} p WHERE p.{parent_col} = s.{col}))"
+        for col, (parent, parent_col) in spec["fks"].items() if col in columns
+    ) or "TRUE"
+    source = (f"(SELECT DISTINCT ON (s.{pk}) {', '.join('s.' + c for c in columns)} "
+              f"FROM {stage} s WHERE {fk_checks})")
+    statements = []
+    updates = ", ".join(f"{c} = s.{c}" for c in columns if c != pk)
+    if on_conflict == "update" and updates:
+        statements.append(f"UPDATE {table} t SET {updates} FROM {source} s WHERE t.{pk} = s.{pk}")
+    statements.append(f"INSERT INTO {table} ({column_list}) SELECT * FROM {source} s "
+                      f"WHERE NOT EXISTS (SELECT 1 FROM {keys.get(table, table)} t WHERE t.{pk} = s.{pk})")
+    fk_count = f"SELECT COUNT(*) FROM {stage} s WHERE NOT ({fk_checks})"
+    return statements, fk_count
+
+
+def _flush(cur, table, columns, buffer, staged, merge_sql, fk_count_sql, report, keys):
+    """Merge one staged batch into ``table`` (the caller commits)."""
+    buffer.seek(0)
+    cur.copy_expert(f"COPY ingest_{table} ({', '.join(columns)}) FROM STDIN", buffer)
+    cur.execute(fk_count_sql)
+    rejected = cur.fetchone()[0]
+    merged = 0
+    for statement in merge_sql:
+        cur.execute(statement)
+        merged += cur.rowcount
+    report.fk_rejected += rejected
+    report.rows_loaded += merged
+    report.duplicates += staged - rejected - merged
+    report.batches += 1
+    cur.execute(f"TRUNCATE ingest_{table}")
+    _sync_sequence(cur, table, keys)
+
+
+def _sync_sequence(cur, table, keys):
+    """Move the id sequence (migrations/V002) past the ids just loaded; no-op without one."""
+    pk = TABLES[table]["pk"]
+    cur.execute(f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({pk}), 0) + 1, false) "
+                f"FROM {keys.get(table, table)}", (table, pk))
+
+
+def load_csv(pool, table, stream, batch_rows=BATCH_ROWS, on_conflict="skip", progress=None,
+             single_transaction=False):
+    """Stream ``stream`` (a text file object) into ``table``; returns a LoadReport.
+
+    Every batch is committed once merged, so a large file never holds one long
+    transaction (and its row locks) open; if a batch fails, the ones before it
+    stay loaded. ``single_transaction=True`` loads the whole file or nothing.
+    ``on_conflict`` is "skip" to keep existing rows or "update" to overwrite
+    them. ``progress`` is called with the report after every batch.
+    """
+    if table not in TABLES:
+        raise IngestError(f"unknown table {table!r}")
+    if on_conflict not in ("skip", "update"):
+        raise IngestError(f"on_conflict must be 'skip' or 'update', not {on_conflict!r}")
+    report = LoadReport(table)
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        raise IngestError("CSV file is empty")
+    mapping, report.ignored_columns = map_header(table, header)
+    columns = [column for _, column, _ in mapping]
+    pk = TABLES[table]["pk"]
+    pk_index = columns.index(pk)
+
+    start = time.perf_counter()
+    with pool.connection() as conn, conn.cursor() as cur:
+        keys = key_tables(cur)
+        merge_sql, fk_count_sql = _merge_sql(table, columns, on_conflict, keys)
+        # a load that failed after committing a batch leaves its staging table on the connection
+        cur.execute(f"DROP TABLE IF EXISTS ingest_{table}")
+        cur.execute(f"CREATE TEMP TABLE ingest_{table} (LIKE {table} INCLUDING DEFAULTS)")
+        buffer, staged = io.StringIO(), 0
+        for row in reader:
+            report.rows_read += 1
+            if not any(row):
+                report.rows_read -= 1
+                continue
+            try:
+                values = [convert(row[index]) if index < len(row) else COPY_NULL
+                          for index, _, convert in mapping]
+                if values[pk_index] == COPY_NULL:
+                    raise ValueError(f"{pk} is blank")
+            except (ValueError, TypeError) as e:
+                report.bad_rows += 1
+                if len(report.errors) < MAX_ERROR_SAMPLES:
+                    report.errors.append((reader.line_num, str(e)))
+                continue
+            buffer.write("\t".join(values))
+            buffer.write("\n")
+            staged += 1
+            if staged >= batch_rows:
+                _flush(cur, table, columns, buffer, staged, merge_sql, fk_count_sql, report, keys)
+                if not single_transaction:
+                    conn.commit()
+                buffer, staged = io.StringIO(), 0
+                report.seconds = time.perf_counter() - start
+                if progress:
+                    progress(report)
+        if staged:
+            _flush(cur, table, columns, buffer, staged, merge_sql, fk_count_sql, report, keys)
+        cur.execute(f"DROP TABLE ingest_{table}")
+    report.seconds = time.perf_counter() - start
+    if progress:
+        progress(report)
+    return report
+
+
+# ---------------- Claims Through the Stock Check ----------------
+def _claim(values):
+    """One converted claims row (column -> COPY text) as a ``reservations.reserve_many`` claim."""
+    def value(column):
+        text = values.get(column, COPY_NULL)
+        return None if text == COPY_NULL else text
+
+    for column in ("food_id", "receiver_id"):
+        if value(column) is None:
+            raise ValueError(f"{column} is blank")
+    status = value("status") or "Pending"
+    if status not in (*reservations.ACTIVE_STATUSES, "Cancelled"):
+        raise ValueError(f"unknown status {status!r}")
+    timestamp = value("timestamp")
+    return {"food_id": int(value("food_id")), "receiver_id": int(value("receiver_id")),
+            "quantity": int(value("quantity") or 1), "status": status,
+            "timestamp": datetime.fromisoformat(timestamp) if timestamp else None}
+
+
+def _reserve(pool, claims, lines, report):
+    for line, result in zip(lines, reservations.reserve_many(pool, claims)):
+        if isinstance(result, reservations.ReservationError):
+            report.refused += 1
+            if len(report.errors) < MAX_ERROR_SAMPLES:
+                report.errors.append((line, str(result)))
+        else:
+            report.rows_loaded += 1
+    report.batches += 1
+
+
+def load_claims(pool, stream, batch_rows=CLAIM_BATCH_ROWS, progress=None):
+    """Make every row of a claims CSV a new claim with ``reservations.reserve_many``; returns a LoadReport.
+
+    load_csv copies claims as they are, which suits the seed data but can
+    take more units than a listing has left. Here each claim has to fit: every
+    ``batch_rows`` claims are reserved in one transaction, and a claim that
+    doesn't fit (or names a missing listing or receiver) is counted in
+    ``refused``, with its reason in ``errors``. claim_id is ignored, since new
+    claims take the next id; a blank quantity is 1 unit and a blank status
+    Pending.
+    """
+    report = LoadReport("claims")
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        raise IngestError("CSV file is empty")
+    mapping, report.ignored_columns = map_header("claims", header, require_pk=False)
+    if not {"food_id", "receiver_id"} <= {column for _, column, _ in mapping}:
+        raise IngestError(f"claims CSV must contain food_id and receiver_id columns (got {header})")
+
+    start = time.perf_counter()
+    claims, lines = [], []
+    for row in reader:
+        if not any(row):
+            continue
+        report.rows_read += 1
+        try:
+            claim = _claim({column: convert(row[index]) for index, column, convert in mapping if index < len(row)})
+        except (ValueError, TypeError) as e:
+            report.bad_rows += 1
+            if len(report.errors) < MAX_ERROR_SAMPLES:
+                report.errors.append((reader.line_num, str(e)))
+            continue
+        claims.append(claim)
+        lines.append(reader.line_num)
+        if len(claims) >= batch_rows:
+            _reserve(pool, claims, lines, report)
+            claims, lines = [], []
+            report.seconds = time.perf_counter() - start
+            if progress:
+                progress(report)
+    if claims:
+        _reserve(pool, claims, lines, report)
+    report.seconds = time.perf_counter() - start
+    if progress:
+        progress(report)
+    return report
+
+
+def load_file(pool, table, path, **kwargs):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return load_csv(pool, table, f, **kwargs)
+
+
+def load_seed_data(pool, base_dir=".", **kwargs):
+    return [load_file(pool, table, os.path.join(base_dir, filename), **kwargs)
+            for table, filename in SEED_FILES]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load CSV files into PostgreSQL with COPY")
+    parser.add_argument("table", nargs="?", choices=list(TABLES), help="target table (default: all seed files)")
+    parser.add_argument("path", nargs="?", help="CSV file to load into TABLE")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument("--update", action="store_true", help="overwrite rows whose primary key already exists")
+    parser.add_argument("--single-transaction", action="store_true",
+                        help="load each file all-or-nothing instead of committing every batch")
+    args = parser.parse_args(argv)
+    if args.table and not args.path:
+        parser.error("a CSV path is required when a table is given")
+
+    pool = db.create_pool()
+    kwargs = {"batch_rows": args.batch_rows, "on_conflict": "update" if args.update else "skip",
+              "single_transaction": args.single_transaction}
+    try:
+        reports = ([load_file(pool, args.table, args.path, **kwargs)] if args.table
+                   else load_seed_data(pool, **kwargs))
+    finally:
+        pool.closeall()
+    for report in reports:
+        print(report.summary())
+        for line, message in report.errors:
+            print(f"  line {line}: {message}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""Place names, coordinates and "listings within X km" lookups.
+
+``providers.city``, ``receivers.city`` and ``food_listings.location`` are free
+text. ``normalize`` turns a name into a locality key: lowercase, common
+accents folded, punctuation dropped, and the St/Ft/Mt/N/S/E/W abbreviations
+spelled out. "St. Louis" and "saint  louis" both become "saint louis". The SQL
+function ``locality_key`` in migrations/R__localities.sql does the same, so
+keys built here and keys computed in SQL match.
+
+The ``localities`` table (migrations/V004__localities.sql) holds one row per key
+with its coordinates. ``python locality.py`` fills it from an offline
+gazetteer CSV (``name,latitude,longitude[,population]``, or a GeoNames
+``*.txt`` dump), ``GAZETTEER_PATH`` or the bundled gazetteer.csv by default.
+The seed data's place names are invented, so the bundled file gives each of
+them a made-up but stable point inside the continental US (``--build-gazetteer``
+regenerates it). Swap in a real gazetteer for real data.
+
+``SpatialIndex`` is a uniform latitude/longitude grid over the distinct points
+of a set of items. A radius lookup searches one contiguous run of points per
+grid row in the query's bounding box, keeps the points within the radius
+(haversine) and returns their items. The cost depends on how many points are
+near the query, not on how many items the index holds. ``LocalityIndex`` is
+that grid over food_listings, geocoded through ``localities``, with row-level
+updates.
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import db
+
+GAZETTEER_PATH = os.environ.get(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv"))
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+CELL_DEGREES = 0.5                # grid cell size, about 55 km north-south
+COMPACT_AFTER = 10_000            # row-level changes kept beside the grid before it is rebuilt
+SYNTHETIC_BOUNDS = ((25.0, 49.0), (-124.0, -67.0))    # lat, lon box for --build-gazetteer
+
+# ---------------- Names ----------------
+# Same characters, in the same order, as the translate() call in R__localities.sql.
+_ACCENTS = str.maketrans("ÀÁÂÃÄÅàáâãäåÇçÈÉÊËèéêëÌÍÎÏìíîïÑñÒÓÔÕÖØòóôõöøÙÚÛÜùúûüÝýÿ",
+                         "aaaaaaaaaaaacceeeeeeeeiiiiiiiinnoooooooooooouuuuuuuuyyy")
+_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount", "pt": "port",
+                  "n": "north", "s": "south", "e": "east", "w": "west"}
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+_ADDRESS_LINE = re.compile(r"^(?P<town>[^,]+),\s*[A-Z]{2}\s+\d{5}(?:-\d{4})?$")
+
+
+def normalize(name):
+    """Locality key of a place name, or None when nothing is left of it."""
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return None
+    words = _SEPARATORS.sub(" ", str(name).translate(_ACCENTS).lower()).split()
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in words) or None
+
+
+def address_locality(address):
+    """Town from an address whose last line is "Town, ST 12345"; None for other layouts."""
+    if not address:
+        return None
+    match = _ADDRESS_LINE.match(str(address).strip().splitlines()[-1].strip())
+    return match.group("town").strip() if match else None
+
+
+# ---------------- Gazetteer ----------------
+def read_gazetteer(path=GAZETTEER_PATH):
+    """``key, name, latitude, longitude`` per locality key; duplicates keep the most populous entry."""
+    if path.endswith(".txt"):         # GeoNames: geonameid, name, asciiname, ..., lat, lon, ..., population
+        raw = pd.read_csv(path, sep="\t", header=None, usecols=[1, 2, 4, 5, 14], quoting=3,
+                          names=["name", "asciiname", "latitude", "longitude", "population"],
+                          dtype={"name": str, "asciiname": str})
+        frame = pd.concat([raw.drop(columns="asciiname"),
+                           raw.drop(columns="name").rename(columns={"asciiname": "name"})])
+    else:
+        frame = pd.read_csv(path, comment="#", dtype={"name": str})
+    if "population" not in frame:
+        frame["population"] = 0
+    frame = frame.dropna(subset=["name", "latitude", "longitude"])
+    frame["key"] = frame["name"].map(normalize)
+    frame = (frame.dropna(subset=["key"])
+             .sort_values("population", ascending=False, kind="stable")
+             .drop_duplicates("key"))
+    return frame[["key", "name", "latitude", "longitude"]].reset_index(drop=True)
+
+
+def synthetic_point(key, bounds=SYNTHETIC_BOUNDS):
+    """A stable made-up (latitude, longitude) for ``key`` inside ``bounds``."""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    u, v = (int.from_bytes(digest[i:i + 4], "big") / 2 ** 32 for i in (0, 4))
+    (lat_lo, lat_hi), (lon_lo, lon_hi) = bounds
+    return round(lat_lo + u * (lat_hi - lat_lo), 5), round(lon_lo + v * (lon_hi - lon_lo), 5)
+
+
+def build_gazetteer(names, path=GAZETTEER_PATH):
+    """Write a gazetteer of synthetic points for ``names`` (see the module docstring); returns its size."""
+    keys = {}
+    for name in names:
+        key = normalize(name)
+        if key is not None:
+            keys.setdefault(key, str(name).strip())
+    rows = [(name, *synthetic_point(key)) for key, name in sorted(keys.items())]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("# Synthetic coordinates for the seed data's invented place names "
+                "(locality.py --build-gazetteer). Replace with a real gazetteer for real data.\n")
+        pd.DataFrame(rows, columns=["name", "latitude", "longitude"]).to_csv(f, index=False)
+    return len(rows)
+
+
+def seed_names(directory=os.path.dirname(os.path.abspath(__file__))):
+    """Every place name in the seed CSVs: cities, listing locations and provider address towns."""
+    providers = pd.read_csv(os.path.join(directory, "providers_data_clean.csv"), dtype=str)
+    receivers = pd.read_csv(os.path.join(directory, "receivers_data_clean.csv"), dtype=str)
+    listings = pd.read_csv(os.path.join(directory, "food_listings_data.csv"), dtype=str)
+    return pd.concat([providers["City"], receivers["City"], listings["Location"],
+                      providers["Address"].map(address_locality)]).dropna().unique()
+
+
+# ---------------- Database ----------------
+LOCALITIES_SQL = "SELECT key, name, latitude, longitude FROM localities"
+
+# One row per listing: its location, and its provider's address for when the location is not in the gazetteer.
+LISTING_ROWS_SQL = """
+    SELECT f.food_id, f.location, p.address
+    FROM food_listings f
+    LEFT JOIN providers p ON f.provider_id = p.provider_id
+"""
+
+COVERAGE_SQL = """
+    SELECT source, COUNT(*) AS names, COUNT(l.key) AS geocoded
+    FROM (SELECT 'providers.city' AS source, city AS name FROM providers
+          UNION ALL SELECT 'receivers.city', city FROM receivers
+          UNION ALL SELECT 'food_listings.location', location FROM food_listings) n
+    LEFT JOIN localities l ON l.key = locality_key(n.name)
+    GROUP BY source
+    ORDER BY source
+"""
+
+
+def available(pool):
+    """True when the locality migrations have been applied and the gazetteer loaded."""
+    _, rows = pool.fetch("SELECT to_regclass('localities') IS NOT NULL")
+    if not (rows and rows[0][0]):
+        return False
+    _, rows = pool.fetch("SELECT EXISTS (SELECT 1 FROM localities)")
+    return bool(rows[0][0])
+
+
+def load(pool, path=GAZETTEER_PATH):
+    """Replace the ``localities`` table with the gazetteer at ``path``; returns the rows loaded."""
+    gazetteer = read_gazetteer(path)
+    buffer = io.StringIO()
+    gazetteer.to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+    with pool.cursor() as cur:
+        cur.execute("TRUNCATE localities")
+        cur.copy_expert("COPY localities (key, name, latitude, longitude) FROM STDIN WITH (FORMAT csv)", buffer)
+    return len(gazetteer)
+
+
+# ---------------- Spatial index ----------------
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    """Radius lookups over ``ids`` placed at (``latitude``, ``longitude``), built once.
+
+    Items are sorted by grid cell, then by point, so every distinct point owns
+    a block of ``ids`` and each grid row of a bounding box is one
+    ``searchsorted`` range of points.
+    """
+
+    def __init__(self, ids, latitude, longitude, cell_degrees=CELL_DEGREES):
+        start = time.perf_counter()
+        ids = np.asarray(ids, dtype=np.int64)
+        lat, lon = np.asarray(latitude, dtype=float), np.asarray(longitude, dtype=float)
+        keep = np.isfinite(lat) & np.isfinite(lon)
+        ids, lat, lon = ids[keep], lat[keep], lon[keep]
+        self.cell_degrees = cell_degrees
+        self.columns = int(np.ceil(360 / cell_degrees))
+        cell = self._row(lat) * self.columns + self._column(lon)
+        order = np.lexsort((lon, lat, cell))
+        ids, lat, lon, cell = ids[order], lat[order], lon[order], cell[order]
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = (lat[1:] != lat[:-1]) | (lon[1:] != lon[:-1])
+        self.ids = ids
+        self.point_lat, self.point_lon, self.point_cell = lat[first], lon[first], cell[first]
+        self.point_start = np.append(np.flatnonzero(first), len(ids))   # point i owns ids[start[i]:start[i + 1]]
+        self.seconds = time.perf_counter() - start
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def points(self):
+        return len(self.point_lat)
+
+    def _row(self, lat):
+        return np.floor((np.clip(lat, -90, 90) + 90) / self.cell_degrees).astype(np.int64)
+
+    def _column(self, lon):
+        return np.floor(((np.asarray(lon) + 180) % 360) / self.cell_degrees).astype(np.int64) % self.columns
+
+    def _candidates(self, lat, lon, km):
+        """Points in the grid cells covering the bounding box of the circle."""
+        dlat = km / KM_PER_DEGREE
+        rows = range(int(self._row(lat - dlat)), int(self._row(lat + dlat)) + 1)
+        widest = min(abs(lat) + dlat, 90.0)
+        dlon = dlat / np.cos(np.radians(widest)) if widest < 90 else 180.0
+        if dlon >= 180:
+            spans = [(0, self.columns - 1)]
+        else:
+            first, last = int(self._column(lon - dlon)), int(self._column(lon + dlon))
+            spans = [(first, last)] if first <= last else [(first, self.columns - 1), (0, last)]
+        lows, highs = [], []
+        for row in rows:
+            for first, last in spans:
+                lows.append(row * self.columns + first)
+                highs.append(row * self.columns + last)
+        starts = np.searchsorted(self.point_cell, lows, side="left")
+        ends = np.searchsorted(self.point_cell, highs, side="right")
+        if len(starts) == 1:
+            return np.arange(starts[0], ends[0])
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+    def within(self, lat, lon, km):
+        """``(ids, distances_km)`` of every item within ``km`` of (``lat``, ``lon``), unordered."""
+        points = self._candidates(lat, lon, km)
+        distance = haversine_km(lat, lon, self.point_lat[points], self.point_lon[points])
+        near = distance <= km
+        points, distance = points[near], distance[near]
+        starts, ends = self.point_start[points], self.point_start[points + 1]
+        counts = ends - starts
+        total = int(counts.sum())
+        # ids of every near point's block, in one gather
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return self.ids[offsets], np.repeat(distance, counts)
+
+
+class LocalityIndex:
+    """``SpatialIndex`` over food_listings, geocoded through ``localities``, with row-level updates.
+
+    Listings written after the build are kept beside the grid and scanned
+    directly; after ``COMPACT_AFTER`` of them the grid is rebuilt in memory.
+    """
+
+    def __init__(self, compact_after=COMPACT_AFTER):
+        self.compact_after = compact_after
+        self.places = {}              # key -> (name, latitude, longitude)
+        self.grid = None
+        self.geocoded = 0             # listings with coordinates
+        self.ungeocoded = 0           # listings whose location and address town are not in the gazetteer
+        self._changed = {}            # food_id -> (latitude, longitude), or None once deleted / ungeocoded
+        self._overlay = None          # _changed as arrays, built on the first lookup after a change
+        self._lock = threading.Lock()
+
+    @property
+    def built(self):
+        return self.grid is not None
+
+    def invalidate(self):
+        with self._lock:
+            self.grid = None
+            self._changed = {}
+            self._overlay = None
+
+    def geocode(self, name, address=None):
+        """(latitude, longitude) of a place name, falling back to the town of ``address``."""
+        for candidate in (name, address_locality(address)):
+            place = self.places.get(normalize(candidate))
+            if place is not None:
+                return place[1], place[2]
+        return None
+
+    def _points(self, rows):
+        """food_id, latitude and longitude arrays for ``(food_id, location, address)`` rows."""
+        frame = pd.DataFrame(rows, columns=["food_id", "location", "address"])
+        # geocode each distinct (location, address) once; there are far fewer of them than listings
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(frame[["location", "address"]].fillna("")))
+        coords = np.array([self.geocode(location, address) or (np.nan, np.nan) for location, address in uniques],
+                          dtype=float).reshape(-1, 2)
+        return frame["food_id"].to_numpy(dtype=np.int64), coords[codes, 0], coords[codes, 1]
+
+    def build(self, rows, places):
+        """``rows`` from ``LISTING_ROWS_SQL``, ``places`` from ``LOCALITIES_SQL``."""
+        with self._lock:
+            self.places = {key: (name, lat, lon) for key, name, lat, lon in places}
+            ids, lat, lon = self._points(rows)
+            self.grid = SpatialIndex(ids, lat, lon)
+            self.geocoded = len(self.grid)
+            self.ungeocoded = len(ids) - self.geocoded
+            self._changed = {}
+            self._overlay = None
+
+    def upsert(self, rows):
+        """Re-place listings from ``LISTING_ROWS_SQL`` rows, e.g. after they were written."""
+        ids, lat, lon = self._points(rows)
+        with self._lock:
+            for food_id, a, b in zip(ids.tolist(), lat.tolist(), lon.tolist()):
+                self._changed[food_id] = (a, b) if np.isfinite(a) else None
+            self._overlay = None
+            self._compact_if_needed()
+
+    def delete(self, food_ids):
+        with self._lock:
+            for food_id in food_ids:
+                self._changed[int(food_id)] = None
+            self._overlay = None
+            self._compact_if_needed()
+
+    def _pending(self):
+        """``(changed ids, moved ids, moved points)`` for the listings written since the build."""
+        if self._overlay is None:
+            moved = [(food_id, point) for food_id, point in self._changed.items() if point is not None]
+            self._overlay = (np.fromiter(self._changed, dtype=np.int64, count=len(self._changed)),
+                             np.array([food_id for food_id, _ in moved], dtype=np.int64),
+                             np.array([point for _, point in moved], dtype=float).reshape(-1, 2))
+        return self._overlay
+
+    def _compact_if_needed(self):
+        if self.grid is None or len(self._changed) < self.compact_after:
+            return
+        grid = self.grid
+        changed, moved_ids, moved_points = self._pending()
+        stale = np.isin(grid.ids, changed)
+        point_of = np.repeat(np.arange(grid.points), np.diff(grid.point_start))[~stale]
+        self.grid = SpatialIndex(np.concatenate([grid.ids[~stale], moved_ids]),
+                                 np.concatenate([grid.point_lat[point_of], moved_points[:, 0]]),
+                                 np.concatenate([grid.point_lon[point_of], moved_points[:, 1]]))
+        self.geocoded = len(self.grid)
+        self._changed = {}
+        self._overlay = None
+
+    def within(self, lat, lon, km):
+        """``(food_ids, distances_km)`` of listings within ``km``, nearest first."""
+        with self._lock:
+            ids, distance = self.grid.within(lat, lon, km)
+            if self._changed:
+                changed, moved_ids, moved_points = self._pending()
+                current = ~np.isin(ids, changed)
+                moved_distance = haversine_km(lat, lon, moved_points[:, 0], moved_points[:, 1])
+                near = moved_distance <= km
+                ids = np.concatenate([ids[current], moved_ids[near]])
+                distance = np.concatenate([distance[current], moved_distance[near]])
+        order = np.argsort(distance, kind="stable")
+        return ids[order], distance[order]
+
+
+# ---------------- CLI ----------------
+def main():
+    parser = argparse.ArgumentParser(description="Load the gazetteer into the localities table.")
+    parser.add_argument("--gazetteer", default=GAZETTEER_PATH, help="CSV (name,latitude,longitude) or GeoNames .txt")
+    parser.add_argument("--build-gazetteer", action="store_true",
+                        help="write synthetic points for the seed CSVs' place names to --gazetteer first")
+    args = parser.parse_args()
+    if args.build_gazetteer:
+        print(f"{build_gazetteer(seed_names(), args.gazetteer):,} places written to {args.gazetteer}")
+    pool = db.create_pool()
+    try:
+        print(f"{load(pool, args.gazetteer):,} localities loaded")
+        _, rows = pool.fetch(COVERAGE_SQL)
+        for source, names, geocoded in rows:
+            print(f"  {source:<24} {geocoded:>9,} of {names:,} geocoded")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
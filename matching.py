@@ -0,0 +1,284 @@
+"""Bulk allocation of available food listings to receivers in the same city.
+
+Cities are compared by ``locality.normalize`` key, so "St. Louis" and
+"Saint Louis" are one city.
+
+One pass over every open listing (not expired, no Pending/Completed claim):
+
+* listings are ordered by expiry, then waste-risk score (quantity / max
+  quantity / days to expiry - the EDA page's score), with one numpy sort;
+* receivers are bucketed by city into max-heaps keyed on remaining capacity,
+  so each listing only looks at receivers in its own city (no all-pairs scan);
+* a listing goes whole to the receiver in its city with the most capacity
+  left, if it fits. Capacity per run depends on the receiver type
+  (``CAPACITY_BY_TYPE``) minus what the receiver already has pending.
+
+The same routine in first-come-first-served order (listing id order, first
+receiver with room) is the baseline for the "waste avoided" figure: quantity
+left unallocated among listings that expire within the horizon. Its receivers
+sit in a per-city max tree over remaining capacity in receiver id order, so
+the first one with room is found in O(log M) rather than by a scan of the city.
+Both passes share one time budget.
+"""
+import heapq
+import io
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import locality
+
+HORIZON_DAYS = 7
+TIME_BUDGET = 60.0           # seconds for one matching run (both passes)
+CHECK_EVERY = 10_000         # listings between time-budget checks
+
+# Units a receiver can take in one matching run, by receiver type.
+CAPACITY_BY_TYPE = {"NGO": 200, "Charity": 150, "Shelter": 100, "Individual": 10}
+DEFAULT_CAPACITY = 50
+
+OPEN_LISTINGS_SQL = """
+    SELECT f.food_id, f.quantity, f.expiry_date, f.location AS city
+    FROM food_listings f
+    WHERE f.expiry_date >= %(today)s AND f.quantity > 0 AND f.location IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM claims c
+                      WHERE c.food_id = f.food_id AND c.status IN ('Pending', 'Completed'))
+"""
+
+RECEIVERS_SQL = """
+    SELECT r.receiver_id, r.type, r.city, COALESCE(p.pending_quantity, 0) AS pending_quantity
+    FROM receivers r
+    LEFT JOIN (
+        SELECT c.receiver_id, SUM(c.quantity) AS pending_quantity
+        FROM claims c
+        WHERE c.status = 'Pending'
+        GROUP BY c.receiver_id
+    ) p ON p.receiver_id = r.receiver_id
+    WHERE r.city IS NOT NULL
+"""
+
+
+class Allocation:
+    def __init__(self, order):
+        self.order = order
+        self.food_ids = np.empty(0, dtype=np.int64)
+        self.receiver_ids = np.empty(0, dtype=np.int64)
+        self.quantities = np.empty(0, dtype=np.int64)
+        self.considered = 0          # listings with at least one receiver in their city
+        self.listings = 0
+        self.receivers = 0
+        self.seconds = 0.0
+        self.complete = True         # False if the time budget ran out
+
+    def __len__(self):
+        return len(self.food_ids)
+
+    @property
+    def quantity(self):
+        return int(self.quantities.sum())
+
+    def frame(self):
+        return pd.DataFrame({"food_id": self.food_ids, "receiver_id": self.receiver_ids,
+                             "quantity": self.quantities})
+
+
+def _days_left(expiry, today):
+    return (pd.to_datetime(expiry).values.astype("datetime64[D]")
+            - np.datetime64(today, "D")).astype(np.int64)
+
+
+def _capacities(receivers, capacity_by_type):
+    base = receivers["type"].map(capacity_by_type).fillna(DEFAULT_CAPACITY).to_numpy(dtype=np.int64)
+    pending = receivers["pending_quantity"].to_numpy(dtype=np.int64) if "pending_quantity" in receivers else 0
+    return np.maximum(base - pending, 0)
+
+
+class _FirstFit:
+    """One city's receivers in id order, in a max segment tree over remaining capacity."""
+
+    def __init__(self, receiver_ids, capacities):
+        self.receiver_ids = receiver_ids
+        self.size = 1
+        while self.size < len(capacities):
+            self.size *= 2
+        self.tree = [0] * (2 * self.size)
+        self.tree[self.size:self.size + len(capacities)] = capacities
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def take(self, need):
+        """Take ``need`` (> 0) units from the first receiver with that much room; returns its id or None."""
+        tree = self.tree
+        if tree[1] < need:
+            return None
+        node = 1
+        while node < self.size:
+            node = 2 * node if tree[2 * node] >= need else 2 * node + 1
+        tree[node] -= need
+        receiver_id = self.receiver_ids[node - self.size]
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+        return receiver_id
+
+
+def allocate(listings, receivers, today=None, order="priority", capacity_by_type=None,
+             time_budget=TIME_BUDGET, clock=time.perf_counter):
+    """Allocate ``listings`` (food_id, quantity, expiry_date, city) to ``receivers``
+    (receiver_id, type, city[, pending_quantity]). ``order`` is "priority" or "fcfs"."""
+    start = clock()
+    today = today or date.today()
+    result = Allocation(order)
+    result.listings, result.receivers = len(listings), len(receivers)
+    if listings.empty or receivers.empty:
+        result.seconds = clock() - start
+        return result
+
+    # one code space for both sides' cities, by locality key so spellings of one city meet;
+    # listings in cities without receivers drop out here
+    codes, names = pd.factorize(pd.concat([receivers["city"], listings["city"]], ignore_index=True))
+    keys, cities = pd.factorize(np.array([locality.normalize(name) or name for name in names], dtype=object))
+    codes = keys[codes]
+    receiver_city, listing_city = codes[:len(receivers)], codes[len(receivers):]
+    capacity = _capacities(receivers, capacity_by_type or CAPACITY_BY_TYPE)
+    has_room = capacity > 0
+    served = np.zeros(len(cities), dtype=bool)
+    served[receiver_city[has_room]] = True
+    quantity = listings["quantity"].to_numpy(dtype=np.int64)
+    candidates = np.flatnonzero(served[listing_city] & (quantity > 0))
+
+    if order == "priority":
+        days = _days_left(listings["expiry_date"], today)[candidates]
+        risk = quantity[candidates] / max(1, quantity.max()) / np.maximum(days, 1)
+        candidates = candidates[np.lexsort((-risk, days))]       # soonest expiry, then highest risk
+    elif order == "fcfs":
+        candidates = candidates[np.argsort(listings["food_id"].to_numpy()[candidates], kind="stable")]
+    else:
+        raise ValueError(f"order must be 'priority' or 'fcfs', not {order!r}")
+    result.considered = len(candidates)
+
+    # per-city receivers: max-heap on remaining capacity (priority) or first-fit tree in id order (fcfs)
+    receiver_ids = receivers["receiver_id"].to_numpy()
+    by_city = {}
+    for i in np.flatnonzero(has_room):
+        by_city.setdefault(receiver_city[i], []).append((-int(capacity[i]), int(receiver_ids[i])))
+    for city, bucket in by_city.items():
+        if order == "priority":
+            heapq.heapify(bucket)
+        else:
+            bucket.sort(key=lambda slot: slot[1])
+            by_city[city] = _FirstFit([receiver_id for _, receiver_id in bucket], [-room for room, _ in bucket])
+
+    food_ids = listings["food_id"].to_numpy()
+    chosen_listing, chosen_receiver = [], []
+    for n, i in enumerate(candidates.tolist()):
+        if time_budget is not None and n % CHECK_EVERY == 0 and clock() - start > time_budget:
+            result.complete = False
+            break
+        bucket = by_city.get(listing_city[i])
+        if not bucket:
+            continue
+        need = quantity[i]
+        if order == "priority":
+            neg_room, receiver_id = bucket[0]
+            if -neg_room < need:
+                continue                      # nobody in this city has room for the whole lot
+            heapq.heapreplace(bucket, (neg_room + need, receiver_id))
+        else:
+            receiver_id = bucket.take(need)
+            if receiver_id is None:
+                continue
+        chosen_listing.append(i)
+        chosen_receiver.append(receiver_id)
+
+    chosen = np.asarray(chosen_listing, dtype=np.int64)
+    result.food_ids = food_ids[chosen].astype(np.int64)
+    result.receiver_ids = np.asarray(chosen_receiver, dtype=np.int64)
+    result.quantities = quantity[chosen]
+    result.seconds = clock() - start
+    return result
+
+
+def wasted_quantity(listings, allocation, today=None, horizon_days=HORIZON_DAYS):
+    """Quantity of listings expiring within the horizon that the allocation left unclaimed."""
+    days = _days_left(listings["expiry_date"], today or date.today())
+    soon = (days >= 0) & (days <= horizon_days)
+    unallocated = ~np.isin(listings["food_id"].to_numpy(), allocation.food_ids)
+    return int(listings["quantity"].to_numpy()[soon & unallocated].sum())
+
+
+class MatchReport:
+    def __init__(self, allocation, baseline, wasted, wasted_fcfs, horizon_days):
+        self.allocation = allocation
+        self.baseline = baseline
+        self.wasted = wasted
+        self.wasted_fcfs = wasted_fcfs
+        self.horizon_days = horizon_days
+
+    @property
+    def waste_avoided(self):
+        return self.wasted_fcfs - self.wasted
+
+    def summary(self):
+        a = self.allocation
+        return (f"{len(a):,} of {a.listings:,} open listings matched ({a.quantity:,} units) "
+                f"to {a.receivers:,} receivers in {a.seconds:.2f}s"
+                + ("" if a.complete else " (time budget reached, partial)")
+                + f"; {self.wasted:,} units expiring within {self.horizon_days} days left unmatched vs "
+                f"{self.wasted_fcfs:,} first-come-first-served ({self.waste_avoided:,} avoided"
+                + ("" if self.baseline.complete else "; baseline cut short by the time budget") + ")")
+
+
+def match(listings, receivers, today=None, horizon_days=HORIZON_DAYS, time_budget=TIME_BUDGET,
+          capacity_by_type=None):
+    """Priority allocation plus the FCFS baseline for the same inputs, within one ``time_budget``.
+
+    The priority pass may use up to half of the budget; the baseline gets what is left.
+    """
+    today = today or date.today()
+    allocation = allocate(listings, receivers, today, "priority", capacity_by_type,
+                          None if time_budget is None else time_budget / 2)
+    remaining = None if time_budget is None else max(time_budget - allocation.seconds, 0.0)
+    baseline = allocate(listings, receivers, today, "fcfs", capacity_by_type, remaining)
+    return MatchReport(allocation, baseline,
+                       wasted_quantity(listings, allocation, today, horizon_days),
+                       wasted_quantity(listings, baseline, today, horizon_days), horizon_days)
+
+
+# ---------------- Database ----------------
+def load_inputs(pool, today=None):
+    params = {"today": today or date.today()}
+    columns, rows = pool.fetch(OPEN_LISTINGS_SQL, params)
+    listings = pd.DataFrame(rows, columns=columns)
+    columns, rows = pool.fetch(RECEIVERS_SQL)
+    return listings, pd.DataFrame(rows, columns=columns)
+
+
+def write_claims(pool, allocation, status="Pending"):
+    """COPY the proposed claims in one transaction; listings claimed meanwhile are skipped.
+
+    Each claim takes the whole listing. Listings are checked against
+    ``listing_stock`` (see reservations.py) under its row locks, and ones a
+    concurrent claimer has locked are skipped rather than waited for.
+    Returns the number of claims inserted (claim ids come from the V002 sequence).
+    """
+    if not len(allocation):
+        return 0
+    buffer = io.StringIO()
+    allocation.frame()[["food_id", "receiver_id"]].to_csv(buffer, sep="\t", header=False, index=False)
+    buffer.seek(0)
+    with pool.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE match_proposals (food_id INT, receiver_id INT) ON COMMIT DROP")
+        cur.copy_expert("COPY match_proposals FROM STDIN", buffer)
+        cur.execute("""
+            INSERT INTO claims (food_id, receiver_id, status, timestamp, quantity)
+            SELECT m.food_id, m.receiver_id, %s, NOW(), s.quantity
+            FROM (SELECT DISTINCT ON (food_id) food_id, receiver_id FROM match_proposals ORDER BY food_id) m
+            JOIN listing_stock s ON s.food_id = m.food_id
+            WHERE s.reserved = 0 AND s.quantity > 0
+            ORDER BY m.food_id
+            FOR UPDATE OF s SKIP LOCKED
+        """, (status,))
+        return cur.rowcount
@@ -0,0 +1,146 @@
+"""Versioned schema migrations for the food wastage database.
+
+migrations/V<version>__<name>.sql run once, in version order.
+migrations/R__<name>.sql are repeatable (views, triggers, functions) and are
+re-applied when their contents change or after any versioned migration ran.
+Applied scripts are recorded in ``schema_migrations``.
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied / pending scripts
+"""
+import argparse
+import hashlib
+import os
+import re
+
+import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+LOCK_ID = 72_311_001  # pg_advisory_lock key so two processes never migrate at once
+
+_VERSIONED_RE = re.compile(r"^V(\d+)__(\w+)\.sql$")
+_REPEATABLE_RE = re.compile(r"^R__(\w+)\.sql$")
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, path, version, name):
+        self.path = path
+        self.version = version          # "001" for versioned, "R__name" for repeatable
+        self.name = name
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+
+    @property
+    def repeatable(self):
+        return self.version.startswith("R__")
+
+
+def discover(directory=MIGRATIONS_DIR):
+    versioned, repeatable = [], []
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if match := _VERSIONED_RE.match(filename):
+            versioned.append(Migration(path, match.group(1), match.group(2)))
+        elif match := _REPEATABLE_RE.match(filename):
+            repeatable.append(Migration(path, f"R__{match.group(1)}", match.group(1)))
+    versioned.sort(key=lambda m: int(m.version))
+    seen = set()
+    for migration in versioned:
+        if int(migration.version) in seen:
+            raise MigrationError(f"duplicate migration version {migration.version}")
+        seen.add(int(migration.version))
+    return versioned, repeatable
+
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+
+
+def applied_migrations(cur):
+    _ensure_table(cur)
+    cur.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cur.fetchall())
+
+
+def migrate(pool, directory=MIGRATIONS_DIR, log=print):
+    """Apply pending migrations; returns the list of scripts that ran."""
+    versioned, repeatable = discover(directory)
+    ran = []
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_ID,))
+            conn.commit()
+            try:
+                applied = applied_migrations(cur)
+                conn.commit()
+                for migration in versioned:
+                    if migration.version in applied:
+                        if applied[migration.version] != migration.checksum:
+                            log(f"warning: V{migration.version}__{migration.name} changed after it was applied")
+                        continue
+                    _apply(conn, cur, migration, log)
+                    ran.append(migration)
+                for migration in repeatable:
+                    if ran or applied.get(migration.version) != migration.checksum:
+                        _apply(conn, cur, migration, log)
+                        ran.append(migration)
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_ID,))
+                conn.commit()
+    return ran
+
+
+def _apply(conn, cur, migration, log):
+    log(f"applying {os.path.basename(migration.path)}")
+    try:
+        cur.execute(migration.sql)
+        cur.execute("""
+            INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)
+            ON CONFLICT (version) DO UPDATE SET checksum = EXCLUDED.checksum, applied_at = NOW()
+        """, (migration.version, migration.name, migration.checksum))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise MigrationError(f"{os.path.basename(migration.path)} failed: {e}") from e
+
+
+def status(pool, directory=MIGRATIONS_DIR):
+    versioned, repeatable = discover(directory)
+    with pool.cursor() as cur:
+        applied = applied_migrations(cur)
+    return [(os.path.basename(m.path),
+             "applied" if applied.get(m.version) == m.checksum
+             else "changed" if m.version in applied else "pending")
+            for m in versioned + repeatable]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--status", action="store_true", help="show migration status and exit")
+    args = parser.parse_args(argv)
+    pool = db.create_pool()
+    try:
+        if args.status:
+            for filename, state in status(pool):
+                print(f"{state:>8}  {filename}")
+        else:
+            ran = migrate(pool)
+            print(f"{len(ran)} migration(s) applied" if ran else "database is up to date")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+-- Materialized aggregates behind the heavy dashboard and "Run Queries" reports.
+-- Repeatable: re-applied whenever this file changes or a versioned migration runs.
+-- Every view has a unique index so it can be refreshed CONCURRENTLY.
+
+DROP MATERIALIZED VIEW IF EXISTS mv_claims_by_listing;
+CREATE MATERIALIZED VIEW mv_claims_by_listing AS
+SELECT food_id,
+       COUNT(*) AS claims,
+       COUNT(*) FILTER (WHERE status = 'Completed') AS completed_claims,
+       SUM(quantity) AS claimed_quantity
+FROM claims
+WHERE food_id IS NOT NULL
+GROUP BY food_id;
+CREATE UNIQUE INDEX mv_claims_by_listing_pk ON mv_claims_by_listing (food_id);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_claim_status_counts;
+CREATE MATERIALIZED VIEW mv_claim_status_counts AS
+SELECT status, COUNT(*) AS claims
+FROM claims
+GROUP BY status;
+CREATE UNIQUE INDEX mv_claim_status_counts_pk ON mv_claim_status_counts (status);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_receiver_claim_totals;
+CREATE MATERIALIZED VIEW mv_receiver_claim_totals AS
+SELECT r.receiver_id,
+       r.name,
+       r.city,
+       COUNT(c.claim_id) AS total_claims,
+       COUNT(f.food_id) AS matched_claims,
+       COUNT(c.quantity) FILTER (WHERE f.food_id IS NOT NULL) AS quantity_claims,
+       SUM(c.quantity) FILTER (WHERE f.food_id IS NOT NULL) AS claimed_quantity
+FROM claims c
+JOIN receivers r ON c.receiver_id = r.receiver_id
+LEFT JOIN food_listings f ON c.food_id = f.food_id
+GROUP BY r.receiver_id, r.name, r.city;
+CREATE UNIQUE INDEX mv_receiver_claim_totals_pk ON mv_receiver_claim_totals (receiver_id);
+
+-- Monthly donation counts now come from rollup_listings (R__rollups.sql).
+DROP MATERIALIZED VIEW IF EXISTS mv_monthly_donations;
@@ -0,0 +1,88 @@
+-- Change feed for the live dashboard KPIs (change_feed.py).
+-- Repeatable: re-applied whenever this file changes or a versioned migration runs.
+--
+-- Each statement on food_listings or claims publishes its net row changes on the
+-- 'table_changes' channel; listeners only see them once the transaction commits. Rows are
+-- [sign, ...columns] with -1 for an old row and +1 for a new one. Old/new pairs that
+-- don't differ in the published columns cancel out, so an UPDATE of, say, a food name
+-- publishes a notice with no rows; it still tells the table versions (api.py's ETags) that
+-- the table changed. A statement that touched no rows publishes nothing. Payloads carry at
+-- most 100 rows (NOTIFY payloads are limited to 8000 bytes). A statement changing more than
+-- 5000 rows publishes a single resync notice instead.
+-- Every payload has the transaction id, so a listener can skip changes already included in
+-- the snapshot it loaded, and the clock time, which also keeps payloads distinct (NOTIFY folds
+-- identical payloads in one transaction).
+--
+-- food_listings rows: [sign, food_id, quantity]
+-- claims rows:        [sign, claim_id, food_id, status, quantity] (the units the claim took)
+
+CREATE OR REPLACE FUNCTION change_feed_publish() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changes TEXT := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT *, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT *, -1 AS sign FROM old_rows'
+        ELSE 'SELECT *, -1 AS sign FROM old_rows UNION ALL SELECT *, 1 FROM new_rows' END;
+    columns TEXT := CASE TG_TABLE_NAME
+        WHEN 'food_listings' THEN 'd.food_id, d.quantity'
+        ELSE 'd.claim_id, d.food_id, d.status, d.quantity' END;
+    net TEXT;
+    total BIGINT;
+    touched BOOLEAN;
+    payload TEXT;
+BEGIN
+    net := format('SELECT SUM(d.sign) AS sign, %s FROM (%s) d GROUP BY %s HAVING SUM(d.sign) <> 0',
+                  columns, changes, columns);
+    EXECUTE format('SELECT COUNT(*) FROM (%s) n', net) INTO total;
+    IF total = 0 THEN
+        EXECUTE format('SELECT EXISTS (%s)', changes) INTO touched;
+        IF touched THEN
+            PERFORM pg_notify('table_changes', json_build_object(
+                'x', txid_current(), 'at', clock_timestamp(), 't', TG_TABLE_NAME, 'rows', '[]'::json)::text);
+        END IF;
+        RETURN NULL;
+    ELSIF total > 5000 THEN
+        PERFORM pg_notify('table_changes', json_build_object(
+            'x', txid_current(), 'at', clock_timestamp(), 't', TG_TABLE_NAME, 'resync', true)::text);
+        RETURN NULL;
+    END IF;
+    FOR payload IN EXECUTE format($sql$
+        SELECT json_build_object('x', txid_current(), 'at', clock_timestamp(), 't', %L,
+                                 'rows', json_agg(r.row ORDER BY r.n))::text
+        FROM (SELECT row_number() OVER (ORDER BY n.sign) AS n, json_build_array(%s) AS row
+              FROM (%s) n) r
+        GROUP BY (r.n - 1) / 100
+        ORDER BY (r.n - 1) / 100
+    $sql$, TG_TABLE_NAME, 'n.sign, ' || replace(columns, 'd.', 'n.'), net)
+    LOOP
+        PERFORM pg_notify('table_changes', payload);
+    END LOOP;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION change_feed_truncated() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('table_changes', json_build_object(
+        'x', txid_current(), 'at', clock_timestamp(), 't', TG_TABLE_NAME, 'resync', true)::text);
+    RETURN NULL;
+END $$;
+
+DO $$
+DECLARE
+    tbl TEXT;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['food_listings', 'claims'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS change_feed_insert ON %I', tbl);
+        EXECUTE format('CREATE TRIGGER change_feed_insert AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION change_feed_publish()', tbl);
+        EXECUTE format('DROP TRIGGER IF EXISTS change_feed_update ON %I', tbl);
+        EXECUTE format('CREATE TRIGGER change_feed_update AFTER UPDATE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION change_feed_publish()', tbl);
+        EXECUTE format('DROP TRIGGER IF EXISTS change_feed_delete ON %I', tbl);
+        EXECUTE format('CREATE TRIGGER change_feed_delete AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION change_feed_publish()', tbl);
+        EXECUTE format('DROP TRIGGER IF EXISTS change_feed_truncate ON %I', tbl);
+        EXECUTE format('CREATE TRIGGER change_feed_truncate AFTER TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION change_feed_truncated()', tbl);
+    END LOOP;
+END $$;
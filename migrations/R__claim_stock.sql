@@ -0,0 +1,120 @@
+-- Maintenance of listing_stock (table in V005__claim_quantities.sql).
+-- Repeatable: re-applied whenever this file changes or a versioned migration runs, and every
+-- apply rebuilds listing_stock from the base tables.
+--
+-- Statement-level triggers with transition tables, as in R__rollups.sql: each statement on
+-- food_listings copies new and changed quantities and expiry dates, and each statement on claims adds its net
+-- change in Pending/Completed units per listing to reserved. Stock rows are locked in food_id
+-- order so concurrent writers can't deadlock on them. The triggers only keep the books; the
+-- check that a claim fits in what is left is made under the stock row's lock by reservations.py.
+
+-- Claims now always carry a quantity (V005); drop the trigger that defaulted it to the whole listing.
+DROP TRIGGER IF EXISTS claim_stock_default_quantity ON claims;
+DROP FUNCTION IF EXISTS claim_stock_default_quantity();
+
+CREATE OR REPLACE FUNCTION claim_stock_listings() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changed TEXT := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT food_id, quantity, expiry_date FROM new_rows'
+        ELSE 'SELECT n.food_id, n.quantity, n.expiry_date FROM new_rows n LEFT JOIN old_rows o ON o.food_id = n.food_id
+              WHERE o.food_id IS NULL OR o.quantity IS DISTINCT FROM n.quantity
+                 OR o.expiry_date IS DISTINCT FROM n.expiry_date' END;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM listing_stock s USING old_rows o WHERE s.food_id = o.food_id;
+        RETURN NULL;
+    ELSIF TG_OP = 'UPDATE' THEN
+        DELETE FROM listing_stock s USING old_rows o
+        WHERE s.food_id = o.food_id AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.food_id = o.food_id);
+    END IF;
+    EXECUTE format($sql$
+        INSERT INTO listing_stock AS s (food_id, quantity, expires)
+        SELECT food_id, GREATEST(COALESCE(quantity, 0), 0), COALESCE(expiry_date, 'infinity') FROM (%s) c
+        ORDER BY food_id
+        ON CONFLICT (food_id) DO UPDATE SET quantity = EXCLUDED.quantity, expires = EXCLUDED.expires
+    $sql$, changed);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION claim_stock_claims() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changes TEXT := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT *, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT *, -1 AS sign FROM old_rows'
+        ELSE 'SELECT *, -1 AS sign FROM old_rows UNION ALL SELECT *, 1 FROM new_rows' END;
+BEGIN
+    EXECUTE format($sql$
+        WITH delta AS (
+            SELECT c.food_id, SUM(c.sign * c.quantity) AS quantity
+            FROM (%s) c
+            WHERE c.status IN ('Pending', 'Completed') AND c.food_id IS NOT NULL AND c.quantity IS NOT NULL
+            GROUP BY c.food_id
+            HAVING SUM(c.sign * c.quantity) <> 0
+        ), locked AS (
+            SELECT s.food_id FROM listing_stock s JOIN delta d ON d.food_id = s.food_id
+            ORDER BY s.food_id
+            FOR UPDATE OF s
+        )
+        UPDATE listing_stock s SET reserved = s.reserved + d.quantity
+        FROM delta d JOIN locked l ON l.food_id = d.food_id
+        WHERE s.food_id = d.food_id
+    $sql$, changes);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION claim_stock_truncated() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'food_listings' THEN
+        DELETE FROM listing_stock;
+    ELSE
+        UPDATE listing_stock SET reserved = 0 WHERE reserved <> 0;
+    END IF;
+    RETURN NULL;
+END $$;
+
+-- Recompute listing_stock from scratch, with writers to both tables held off meanwhile.
+CREATE OR REPLACE FUNCTION listing_stock_rebuild() RETURNS void LANGUAGE sql AS $$
+    LOCK TABLE food_listings, claims IN SHARE MODE;
+    DELETE FROM listing_stock;
+    INSERT INTO listing_stock (food_id, quantity, reserved, expires)
+    SELECT f.food_id, GREATEST(COALESCE(f.quantity, 0), 0),
+           COALESCE(SUM(c.quantity) FILTER (WHERE c.status IN ('Pending', 'Completed')), 0),
+           COALESCE(f.expiry_date, 'infinity')
+    FROM food_listings f
+    LEFT JOIN claims c ON c.food_id = f.food_id
+    GROUP BY f.food_id, f.quantity, f.expiry_date;
+$$;
+
+DROP TRIGGER IF EXISTS claim_stock_insert ON food_listings;
+CREATE TRIGGER claim_stock_insert AFTER INSERT ON food_listings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_listings();
+DROP TRIGGER IF EXISTS claim_stock_update ON food_listings;
+CREATE TRIGGER claim_stock_update AFTER UPDATE ON food_listings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_listings();
+DROP TRIGGER IF EXISTS claim_stock_delete ON food_listings;
+CREATE TRIGGER claim_stock_delete AFTER DELETE ON food_listings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_listings();
+DROP TRIGGER IF EXISTS claim_stock_truncate ON food_listings;
+CREATE TRIGGER claim_stock_truncate AFTER TRUNCATE ON food_listings
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_truncated();
+
+DROP TRIGGER IF EXISTS claim_stock_insert ON claims;
+CREATE TRIGGER claim_stock_insert AFTER INSERT ON claims
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_claims();
+DROP TRIGGER IF EXISTS claim_stock_update ON claims;
+CREATE TRIGGER claim_stock_update AFTER UPDATE ON claims
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_claims();
+DROP TRIGGER IF EXISTS claim_stock_delete ON claims;
+CREATE TRIGGER claim_stock_delete AFTER DELETE ON claims
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_claims();
+DROP TRIGGER IF EXISTS claim_stock_truncate ON claims;
+CREATE TRIGGER claim_stock_truncate AFTER TRUNCATE ON claims
+    FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_truncated();
+
+SELECT listing_stock_rebuild();
@@ -0,0 +1,20 @@
+-- Place-name normalisation shared by SQL and locality.py (locality.normalize).
+-- Repeatable: re-applied whenever this file changes or a versioned migration runs.
+--
+-- Lowercases, folds common accents, turns every run of other characters into one space
+-- and spells out the St/Ste/Ft/Mt/Pt/N/S/E/W abbreviations, so "St. Louis" and
+-- "saint  louis" share a key. Keep the two implementations in step; nothing is indexed on
+-- this function, so changing it only needs `python locality.py` to reload the keys.
+
+CREATE OR REPLACE FUNCTION locality_key(name TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT NULLIF(btrim(
+        regexp_replace(regexp_replace(regexp_replace(regexp_replace(regexp_replace(
+        regexp_replace(regexp_replace(regexp_replace(regexp_replace(
+            ' ' || regexp_replace(lower(translate(name,
+                'ÀÁÂÃÄÅàáâãäåÇçÈÉÊËèéêëÌÍÎÏìíîïÑñÒÓÔÕÖØòóôõöøÙÚÛÜùúûüÝýÿ',
+                'aaaaaaaaaaaacceeeeeeeeiiiiiiiinnoooooooooooouuuuuuuuyyy')), '[^a-z0-9]+', ' ', 'g') || ' ',
+        ' st(?= )', ' saint', 'g'), ' ste(?= )', ' sainte', 'g'), ' ft(?= )', ' fort', 'g'),
+        ' mt(?= )', ' mount', 'g'), ' pt(?= )', ' port', 'g'), ' n(?= )', ' north', 'g'),
+        ' s(?= )', ' south', 'g'), ' e(?= )', ' east', 'g'), ' w(?= )', ' west', 'g')), '')
+$$;
@@ -0,0 +1,185 @@
+-- Upkeep of the partitioned food_listings and claims (V006__partitions.sql).
+-- Repeatable: re-applied whenever this file changes or a versioned migration runs, and every apply
+-- runs partitions_maintain(). Run it again monthly (`python partitions.py`) so the current month
+-- stays out of the default partition and old months leave the monthly partitions.
+
+-- Moves the rows of ``src`` in [lo, hi) into ``dst`` (a table of the same shape); ``lo`` NULL means no lower bound.
+-- Rows only change partition, so the statement triggers on the partitioned table don't fire.
+CREATE OR REPLACE FUNCTION partition_move_rows(src text, dst text, col text, lo date, hi date)
+RETURNS bigint LANGUAGE plpgsql AS $$
+DECLARE
+    moved bigint;
+BEGIN
+    EXECUTE format('WITH moved AS (DELETE FROM %I WHERE %I < %L %s RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                   src, col, hi, CASE WHEN lo IS NULL THEN '' ELSE format('AND %I >= %L', col, lo) END, dst);
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END $$;
+
+-- For each table in partition_policy: folds the monthly partitions that fell behind keep_months into
+-- <table>_archive, then creates the months up to ahead_months past the current one, taking their rows
+-- out of <table>_default. Returns one row per action taken.
+CREATE OR REPLACE FUNCTION partitions_maintain()
+RETURNS TABLE (table_name text, action text, partition_name text, moved_rows bigint) LANGUAGE plpgsql AS $$
+DECLARE
+    p record;
+    part record;
+    archive text;
+    cutoff date;
+    horizon date;
+    archive_end date;
+    m date;
+    rows_moved bigint;
+BEGIN
+    FOR p IN SELECT * FROM partition_policy pp ORDER BY pp.table_name LOOP
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass(p.table_name)) IS DISTINCT FROM 'p' THEN
+            CONTINUE;
+        END IF;
+        archive := p.table_name || '_archive';
+        cutoff := date_trunc('month', CURRENT_DATE) - make_interval(months => p.keep_months);
+        horizon := date_trunc('month', CURRENT_DATE) + make_interval(months => p.ahead_months + 1);
+        SELECT (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''([^'']+)''\)'))[1]::date INTO archive_end
+        FROM pg_class c WHERE c.oid = to_regclass(archive);
+
+        -- Archive: widen <table>_archive's range to the cutoff and move the months below it in. The
+        -- bound check is validated first (no exclusive lock), so re-attaching the archive skips its scan.
+        IF archive_end < cutoff THEN
+            EXECUTE format('ALTER TABLE %I DROP CONSTRAINT IF EXISTS %I', archive, archive || '_bound');
+            EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I CHECK (%I IS NOT NULL AND %I < %L) NOT VALID',
+                           archive, archive || '_bound', p.column_name, p.column_name, cutoff);
+            EXECUTE format('ALTER TABLE %I VALIDATE CONSTRAINT %I', archive, archive || '_bound');
+            EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', p.table_name, archive);
+            FOR part IN
+                SELECT c.relname
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(p.table_name)
+                  AND c.relname ~ ('^' || p.table_name || '_p\d{4}_\d{2}$')
+                  AND to_date(right(c.relname, 7), 'YYYY_MM') < cutoff
+                ORDER BY c.relname
+            LOOP
+                EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', p.table_name, part.relname);
+                EXECUTE format('INSERT INTO %I SELECT * FROM %I', archive, part.relname);
+                GET DIAGNOSTICS rows_moved = ROW_COUNT;
+                EXECUTE format('DROP TABLE %I', part.relname);
+                RETURN QUERY SELECT p.table_name, 'archived', part.relname::text, rows_moved;
+            END LOOP;
+            -- rows of months that never had a partition
+            rows_moved := partition_move_rows(p.table_name || '_default', archive, p.column_name, NULL, cutoff);
+            EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)',
+                           p.table_name, archive, cutoff);
+            RETURN QUERY SELECT p.table_name, 'archive extended', archive, rows_moved;
+            archive_end := cutoff;
+        END IF;
+
+        -- Months ahead: created empty, or filled from the default partition where it already holds their rows.
+        m := archive_end;
+        WHILE m < horizon LOOP
+            IF to_regclass(p.table_name || to_char(m, '"_p"YYYY_MM')) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                               p.table_name || to_char(m, '"_p"YYYY_MM'), p.table_name);
+                rows_moved := partition_move_rows(p.table_name || '_default', p.table_name || to_char(m, '"_p"YYYY_MM'),
+                                                  p.column_name, m, (m + interval '1 month')::date);
+                EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', p.table_name,
+                               p.table_name || to_char(m, '"_p"YYYY_MM'), m, m + interval '1 month');
+                RETURN QUERY SELECT p.table_name, 'created', p.table_name || to_char(m, '"_p"YYYY_MM'), rows_moved;
+            END IF;
+            m := m + interval '1 month';
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- Upkeep of listing_keys and claim_keys (V008__partition_keys.sql), the keys the partitioned tables can't
+-- declare. Statement-level, like the other triggers: each statement adds the ids it wrote and removes the
+-- ids it dropped, in id order, so a duplicate id fails on their primary keys and a claim on a missing
+-- listing (or a listing that still has claims) on their foreign key. Both wait for a concurrent
+-- transaction writing the same id to finish, as the keys on the tables themselves would.
+DROP TRIGGER IF EXISTS partition_check_insert ON food_listings;
+DROP TRIGGER IF EXISTS partition_check_update ON food_listings;
+DROP TRIGGER IF EXISTS partition_check_delete ON food_listings;
+DROP TRIGGER IF EXISTS partition_check_truncate ON food_listings;
+DROP TRIGGER IF EXISTS partition_check_insert ON claims;
+DROP TRIGGER IF EXISTS partition_check_update ON claims;
+DROP FUNCTION IF EXISTS partition_check_listings();
+DROP FUNCTION IF EXISTS partition_check_claims();
+
+CREATE OR REPLACE FUNCTION partition_keys_listings() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO listing_keys (food_id) SELECT food_id FROM new_rows ORDER BY food_id;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- EXCEPT ALL keeps an id written twice by the statement, so it fails
+        INSERT INTO listing_keys (food_id)
+        SELECT food_id FROM (SELECT food_id FROM new_rows EXCEPT ALL SELECT food_id FROM old_rows) n ORDER BY food_id;
+        DELETE FROM listing_keys k
+        USING (SELECT food_id FROM old_rows EXCEPT SELECT food_id FROM new_rows) o WHERE k.food_id = o.food_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM listing_keys k USING old_rows o WHERE k.food_id = o.food_id;
+    ELSE
+        IF NOT EXISTS (SELECT 1 FROM claims) THEN       -- TRUNCATE food_listings, claims
+            DELETE FROM claim_keys;
+        END IF;
+        DELETE FROM listing_keys;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION partition_keys_claims() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO claim_keys (claim_id, food_id) SELECT claim_id, food_id FROM new_rows ORDER BY claim_id;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO claim_keys (claim_id, food_id)
+        SELECT n.claim_id, (SELECT r.food_id FROM new_rows r WHERE r.claim_id = n.claim_id LIMIT 1)
+        FROM (SELECT claim_id FROM new_rows EXCEPT ALL SELECT claim_id FROM old_rows) n ORDER BY n.claim_id;
+        DELETE FROM claim_keys k
+        USING (SELECT claim_id FROM old_rows EXCEPT SELECT claim_id FROM new_rows) o WHERE k.claim_id = o.claim_id;
+        UPDATE claim_keys k SET food_id = n.food_id
+        FROM (SELECT claim_id, food_id FROM new_rows EXCEPT SELECT claim_id, food_id FROM old_rows ORDER BY 1) n
+        WHERE k.claim_id = n.claim_id AND k.food_id IS DISTINCT FROM n.food_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM claim_keys k USING old_rows o WHERE k.claim_id = o.claim_id;
+    ELSE
+        DELETE FROM claim_keys;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('food_listings')) = 'p' THEN
+        DROP TRIGGER IF EXISTS partition_keys_insert ON food_listings;
+        CREATE TRIGGER partition_keys_insert AFTER INSERT ON food_listings
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_listings();
+        DROP TRIGGER IF EXISTS partition_keys_update ON food_listings;
+        CREATE TRIGGER partition_keys_update AFTER UPDATE ON food_listings
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_listings();
+        DROP TRIGGER IF EXISTS partition_keys_delete ON food_listings;
+        CREATE TRIGGER partition_keys_delete AFTER DELETE ON food_listings
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_listings();
+        DROP TRIGGER IF EXISTS partition_keys_truncate ON food_listings;
+        CREATE TRIGGER partition_keys_truncate AFTER TRUNCATE ON food_listings
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_listings();
+    END IF;
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('claims')) = 'p' THEN
+        DROP TRIGGER IF EXISTS partition_keys_insert ON claims;
+        CREATE TRIGGER partition_keys_insert AFTER INSERT ON claims
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_claims();
+        DROP TRIGGER IF EXISTS partition_keys_update ON claims;
+        CREATE TRIGGER partition_keys_update AFTER UPDATE ON claims
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_claims();
+        DROP TRIGGER IF EXISTS partition_keys_delete ON claims;
+        CREATE TRIGGER partition_keys_delete AFTER DELETE ON claims
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_claims();
+        DROP TRIGGER IF EXISTS partition_keys_truncate ON claims;
+        CREATE TRIGGER partition_keys_truncate AFTER TRUNCATE ON claims
+            FOR EACH STATEMENT EXECUTE FUNCTION partition_keys_claims();
+    END IF;
+END $$;
+
+SELECT * FROM partitions_maintain();
@@ -0,0 +1,143 @@
+-- Incremental maintenance of rollup_listings and rollup_claims (tables in V003__rollups.sql).
+-- Repeatable: re-applied whenever this file changes or a versioned migration runs, and every
+-- apply rebuilds both rollups from the base tables.
+--
+-- The triggers are statement-level with transition tables, so a batch insert or COPY of N rows
+-- costs one grouped upsert per rollup, not N. Old rows count -1 and new rows +1; an UPDATE that
+-- leaves a row's period, city and food type alone nets to zero and writes nothing. Upserts go
+-- in key order so concurrent writers lock rollup rows in the same order.
+
+CREATE OR REPLACE FUNCTION rollup_listings_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changes TEXT := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT *, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT *, -1 AS sign FROM old_rows'
+        ELSE 'SELECT *, -1 AS sign FROM old_rows UNION ALL SELECT *, 1 FROM new_rows' END;
+BEGIN
+    EXECUTE format($sql$
+        INSERT INTO rollup_listings AS r (grain, period, city, food_type, listings, quantity)
+        SELECT g.grain, date_trunc(g.grain, d.expiry_date::timestamp)::date,
+               COALESCE(d.location, 'Unknown'), COALESCE(d.food_type, 'Unknown'),
+               SUM(d.sign), SUM(d.sign * COALESCE(d.quantity, 0))
+        FROM (%s) d CROSS JOIN (VALUES ('day'), ('week'), ('month')) g (grain)
+        WHERE d.expiry_date IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        HAVING SUM(d.sign) <> 0 OR SUM(d.sign * COALESCE(d.quantity, 0)) <> 0
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (grain, period, city, food_type) DO UPDATE
+            SET listings = r.listings + EXCLUDED.listings, quantity = r.quantity + EXCLUDED.quantity
+    $sql$, changes);
+
+    -- Claims are rolled up under their listing's location and food type; move them when those change.
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO rollup_claims AS r (grain, period, city, food_type, status, claims)
+        SELECT g.grain, date_trunc(g.grain, c."timestamp")::date,
+               COALESCE(m.location, 'Unknown'), COALESCE(m.food_type, 'Unknown'),
+               COALESCE(c.status, 'Unknown'), SUM(m.sign)
+        FROM (SELECT o.food_id, o.location, o.food_type, -1 AS sign
+              FROM old_rows o JOIN new_rows n USING (food_id)
+              WHERE (o.location, o.food_type) IS DISTINCT FROM (n.location, n.food_type)
+              UNION ALL
+              SELECT n.food_id, n.location, n.food_type, 1
+              FROM old_rows o JOIN new_rows n USING (food_id)
+              WHERE (o.location, o.food_type) IS DISTINCT FROM (n.location, n.food_type)) m
+        JOIN claims c ON c.food_id = m.food_id
+        CROSS JOIN (VALUES ('day'), ('week'), ('month')) g (grain)
+        WHERE c."timestamp" IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+        HAVING SUM(m.sign) <> 0
+        ORDER BY 1, 2, 3, 4, 5
+        ON CONFLICT (grain, period, city, food_type, status) DO UPDATE SET claims = r.claims + EXCLUDED.claims;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION rollup_claims_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changes TEXT := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT *, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT *, -1 AS sign FROM old_rows'
+        ELSE 'SELECT *, -1 AS sign FROM old_rows UNION ALL SELECT *, 1 FROM new_rows' END;
+BEGIN
+    EXECUTE format($sql$
+        INSERT INTO rollup_claims AS r (grain, period, city, food_type, status, claims)
+        SELECT g.grain, date_trunc(g.grain, d."timestamp")::date,
+               COALESCE(f.location, 'Unknown'), COALESCE(f.food_type, 'Unknown'),
+               COALESCE(d.status, 'Unknown'), SUM(d.sign)
+        FROM (%s) d
+        LEFT JOIN food_listings f ON f.food_id = d.food_id
+        CROSS JOIN (VALUES ('day'), ('week'), ('month')) g (grain)
+        WHERE d."timestamp" IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+        HAVING SUM(d.sign) <> 0
+        ORDER BY 1, 2, 3, 4, 5
+        ON CONFLICT (grain, period, city, food_type, status) DO UPDATE SET claims = r.claims + EXCLUDED.claims
+    $sql$, changes);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION rollup_truncated() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'food_listings' THEN
+        DELETE FROM rollup_listings;
+    END IF;
+    DELETE FROM rollup_claims;   -- claims can't outlive their listings
+    RETURN NULL;
+END $$;
+
+-- Recompute both rollups from scratch (also the reference the triggers are checked against).
+CREATE OR REPLACE FUNCTION rollup_rebuild() RETURNS void LANGUAGE sql AS $$
+    DELETE FROM rollup_listings;
+    INSERT INTO rollup_listings (grain, period, city, food_type, listings, quantity)
+    SELECT g.grain, date_trunc(g.grain, f.expiry_date::timestamp)::date,
+           COALESCE(f.location, 'Unknown'), COALESCE(f.food_type, 'Unknown'),
+           COUNT(*), COALESCE(SUM(f.quantity), 0)
+    FROM food_listings f CROSS JOIN (VALUES ('day'), ('week'), ('month')) g (grain)
+    WHERE f.expiry_date IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+
+    DELETE FROM rollup_claims;
+    INSERT INTO rollup_claims (grain, period, city, food_type, status, claims)
+    SELECT g.grain, date_trunc(g.grain, c."timestamp")::date,
+           COALESCE(f.location, 'Unknown'), COALESCE(f.food_type, 'Unknown'),
+           COALESCE(c.status, 'Unknown'), COUNT(*)
+    FROM claims c
+    LEFT JOIN food_listings f ON f.food_id = c.food_id
+    CROSS JOIN (VALUES ('day'), ('week'), ('month')) g (grain)
+    WHERE c."timestamp" IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5;
+$$;
+
+DROP TRIGGER IF EXISTS rollup_listings_insert ON food_listings;
+CREATE TRIGGER rollup_listings_insert AFTER INSERT ON food_listings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_listings_apply();
+DROP TRIGGER IF EXISTS rollup_listings_update ON food_listings;
+CREATE TRIGGER rollup_listings_update AFTER UPDATE ON food_listings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_listings_apply();
+DROP TRIGGER IF EXISTS rollup_listings_delete ON food_listings;
+CREATE TRIGGER rollup_listings_delete AFTER DELETE ON food_listings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_listings_apply();
+DROP TRIGGER IF EXISTS rollup_listings_truncate ON food_listings;
+CREATE TRIGGER rollup_listings_truncate AFTER TRUNCATE ON food_listings
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_truncated();
+
+DROP TRIGGER IF EXISTS rollup_claims_insert ON claims;
+CREATE TRIGGER rollup_claims_insert AFTER INSERT ON claims
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_claims_apply();
+DROP TRIGGER IF EXISTS rollup_claims_update ON claims;
+CREATE TRIGGER rollup_claims_update AFTER UPDATE ON claims
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_claims_apply();
+DROP TRIGGER IF EXISTS rollup_claims_delete ON claims;
+CREATE TRIGGER rollup_claims_delete AFTER DELETE ON claims
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_claims_apply();
+DROP TRIGGER IF EXISTS rollup_claims_truncate ON claims;
+CREATE TRIGGER rollup_claims_truncate AFTER TRUNCATE ON claims
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_truncated();
+
+SELECT rollup_rebuild();
@@ -0,0 +1,121 @@
+-- Maintenance of the search tables (V007__search.sql) for search.py.
+-- Repeatable: re-applied whenever this file changes or a versioned migration runs, and every
+-- apply rebuilds the search tables from the base tables.
+--
+-- Statement-level triggers with transition tables add the new values of the searched columns,
+-- and any words not seen before (with their trigrams, unless V009 built the pg_trgm index that
+-- makes them unnecessary). A value deleted or changed away from is dropped from search_values
+-- once no row holds it, so it stops matching. Its words stay in search_words until the next
+-- rebuild; a word no value holds any more finds no values. A value removed while another
+-- transaction adds it back can also go missing until the next rebuild.
+
+-- Trigrams of a word as pg_trgm makes them: padded with two spaces in front and one behind.
+CREATE OR REPLACE FUNCTION search_trigrams(word TEXT) RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT ARRAY(SELECT DISTINCT substr('  ' || word || ' ', i, 3) FROM generate_series(1, length(word) + 1) i)
+$$;
+
+CREATE OR REPLACE FUNCTION search_add(tbl TEXT, col TEXT, vals TEXT[]) RETURNS void LANGUAGE sql AS $$
+    WITH added AS (
+        INSERT INTO search_values (table_name, field, value, words)
+        SELECT tbl, col, v, to_tsvector('simple', v)
+        FROM (SELECT DISTINCT v FROM unnest(vals) v WHERE v IS NOT NULL ORDER BY v) d
+        ON CONFLICT DO NOTHING
+        RETURNING words
+    ), new_words AS (
+        INSERT INTO search_words (word)
+        SELECT w
+        FROM (SELECT DISTINCT w FROM added, unnest(tsvector_to_array(added.words)) w ORDER BY w) d
+        ON CONFLICT DO NOTHING
+        RETURNING word
+    )
+    INSERT INTO search_word_trigrams (trigram, word)
+    SELECT DISTINCT g, word FROM new_words, unnest(search_trigrams(word)) g
+    WHERE to_regclass('idx_search_words_trgm') IS NULL;
+$$;
+
+-- Drop the values in vals that no row of tbl holds in col any more (idx_* on the column, V007).
+CREATE OR REPLACE FUNCTION search_remove(tbl TEXT, col TEXT, vals TEXT[]) RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format('DELETE FROM search_values v
+                    WHERE v.table_name = %L AND v.field = %L AND v.value = ANY($1)
+                      AND NOT EXISTS (SELECT 1 FROM %I t WHERE t.%I = v.value)', tbl, col, tbl, col)
+    USING vals;
+END $$;
+
+-- TG_ARGV: the searched columns of the table
+CREATE OR REPLACE FUNCTION search_index_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    col TEXT;
+BEGIN
+    FOREACH col IN ARRAY TG_ARGV LOOP
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM search_values WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            EXECUTE format('SELECT search_add(%L, %L, ARRAY(SELECT DISTINCT %I FROM new_rows))',
+                           TG_TABLE_NAME, col, col);
+        END IF;
+        IF TG_OP = 'DELETE' THEN
+            EXECUTE format('SELECT search_remove(%L, %L, ARRAY(SELECT DISTINCT %I FROM old_rows))',
+                           TG_TABLE_NAME, col, col);
+        ELSIF TG_OP = 'UPDATE' THEN
+            EXECUTE format('SELECT search_remove(%L, %L, ARRAY(SELECT %I FROM old_rows EXCEPT SELECT %I FROM new_rows))',
+                           TG_TABLE_NAME, col, col, col);
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION search_rebuild() RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE search_values, search_words, search_word_trigrams;
+    PERFORM search_add('food_listings', 'food_name', ARRAY(SELECT DISTINCT food_name FROM food_listings));
+    PERFORM search_add('providers', 'name', ARRAY(SELECT DISTINCT name FROM providers));
+    PERFORM search_add('providers', 'address', ARRAY(SELECT DISTINCT address FROM providers));
+    PERFORM search_add('providers', 'city', ARRAY(SELECT DISTINCT city FROM providers));
+    PERFORM search_add('receivers', 'name', ARRAY(SELECT DISTINCT name FROM receivers));
+    PERFORM search_add('receivers', 'city', ARRAY(SELECT DISTINCT city FROM receivers));
+END $$;
+
+DROP TRIGGER IF EXISTS search_insert ON food_listings;
+CREATE TRIGGER search_insert AFTER INSERT ON food_listings REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('food_name');
+DROP TRIGGER IF EXISTS search_update ON food_listings;
+CREATE TRIGGER search_update AFTER UPDATE ON food_listings REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('food_name');
+DROP TRIGGER IF EXISTS search_delete ON food_listings;
+CREATE TRIGGER search_delete AFTER DELETE ON food_listings REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('food_name');
+DROP TRIGGER IF EXISTS search_truncate ON food_listings;
+CREATE TRIGGER search_truncate AFTER TRUNCATE ON food_listings
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('food_name');
+
+DROP TRIGGER IF EXISTS search_insert ON providers;
+CREATE TRIGGER search_insert AFTER INSERT ON providers REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'address', 'city');
+DROP TRIGGER IF EXISTS search_update ON providers;
+CREATE TRIGGER search_update AFTER UPDATE ON providers REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'address', 'city');
+DROP TRIGGER IF EXISTS search_delete ON providers;
+CREATE TRIGGER search_delete AFTER DELETE ON providers REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'address', 'city');
+DROP TRIGGER IF EXISTS search_truncate ON providers;
+CREATE TRIGGER search_truncate AFTER TRUNCATE ON providers
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'address', 'city');
+
+DROP TRIGGER IF EXISTS search_insert ON receivers;
+CREATE TRIGGER search_insert AFTER INSERT ON receivers REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'city');
+DROP TRIGGER IF EXISTS search_update ON receivers;
+CREATE TRIGGER search_update AFTER UPDATE ON receivers REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'city');
+DROP TRIGGER IF EXISTS search_delete ON receivers;
+CREATE TRIGGER search_delete AFTER DELETE ON receivers REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'city');
+DROP TRIGGER IF EXISTS search_truncate ON receivers;
+CREATE TRIGGER search_truncate AFTER TRUNCATE ON receivers
+    FOR EACH STATEMENT EXECUTE FUNCTION search_index_rows('name', 'city');
+
+SELECT search_rebuild();
@@ -0,0 +1,19 @@
+-- Indexes for the predefined queries, dashboards and EDA joins.
+
+-- Foreign keys (claims -> food_listings -> providers / receivers joins)
+CREATE INDEX IF NOT EXISTS idx_food_listings_provider_id ON food_listings (provider_id);
+CREATE INDEX IF NOT EXISTS idx_claims_food_id ON claims (food_id);
+CREATE INDEX IF NOT EXISTS idx_claims_receiver_id ON claims (receiver_id);
+
+-- status = 'Completed' filters and status distributions
+CREATE INDEX IF NOT EXISTS idx_claims_status ON claims (status);
+
+-- Per-city counts and city filters
+CREATE INDEX IF NOT EXISTS idx_providers_city ON providers (city);
+CREATE INDEX IF NOT EXISTS idx_receivers_city ON receivers (city);
+
+-- Location filters (Main Dashboard) and location-wise food type counts
+CREATE INDEX IF NOT EXISTS idx_food_listings_location_food_type ON food_listings (location, food_type);
+
+-- expiry_date < CURRENT_DATE, near-expiry windows and monthly trends
+CREATE INDEX IF NOT EXISTS idx_food_listings_expiry_date ON food_listings (expiry_date);
@@ -0,0 +1,16 @@
+-- Server-side id defaults so new rows (CRUD forms, batch inserts) don't have to pick an id.
+-- ingest.py moves each sequence past the largest loaded id after a CSV load.
+DO $$
+DECLARE
+    t record;
+    seq text;
+BEGIN
+    FOR t IN SELECT * FROM (VALUES ('providers', 'provider_id'), ('receivers', 'receiver_id'),
+                                   ('food_listings', 'food_id'), ('claims', 'claim_id')) AS v(tbl, pk)
+    LOOP
+        seq := t.tbl || '_' || t.pk || '_seq';
+        EXECUTE format('CREATE SEQUENCE IF NOT EXISTS %I AS integer OWNED BY %I.%I', seq, t.tbl, t.pk);
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET DEFAULT nextval(%L)', t.tbl, t.pk, seq);
+        EXECUTE format('SELECT setval(%L, COALESCE(MAX(%I), 0) + 1, false) FROM %I', seq, t.pk, t.tbl);
+    END LOOP;
+END $$;
@@ -0,0 +1,24 @@
+-- Day / week / month rollups behind the trend reports and forecasts (rollups.py, forecast.py).
+-- Kept current by the statement triggers in R__rollups.sql, which also backfill them.
+
+-- Listings and quantity by expiry period, listing location and food type.
+CREATE TABLE IF NOT EXISTS rollup_listings (
+    grain TEXT NOT NULL,                -- 'day', 'week' (ISO weeks, starting Monday) or 'month'
+    period DATE NOT NULL,               -- first day of the period
+    city TEXT NOT NULL,
+    food_type TEXT NOT NULL,
+    listings BIGINT NOT NULL DEFAULT 0,
+    quantity BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, period, city, food_type)
+);
+
+-- Claims by claim period, location and food type of the claimed listing, and status.
+CREATE TABLE IF NOT EXISTS rollup_claims (
+    grain TEXT NOT NULL,
+    period DATE NOT NULL,
+    city TEXT NOT NULL,
+    food_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    claims BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, period, city, food_type, status)
+);
@@ -0,0 +1,9 @@
+-- Coordinates of place names, keyed by locality_key(name) (see R__localities.sql and locality.py).
+-- Filled from an offline gazetteer by `python locality.py`.
+
+CREATE TABLE IF NOT EXISTS localities (
+    key TEXT PRIMARY KEY,               -- locality_key(name)
+    name TEXT NOT NULL,                 -- spelling in the gazetteer
+    latitude DOUBLE PRECISION NOT NULL,
+    longitude DOUBLE PRECISION NOT NULL
+);
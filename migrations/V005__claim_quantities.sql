@@ -0,0 +1,23 @@
+-- Per-claim quantities and each listing's remaining stock (reservations.py).
+-- listing_stock is kept in step with food_listings and claims by the triggers in R__claim_stock.sql,
+-- which also rebuild it.
+
+-- Units taken by the claim. Backfill rule: every claim made before this column, and every claim
+-- inserted without a quantity (e.g. a claims CSV without one), takes 1 unit. Taking the whole
+-- listing would reserve a listing's units once per claim on it; at 1 unit a claim, only a listing
+-- with more Pending/Completed claims than units starts out over-reserved, by the surplus claims.
+ALTER TABLE claims ADD COLUMN IF NOT EXISTS quantity INT DEFAULT 1 CHECK (quantity > 0);
+ALTER TABLE claims DISABLE TRIGGER USER;     -- no rollup or change feed publishes this column
+UPDATE claims SET quantity = 1 WHERE quantity IS NULL;
+ALTER TABLE claims ENABLE TRIGGER USER;
+ALTER TABLE claims ALTER COLUMN quantity SET NOT NULL;
+
+CREATE TABLE IF NOT EXISTS listing_stock (
+    food_id INT PRIMARY KEY,
+    quantity INT NOT NULL DEFAULT 0,        -- food_listings.quantity
+    reserved INT NOT NULL DEFAULT 0,        -- units held by the listing's Pending and Completed claims
+    expires DATE NOT NULL DEFAULT 'infinity' -- food_listings.expiry_date ('infinity' when it has none)
+);
+
+-- reserve_any's queue: listings with units left, soonest expiry first
+CREATE INDEX IF NOT EXISTS idx_listing_stock_queue ON listing_stock (expires, food_id) WHERE quantity > reserved;
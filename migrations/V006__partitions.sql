@@ -0,0 +1,84 @@
+-- Range partitioning of claims by timestamp and food_listings by expiry_date (partitions.py).
+-- Each table becomes <table>_archive (everything before the kept months), one partition per month up to
+-- ahead_months past the current one, and <table>_default (NULL keys and anything past the last month).
+-- partitions_maintain() in R__partitions.sql adds months as time passes and folds old ones into the archive.
+--
+-- A partitioned table's unique keys must include the partition key, which may be NULL here, so the
+-- food_id / claim_id primary keys and the claims -> food_listings foreign key can't be declared on the
+-- partitioned tables. Ids still come from the V002 sequences; R__partitions.sql checks uniqueness
+-- and claim references with triggers instead.
+
+CREATE TABLE IF NOT EXISTS partition_policy (
+    table_name TEXT PRIMARY KEY,
+    column_name TEXT NOT NULL,          -- partition key
+    keep_months INT NOT NULL,           -- months before the current one kept as monthly partitions
+    ahead_months INT NOT NULL           -- monthly partitions kept ready after the current one
+);
+INSERT INTO partition_policy VALUES
+    ('food_listings', 'expiry_date', 1, 3),     -- listings that expired before last month are archived
+    ('claims', 'timestamp', 12, 1)              -- claims older than a year are archived
+ON CONFLICT (table_name) DO NOTHING;
+
+DO $$
+DECLARE
+    p record;
+    seq record;
+    old text;
+    cutoff date;
+    horizon date;
+    m date;
+BEGIN
+    FOR p IN SELECT * FROM partition_policy ORDER BY table_name DESC LOOP     -- food_listings, then claims
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass(p.table_name)) = 'p' THEN
+            CONTINUE;
+        END IF;
+        old := p.table_name || '_unpartitioned';
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', p.table_name, old);
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%I)',
+                       p.table_name, old, p.column_name);
+
+        cutoff := date_trunc('month', CURRENT_DATE) - make_interval(months => p.keep_months);
+        horizon := date_trunc('month', CURRENT_DATE) + make_interval(months => p.ahead_months + 1);
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (MINVALUE) TO (%L)',
+                       p.table_name || '_archive', p.table_name, cutoff);
+        m := cutoff;
+        WHILE m < horizon LOOP
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                           p.table_name || to_char(m, '"_p"YYYY_MM'), p.table_name, m, m + interval '1 month');
+            m := m + interval '1 month';
+        END LOOP;
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', p.table_name || '_default', p.table_name);
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', p.table_name, old);
+
+        -- the id sequences (V002) would be dropped with the old table
+        FOR seq IN
+            SELECT s.relname, a.attname
+            FROM pg_depend d
+            JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+            JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+            WHERE d.refobjid = to_regclass(old) AND d.deptype = 'a'
+        LOOP
+            EXECUTE format('ALTER SEQUENCE %I OWNED BY %I.%I', seq.relname, p.table_name, seq.attname);
+        END LOOP;
+        -- materialized views (R__aggregates.sql), triggers and foreign keys go with it and are recreated
+        EXECUTE format('DROP TABLE %I CASCADE', old);
+    END LOOP;
+END $$;
+
+ALTER TABLE food_listings ADD FOREIGN KEY (provider_id) REFERENCES providers (provider_id);
+ALTER TABLE claims ADD FOREIGN KEY (receiver_id) REFERENCES receivers (receiver_id);
+
+-- Id lookups (the table browser, batch updates and deletes, reference checks) probe every partition.
+CREATE INDEX IF NOT EXISTS idx_food_listings_food_id ON food_listings (food_id);
+CREATE INDEX IF NOT EXISTS idx_claims_claim_id ON claims (claim_id);
+
+-- V001's indexes, now on every partition.
+CREATE INDEX IF NOT EXISTS idx_food_listings_provider_id ON food_listings (provider_id);
+CREATE INDEX IF NOT EXISTS idx_claims_food_id ON claims (food_id);
+CREATE INDEX IF NOT EXISTS idx_claims_receiver_id ON claims (receiver_id);
+CREATE INDEX IF NOT EXISTS idx_claims_status ON claims (status);
+CREATE INDEX IF NOT EXISTS idx_food_listings_location_food_type ON food_listings (location, food_type);
+CREATE INDEX IF NOT EXISTS idx_food_listings_expiry_date ON food_listings (expiry_date);
+
+ANALYZE food_listings;
+ANALYZE claims;
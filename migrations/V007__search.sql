@@ -0,0 +1,29 @@
+-- Search over food names, provider names/addresses/cities and receiver names/cities (search.py).
+-- Filled and kept in step by the triggers in R__search.sql, which also rebuild it.
+
+-- Each distinct value of a searched column, with its words (to_tsvector 'simple': lowercased, not stemmed).
+CREATE TABLE IF NOT EXISTS search_values (
+    table_name TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    words TSVECTOR NOT NULL,
+    PRIMARY KEY (table_name, field, value)
+);
+CREATE INDEX IF NOT EXISTS idx_search_values_words ON search_values USING GIN (words);
+
+-- Every word of those values and its trigrams, for substring and misspelling matches (pg_trgm isn't
+-- available everywhere, so the trigrams are kept in a table of their own).
+CREATE TABLE IF NOT EXISTS search_words (
+    word TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS search_word_trigrams (
+    trigram TEXT NOT NULL,
+    word TEXT NOT NULL,
+    PRIMARY KEY (trigram, word)
+);
+
+-- rows of a matched value, in id order (cities use idx_providers_city / idx_receivers_city)
+CREATE INDEX IF NOT EXISTS idx_food_listings_food_name ON food_listings (food_name, food_id);
+CREATE INDEX IF NOT EXISTS idx_providers_name ON providers (name, provider_id);
+CREATE INDEX IF NOT EXISTS idx_providers_address ON providers (address, provider_id);
+CREATE INDEX IF NOT EXISTS idx_receivers_name ON receivers (name, receiver_id);
@@ -0,0 +1,18 @@
+-- The keys the partitioned food_listings and claims (V006__partitions.sql) can't declare, kept in tables
+-- of their own: one row per listing id and per claim id, with real primary keys and the claims -> listings
+-- foreign key between them. The triggers in R__partitions.sql add and remove rows as the partitioned
+-- tables are written, so a duplicate id or a claim on a missing (or concurrently deleted) listing fails
+-- on these constraints, with their locking, as it did when the tables had the keys themselves.
+-- ingest.py also merges against them instead of probing every partition's id index.
+
+CREATE TABLE IF NOT EXISTS listing_keys (
+    food_id INT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS claim_keys (
+    claim_id INT PRIMARY KEY,
+    food_id INT REFERENCES listing_keys (food_id)
+);
+CREATE INDEX IF NOT EXISTS idx_claim_keys_food_id ON claim_keys (food_id);
+
+INSERT INTO listing_keys (food_id) SELECT food_id FROM food_listings ORDER BY food_id;
+INSERT INTO claim_keys (claim_id, food_id) SELECT claim_id, food_id FROM claims ORDER BY claim_id;
@@ -0,0 +1,19 @@
+-- pg_trgm for search.py's misspelling and substring matches: a GIN trigram index over the search
+-- vocabulary (search_words, V007__search.sql), queried with similarity() and the % and LIKE operators.
+-- Installing an extension needs the CREATE privilege on the database (or a superuser) and the contrib
+-- package on the server. Where either is missing the migration still applies, without the index, and
+-- search.py falls back to the trigrams R__search.sql keeps in search_word_trigrams.
+
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN insufficient_privilege OR undefined_file OR feature_not_supported THEN
+    RAISE NOTICE 'pg_trgm is not available (%); search uses its own trigram table', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_search_words_trgm ON search_words USING gin (word gin_trgm_ops);
+    END IF;
+END $$;
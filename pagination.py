@@ -0,0 +1,96 @@
+"""Keyset pagination over the four tables.
+
+Pages are fetched with ``WHERE (sort_col, pk) > (last values) ORDER BY sort_col, pk
+LIMIT n`` through a server-side cursor, so only one page is ever held in memory
+and the cost of a page does not grow with its offset. NULL sort values are
+ordered last in both directions.
+"""
+PRIMARY_KEYS = {
+    "providers": "provider_id",
+    "receivers": "receiver_id",
+    "food_listings": "food_id",
+    "claims": "claim_id",
+}
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Row estimate from planner statistics, falling back to the live-tuple count; no table scan.
+# A partitioned table (migrations/V006) is the sum of its partitions: autovacuum never analyzes
+# the parent, so its own estimate goes stale.
+APPROX_COUNT_SQL = """
+    SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint,
+           COALESCE(SUM(s.n_live_tup), 0)::bigint
+    FROM pg_class c
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE (c.oid = to_regclass(%(table)s) AND c.relkind <> 'p')
+       OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%(table)s))
+"""
+
+COLUMNS_SQL = """
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = %s
+    ORDER BY ordinal_position
+"""
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def build_page_query(table, columns, sort_by=None, descending=False, after=None, page_size=50,
+                     start_id=None):
+    """Return ``(sql, params)`` for one page of ``table``.
+
+    ``after`` is the ``(sort value, pk)`` key of the last row of the previous page.
+    ``start_id`` jumps to the first row whose primary key is >= that id (pk order).
+    Fetches ``page_size + 1`` rows so the caller can tell whether a next page exists.
+    """
+    if table not in PRIMARY_KEYS:
+        raise ValueError(f"unknown table {table!r}")
+    pk = PRIMARY_KEYS[table]
+    sort_by = sort_by or pk
+    if sort_by not in columns:
+        raise ValueError(f"cannot sort {table} by {sort_by!r}")
+    col, key = _quote(sort_by), _quote(pk)
+    direction, cmp = ("DESC", "<") if descending else ("ASC", ">")
+
+    where, params = [], []
+    if start_id is not None:
+        where.append(f"{key} {'<=' if descending else '>='} %s")
+        params.append(start_id)
+    if after is not None:
+        last_value, last_pk = after
+        if sort_by == pk:
+            where.append(f"{key} {cmp} %s")
+            params.append(last_pk)
+        elif last_value is None:
+            where.append(f"({col} IS NULL AND {key} {cmp} %s)")
+            params.append(last_pk)
+        else:
+            where.append(f"(({col}, {key}) {cmp} (%s, %s) OR {col} IS NULL)")
+            params.extend([last_value, last_pk])
+
+    order = f"{key} {direction}" if sort_by == pk else f"{col} {direction} NULLS LAST, {key} {direction}"
+    sql = (f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(table)}"
+           + (f" WHERE {' AND '.join(where)}" if where else "")
+           + f" ORDER BY {order} LIMIT {int(page_size) + 1}")
+    return sql, tuple(params)
+
+
+def fetch_page(pool, sql, params, page_size):
+    """Run a page query through a server-side cursor; returns ``(columns, rows, has_next)``."""
+    with pool.connection(readonly=True, autocommit=False) as conn:
+        with conn.cursor(name="page_cursor") as cur:
+            cur.itersize = page_size + 1
+            cur.execute(sql, params)
+            rows = cur.fetchmany(page_size + 1)
+            columns = [desc[0] for desc in cur.description]
+    return columns, rows[:page_size], len(rows) > page_size
+
+
+def page_key(table, columns, row, sort_by=None):
+    """The ``after`` key for the page that follows ``row``."""
+    pk = PRIMARY_KEYS[table]
+    sort_by = sort_by or pk
+    return row[columns.index(sort_by)], row[columns.index(pk)]
+
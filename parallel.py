@@ -0,0 +1,110 @@
+"""Run a page's independent queries at the same time on separate pooled connections.
+
+``QueryExecutor.run`` takes ``{name: callable}`` (usually ``load_data`` calls),
+starts them on a shared thread pool and yields ``(name, result, error)`` as
+each finishes, so a page can draw a chart as soon as its data is in.
+
+* Concurrency is capped per session by a ``SessionLimit``, a semaphore held
+  while a query runs. Queries left over from an interrupted rerun still count
+  against the cap until they finish.
+* A batch has a deadline (``QUERY_TIMEOUT`` seconds). A query still queued at
+  the deadline is never started. A running query is cancelled on the server
+  (``ConnectionPool.cancel``), and both report ``QueryTimeout``.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import db
+
+SESSION_CONCURRENCY = int(os.environ.get("QUERY_CONCURRENCY", "4"))
+QUERY_TIMEOUT = float(os.environ.get("QUERY_TIMEOUT", "30"))
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class SessionLimit:
+    """At most ``limit`` queries of one session running at once."""
+
+    def __init__(self, limit=SESSION_CONCURRENCY):
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self, timeout=None):
+        return self._slots.acquire(timeout=timeout) if timeout is not None else self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+
+class QueryExecutor:
+    """Process-wide worker threads (one per pooled connection) shared by every session.
+
+    ``wrap(fn)`` is applied to each task before it is handed to a worker
+    (views/shared.py uses it to attach the session's Streamlit script context).
+    """
+
+    def __init__(self, pool, workers=db.POOL_MAX_CONN, timeout=QUERY_TIMEOUT, wrap=None):
+        self.pool = pool
+        self.timeout = timeout
+        self.wrap = wrap
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-query")
+
+    def _call(self, fn, running):
+        running["thread"] = threading.get_ident()
+        return fn()
+
+    def _start(self, name, fn, limit):
+        running = {}
+        future = self._threads.submit(self._call, self.wrap(fn) if self.wrap else fn, running)
+        future.add_done_callback(lambda _: limit.release())
+        return future, (name, running)
+
+    def run(self, tasks, limit=None, timeout=None):
+        """Yield ``(name, result, error)`` for each of ``tasks`` (``{name: callable}``) in completion order."""
+        limit = limit or SessionLimit()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        queued = list(tasks.items())
+        pending = {}
+        while queued or pending:
+            while queued and limit.acquire():
+                future, info = self._start(*queued.pop(0), limit)
+                pending[future] = info
+            remaining = deadline - time.monotonic()
+            if remaining > 0 and queued and not pending:
+                # every slot is held by an earlier batch of this session; wait for one
+                if limit.acquire(timeout=remaining):
+                    future, info = self._start(*queued.pop(0), limit)
+                    pending[future] = info
+                continue
+            done = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)[0] if remaining > 0 else ()
+            if not done:
+                yield from self._expire(pending, queued)
+                return
+            for future in done:
+                name, _ = pending.pop(future)
+                error = future.exception()
+                yield name, None if error else future.result(), error
+
+    def _expire(self, pending, queued):
+        for future, (name, running) in pending.items():
+            if not future.cancel() and "thread" in running:
+                self.pool.cancel(running["thread"])
+            yield name, None, QueryTimeout(f"{name}: no result within the query timeout")
+        for name, _ in queued:
+            yield name, None, QueryTimeout(f"{name}: not started within the query timeout")
+
+    def run_all(self, tasks, limit=None, timeout=None):
+        """``{name: result}`` once every task is done; the first error is raised."""
+        results = {}
+        for name, result, error in self.run(tasks, limit, timeout):
+            if error is not None:
+                raise error
+            results[name] = result
+        return results
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
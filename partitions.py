@@ -0,0 +1,81 @@
+"""Monthly range partitions of food_listings (by expiry_date) and claims (by timestamp).
+
+migrations/V006__partitions.sql turns both tables into partitioned tables laid
+out by ``partition_policy``: ``<table>_archive`` holds everything before the
+kept months, then one ``<table>_pYYYY_MM`` partition per month up to
+``ahead_months`` past the current one, then ``<table>_default`` for NULL keys
+and anything further out. A query with a range on the key only scans the
+partitions the range touches: the EDA near-expiry list, the matching inputs
+and api.py's /listings window all have one. The 20 reports, the EDA KPIs and
+charts, and the waste-risk index (which ranks overdue listings too) cover the
+whole history and have no date filter in the UI to push down, so they scan
+every partition, as before.
+
+``maintain`` runs ``partitions_maintain()`` (migrations/R__partitions.sql):
+it creates the months coming up, moving their rows out of the default
+partition, and folds the months that fell out of ``keep_months`` into the
+archive. Every migration run does it once; run ``python partitions.py`` from
+cron at the start of each month as well.
+
+    python partitions.py            # maintain, then print the layout
+    python partitions.py --status   # layout only
+"""
+import argparse
+
+import db
+
+# One row per partition: parent, partition, bound, estimated rows and on-disk size.
+LAYOUT_SQL = """
+    SELECT i.inhparent::regclass::text AS table_name, c.relname AS partition,
+           pg_get_expr(c.relpartbound, c.oid) AS bound,
+           GREATEST(c.reltuples, 0)::bigint AS rows_estimate,
+           pg_total_relation_size(c.oid) AS bytes
+    FROM partition_policy p
+    JOIN pg_inherits i ON i.inhparent = to_regclass(p.table_name)
+    JOIN pg_class c ON c.oid = i.inhrelid
+    ORDER BY 1, c.relname ~ '_archive$' DESC, c.relname ~ '_default$', c.relname
+"""
+
+
+def available(pool):
+    """True when the partitioning migration has been applied to this database."""
+    _, rows = pool.fetch("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('claims')")
+    return bool(rows and rows[0][0])
+
+
+def maintain(pool):
+    """Create upcoming months and archive old ones; returns ``[(table, action, partition, moved rows)]``."""
+    with pool.cursor() as cur:
+        cur.execute("SELECT * FROM partitions_maintain()")
+        return cur.fetchall()
+
+
+def layout(pool):
+    """``[(table, partition, bound, estimated rows, bytes)]``, archive first and default last per table."""
+    _, rows = pool.fetch(LAYOUT_SQL)
+    return rows
+
+
+# ---------------- CLI ----------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="print the layout without maintaining")
+    args = parser.parse_args()
+    pool = db.create_pool()
+    try:
+        if not available(pool):
+            raise SystemExit("food_listings and claims are not partitioned; run python migrate.py first")
+        if not args.status:
+            actions = maintain(pool)
+            for table, action, partition, moved in actions:
+                print(f"{table}: {action} {partition} ({moved:,} rows moved)")
+            if not actions:
+                print("partitions are up to date")
+        for table, partition, bound, rows, size in layout(pool):
+            print(f"  {partition:<26} {bound:<60} {rows:>12,} rows {size / 2**20:>9,.1f} MiB")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# ---------------- Predefined Queries ----------------
+# The 20 reports offered on the "Run Queries" page.
+queries = {
+    "1. Providers & Receivers per city": """
+        SELECT city, 
+               COUNT(DISTINCT provider_id) AS total_providers, 
+               COUNT(DISTINCT receiver_id) AS total_receivers
+        FROM providers FULL JOIN receivers USING(city)
+        GROUP BY city;
+    """,
+    "2. Top provider types contributing food": """
+        SELECT type, COUNT(*) AS total_contributions
+        FROM providers
+        GROUP BY type
+        ORDER BY total_contributions DESC;
+    """,
+    "3. Contact info of providers by city": """
+        SELECT name, city, contact FROM providers ORDER BY city;
+    """,
+    "4. Receivers with most food claims": """
+        SELECT r.name, COUNT(c.claim_id) AS total_claims
+        FROM claims c
+        JOIN receivers r ON c.receiver_id = r.receiver_id
+        GROUP BY r.name
+        ORDER BY total_claims DESC;
+    """,
+    "5. Total food available": """
+        SELECT SUM(quantity) AS total_food_quantity FROM food_listings;
+    """,
+    "6. City with most food listings": """
+        SELECT location, COUNT(food_id) AS listings
+        FROM food_listings
+        GROUP BY location
+        ORDER BY listings DESC;
+    """,
+    "7. Most common food types": """
+        SELECT food_type, COUNT(*) AS frequency
+        FROM food_listings
+        GROUP BY food_type
+        ORDER BY frequency DESC;
+    """,
+    "8. Claims per food item": """
+        SELECT f.food_name, COUNT(c.claim_id) AS claim_count
+        FROM claims c
+        JOIN food_listings f ON c.food_id = f.food_id
+        GROUP BY f.food_name;
+    """,
+    "9. Provider with most successful claims": """
+        SELECT p.name, COUNT(c.claim_id) AS successful_claims
+        FROM claims c
+        JOIN food_listings f ON c.food_id = f.food_id
+        JOIN providers p ON f.provider_id = p.provider_id
+        WHERE c.status='Completed'
+        GROUP BY p.name
+        ORDER BY successful_claims DESC;
+    """,
+    "10. Claim status distribution": """
+        SELECT status, COUNT(*) FROM claims GROUP BY status;
+    """,
+    "11. Avg food claimed per receiver": """
+        SELECT r.name, ROUND(AVG(f.quantity),2) AS avg_quantity
+        FROM claims c
+        JOIN food_listings f ON c.food_id = f.food_id
+        JOIN receivers r ON c.receiver_id = r.receiver_id
+        GROUP BY r.name;
+    """,
+    "12. Most claimed meal type": """
+        SELECT meal_type, COUNT(*) AS claim_count
+        FROM claims c
+        JOIN food_listings f ON c.food_id=f.food_id
+        GROUP BY meal_type
+        ORDER BY claim_count DESC;
+    """,
+    "13. Total food donated per provider": """
+        SELECT p.name, SUM(f.quantity) AS total_donated
+        FROM food_listings f
+        JOIN providers p ON f.provider_id=p.provider_id
+        GROUP BY p.name
+        ORDER BY total_donated DESC;
+    """,
+     "14. Claimed vs Unclaimed Donations": """
+        SELECT CASE WHEN c.food_id IS NULL THEN 'Unclaimed' ELSE 'Claimed' END AS claim_status,
+               COUNT(*) AS count
+        FROM food_listings f
+        LEFT JOIN claims c ON f.food_id = c.food_id
+        GROUP BY claim_status;
+    """,
+    "15. Most Common Meal Type by City": """
+        SELECT city, meal_type, COUNT(*) AS count
+        FROM providers p
+        JOIN food_listings f ON p.provider_id = f.provider_id
+        GROUP BY city, meal_type
+        ORDER BY city, count DESC;
+    """,
+    "16. Monthly Donation Trends": """
+        SELECT TO_CHAR(expiry_date, 'YYYY-MM') AS month, COUNT(*) AS donation_count
+        FROM food_listings
+        GROUP BY month
+        ORDER BY month;
+    """,
+    "17. Providers Without Donations": """
+        SELECT p.name
+        FROM providers p
+        LEFT JOIN food_listings f ON p.provider_id = f.provider_id
+        WHERE f.food_id IS NULL;
+    """,
+    "18. Location-wise Most Common Food Type": """
+        SELECT location, food_type, COUNT(*) AS food_count
+        FROM food_listings
+        GROUP BY location, food_type
+        ORDER BY location, food_count DESC;
+    """,
+    "19. Top Providers by Unique Food Items Donated": """
+        SELECT p.name AS provider_name, COUNT(DISTINCT f.food_name) AS unique_food_items
+        FROM providers p
+        JOIN food_listings f ON p.provider_id = f.provider_id
+        GROUP BY p.name
+        ORDER BY unique_food_items DESC;
+    """,
+    "20. Receiver Cities by Claim Count": """
+        SELECT r.city, COUNT(c.claim_id) AS claim_count
+        FROM receivers r
+        JOIN claims c ON r.receiver_id = c.receiver_id
+        GROUP BY r.city
+        ORDER BY claim_count DESC;
+    """
+}
+
+
+# ---------------- Aggregate-backed Variants ----------------
+# Same results as the entries above, read from the materialized views in
+# migrations/R__aggregates.sql (refreshed by aggregates.AggregateRefresher), from
+# the trigger-maintained rollups in migrations/R__rollups.sql, or rewritten to
+# avoid the per-city providers x receivers join. Query 1 also counts spellings of
+# one city together ("St. Louis", "saint louis") through locality_key from
+# migrations/R__localities.sql.
+aggregate_queries = {
+    "1. Providers & Receivers per city": """
+        SELECT MIN(city) AS city,
+               SUM(total_providers)::bigint AS total_providers,
+               SUM(total_receivers)::bigint AS total_receivers
+        FROM (SELECT city, COUNT(*) AS total_providers, 0 AS total_receivers FROM providers GROUP BY city
+              UNION ALL
+              SELECT city, 0, COUNT(*) FROM receivers GROUP BY city) per_city
+        GROUP BY COALESCE(locality_key(city), city);
+    """,
+    "4. Receivers with most food claims": """
+        SELECT name, SUM(total_claims)::bigint AS total_claims
+        FROM mv_receiver_claim_totals
+        GROUP BY name
+        ORDER BY total_claims DESC;
+    """,
+    "8. Claims per food item": """
+        SELECT f.food_name, SUM(m.claims)::bigint AS claim_count
+        FROM mv_claims_by_listing m
+        JOIN food_listings f ON m.food_id = f.food_id
+        GROUP BY f.food_name;
+    """,
+    "9. Provider with most successful claims": """
+        SELECT p.name, SUM(m.completed_claims)::bigint AS successful_claims
+        FROM mv_claims_by_listing m
+        JOIN food_listings f ON m.food_id = f.food_id
+        JOIN providers p ON f.provider_id = p.provider_id
+        WHERE m.completed_claims > 0
+        GROUP BY p.name
+        ORDER BY successful_claims DESC;
+    """,
+    "10. Claim status distribution": """
+        SELECT status, claims AS count FROM mv_claim_status_counts;
+    """,
+    "11. Avg food claimed per receiver": """
+        SELECT name, ROUND(SUM(claimed_quantity)::numeric / NULLIF(SUM(quantity_claims), 0), 2) AS avg_quantity
+        FROM mv_receiver_claim_totals
+        WHERE matched_claims > 0
+        GROUP BY name;
+    """,
+    "12. Most claimed meal type": """
+        SELECT f.meal_type, SUM(m.claims)::bigint AS claim_count
+        FROM mv_claims_by_listing m
+        JOIN food_listings f ON m.food_id = f.food_id
+        GROUP BY f.meal_type
+        ORDER BY claim_count DESC;
+    """,
+    "14. Claimed vs Unclaimed Donations": """
+        SELECT CASE WHEN m.food_id IS NULL THEN 'Unclaimed' ELSE 'Claimed' END AS claim_status,
+               SUM(COALESCE(m.claims, 1))::bigint AS count
+        FROM food_listings f
+        LEFT JOIN mv_claims_by_listing m ON f.food_id = m.food_id
+        GROUP BY claim_status;
+    """,
+    "16. Monthly Donation Trends": """
+        SELECT TO_CHAR(period, 'YYYY-MM') AS month, SUM(listings)::bigint AS donation_count
+        FROM rollup_listings
+        WHERE grain = 'month'
+        GROUP BY period
+        HAVING SUM(listings) > 0
+        ORDER BY period;
+    """,
+    "20. Receiver Cities by Claim Count": """
+        SELECT city, SUM(total_claims)::bigint AS claim_count
+        FROM mv_receiver_claim_totals
+        GROUP BY city
+        ORDER BY claim_count DESC;
+    """,
+}
+
+
+def predefined_queries(use_aggregates=False):
+    return {**queries, **aggregate_queries} if use_aggregates else dict(queries)
@@ -0,0 +1,161 @@
+"""Per-statement query profiling for the Streamlit app.
+
+Every ``load_data``/``run_query`` call is recorded as a sample (page, kind,
+wall time, database time, DataFrame build time, rows, bytes, cache status).
+Samples older than the rolling window are dropped. Statements slower than
+``slow_ms`` get an ``EXPLAIN (ANALYZE, BUFFERS)`` captured in a background
+thread, at most once per statement per ``explain_every`` seconds. Writes only
+get a plain ``EXPLAIN``: running them again, even in a transaction that is
+rolled back, would advance sequences, take row locks and fire triggers.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from query_cache import normalize_sql, tables_written
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "500"))
+WINDOW_SECONDS = int(os.environ.get("PROFILE_WINDOW_SECONDS", "900"))
+MAX_SAMPLES = 50_000
+MAX_PLANS = 50
+
+SAMPLE_FIELDS = ["at", "page", "kind", "query", "total_ms", "db_ms", "frame_ms", "rows", "bytes", "cache"]
+SUMMARY_FIELDS = ["page", "kind", "query", "calls", "hit_ratio", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+                  "mean_db_ms", "mean_frame_ms", "mean_rows", "total_bytes"]
+
+
+def _is_read(query):
+    query = normalize_sql(query)
+    return query.split(" ", 1)[0].lower() in ("select", "with", "values", "table") and not tables_written(query)
+
+
+class QueryProfiler:
+    def __init__(self, window=WINDOW_SECONDS, slow_ms=SLOW_QUERY_MS, explain_every=300, clock=time.time):
+        self.window = window
+        self.slow_ms = slow_ms
+        self.explain_every = explain_every
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=MAX_SAMPLES)
+        self.plans = deque(maxlen=MAX_PLANS)        # dicts: at, page, query, params, ms, plan
+        self._explained = {}                       # normalised query -> last EXPLAIN time
+
+    # ---------------- Recording ----------------
+    def record(self, query, page=None, kind="read", total_ms=0.0, db_ms=0.0, frame_ms=0.0, rows=0,
+               nbytes=0, cache="miss"):
+        sample = (self._clock(), page, kind, normalize_sql(query), total_ms, db_ms, frame_ms, rows, nbytes, cache)
+        with self._lock:
+            self._samples.append(sample)
+
+    def is_slow(self, ms):
+        return self.slow_ms > 0 and ms >= self.slow_ms
+
+    def maybe_explain(self, pool, query, params=None, page=None, ms=0.0):
+        """Capture the plan of a slow statement in the background (with ANALYZE for reads only)."""
+        key = normalize_sql(query)
+        now = self._clock()
+        with self._lock:
+            if now - self._explained.get(key, float("-inf")) < self.explain_every:
+                return False
+            self._explained[key] = now
+        threading.Thread(target=self._explain, args=(pool, query, params, page, ms, now), daemon=True).start()
+        return True
+
+    def _explain(self, pool, query, params, page, ms, at):
+        try:
+            # a read-only transaction still allows a plain EXPLAIN of a write
+            with pool.connection(readonly=True, autocommit=False) as conn:
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(("EXPLAIN (ANALYZE, BUFFERS) " if _is_read(query) else "EXPLAIN ") + query, params)
+                        plan = "\n".join(row[0] for row in cur.fetchall())
+                finally:
+                    conn.rollback()
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+        with self._lock:
+            self.plans.appendleft({"at": at, "page": page, "query": normalize_sql(query),
+                                   "params": repr(params), "ms": round(ms, 1), "plan": plan})
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.plans.clear()
+            self._explained.clear()
+
+    # ---------------- Reporting ----------------
+    def samples(self, page=None, window=None, since=None):
+        """Samples inside the rolling window (oldest first), as dicts keyed by SAMPLE_FIELDS.
+
+        ``window`` (seconds) narrows the result to the most recent samples and
+        ``since`` (a clock time) to those recorded from then on; the retention
+        window itself stays ``self.window``. The Query Profile page's Reset sets
+        ``since`` for its session only, as every session shares the samples.
+        """
+        now = self._clock()
+        cutoff = now - self.window
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            rows = list(self._samples)
+        since = max(now - window if window is not None else cutoff, cutoff if since is None else since)
+        return [dict(zip(SAMPLE_FIELDS, s)) for s in rows if s[0] >= since and (page is None or s[1] == page)]
+
+    def summary(self, page=None, window=None, since=None):
+        """p50/p95/p99 wall time and means per (page, kind, statement), slowest p95 first."""
+        groups = {}
+        for s in self.samples(page, window, since):
+            groups.setdefault((s["page"], s["kind"], s["query"]), []).append(s)
+        out = []
+        for (pg, kind, query), group in groups.items():
+            total = np.array([s["total_ms"] for s in group])
+            p50, p95, p99 = np.percentile(total, [50, 95, 99])
+            misses = [s for s in group if s["cache"] != "hit"]
+            out.append({
+                "page": pg, "kind": kind, "query": query, "calls": len(group),
+                "hit_ratio": round(1 - len(misses) / len(group), 3),
+                "p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2),
+                "max_ms": round(total.max(), 2),
+                "mean_db_ms": round(np.mean([s["db_ms"] for s in misses]), 2) if misses else 0.0,
+                "mean_frame_ms": round(np.mean([s["frame_ms"] for s in misses]), 2) if misses else 0.0,
+                "mean_rows": round(np.mean([s["rows"] for s in group]), 1),
+                "total_bytes": int(sum(s["bytes"] for s in misses)),
+            })
+        out.sort(key=lambda r: r["p95_ms"], reverse=True)
+        return out
+
+    def page_summary(self, window=None, since=None):
+        """Per page: statements run, wall time and database time summed over the window."""
+        pages = {}
+        for s in self.samples(window=window, since=since):
+            entry = pages.setdefault(s["page"], {"page": s["page"], "statements": 0, "total_ms": 0.0,
+                                                 "db_ms": 0.0, "cache_hits": 0})
+            entry["statements"] += 1
+            entry["total_ms"] += s["total_ms"]
+            entry["db_ms"] += s["db_ms"]
+            entry["cache_hits"] += s["cache"] == "hit"
+        return sorted(pages.values(), key=lambda r: r["total_ms"], reverse=True)
+
+    def slow_plans(self, since=None):
+        """Captured plans, newest first (from ``since`` on)."""
+        with self._lock:
+            return [plan for plan in self.plans if since is None or plan["at"] >= since]
+
+    def export_json(self, since=None):
+        return json.dumps({"window_seconds": self.window, "slow_ms": self.slow_ms,
+                           "summary": self.summary(since=since), "samples": self.samples(since=since),
+                           "slow_plans": self.slow_plans(since)}, default=str, indent=1)
+
+    def export_csv(self, summary=False, since=None):
+        fields = SUMMARY_FIELDS if summary else SAMPLE_FIELDS
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(self.summary(since=since) if summary else self.samples(since=since))
+        return buffer.getvalue()
@@ -0,0 +1,207 @@
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# ---------------- Settings ----------------
+DEFAULT_TTL = 300            # seconds a cached result stays fresh
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# string literals, quoted identifiers and dollar quotes are kept as written; comments and runs of
+# whitespace outside them become one space
+_TOKEN_RE = re.compile(
+    r"""(?P<literal>\b[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*'|"(?:[^"]|"")*"|\$(?P<tag>[a-z_]*)\$.*?\$(?P=tag)\$)"""
+    r"|(?P<space>(?:--[^\n]*|/\*.*?\*/|\s)+)", re.S | re.I)
+_NAME = r"[a-z_][a-z0-9_.]*"
+_ALIASED = rf"{_NAME}(?:\s+(?:as\s+)?(?!join\b){_NAME})?"
+_READ_TABLE_RE = re.compile(rf"\b(?:from|join)\s+({_ALIASED}(?:\s*,\s*{_ALIASED})*)", re.I)
+_WRITE_TABLE_RE = re.compile(
+    rf"^\s*(?:insert\s+into|update|delete\s+from|truncate(?:\s+table)?|copy)\s+({_NAME})", re.I)
+# writes anywhere in a WITH statement, leaving out FOR UPDATE [OF|SKIP LOCKED|NOWAIT] and DO UPDATE SET
+_CTE_WRITE_RE = re.compile(
+    rf"\b(?:insert\s+into|update|delete\s+from)\s+(?:only\s+)?(?!(?:set|of|skip|nowait)\b)({_NAME})", re.I)
+
+
+# ---------------- SQL helpers ----------------
+def normalize_sql(query):
+    """Collapse whitespace/comments and trailing semicolons so equivalent SQL shares a key.
+
+    Text inside quotes is left alone, so ``name='a--b'`` and ``name='a--c'`` stay different.
+    """
+    query = _TOKEN_RE.sub(lambda m: " " if m.group("space") else m.group(0), query)
+    return query.strip().rstrip(";").strip()
+
+
+def _without_literals(query):
+    return _TOKEN_RE.sub(lambda m: " " if m.group("space") else "''", query)
+
+
+def _bare_name(name):
+    return name.lower().rsplit(".", 1)[-1]
+
+
+def tables_read(query):
+    """Tables named after FROM or JOIN, including each table of a comma-separated FROM list."""
+    return {_bare_name(item.split()[0]) for names in _READ_TABLE_RE.findall(_without_literals(query))
+            for item in names.split(",")}
+
+
+def tables_written(query):
+    query = _without_literals(query).strip()
+    match = _WRITE_TABLE_RE.match(query)
+    if match:
+        return {_bare_name(match.group(1))}
+    if query[:4].lower() == "with":
+        return {_bare_name(name) for name in _CTE_WRITE_RE.findall(query)}
+    return set()
+
+
+def _freeze(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in params.items()))
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(p) for p in params)
+    return params
+
+
+def frame_size(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(frame_size(v) for v in value)
+    try:
+        return int(value.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+# ---------------- Result Cache ----------------
+class QueryCache:
+    """Process-wide LRU cache of query results, keyed by normalised SQL + params.
+
+    Entries expire after their TTL and are dropped as soon as a write touches
+    one of the tables they read. Hit/miss counters are kept per page so each
+    page can show whether a rerun reached Postgres.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, default_ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()          # key -> (value, size, expires_at, tables)
+        self._by_table = defaultdict(set)      # table -> keys reading it
+        self._generations = defaultdict(int)   # table -> invalidations so far (None: clears)
+        self.bytes_used = 0
+        self.page_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(query, params=None):
+        return normalize_sql(query), _freeze(params)
+
+    def get_or_load(self, query, params, loader, ttl=None, page=None, tables=None):
+        """Return the cached result for ``query``/``params`` or call ``loader()`` and cache it.
+
+        ``ttl=0`` bypasses the cache entirely. ``tables`` overrides the tables the
+        query depends on (useful when FROM-clause parsing can't see them).
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            self._count(page, hit=False)
+            return loader()
+
+        key = self.make_key(query, params)
+        tables = tables if tables is not None else tables_read(key[0])
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._entries.move_to_end(key)
+                    self._count(page, hit=True)
+                    return entry[0]
+                self._drop(key)
+            generation = self.generation(tables)
+
+        value = loader()
+        self._count(page, hit=False)
+        self.put(key, value, ttl, tables, generation)
+        return value
+
+    def generation(self, tables):
+        """A number that changes whenever any of ``tables`` is invalidated (or the cache is cleared)."""
+        with self._lock:
+            return self._generations[None] + sum(self._generations.get(_bare_name(t), 0) for t in tables)
+
+    def put(self, key, value, ttl, tables, generation=None):
+        """Cache ``value``; with ``generation`` (from before it was loaded), only if no write invalidated
+        its tables since, so a load that raced a write can't keep the stale result for a whole TTL."""
+        size = frame_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation(tables):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, self._clock() + ttl, frozenset(tables))
+            self.bytes_used += size
+            for table in tables:
+                self._by_table[table].add(key)
+            while self.bytes_used > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        """Drop every cached result that reads any of ``tables``."""
+        with self._lock:
+            for table in tables:
+                self._generations[_bare_name(table)] += 1
+                for key in list(self._by_table.get(_bare_name(table), ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def invalidate_for(self, query):
+        tables = tables_written(query)
+        self.invalidate(tables)
+        return tables
+
+    def clear(self):
+        with self._lock:
+            self._generations[None] += 1
+            self._entries.clear()
+            self._by_table.clear()
+            self.bytes_used = 0
+
+    def stats(self, page=None):
+        with self._lock:
+            if page is not None:
+                return dict(self.page_stats[page])
+            totals = {"hits": 0, "misses": 0}
+            for counts in self.page_stats.values():
+                totals["hits"] += counts["hits"]
+                totals["misses"] += counts["misses"]
+            totals.update(entries=len(self._entries), bytes=self.bytes_used,
+                          evictions=self.evictions, invalidations=self.invalidations)
+            return totals
+
+    def _count(self, page, hit):
+        with self._lock:
+            self.page_stats[page]["hits" if hit else "misses"] += 1
+
+    def _drop(self, key):
+        value, size, _, tables = self._entries.pop(key)
+        self.bytes_used -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
@@ -0,0 +1,248 @@
+"""Claims that take units of a listing without ever taking more than is left.
+
+``listing_stock`` (migrations/V005__claim_quantities.sql) holds each
+listing's quantity and the units its Pending and Completed claims hold. The
+triggers in migrations/R__claim_stock.sql keep it in step with every write to
+food_listings and claims. A reservation is one statement: it locks the
+listing's stock row, checks the units left, and inserts the claim; the
+claims trigger then adds the claim to ``reserved`` before the lock is
+released. Two receivers claiming the last units of a listing are serialised
+on that row, and the second one sees what the first one took.
+
+* ``reserve`` claims a given listing. It waits for the row lock, up to
+  ``LOCK_TIMEOUT_MS``; the lock is only held for the length of one insert.
+* ``reserve_any`` claims the soonest-expiring listing with enough left,
+  among ``food_ids`` or in a location, through ``FOR UPDATE SKIP LOCKED``.
+  It walks the partial index of listings with units left in expiry order;
+  listings another claimer has locked are passed over, so concurrent claimers
+  spread across the hot listings instead of queueing on the same row.
+* ``reserve_many`` makes a batch of either kind of claim in one transaction,
+  each in its own savepoint, so a claim that doesn't fit is skipped without
+  undoing the others.
+* ``set_status`` changes a claim's status; a Cancelled claim made Pending or
+  Completed again has to fit in what is left, like a new one.
+"""
+import os
+from contextlib import contextmanager
+from datetime import date
+
+import psycopg2
+import psycopg2.errors
+
+ACTIVE_STATUSES = ("Pending", "Completed")      # statuses whose claims hold units
+LOCK_TIMEOUT_MS = int(os.environ.get("CLAIM_LOCK_TIMEOUT_MS", "2000"))
+
+RESERVE_SQL = """
+    WITH stock AS (
+        SELECT food_id, quantity - reserved AS remaining
+        FROM listing_stock
+        WHERE food_id = %(food_id)s AND quantity - reserved >= %(quantity)s
+        FOR UPDATE
+    ), claim AS (
+        INSERT INTO claims (food_id, receiver_id, status, timestamp, quantity)
+        SELECT food_id, %(receiver_id)s, %(status)s, COALESCE(%(timestamp)s, NOW()), %(quantity)s FROM stock
+        RETURNING claim_id, food_id
+    )
+    SELECT claim.claim_id, claim.food_id, stock.remaining - %(quantity)s
+    FROM claim JOIN stock ON stock.food_id = claim.food_id
+"""
+
+RESERVE_ANY_SQL = """
+    WITH stock AS (
+        SELECT s.food_id, s.quantity - s.reserved AS remaining
+        FROM listing_stock s
+        WHERE s.quantity > s.reserved AND s.expires >= %(today)s            -- idx_listing_stock_queue
+          AND s.quantity - s.reserved >= %(quantity)s {filters}
+        ORDER BY s.expires, s.food_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ), claim AS (
+        INSERT INTO claims (food_id, receiver_id, status, timestamp, quantity)
+        SELECT food_id, %(receiver_id)s, %(status)s, NOW(), %(quantity)s FROM stock
+        RETURNING claim_id, food_id
+    )
+    SELECT claim.claim_id, claim.food_id, stock.remaining - %(quantity)s
+    FROM claim JOIN stock ON stock.food_id = claim.food_id
+"""
+
+INSERT_SQL = """
+    INSERT INTO claims (food_id, receiver_id, status, timestamp, quantity)
+    VALUES (%(food_id)s, %(receiver_id)s, %(status)s, COALESCE(%(timestamp)s, NOW()), %(quantity)s)
+    RETURNING claim_id, food_id, NULL
+"""
+
+
+class ReservationError(Exception):
+    pass
+
+
+class Reservation:
+    def __init__(self, claim_id, food_id, quantity, remaining):
+        self.claim_id = claim_id
+        self.food_id = food_id
+        self.quantity = quantity
+        self.remaining = remaining        # units left on the listing afterwards (None for inactive claims)
+
+    def __repr__(self):
+        return (f"Reservation(claim_id={self.claim_id}, food_id={self.food_id}, quantity={self.quantity}, "
+                f"remaining={self.remaining})")
+
+
+def available(pool):
+    """True when the reservation migrations have been applied to this database."""
+    _, rows = pool.fetch("SELECT to_regclass('listing_stock') IS NOT NULL")
+    return bool(rows and rows[0][0])
+
+
+def remaining(pool, food_ids):
+    """``{food_id: units left}`` for the listings in ``food_ids`` that exist."""
+    _, rows = pool.fetch("SELECT food_id, GREATEST(quantity - reserved, 0) FROM listing_stock "
+                         "WHERE food_id = ANY(%s)", (list(food_ids),))
+    return dict(rows)
+
+
+@contextmanager
+def _locking(pool):
+    """A write transaction that gives up on a row lock after ``LOCK_TIMEOUT_MS``.
+
+    The timeout is lifted again before the commit, which may queue behind other
+    committers (NOTIFY from the change feed) without anything being wrong.
+    """
+    try:
+        with pool.cursor() as cur:
+            cur.execute(f"SET LOCAL lock_timeout = {int(LOCK_TIMEOUT_MS)}")
+            yield cur
+            cur.execute("SET LOCAL lock_timeout = DEFAULT")
+    except psycopg2.errors.LockNotAvailable:
+        raise ReservationError("the listing is busy; try again") from None
+
+
+def _run(pool, query, params):
+    with _locking(pool) as cur:
+        cur.execute(query, params)
+        return cur.fetchone()
+
+
+def _reserve_statement(food_id, receiver_id, quantity, status="Pending", timestamp=None):
+    if quantity is None or quantity < 1:
+        raise ReservationError("quantity must be at least 1")
+    params = {"food_id": food_id, "receiver_id": receiver_id, "status": status, "timestamp": timestamp,
+              "quantity": quantity}
+    return RESERVE_SQL if status in ACTIVE_STATUSES else INSERT_SQL, params
+
+
+def _reserve_any_statement(receiver_id, quantity, food_ids=None, location=None, today=None, status="Pending"):
+    if quantity is None or quantity < 1:
+        raise ReservationError("quantity must be at least 1")
+    if status not in ACTIVE_STATUSES:
+        raise ReservationError(f"a {status} claim holds no units; use reserve()")
+    filters = []
+    if food_ids is not None:
+        filters.append("AND s.food_id = ANY(%(food_ids)s)")
+    if location is not None:
+        filters.append("AND EXISTS (SELECT 1 FROM food_listings f WHERE f.food_id = s.food_id "
+                       "AND f.location = %(location)s)")
+    params = {"receiver_id": receiver_id, "quantity": quantity, "status": status,
+              "today": today or date.today(), "food_ids": list(food_ids) if food_ids is not None else None,
+              "location": location}
+    return RESERVE_ANY_SQL.format(filters=" ".join(filters)), params
+
+
+def _shortfall(left, food_id):
+    if left is None:
+        return ReservationError(f"listing {food_id} does not exist")
+    return ReservationError(f"only {left} unit(s) left on listing {food_id}")
+
+
+def reserve(pool, food_id, receiver_id, quantity, status="Pending", timestamp=None):
+    """Claim ``quantity`` units of listing ``food_id``; raises ``ReservationError`` if fewer are left.
+
+    Claims in other statuses (Cancelled) hold no units and are inserted without a check.
+    """
+    row = _run(pool, *_reserve_statement(food_id, receiver_id, quantity, status, timestamp))
+    if row is None:
+        raise _shortfall(remaining(pool, [food_id]).get(food_id), food_id)
+    return Reservation(row[0], row[1], quantity, row[2])
+
+
+def reserve_any(pool, receiver_id, quantity, food_ids=None, location=None, today=None, status="Pending"):
+    """Claim ``quantity`` units of the soonest-expiring unexpired listing that has them.
+
+    Candidates can be narrowed to ``food_ids`` and/or a ``location``; listings
+    locked by other claimers are skipped. Returns None when nothing fits.
+    """
+    row = _run(pool, *_reserve_any_statement(receiver_id, quantity, food_ids, location, today, status))
+    return Reservation(row[0], row[1], quantity, row[2]) if row else None
+
+
+def reserve_many(pool, claims, today=None):
+    """Make every claim in ``claims`` in one transaction; returns a Reservation or ReservationError per claim.
+
+    A claim is a dict with ``receiver_id``, ``quantity``, optionally ``status``,
+    and either ``food_id`` (as ``reserve``, optionally with a ``timestamp``) or
+    ``location`` (as ``reserve_any``).
+    Each runs in its own savepoint, so one that doesn't fit, or fails (an
+    unknown receiver), is reported without undoing the rest. Listings are
+    locked in food_id order, so concurrent batches can't deadlock on each
+    other; the locks are held until the batch commits.
+    """
+    results = [None] * len(claims)
+    order = sorted(range(len(claims)), key=lambda i: (claims[i].get("food_id") is None,
+                                                      claims[i].get("food_id") or 0))
+    with _locking(pool) as cur:
+        for i in order:
+            claim = claims[i]
+            food_id, status = claim.get("food_id"), claim.get("status", "Pending")
+            try:
+                if food_id is not None:
+                    query, params = _reserve_statement(food_id, claim["receiver_id"], claim["quantity"], status,
+                                                       claim.get("timestamp"))
+                else:
+                    query, params = _reserve_any_statement(claim["receiver_id"], claim["quantity"],
+                                                           location=claim.get("location"), today=today,
+                                                           status=status)
+            except ReservationError as e:
+                results[i] = e
+                continue
+            cur.execute("SAVEPOINT claim")
+            try:
+                cur.execute(query, params)
+                row = cur.fetchone()
+                cur.execute("RELEASE SAVEPOINT claim")
+            except psycopg2.errors.LockNotAvailable:
+                cur.execute("ROLLBACK TO SAVEPOINT claim")
+                results[i] = ReservationError("the listing is busy; try again")
+                continue
+            except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+                cur.execute("ROLLBACK TO SAVEPOINT claim")
+                results[i] = ReservationError(e.diag.message_primary or str(e))
+                continue
+            if row is not None:
+                results[i] = Reservation(row[0], row[1], claim["quantity"], row[2])
+            elif food_id is not None:
+                cur.execute("SELECT GREATEST(quantity - reserved, 0) FROM listing_stock WHERE food_id = %s",
+                            (food_id,))
+                left = cur.fetchone()
+                results[i] = _shortfall(left[0] if left else None, food_id)
+            else:
+                results[i] = ReservationError(f"no listing in {claim.get('location')} has "
+                                              f"{claim['quantity']} unit(s) left")
+    return results
+
+
+def set_status(pool, claim_id, status):
+    """Change claim ``claim_id``'s status; returns its food_id."""
+    with _locking(pool) as cur:
+        cur.execute("SELECT food_id, quantity, status FROM claims WHERE claim_id = %s FOR UPDATE", (claim_id,))
+        row = cur.fetchone()
+        if row is None:
+            raise ReservationError(f"claim {claim_id} does not exist")
+        food_id, quantity, old_status = row
+        if status in ACTIVE_STATUSES and old_status not in ACTIVE_STATUSES and quantity:
+            cur.execute("SELECT quantity - reserved FROM listing_stock WHERE food_id = %s FOR UPDATE", (food_id,))
+            left = cur.fetchone()
+            if left is None or left[0] < quantity:
+                raise ReservationError(f"claim {claim_id} needs {quantity} unit(s); "
+                                       f"{max(left[0], 0) if left else 0} left on listing {food_id}")
+        cur.execute("UPDATE claims SET status = %s WHERE claim_id = %s", (status, claim_id))
+        return food_id
@@ -0,0 +1,298 @@
+"""Standing waste-risk index over food_listings.
+
+risk_score = (quantity / max quantity) / max(days to expiry, 1), as on the EDA
+page. Within one expiry date the ranking is by quantity alone, so each scope
+(all listings, and each city) keeps:
+
+* ``overdue``: listings expiring on or before tomorrow (divisor 1), by quantity;
+* ``future``: one quantity-ordered bucket per later expiry date;
+* ``by_expiry``: every listing ordered by expiry date, for "expiring in N days".
+
+top-K is a K-way merge over the overdue list and the (few) future buckets, and
+the expiry window is a bisect into ``by_expiry`` - both O(K log N). When the
+day rolls over only the buckets that became due move into ``overdue``.
+Listings with a completed claim stay in ``by_expiry`` but leave the ranking.
+"""
+import heapq
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+RISK_COLUMNS = ["food_id", "food_name", "city", "quantity", "expiry_date", "days_to_expiry", "risk_score"]
+EXPIRY_COLUMNS = ["food_id", "provider_id", "food_name", "quantity", "expiry_date", "city", "days_left"]
+
+# One row per listing, with whether it has been collected (completed claim).
+LISTING_ROWS_SQL = """
+    SELECT f.food_id, f.food_name, f.quantity, f.expiry_date, f.provider_id,
+           COALESCE(p.city, 'Unknown') AS city,
+           EXISTS (SELECT 1 FROM claims c WHERE c.food_id = f.food_id AND c.status = 'Completed') AS claimed
+    FROM food_listings f
+    LEFT JOIN providers p ON f.provider_id = p.provider_id
+"""
+
+
+class _Item:
+    __slots__ = ("food_id", "food_name", "quantity", "expiry", "provider_id", "city", "claimed")
+
+    def __init__(self, food_id, food_name, quantity, expiry, provider_id, city, claimed):
+        self.food_id = food_id
+        self.food_name = food_name
+        self.quantity = quantity or 0
+        self.expiry = expiry
+        self.provider_id = provider_id
+        self.city = city
+        self.claimed = bool(claimed)
+
+    @property
+    def rank_key(self):
+        return (-self.quantity, self.food_id)
+
+    @property
+    def ranked(self):
+        return self.expiry is not None and not self.claimed
+
+
+class _Scope:
+    def __init__(self, boundary):
+        self.boundary = boundary          # last expiry date that counts as "overdue"
+        self.overdue = []                 # [(-quantity, food_id)]
+        self.future = {}                  # expiry date -> [(-quantity, food_id)]
+        self.future_dates = []            # sorted keys of ``future``
+        self.by_expiry = []               # [(expiry, food_id)] for all dated listings
+        self.quantities = Counter()       # quantity -> listings, for the normaliser
+        self.max_quantity = 0
+
+    def __len__(self):
+        return sum(self.quantities.values())
+
+    def load(self, items):
+        """Bulk-fill an empty scope (one sort per structure instead of N inserts)."""
+        future = {}
+        for item in items:
+            self.quantities[item.quantity] += 1
+            if item.ranked:
+                if item.expiry <= self.boundary:
+                    self.overdue.append(item.rank_key)
+                else:
+                    future.setdefault(item.expiry, []).append(item.rank_key)
+        self.max_quantity = max(self.quantities, default=0)
+        self.by_expiry = sorted((item.expiry, item.food_id) for item in items if item.expiry is not None)
+        self.overdue.sort()
+        for bucket in future.values():
+            bucket.sort()
+        self.future = future
+        self.future_dates = sorted(future)
+
+    def add(self, item):
+        self.quantities[item.quantity] += 1
+        self.max_quantity = max(self.max_quantity, item.quantity)
+        if item.expiry is not None:
+            insort(self.by_expiry, (item.expiry, item.food_id))
+        if item.ranked:
+            if item.expiry <= self.boundary:
+                insort(self.overdue, item.rank_key)
+            else:
+                bucket = self.future.get(item.expiry)
+                if bucket is None:
+                    bucket = self.future[item.expiry] = []
+                    insort(self.future_dates, item.expiry)
+                insort(bucket, item.rank_key)
+
+    def remove(self, item):
+        self.quantities[item.quantity] -= 1
+        if not self.quantities[item.quantity]:
+            del self.quantities[item.quantity]
+            if item.quantity == self.max_quantity:
+                self.max_quantity = max(self.quantities, default=0)
+        if item.expiry is not None:
+            _discard(self.by_expiry, (item.expiry, item.food_id))
+        if item.ranked:
+            if item.expiry <= self.boundary:
+                _discard(self.overdue, item.rank_key)
+            else:
+                bucket = self.future[item.expiry]
+                _discard(bucket, item.rank_key)
+                if not bucket:
+                    del self.future[item.expiry]
+                    _discard(self.future_dates, item.expiry)
+
+    def roll(self, boundary, items):
+        """Move buckets that became due into ``overdue`` (or back, if the clock went backwards)."""
+        if boundary > self.boundary:
+            cut = bisect_right(self.future_dates, boundary)
+            due, self.future_dates = self.future_dates[:cut], self.future_dates[cut:]
+            if due:
+                self.overdue = list(heapq.merge(self.overdue, *(self.future.pop(d) for d in due)))
+        elif boundary < self.boundary:
+            keep = []
+            for key in self.overdue:
+                item = items[key[1]]
+                if item.expiry <= boundary:
+                    keep.append(key)
+                else:
+                    bucket = self.future.get(item.expiry)
+                    if bucket is None:
+                        bucket = self.future[item.expiry] = []
+                        insort(self.future_dates, item.expiry)
+                    insort(bucket, key)
+            self.overdue = keep
+        self.boundary = boundary
+
+    def top(self, k):
+        """Yield up to ``k`` food_ids, highest risk first."""
+        heap = []
+        if self.overdue:
+            heap.append((self.overdue[0][0], 0, 1, self.overdue))
+        for d in self.future_dates:
+            bucket = self.future[d]
+            divisor = (d - self.boundary).days + 1
+            heap.append((bucket[0][0] / divisor, len(heap), divisor, bucket))
+        heapq.heapify(heap)
+        positions = {}
+        while heap and k > 0:
+            neg_score, tag, divisor, bucket = heapq.heappop(heap)
+            pos = positions.get(tag, 0)
+            yield bucket[pos][1]
+            k -= 1
+            positions[tag] = pos + 1
+            if pos + 1 < len(bucket):
+                heapq.heappush(heap, (bucket[pos + 1][0] / divisor, tag, divisor, bucket))
+
+    def expiring(self, start, end):
+        lo = bisect_left(self.by_expiry, (start,))
+        hi = bisect_left(self.by_expiry, (end + timedelta(days=1),))
+        return [food_id for _, food_id in self.by_expiry[lo:hi]]
+
+
+def _discard(sorted_list, value):
+    i = bisect_left(sorted_list, value)
+    if i < len(sorted_list) and sorted_list[i] == value:
+        del sorted_list[i]
+
+
+def _as_date(value):
+    if value is None or pd.isna(value):
+        return None
+    return value.date() if isinstance(value, datetime) else value
+
+
+class RiskIndex:
+    """Incrementally maintained top-K waste-risk and near-expiry lookups."""
+
+    def __init__(self, today=None):
+        self._lock = threading.RLock()
+        self._items = {}
+        self._today = today or date.today()
+        self._all = _Scope(self._boundary(self._today))
+        self._cities = {}
+        self.built = False
+
+    @staticmethod
+    def _boundary(today):
+        return today + timedelta(days=1)
+
+    def __len__(self):
+        return len(self._items)
+
+    # ---------------- Maintenance ----------------
+    def build(self, rows, today=None):
+        """Replace the index contents with ``rows`` (see LISTING_ROWS_SQL for the column order)."""
+        with self._lock:
+            self._today = today or date.today()
+            boundary = self._boundary(self._today)
+            self._items = {}
+            by_city = {}
+            for row in rows:
+                item = _Item(row[0], row[1], row[2], _as_date(row[3]), row[4], row[5], row[6])
+                self._items[item.food_id] = item
+                by_city.setdefault(item.city, []).append(item)
+            self._all = _Scope(boundary)
+            self._all.load(list(self._items.values()))
+            self._cities = {}
+            for city, items in by_city.items():
+                self._cities[city] = _Scope(boundary)
+                self._cities[city].load(items)
+            self.built = True
+
+    def upsert(self, rows):
+        """Insert or replace listings (LISTING_ROWS_SQL rows)."""
+        with self._lock:
+            for row in rows:
+                self._remove(row[0])
+                self._add(_Item(row[0], row[1], row[2], _as_date(row[3]), row[4], row[5], row[6]))
+
+    def delete(self, food_ids):
+        with self._lock:
+            for food_id in food_ids:
+                self._remove(food_id)
+
+    def invalidate(self):
+        """Force a rebuild on next use (after writes the index can't follow, e.g. bulk loads)."""
+        self.built = False
+
+    def _scope(self, city, create=False):
+        if city is None:
+            return self._all
+        scope = self._cities.get(city)
+        if scope is None and create:
+            scope = self._cities[city] = _Scope(self._all.boundary)
+        return scope
+
+    def _add(self, item):
+        self._items[item.food_id] = item
+        self._all.add(item)
+        self._scope(item.city, create=True).add(item)
+
+    def _remove(self, food_id):
+        item = self._items.pop(food_id, None)
+        if item is not None:
+            self._all.remove(item)
+            city_scope = self._cities[item.city]
+            city_scope.remove(item)
+            if not len(city_scope):
+                del self._cities[item.city]
+
+    def _roll(self, today):
+        today = today or date.today()
+        if today != self._today:
+            boundary = self._boundary(today)
+            for scope in [self._all, *self._cities.values()]:
+                scope.roll(boundary, self._items)
+            self._today = today
+        return today
+
+    # ---------------- Queries ----------------
+    def top_k(self, k=10, city=None, today=None):
+        """Highest-risk unclaimed listings as a DataFrame with RISK_COLUMNS."""
+        with self._lock:
+            today = self._roll(today)
+            scope = self._scope(city)
+            if scope is None:
+                return pd.DataFrame(columns=RISK_COLUMNS)
+            qmax = max(1, scope.max_quantity)
+            records = []
+            for food_id in scope.top(k):
+                item = self._items[food_id]
+                days = (item.expiry - today).days
+                score = round(item.quantity / qmax / max(days, 1), 3)
+                records.append((food_id, item.food_name, item.city, item.quantity,
+                                pd.Timestamp(item.expiry), days, score))
+        return pd.DataFrame(records, columns=RISK_COLUMNS)
+
+    def expiring(self, days=7, city=None, today=None):
+        """Listings expiring between today and ``today + days`` (inclusive), soonest first."""
+        with self._lock:
+            today = self._roll(today)
+            scope = self._scope(city)
+            if scope is None:
+                return pd.DataFrame(columns=EXPIRY_COLUMNS)
+            records = []
+            for food_id in scope.expiring(today, today + timedelta(days=days)):
+                item = self._items[food_id]
+                records.append((food_id, item.provider_id, item.food_name, item.quantity,
+                                pd.Timestamp(item.expiry), item.city, (item.expiry - today).days))
+        df = pd.DataFrame(records, columns=EXPIRY_COLUMNS)
+        return df.sort_values(["days_left", "quantity"], ascending=[True, False], kind="stable")
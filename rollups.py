@@ -0,0 +1,95 @@
+"""Day / week / month rollups of listings and claims.
+
+``rollup_listings`` counts listings and quantity by expiry period, city (the
+listing's location) and food type; ``rollup_claims`` counts claims by claim
+period, city and food type of the claimed listing, and status. The tables come
+from migrations/V003__rollups.sql and are kept current by the statement
+triggers in migrations/R__rollups.sql, so a trend report reads a few hundred
+rollup rows instead of grouping the base tables. ``panel`` turns a report into
+a series x periods matrix for ``forecast``.
+"""
+import numpy as np
+import pandas as pd
+
+GRAINS = ("day", "week", "month")
+SEASON = {"day": 7, "week": 52, "month": 12}           # periods per seasonal cycle
+FREQ = {"day": "D", "week": "W-MON", "month": "MS"}    # pandas frequency of each grain's periods
+HORIZON = {"day": 14, "week": 8, "month": 3}           # periods forecast (and held out to score)
+
+# measure -> (rollup table, column)
+MEASURES = {
+    "listings": ("rollup_listings", "listings"),
+    "quantity": ("rollup_listings", "quantity"),
+    "claims": ("rollup_claims", "claims"),
+}
+DIMENSIONS = ("city", "food_type", "status")
+
+# Rollups are written by triggers on these tables, so their cached reads go stale with them.
+ROLLUP_TABLES = {
+    "rollup_listings": {"food_listings"},
+    "rollup_claims": {"claims", "food_listings"},
+}
+
+
+def tables_depending_on(tables):
+    tables = set(tables)
+    return {rollup for rollup, deps in ROLLUP_TABLES.items() if deps & tables}
+
+
+def available(pool):
+    """True when the rollup migrations have been applied to this database."""
+    _, rows = pool.fetch("SELECT to_regclass('rollup_listings') IS NOT NULL")
+    return bool(rows and rows[0][0])
+
+
+def series_sql(measure="listings", grain="month", by=(), city=None, status=None):
+    """``(query, params)``: ``measure`` per period, split by the ``by`` dimensions.
+
+    Rows are ``(*by, period, measure)`` ordered by ``by`` then period; periods
+    with nothing in them are left out (``panel`` fills them with zeros).
+    """
+    table, column = MEASURES[measure]
+    if grain not in GRAINS:
+        raise ValueError(f"unknown grain {grain!r}")
+    by = list(by)
+    if any(dim not in DIMENSIONS for dim in by) or (table != "rollup_claims" and ("status" in by or status)):
+        raise ValueError(f"{measure} can't be split by {by}")
+    conditions = ["grain = %(grain)s"]
+    if city is not None:
+        conditions.append("city = %(city)s")
+    if status is not None:
+        conditions.append("status = %(status)s")
+    keys = ", ".join([*by, "period"])
+    query = f"""
+        SELECT {keys}, SUM({column})::bigint AS {measure}
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        GROUP BY {keys}
+        HAVING SUM({column}) <> 0
+        ORDER BY {keys}
+    """
+    return query, {"grain": grain, "city": city, "status": status}
+
+
+def panel(df, measure, grain="month", by=(), end=None):
+    """``(keys, periods, values)`` from a ``series_sql`` result.
+
+    ``values`` is a float (series x periods) array over every period from the
+    first one seen to ``end`` (default: the last one seen), zeros where a series
+    has no rows; ``keys`` is a DataFrame of the ``by`` values, one row per series.
+    """
+    by = list(by)
+    if df.empty:
+        return pd.DataFrame(columns=by), pd.DatetimeIndex([]), np.zeros((0, 0))
+    period = pd.to_datetime(df["period"])
+    periods = pd.date_range(period.min(), pd.Timestamp(end) if end is not None else period.max(), freq=FREQ[grain])
+    columns = periods.get_indexer(period)
+    if by:
+        codes, keys = pd.MultiIndex.from_frame(df[by]).factorize()
+        keys = keys.to_frame(index=False, name=by)
+    else:
+        codes, keys = np.zeros(len(df), np.intp), pd.DataFrame(index=[0])
+    values = np.zeros((len(keys), len(periods)))
+    inside = columns >= 0
+    np.add.at(values, (codes[inside], columns[inside]), df[measure].to_numpy(float)[inside])
+    return keys, periods, values
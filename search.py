@@ -0,0 +1,292 @@
+"""Typo-tolerant search over food names, providers and receivers.
+
+Searches ``food_listings.food_name``, ``providers.name/address/city`` and
+``receivers.name/city``. The tables in migrations/V007__search.sql hold each
+distinct value of those columns with its words (``search_values``, GIN
+indexed) and every word (``search_words``); the triggers in
+migrations/R__search.sql keep them in step with writes, deletes included.
+migrations/V009__search_trgm.sql installs ``pg_trgm`` and a ``gin_trgm_ops``
+index on ``search_words`` where the server allows it.
+
+A query is split into words the way the values are (``to_tsvector``,
+'simple' configuration). Each query word stands for up to ``MAX_WORDS``
+vocabulary words:
+
+* the same word (score 1.0)
+* a word it is the start of (0.9), so a half-typed word already matches
+* a word it is inside of, for query words of three or more letters (0.75)
+* a word with a trigram similarity of at least ``SIMILARITY``, which covers
+  most single typos ("chiken", "jonson"), scored 0.6 x how little has to be
+  edited (1 - edit distance / length of the longer word)
+
+Trigram similarity is pg_trgm's ``similarity()``, found through the trigram
+index (the ``%`` operator, so ``SIMILARITY`` should not be below the
+server's ``pg_trgm.similarity_threshold``), which also serves the prefix and
+substring ``LIKE`` matches. It finds the misspellings; the edit distance
+ranks them, since trigrams favour short words ("jon" over "johnson" for
+"jonson").
+
+Fallback without pg_trgm: the triggers also keep every word's trigrams in
+``search_word_trigrams``, and ``FALLBACK_CANDIDATES_SQL`` computes the same
+similarity from that table (shared trigrams over all trigrams of the two
+words, a word's own trigrams taken to be its length + 1, which is exact
+unless one repeats). ``has_pg_trgm`` picks the path, once per pool.
+
+A value matches when every query word is found in it. Its score is the
+average of its query words' best scores, weighted by ``FIELDS``, plus a
+little when it equals the whole query. A common word ("b" while typing, or
+"suite" in addresses) can match more values than are worth scoring, so at
+most ``MAX_MATCHES`` values found through exact, prefix and substring matches
+are scored, and as many through the rest; the best ``MAX_VALUES`` are kept.
+
+Results list the rows holding each value in that order, then by id, and page
+through them with a cursor. Each page is a few index lookups however many
+rows the tables have, where an ``ILIKE '%term%'`` has to read every row.
+"""
+import argparse
+import os
+from functools import lru_cache
+
+import db
+
+FIELDS = {      # table: (id column, title, detail, {field: weight})
+    "food_listings": ("food_id", "food_name",
+                      "concat_ws(' · ', quantity || ' units', location, 'expires ' || expiry_date, provider_type)",
+                      {"food_name": 1.0}),
+    "providers": ("provider_id", "name",
+                  "concat_ws(' · ', type, city, replace(address, E'\\n', ', '), contact)",
+                  {"name": 1.0, "city": 0.8, "address": 0.6}),
+    "receivers": ("receiver_id", "name", "concat_ws(' · ', type, city, contact)",
+                  {"name": 1.0, "city": 0.8}),
+}
+PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", "20"))
+MAX_VALUES = 200        # ranked values a query considers
+MAX_WORDS = 30          # vocabulary words one query word can stand for
+MAX_MATCHES = 2000      # values scored per pass (exact/prefix/substring matches, then the rest)
+SIMILARITY = 0.3        # trigram similarity a misspelt word needs (pg_trgm's default threshold)
+
+CANDIDATES_SQL = """
+    WITH terms AS (
+        SELECT term, replace(replace(replace(term, '\\', '\\\\'), '%%', '\\%%'), '_', '\\_') AS pattern
+        FROM unnest(tsvector_to_array(to_tsvector('simple', %(query)s))) term
+    ), matched AS (
+        SELECT t.term, w.word,
+               CASE WHEN w.word = t.term THEN 1.0
+                    WHEN starts_with(w.word, t.term) THEN 0.9
+                    WHEN length(t.term) >= 3 AND strpos(w.word, t.term) > 0 THEN 0.75
+                    ELSE 0 END AS score,
+               similarity(w.word, t.term) AS similarity
+        FROM terms t
+        JOIN search_words w                                             -- idx_search_words_trgm
+          ON w.word %% t.term OR w.word LIKE t.pattern || '%%'
+             OR (length(t.term) >= 3 AND w.word LIKE '%%' || t.pattern || '%%')
+    )
+    SELECT t.term, c.word, c.score
+    FROM terms t LEFT JOIN LATERAL (
+        SELECT word, score FROM matched c
+        WHERE c.term = t.term AND (c.score > 0 OR c.similarity >= %(similarity)s)
+        ORDER BY score DESC, similarity DESC, word
+        LIMIT %(max_words)s
+    ) c ON true
+"""
+
+FALLBACK_CANDIDATES_SQL = """
+    WITH terms AS (
+        SELECT term, search_trigrams(term) AS trigrams
+        FROM unnest(tsvector_to_array(to_tsvector('simple', %(query)s))) term
+    ), shared AS (
+        SELECT t.term, g.word, COUNT(*) AS n
+        FROM terms t CROSS JOIN unnest(t.trigrams) q(trigram)
+        JOIN search_word_trigrams g ON g.trigram = q.trigram
+        GROUP BY t.term, g.word
+    ), scored AS (
+        SELECT s.term, s.word, k.score,
+               -- a word has length + 1 trigrams unless one repeats
+               s.n::float / (cardinality(t.trigrams) + GREATEST(length(s.word) + 1 - s.n, 0)) AS similarity
+        FROM shared s JOIN terms t USING (term)
+        CROSS JOIN LATERAL (SELECT CASE WHEN s.word = s.term THEN 1.0
+                                        WHEN starts_with(s.word, s.term) THEN 0.9
+                                        WHEN length(s.term) >= 3 AND strpos(s.word, s.term) > 0 THEN 0.75
+                                        ELSE 0 END AS score) k
+    )
+    SELECT t.term, c.word, c.score
+    FROM terms t LEFT JOIN LATERAL (
+        SELECT word, score FROM scored c
+        WHERE c.term = t.term AND (c.score > 0 OR c.similarity >= %(similarity)s)
+        ORDER BY score DESC, similarity DESC, word
+        LIMIT %(max_words)s
+    ) c ON true
+"""
+
+VALUES_SQL = """
+    WITH candidates AS (
+        SELECT * FROM unnest(%(terms)s::text[], %(words)s::text[], %(scores)s::float8[]) c(term, word, score)
+    ), weights AS (
+        SELECT * FROM unnest(%(weight_tables)s::text[], %(weight_fields)s::text[], %(weights)s::float8[])
+            w(table_name, field, weight)
+    ), matched AS (
+        (SELECT table_name, field, value FROM search_values
+         WHERE words @@ %(strong)s::tsquery AND table_name = ANY(%(tables)s) LIMIT %(max_matches)s)
+        UNION
+        (SELECT table_name, field, value FROM search_values
+         WHERE words @@ %(tsquery)s::tsquery AND table_name = ANY(%(tables)s) LIMIT %(max_matches)s)
+    )
+    SELECT v.table_name, v.field, v.value,
+           w.weight * b.score + CASE WHEN lower(v.value) = lower(%(query)s) THEN 0.05 ELSE 0 END AS score
+    FROM matched m
+    JOIN search_values v USING (table_name, field, value)
+    JOIN weights w USING (table_name, field)
+    CROSS JOIN LATERAL (
+        SELECT AVG(best) AS score FROM (
+            SELECT MAX(c.score) AS best
+            FROM unnest(tsvector_to_array(v.words)) vw(word) JOIN candidates c ON c.word = vw.word
+            GROUP BY c.term) t
+    ) b
+    ORDER BY score DESC, v.table_name, v.field, v.value
+    LIMIT %(max_values)s
+"""
+
+ROWS_SQL = """
+    SELECT {id} AS id, {title} AS title, {detail} AS detail
+    FROM {table}
+    WHERE {field} = %(value)s AND {id} > %(after)s
+    ORDER BY {id}
+    LIMIT %(limit)s
+"""
+
+
+def available(pool):
+    """True when the search migrations have been applied to this database."""
+    _, rows = pool.fetch("SELECT to_regclass('search_values') IS NOT NULL")
+    return bool(rows and rows[0][0])
+
+
+@lru_cache(maxsize=8)
+def has_pg_trgm(pool):
+    """True when pg_trgm's index on search_words exists (migrations/V009); checked once per pool."""
+    _, rows = pool.fetch("SELECT to_regclass('idx_search_words_trgm') IS NOT NULL")
+    return bool(rows and rows[0][0])
+
+
+def _lexeme(word):
+    return "'" + word.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _tsquery(found):
+    """Every query word, each as any of its vocabulary words."""
+    return " & ".join("(" + " | ".join(_lexeme(word) for word, _ in matches) + ")" for matches in found.values())
+
+
+def edit_similarity(a, b):
+    """1 - Levenshtein distance / length of the longer word."""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return 1 - previous[-1] / max(len(a), len(b), 1)
+
+
+def _cursor(after):
+    """``after`` = "<value position>:<last id>" from the previous page's ``next``."""
+    if not after:
+        return 0, 0
+    try:
+        position, _, last_id = after.partition(":")
+        return int(position), int(last_id)
+    except ValueError:
+        raise ValueError(f"not a search cursor: {after!r}") from None
+
+
+def candidates(pool, query):
+    """``{query word: [(vocabulary word, score), ...]}``, best first; empty lists for words nothing matches."""
+    sql = CANDIDATES_SQL if has_pg_trgm(pool) else FALLBACK_CANDIDATES_SQL
+    _, rows = pool.fetch(sql, {"query": query, "similarity": SIMILARITY, "max_words": MAX_WORDS})
+    found = {}
+    for term, word, score in rows:
+        found.setdefault(term, [])
+        if word is not None:
+            found[term].append((word, float(score) or 0.6 * edit_similarity(term, word)))
+    return {term: sorted(matches, key=lambda m: (-m[1], m[0])) for term, matches in found.items()}
+
+
+def ranked_values(pool, query, tables=None):
+    """``[(table, field, value, score), ...]`` of the values matching every word of ``query``, best first."""
+    found = candidates(pool, query)
+    if not found or not all(found.values()):
+        return []
+    tables = [t for t in FIELDS if tables is None or t in tables]
+    weights = [(table, field, weight) for table in tables for field, weight in FIELDS[table][3].items()]
+    terms, words, scores = zip(*((term, word, score) for term, matches in found.items() for word, score in matches))
+    strong = {term: [m for m in matches if m[1] >= 0.75] for term, matches in found.items()}
+    _, rows = pool.fetch(VALUES_SQL, {
+        "query": query, "terms": list(terms), "words": list(words), "scores": list(scores),
+        "tsquery": _tsquery(found), "strong": _tsquery(strong) if all(strong.values()) else None,
+        "tables": tables, "max_matches": MAX_MATCHES,
+        "weight_tables": [t for t, _, _ in weights], "weight_fields": [f for _, f, _ in weights],
+        "weights": [w for _, _, w in weights], "max_values": MAX_VALUES})
+    return [(table, field, value, float(score)) for table, field, value, score in rows]
+
+
+def search(pool, query, limit=PAGE_SIZE, after=None, tables=None):
+    """One page of results for ``query``: ``(items, next cursor or None)``.
+
+    Items are dicts with the table, id, title and detail of a row and the
+    field and value it matched on. ``tables`` limits the search to some of
+    ``FIELDS``' tables.
+    """
+    position, last_id = _cursor(after)
+    values = ranked_values(pool, query, tables) if query and query.strip() else []
+    items = []
+    for index in range(position, len(values)):
+        table, field, value, score = values[index]
+        id_column, title, detail, _ = FIELDS[table]
+        sql = ROWS_SQL.format(id=id_column, title=title, detail=detail, table=table, field=field)
+        _, rows = pool.fetch(sql, {"value": value, "after": last_id if index == position else 0,
+                                   "limit": limit - len(items) + 1})
+        for row_id, row_title, row_detail in rows:
+            if len(items) == limit:
+                return items, f"{index}:{items[-1]['id']}"
+            items.append({"table": table, "id": row_id, "title": row_title, "detail": row_detail,
+                          "field": field, "value": value, "score": round(score, 3)})
+        if len(items) == limit and index + 1 < len(values):
+            return items, f"{index + 1}:0"
+    return items, None
+
+
+def rebuild(pool):
+    """Rebuild the search tables from the base tables (drops words no value holds any more)."""
+    with pool.cursor() as cur:
+        cur.execute("SELECT search_rebuild()")
+
+
+# ---------------- CLI ----------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("query", nargs="?", help="text to search for")
+    parser.add_argument("--limit", type=int, default=PAGE_SIZE)
+    parser.add_argument("--after", help="cursor printed after the previous page")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the search tables from the base tables")
+    args = parser.parse_args()
+    pool = db.create_pool()
+    try:
+        if not available(pool):
+            raise SystemExit("the search tables don't exist; run python migrate.py first")
+        if args.rebuild:
+            rebuild(pool)
+            _, rows = pool.fetch("SELECT (SELECT COUNT(*) FROM search_values), (SELECT COUNT(*) FROM search_words)")
+            print(f"search tables rebuilt: {rows[0][0]:,} values, {rows[0][1]:,} words")
+        if args.query:
+            items, next_cursor = search(pool, args.query, args.limit, args.after)
+            for item in items:
+                print(f"{item['score']:5.2f}  {item['table']:<13} {item['id']:>8}  {item['title']}  "
+                      f"[{item['field']}: {item['value']}]  {item['detail']}")
+            if next_cursor:
+                print(f"more: --after {next_cursor}")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
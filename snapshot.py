@@ -0,0 +1,259 @@
+"""Columnar snapshot of the four tables as memory-mapped Arrow files.
+
+Each table is written to ``<SNAPSHOT_DIR>/<database>/<table>.arrow`` (Arrow IPC file,
+uncompressed so it can be memory-mapped without a copy). Low-cardinality text
+columns (``CATEGORICAL``) are dictionary-encoded and come back from
+``Snapshot.frame`` as pandas categoricals. Integer, date and timestamp columns
+are stored as int32, date32 and timestamp instead of Python objects.
+
+Refreshes only re-read what changed from Postgres. Rows are grouped into
+primary-key blocks of ``BLOCK_ROWS`` ids, and Postgres returns one ``(count,
+sum of row hashes)`` signature per block. Only blocks whose signature changed
+are re-read with ``COPY``: new ids land in new or tail blocks, while updates
+and deletes change the block they are in. The signatures are kept in
+``manifest.json``. The table's file itself is written out whole each time the
+table changed (an IPC file can't be patched in place): to a temporary file
+beside it, then renamed over it, so readers see the old file or the new one,
+never a half-written one. A file whose columns no longer match ``schema``
+(after a migration added one) is rebuilt from scratch.
+
+    python snapshot.py            # create or refresh the snapshot
+    python snapshot.py --rebuild  # re-read every table
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+import db
+from frames import CATEGORICAL, to_pandas
+from ingest import TABLES, to_date, to_int, to_text, to_timestamp
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot"))
+BLOCK_ROWS = 10_000
+MAX_AGE = 300            # seconds before pages trigger a background refresh
+REFRESH_INTERVAL = 30    # minimum seconds between refreshes after writes
+
+ARROW_TYPES = {to_int: pa.int32(), to_text: pa.string(), to_date: pa.date32(), to_timestamp: pa.timestamp("us")}
+
+SIGNATURE_SQL = "SELECT {pk} / {block} AS block, COUNT(*), SUM(hashtext(t::text)) FROM {table} t GROUP BY 1"
+
+
+def schema(table):
+    columns = TABLES[table]["columns"]
+    return pa.schema([(name, pa.dictionary(pa.int32(), pa.string()) if name in CATEGORICAL[table]
+                       else ARROW_TYPES[converter]) for name, converter in columns.items()])
+
+
+def _ranges(blocks):
+    """Sorted block numbers -> [(first_id, end_id)] for contiguous runs."""
+    runs = []
+    for block in sorted(blocks):
+        if runs and runs[-1][1] == block * BLOCK_ROWS:
+            runs[-1][1] += BLOCK_ROWS
+        else:
+            runs.append([block * BLOCK_ROWS, (block + 1) * BLOCK_ROWS])
+    return runs
+
+
+def fetch_blocks(pool, table, blocks=None):
+    """COPY the rows of ``blocks`` (None = whole table) straight into an Arrow table."""
+    table_schema = schema(table)
+    pk = TABLES[table]["pk"]
+    where = ""
+    if blocks is not None:
+        if not blocks:
+            return table_schema.empty_table()
+        where = "WHERE " + " OR ".join(f"({pk} >= {lo} AND {pk} < {hi})" for lo, hi in _ranges(blocks))
+    buffer = io.BytesIO()
+    with pool.cursor(readonly=True) as cur:
+        cur.copy_expert(f"COPY (SELECT {', '.join(table_schema.names)} FROM {table} {where} ORDER BY {pk}) "
+                        "TO STDOUT WITH (FORMAT csv)", buffer)
+    if not buffer.tell():
+        return table_schema.empty_table()
+    buffer.seek(0)
+    return pa_csv.read_csv(
+        buffer,
+        read_options=pa_csv.ReadOptions(column_names=table_schema.names),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),       # addresses span lines
+        convert_options=pa_csv.ConvertOptions(column_types=dict(zip(table_schema.names, table_schema.types)),
+                                              strings_can_be_null=True, quoted_strings_can_be_null=False,
+                                              timestamp_parsers=[pa_csv.ISO8601]),
+    ).cast(table_schema)
+
+
+class Snapshot:
+    def __init__(self, directory=None, max_age=MAX_AGE, interval=REFRESH_INTERVAL):
+        self.directory = directory or os.path.join(SNAPSHOT_DIR, db.DB_CONFIG["dbname"])
+        self.max_age = max_age
+        self.interval = interval
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()   # one refresh at a time (background and "Refresh now")
+        self._running = False
+        self._dirty = set()
+        self._last_refresh = 0.0
+        self._frames = {}               # table -> (mtime, DataFrame)
+        self.manifest = self._read_manifest()
+
+    def path(self, table):
+        return os.path.join(self.directory, f"{table}.arrow")
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, "manifest.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    @property
+    def exists(self):
+        return all(table in self.manifest and os.path.exists(self.path(table)) for table in TABLES)
+
+    @property
+    def refreshed_at(self):
+        stamps = [self.manifest[t]["refreshed_at"] for t in TABLES if t in self.manifest]
+        return datetime.fromisoformat(min(stamps)) if stamps else None
+
+    # ---------------- Refresh ----------------
+    def refresh(self, pool, tables=None, rebuild=False, log=lambda msg: None):
+        """Bring ``tables`` (default: all) up to date; returns ``{table: stats}``."""
+        with self._refresh_lock:
+            return self._refresh_tables(pool, tables, rebuild, log)
+
+    def _current(self, table):
+        """The table's file still matches its schema; otherwise it has to be rebuilt."""
+        try:
+            return pa.ipc.open_file(pa.memory_map(self.path(table))).schema.equals(schema(table))
+        except (OSError, pa.ArrowInvalid):
+            return False
+
+    def _refresh_tables(self, pool, tables, rebuild, log):
+        os.makedirs(self.directory, exist_ok=True)
+        report = {}
+        for table in tables or TABLES:
+            start = time.perf_counter()
+            pk = TABLES[table]["pk"]
+            _, rows = pool.fetch(SIGNATURE_SQL.format(pk=pk, block=BLOCK_ROWS, table=table))
+            signatures = {str(block): [count, int(checksum)] for block, count, checksum in rows}
+            known = {} if rebuild or not self._current(table) else self.manifest.get(table, {}).get("blocks", {})
+            changed = {b for b, sig in signatures.items() if known.get(b) != sig}
+            dropped = set(known) - set(signatures)
+
+            if changed or dropped or not known:
+                fresh = fetch_blocks(pool, table, None if not known else [int(b) for b in changed])
+                if known:
+                    current = self.read(table)
+                    stale = pa.array(sorted(int(b) for b in changed | dropped), pa.int32())
+                    keep = pc.invert(pc.is_in(pc.divide(current[pk], pa.scalar(BLOCK_ROWS, pa.int32())), stale))
+                    fresh = pa.concat_tables([current.filter(keep), fresh])
+                    fresh = fresh.take(pc.sort_indices(fresh, [(pk, "ascending")]))
+                self._write(table, fresh.unify_dictionaries().combine_chunks())
+                rows_read = fresh.num_rows if not known else sum(signatures[b][0] for b in changed)
+            else:
+                rows_read = 0
+            self.manifest[table] = {"blocks": signatures, "rows": sum(s[0] for s in signatures.values()),
+                                    "refreshed_at": datetime.now().isoformat(timespec="seconds")}
+            self._write_manifest()
+            report[table] = {"blocks_changed": len(changed), "blocks_dropped": len(dropped),
+                             "rows_read": rows_read, "seconds": time.perf_counter() - start}
+            log(f"{table}: {len(changed)} of {len(signatures)} blocks re-read ({rows_read:,} rows), "
+                f"{len(dropped)} dropped in {report[table]['seconds']:.2f}s")
+        return report
+
+    def _temp_path(self, name):
+        """A new temporary file beside ``name``; another process refreshing at once gets its own."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{name}.", suffix=".tmp")
+        os.close(fd)
+        return tmp
+
+    def _write(self, table, arrow_table):
+        tmp = self._temp_path(f"{table}.arrow")
+        try:
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+            os.replace(tmp, self.path(table))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _write_manifest(self):
+        tmp = self._temp_path("manifest.json")
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp, os.path.join(self.directory, "manifest.json"))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def mark_dirty(self, tables):
+        with self._lock:
+            self._dirty |= set(tables) & set(TABLES)
+
+    def refresh_if_due(self, pool):
+        """Refresh in the background after writes (at most every ``interval`` s) or once ``max_age`` passed."""
+        refreshed_at = self.refreshed_at
+        age = (datetime.now() - refreshed_at).total_seconds() if refreshed_at else float("inf")
+        with self._lock:
+            if self._running or time.monotonic() - self._last_refresh < self.interval:
+                return False
+            if not self._dirty and age < self.max_age:
+                return False
+            self._dirty, self._running = set(), True
+        threading.Thread(target=self._refresh, args=(pool,), daemon=True).start()
+        return True
+
+    def _refresh(self, pool):
+        try:
+            self.refresh(pool)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+        finally:
+            with self._lock:
+                self._last_refresh = time.monotonic()
+                self._running = False
+
+    # ---------------- Reading ----------------
+    def read(self, table, columns=None):
+        """The table as a zero-copy, memory-mapped Arrow table."""
+        arrow_table = pa.ipc.open_file(pa.memory_map(self.path(table))).read_all()
+        return arrow_table.select(columns) if columns else arrow_table
+
+    def frame(self, table):
+        """The table as a DataFrame (categoricals for CATEGORICAL columns), cached until the file changes."""
+        mtime = os.path.getmtime(self.path(table))
+        cached = self._frames.get(table)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, to_pandas(self.read(table)))
+            self._frames[table] = cached
+        return cached[1]
+
+    def file_bytes(self, table):
+        return os.path.getsize(self.path(table))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", help="default: SNAPSHOT_DIR/<database>")
+    parser.add_argument("--rebuild", action="store_true", help="re-read every table instead of changed blocks")
+    args = parser.parse_args()
+    pool = db.create_pool()
+    try:
+        Snapshot(args.dir).refresh(pool, rebuild=args.rebuild, log=print)
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
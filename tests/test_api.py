@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("starlette")
+
+import api  # noqa: E402
+from api import ApiError  # noqa: E402
+
+
+def test_claims_are_always_pending():
+    claims = api.claim_requests({"claims": [{"food_id": "12", "receiver_id": 3, "quantity": 2},
+                                            {"receiver_id": 4, "quantity": 1, "city": "Saint Louis",
+                                             "status": "Pending"}]})
+    assert claims == [{"receiver_id": 3, "quantity": 2, "status": "Pending", "food_id": 12},
+                      {"receiver_id": 4, "quantity": 1, "status": "Pending", "location": "Saint Louis"}]
+
+
+@pytest.mark.parametrize("status", ["Completed", "Cancelled", "pending", None])
+def test_other_statuses_are_refused(status):
+    with pytest.raises(ApiError, match="claim 1: status must be Pending"):
+        api.claim_requests([{"food_id": 1, "receiver_id": 1, "quantity": 1},
+                            {"food_id": 2, "receiver_id": 1, "quantity": 1, "status": status}])
+
+
+@pytest.mark.parametrize("body, message", [
+    ({}, "non-empty list"),
+    ([], "non-empty list"),
+    (["x"], "claim 0: expected an object"),
+    ([{"receiver_id": 1, "quantity": 1}], "claim 0: needs a food_id or a city"),
+    ([{"food_id": 1, "receiver_id": "me"}], "claim 0: receiver_id must be an integer"),
+    ([{"food_id": 1, "receiver_id": 1}], "claim 0: quantity must be an integer"),
+    ([{"food_id": 1, "receiver_id": 1, "quantity": 0}], "claim 0: quantity must be between 1"),
+])
+def test_bad_claims(body, message):
+    with pytest.raises(ApiError, match=message):
+        api.claim_requests(body)
+
+
+def test_too_many_claims(monkeypatch):
+    monkeypatch.setattr(api, "MAX_BULK_CLAIMS", 2)
+    with pytest.raises(ApiError) as e:
+        api.claim_requests([{"food_id": i, "receiver_id": 1} for i in range(3)])
+    assert e.value.status == 413
+
+
+def test_listings_query_pages_after_the_cursor():
+    sql, params, limit = api.listings_query({"city": "Pune", "limit": "5", "after": "2026-10-20,7"})
+    assert limit == 5 and params["limit"] == 6
+    assert params["expires_from"] == date.today()
+    assert (params["after_expiry"], params["after_id"]) == (date(2026, 10, 20), 7)
+    assert "(f.expiry_date, f.food_id) > (%(after_expiry)s, %(after_id)s)" in sql
+    assert "f.location = %(city)s" in sql
+    with pytest.raises(ApiError, match="after must be a YYYY-MM-DD date"):
+        api.listings_query({"after": "7"})
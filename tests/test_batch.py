@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+
+import batch
+
+
+class FakeCursor:
+    """Records statements; an execute_values page fails when any of its rows holds "bad"."""
+
+    def __init__(self):
+        self.connection = SimpleNamespace(encoding="UTF8")
+        self.statements = []      # (sql, rows) for VALUES statements, sql alone otherwise
+        self.templates = []
+        self._page = []
+        self._rows = []
+        self._next_id = 1000
+
+    def mogrify(self, template, args):
+        self.templates.append(template)
+        self._page.append(tuple(args))
+        return b"(?)"
+
+    def execute(self, query, params=None):
+        if isinstance(query, str):                # SAVEPOINT / RELEASE / ROLLBACK TO
+            self.statements.append(query)
+            return
+        page, self._page = self._page, []
+        self.statements.append((query.decode(), page))
+        if any("bad" in row for row in page):
+            raise psycopg2.DataError('invalid input syntax for type integer: "bad"')
+        if query.startswith(b"INSERT") and b"_id," not in query.split(b"(", 2)[1]:
+            self._rows = [(self._new_id(),) for _ in page]          # id from the column default
+        else:
+            self._rows = [(row[0],) for row in page]
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class FakePool:
+    def __init__(self):
+        self.cur = FakeCursor()
+
+    @contextmanager
+    def cursor(self):
+        yield self.cur
+
+
+def value_statements(cur):
+    return [s for s in cur.statements if isinstance(s, tuple)]
+
+
+def test_insert_sends_one_statement_per_column_set():
+    pool = FakePool()
+    result = batch.insert_rows(pool, "providers", [
+        {"provider_id": 1, "name": "a", "city": "Pune"},
+        {"provider_id": 2, "name": "b"},
+        {"city": "Agra", "provider_id": 3, "name": "c"},
+        {"provider_id": None, "name": "d"},
+    ])
+    assert value_statements(pool.cur) == [
+        ("INSERT INTO providers (provider_id, name, city) VALUES (?),(?) RETURNING provider_id",
+         [(1, "a", "Pune"), (3, "c", "Agra")]),
+        ("INSERT INTO providers (provider_id, name) VALUES (?) RETURNING provider_id", [(2, "b")]),
+        ("INSERT INTO providers (name) VALUES (?) RETURNING provider_id", [("d",)]),
+    ]
+    assert result.ids == [1, 3, 2, 1001]
+    assert result.summary() == "providers: inserted 4 of 4 rows"
+
+
+def test_update_casts_values_to_column_types():
+    pool = FakePool()
+    result = batch.update_rows(pool, "food_listings", [{"food_id": 7, "quantity": 3, "expiry_date": "2025-03-17"}])
+    assert value_statements(pool.cur) == [
+        ("UPDATE food_listings t SET expiry_date = v.expiry_date, quantity = v.quantity "
+         "FROM (VALUES (?)) AS v(food_id, expiry_date, quantity) WHERE t.food_id = v.food_id RETURNING t.food_id",
+         [(7, "2025-03-17", 3)])]
+    assert pool.cur.templates == ["(%s::integer, %s::date, %s::integer)"]
+    assert result.ids == [7]
+
+
+def test_delete():
+    pool = FakePool()
+    result = batch.delete_rows(pool, "claims", [4, 5])
+    assert value_statements(pool.cur) == [
+        ("DELETE FROM claims t USING (VALUES (?),(?)) AS v(id) WHERE t.claim_id = v.id RETURNING t.claim_id",
+         [(4,), (5,)])]
+    assert result.applied == 2
+
+
+def test_failed_batch_is_replayed_row_by_row():
+    pool = FakePool()
+    records = [{"receiver_id": 1, "name": "a"}, {"receiver_id": "bad", "name": "b"}, {"receiver_id": 3, "name": "c"}]
+    result = batch.insert_rows(pool, "receivers", records, on_error="skip")
+    assert result.ids == [1, 3]
+    assert result.errors == [(1, 'invalid input syntax for type integer: "bad"')]
+    assert result.summary() == "receivers: inserted 2 of 3 rows, 1 rejected"
+    savepoints = [s for s in pool.cur.statements if isinstance(s, str)]
+    assert savepoints == ["SAVEPOINT batch", "ROLLBACK TO SAVEPOINT batch",
+                          "SAVEPOINT batch_row", "RELEASE SAVEPOINT batch_row",
+                          "SAVEPOINT batch_row", "ROLLBACK TO SAVEPOINT batch_row",
+                          "SAVEPOINT batch_row", "RELEASE SAVEPOINT batch_row"]
+
+
+def test_abort_raises_with_every_rejected_row():
+    pool = FakePool()
+    with pytest.raises(batch.BatchError) as raised:
+        batch.apply(pool, "receivers", inserts=[{"receiver_id": "bad", "name": "a"}],
+                    updates=[{"receiver_id": 2, "name": "bad"}, {"receiver_id": 3, "name": "c"}])
+    assert raised.value.errors == [("inserted", 0, 'invalid input syntax for type integer: "bad"'),
+                                   ("updated", 0, 'invalid input syntax for type integer: "bad"')]
+    assert [r.applied for r in raised.value.results] == [0, 1]
+
+
+@pytest.mark.parametrize("call", [
+    lambda pool: batch.insert_rows(pool, "users", [{"id": 1}]),
+    lambda pool: batch.insert_rows(pool, "providers", [{"provider_id": 1, "password": "x"}]),
+    lambda pool: batch.insert_rows(pool, "providers", [{"provider_id": None}]),
+    lambda pool: batch.update_rows(pool, "providers", [{"name": "no id"}]),
+    lambda pool: batch.apply(pool, "providers", deletes=[1], on_error="ignore"),
+])
+def test_bad_requests_are_rejected(call):
+    with pytest.raises(ValueError):
+        call(FakePool())
@@ -0,0 +1,72 @@
+import change_feed
+from change_feed import KpiState
+
+
+class FakeCursor:
+    """Answers the three LOAD_SQL statements in order."""
+
+    def __init__(self, listings, statuses, claimed):
+        self.results = [[listings], statuses, [(claimed,)]]
+
+    def execute(self, query, params=None):
+        self.rows = self.results.pop(0)
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+
+def loaded():
+    state = KpiState()
+    assert state.load(FakeCursor((10, 500), [("Pending", 3), ("Completed", 2)], 40)) == len(change_feed.LOAD_SQL)
+    return state
+
+
+def test_load():
+    assert loaded().kpis() == {"listings": 10, "quantity": 500, "claims": 5, "claimed": 40,
+                               "statuses": {"Pending": 3, "Completed": 2}}
+
+
+def test_claim_insert_update_delete():
+    state = loaded()
+    state.apply("claims", [[1, 101, 7, "Pending", 2], [1, 102, 8, "Pending", 5]])
+    assert state.kpis()["claims"] == 7
+    assert state.kpis()["claimed"] == 47
+    # a status change: old row out, new row in
+    state.apply("claims", [[-1, 101, 7, "Pending", 2], [1, 101, 7, "Completed", 2]])
+    assert state.kpis()["statuses"] == {"Pending": 4, "Completed": 3}
+    assert state.kpis()["claimed"] == 47
+    # a quantity change counts the claim's units, not the listing's
+    state.apply("claims", [[-1, 102, 8, "Pending", 5], [1, 102, 8, "Pending", 1]])
+    assert state.kpis()["claimed"] == 43
+    state.apply("claims", [[-1, 101, 7, "Completed", 2], [-1, 102, 8, "Pending", 1]])
+    assert state.kpis() == loaded().kpis()
+
+
+def test_claim_without_listing_counts_no_units():
+    state = loaded()
+    state.apply("claims", [[1, 103, None, None, 4]])
+    assert state.kpis()["claimed"] == 40
+    assert state.kpis()["statuses"][None] == 1
+    state.apply("claims", [[-1, 103, None, None, 4]])
+    assert None not in state.kpis()["statuses"]
+
+
+def test_listing_changes_leave_claimed_quantity_alone():
+    state = loaded()
+    state.apply("food_listings", [[1, 11, 30]])
+    assert (state.kpis()["listings"], state.kpis()["quantity"]) == (11, 530)
+    state.apply("food_listings", [[-1, 11, 30], [1, 11, 100]])
+    assert (state.kpis()["listings"], state.kpis()["quantity"]) == (11, 600)
+    state.apply("food_listings", [[-1, 11, 100]])
+    assert state.kpis() == loaded().kpis()
+
+
+def test_visible():
+    snapshot = "100:105:101,103"
+    assert change_feed._visible(99, snapshot)
+    assert change_feed._visible(102, snapshot)          # committed before the snapshot
+    assert not change_feed._visible(101, snapshot)      # still running then
+    assert not change_feed._visible(105, snapshot)      # started after
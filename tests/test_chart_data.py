@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+import chart_data
+
+
+def series(size):
+    x = pd.date_range("2024-01-01", periods=size, freq="h")
+    y = np.sin(np.arange(size) / 50.0)
+    y[1234] = 25.0                       # a peak the downsampled series has to keep
+    return pd.DataFrame({"period": x, "donations": y})
+
+
+def test_downsample_leaves_short_series_alone():
+    df = series(2000).head(100)
+    assert chart_data.downsample(df, "period", "donations") is df
+
+
+def test_downsample_caps_points_and_keeps_shape():
+    df = series(2000).sample(frac=1, random_state=0)          # unordered input
+    out = chart_data.downsample(df, "period", "donations", n=200)
+    assert len(out) == 200
+    assert out["period"].is_monotonic_increasing
+    assert out["period"].iloc[0] == df["period"].min()
+    assert out["period"].iloc[-1] == df["period"].max()
+    assert out["donations"].max() == 25.0
+    assert set(out.index) <= set(df.index)                    # rows are picked, never interpolated
+
+
+def test_downsample_non_numeric_axis_uses_row_order():
+    df = pd.DataFrame({"month": [f"m{i:04d}" for i in range(1000)], "n": np.arange(1000.0)})
+    out = chart_data.downsample(df, "month", "n", n=50)
+    assert len(out) == 50
+    assert list(out["month"]) == sorted(out["month"])
+
+
+def test_top_n_buckets_the_rest_into_other():
+    df = pd.DataFrame({"food_name": [f"f{i}" for i in range(40)], "quantity": range(40)})
+    out = chart_data.top_n(df, "food_name", "quantity", n=15)
+    assert len(out) == 16
+    assert list(out["food_name"][:3]) == ["f39", "f38", "f37"]
+    assert out["food_name"].iloc[-1] == chart_data.OTHER
+    assert out["quantity"].iloc[-1] == sum(range(25))
+    assert out["quantity"].sum() == df["quantity"].sum()
+
+
+def test_top_n_keeps_small_frames():
+    df = pd.DataFrame({"food_name": ["a", "b"], "quantity": [1, 2]})
+    assert chart_data.top_n(df, "food_name", "quantity") is df
+
+
+def test_largest_keeps_the_biggest_rows():
+    df = pd.DataFrame({"quantity": np.arange(1000)})
+    out = chart_data.largest(df, "quantity", n=10)
+    assert sorted(out["quantity"]) == list(range(990, 1000))
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import db
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the pool's checkout/checkin bookkeeping."""
+
+    def __init__(self):
+        self.autocommit = False
+        self.readonly = None
+        self.closed = 0
+        self.status = psycopg2.extensions.STATUS_READY
+        self.commits = 0
+        self.cancels = 0
+
+    def set_session(self, readonly=None, autocommit=None):
+        self.readonly = readonly
+        self.autocommit = autocommit
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+    def cancel(self):
+        self.cancels += 1
+
+
+def make_pool(**kwargs):
+    connections = []
+
+    def connect(**dsn):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    kwargs.setdefault("minconn", 0)
+    pool = db.ConnectionPool(connect=connect, host="fake", **kwargs)
+    return pool, connections
+
+
+def wait_for_waiters(pool, count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while len(pool._waiters) < count:
+        assert time.monotonic() < deadline, "waiter never queued"
+        time.sleep(0.001)
+
+
+@pytest.mark.parametrize("minconn, maxconn", [(-1, 5), (0, 0), (6, 5)])
+def test_rejects_bad_bounds(minconn, maxconn):
+    with pytest.raises(ValueError):
+        db.ConnectionPool(minconn=minconn, maxconn=maxconn, connect=lambda **dsn: FakeConnection())
+
+
+def test_reuses_returned_connection_and_commits():
+    pool, connections = make_pool(maxconn=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert len(connections) == 1
+    assert first.commits == 2
+
+
+def test_broken_connection_is_discarded():
+    pool, connections = make_pool(maxconn=1)
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection():
+            raise psycopg2.OperationalError("server closed the connection")
+    assert connections[0].closed
+    with pool.connection() as conn:
+        assert conn is connections[1]
+
+
+def test_waiters_are_served_in_arrival_order():
+    pool, _ = make_pool(maxconn=1, timeout=5)
+    served = []
+
+    def wait(name):
+        with pool.connection():
+            served.append(name)
+
+    with pool.connection():
+        threads = []
+        for i, name in enumerate("abcd"):
+            thread = threading.Thread(target=wait, args=(name,))
+            thread.start()
+            threads.append(thread)
+            wait_for_waiters(pool, i + 1)
+    for thread in threads:
+        thread.join(5)
+    assert served == list("abcd")
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(maxconn=1, timeout=0.05)
+    with pool.connection():
+        start = time.monotonic()
+        with pytest.raises(db.PoolTimeout):
+            with pool.connection():
+                pass
+        assert time.monotonic() - start >= 0.05
+        assert not pool._waiters
+    with pool.connection():           # the slot came back once the holder was done
+        pass
+
+
+def test_timed_out_waiter_does_not_take_a_later_slot():
+    pool, _ = make_pool(maxconn=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(db.PoolTimeout):
+            with pool.connection():
+                pass
+    assert pool._free == 1
+
+
+def test_cancel_signals_only_the_threads_connections():
+    pool, _ = make_pool(maxconn=2)
+    me = threading.get_ident()
+    with pool.connection() as conn:
+        assert pool.cancel(me) == 1
+        assert pool.cancel(me + 1) == 0
+        assert conn.cancels == 1
+    assert pool.cancel(me) == 0
+
+
+def test_cancelled_statement_keeps_the_connection():
+    pool, connections = make_pool(maxconn=1)
+    with pytest.raises(psycopg2.extensions.QueryCanceledError):
+        with pool.connection():
+            raise psycopg2.extensions.QueryCanceledError("canceling statement due to user request")
+    assert not connections[0].closed
+    with pool.connection() as conn:
+        assert conn is connections[0]
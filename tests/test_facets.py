@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from facets import FACETS, FacetIndex
+
+
+def make_frame(n=500, seed=11):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "food_id": np.arange(1, n + 1),
+        "location": rng.choice(["Pune", "Delhi", "Agra", None], n),
+        "provider_id": rng.integers(1, 15, n),
+        "food_type": rng.choice(["Vegan", "Vegetarian", "Non-Vegetarian"], n),
+        "meal_type": rng.choice(["Breakfast", "Lunch", "Dinner", "Snacks"], n),
+    })
+
+
+def rows(frame):
+    """FACET_ROWS_SQL rows, with None for NULL as psycopg2 returns it."""
+    frame = frame[["food_id", *FACETS]].astype(object)
+    return list(frame.where(frame.notna(), None).itertuples(index=False, name=None))
+
+
+def expected_counts(frame, selected):
+    """Per facet, rows left once every *other* facet's picks are applied, counted with a groupby."""
+    out = {}
+    for name in FACETS:
+        keep = pd.Series(True, index=frame.index)
+        for other, chosen in selected.items():
+            if other != name and chosen:
+                keep &= frame[other].isin(chosen)
+        counts = frame[keep].groupby(name).size()
+        out[name] = {value: int(n) for value, n in counts.items() if n}
+    return out
+
+
+def counted(index, selected):
+    return {name: dict(zip(df["value"], df["count"])) for name, df in index.counts(selected).items()}
+
+
+SELECTIONS = [
+    {},
+    {"location": ["Pune"]},
+    {"location": ["Pune", "Agra"], "food_type": ["Vegan"]},
+    {"provider_id": [3, 4, 5], "meal_type": ["Lunch", "Dinner"], "food_type": ["Vegetarian"]},
+]
+
+
+@pytest.mark.parametrize("selected", SELECTIONS)
+def test_counts_match_a_groupby(selected):
+    frame = make_frame()
+    index = FacetIndex()
+    index.build(rows(frame))
+    assert counted(index, selected) == expected_counts(frame, selected)
+    keep = pd.Series(True, index=frame.index)
+    for name, chosen in selected.items():
+        keep &= frame[name].isin(chosen)
+    assert index.total(selected) == int(keep.sum())
+
+
+def test_upserts_and_deletes_match_a_groupby():
+    frame = make_frame()
+    index = FacetIndex()
+    index.build(rows(frame.iloc[:300]))
+    index.upsert(rows(frame.iloc[300:]))                       # new listings, growing the slots
+    changed = make_frame(seed=12).iloc[:100]
+    index.upsert(rows(changed))                                # rewrites of existing listings
+    frame = pd.concat([changed, frame.iloc[100:]], ignore_index=True)
+    gone = list(range(50, 120))
+    index.delete(gone)
+    frame = frame[~frame["food_id"].isin(gone)]
+    index.upsert(rows(make_frame(n=560).iloc[500:]))           # reuse the freed slots
+    frame = pd.concat([frame, make_frame(n=560).iloc[500:]], ignore_index=True)
+    assert len(index) == len(frame)
+    for selected in SELECTIONS:
+        assert counted(index, selected) == expected_counts(frame, selected)
+
+
+def test_selected_options_stay_listed_and_labels_apply():
+    frame = make_frame()
+    index = FacetIndex()
+    index.build(rows(frame))
+    index.set_labels("provider_id", {3: "Annapurna"})
+    counts = index.counts({"location": ["Atlantis"], "provider_id": [3]})
+    location = counts["location"]
+    assert location.iloc[-1].tolist() == ["Atlantis", "Atlantis", 0]          # picked, so listed at 0
+    assert dict(zip(location["value"][:-1], location["count"][:-1])) == expected_counts(
+        frame, {"provider_id": [3]})["location"]
+    provider = counts["provider_id"].set_index("value")
+    assert provider.loc[3, "label"] == "Annapurna"
+    assert provider.loc[3, "count"] == 0                        # no listings in Atlantis
+    assert counts["food_type"].empty
+    assert list(index.counts()["location"]["value"]) == sorted(
+        frame["location"].dropna().unique(), key=lambda c: (-(frame["location"] == c).sum(), c))
@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import frames
+
+
+class FakeCursor:
+    """Describes the result from ``columns`` and COPYs ``csv`` out, like psycopg2 would."""
+
+    def __init__(self, columns, csv):
+        self.columns = columns
+        self.csv = csv
+        self.connection = SimpleNamespace(close=lambda: None)
+        self.description = None
+
+    def mogrify(self, query, params=None):
+        return (query % tuple(repr(p) for p in params) if params else query).encode()
+
+    def execute(self, query, params=None):
+        assert query.endswith(" q LIMIT 0")
+        self.description = [SimpleNamespace(name=n, type_code=t) for n, t in self.columns]
+
+    def copy_expert(self, query, sink):
+        assert query.startswith("COPY (") and query.endswith(") TO STDOUT WITH (FORMAT csv)")
+        sink.write(self.csv.encode())
+
+
+class FakePool:
+    def __init__(self, cur):
+        self.cur = cur
+
+    @contextmanager
+    def cursor(self, readonly=False):
+        yield self.cur
+
+
+def test_parse_schema_reads_create_table_sql():
+    schema = frames.parse_schema()
+    assert list(schema) == ["providers", "receivers", "food_listings", "claims"]
+    assert schema["food_listings"]["quantity"] == "INT"
+    assert schema["food_listings"]["expiry_date"] == "DATE"
+    assert schema["claims"] == {"claim_id": "INT", "food_id": "INT", "receiver_id": "INT", "status": "TEXT",
+                                "timestamp": "TIMESTAMP"}
+
+
+def test_parse_schema_skips_comments(tmp_path):
+    path = tmp_path / "schema.sql"
+    path.write_text("-- CREATE TABLE old (id INT);\n"
+                    "CREATE TABLE Things (\n  ID bigint PRIMARY KEY, -- the key\n  Label varchar(20)\n);\n")
+    assert frames.parse_schema(str(path)) == {"things": {"id": "BIGINT", "label": "VARCHAR"}}
+
+
+def test_column_types_drop_names_declared_differently():
+    schema = {"claims": {"status": "TEXT", "code": "INT"}, "other": {"code": "TEXT"}}
+    assert frames.column_types(schema) == {"status": pa.dictionary(pa.int32(), pa.string())}
+    assert frames.COLUMN_TYPES["quantity"] == pa.int32()
+    assert frames.COLUMN_TYPES["city"] == pa.dictionary(pa.int32(), pa.string())
+
+
+def test_result_type_prefers_the_declared_type_when_storage_agrees():
+    assert frames.result_type("city", 25) == pa.dictionary(pa.int32(), pa.string())
+    assert frames.result_type("quantity", 23) == pa.int32()
+    assert frames.result_type("quantity", 20) == pa.int64()          # SUM(quantity) is a bigint
+    assert frames.result_type("anything", 1700) == pa.float64()
+    assert frames.result_type("anything", 114) == pa.string()        # json: read as text
+
+
+def test_is_read():
+    assert frames.is_read("  ( SELECT 1)")
+    assert frames.is_read("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not frames.is_read("INSERT INTO claims VALUES (1)")
+
+
+def test_fetch_frame_types_columns_from_copy_output():
+    cur = FakeCursor([("food_id", 23), ("city", 25), ("quantity", 23), ("expiry_date", 1082), ("total", 20)],
+                     '1,Pune,5,2025-03-17,10\n2,Agra,,2025-03-18,\n3,"Pune, East",7,,30\n')
+    df = frames.fetch_frame(FakePool(cur), "SELECT * FROM food_listings WHERE food_id < %s", (4,))
+    assert df["food_id"].dtype == "int32"
+    assert df["quantity"].dtype == "Int32"                            # has a NULL
+    assert df["total"].dtype == "Int64"
+    assert isinstance(df["city"].dtype, pd.CategoricalDtype)
+    assert list(df["city"].cat.categories) == ["Agra", "Pune", "Pune, East"]
+    assert df["expiry_date"].dtype.kind == "M"
+    assert df["expiry_date"].isna().tolist() == [False, False, True]
+    assert df["city"].tolist() == ["Pune", "Agra", "Pune, East"]
+
+
+def test_fetch_frame_of_no_rows_keeps_the_schema():
+    cur = FakeCursor([("claim_id", 23), ("status", 25)], "")
+    df = frames.fetch_frame(FakePool(cur), "SELECT claim_id, status FROM claims WHERE false")
+    assert df.empty
+    assert list(df.columns) == ["claim_id", "status"]
+    assert df["claim_id"].dtype == "int32"
+
+
+def test_bad_copy_output_raises():
+    cur = FakeCursor([("claim_id", 23)], "1\nnot a number\n")
+    with pytest.raises(pa.ArrowInvalid):
+        frames.fetch_frame(FakePool(cur), "SELECT claim_id FROM claims")
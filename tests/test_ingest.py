@@ -0,0 +1,226 @@
+import io
+from contextlib import contextmanager
+
+import pytest
+
+import ingest
+from ingest import COPY_NULL
+
+
+class FakeCursor:
+    """Stands in for the staging-table round trip: COPY rows in, merge the ids not loaded yet."""
+
+    def __init__(self):
+        self.statements = []
+        self.copied = []          # every staged row, COPY text format, split on tabs
+        self.loaded = set()       # ids merged so far
+        self.batch = []
+        self.rowcount = -1
+        self._one = None
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+        if query.startswith("SELECT COUNT(*)"):
+            self._one = (0,)
+        elif "to_regclass" in query:
+            self._one = (False,)
+        elif query.startswith("INSERT"):
+            new = {row[0] for row in self.batch} - self.loaded
+            self.loaded |= new
+            self.rowcount = len(new)
+        elif query.startswith("UPDATE"):
+            self.rowcount = 0
+
+    def fetchone(self):
+        return self._one
+
+    def copy_expert(self, query, buffer):
+        self.batch = [line.split("\t") for line in buffer.getvalue().splitlines()]
+        self.copied.extend(self.batch)
+
+
+class FakePool:
+    def __init__(self):
+        self.cur = FakeCursor()
+        self.commits = 0
+
+    @contextmanager
+    def cursor(self):
+        yield self.cur
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def commit(self):
+        self.commits += 1
+
+
+def load(table, text, **kwargs):
+    pool = FakePool()
+    return pool, ingest.load_csv(pool, table, io.StringIO(text), **kwargs)
+
+
+# ---------------- Converters ----------------
+def test_to_int():
+    assert ingest.to_int(" 42 ") == "42"
+    assert ingest.to_int("  ") == COPY_NULL
+    with pytest.raises(ValueError):
+        ingest.to_int("4.5")
+
+
+def test_to_text_escapes_copy_specials():
+    assert ingest.to_text("") == COPY_NULL
+    assert ingest.to_text(" Pune ") == " Pune "
+    assert ingest.to_text("a\tb\\c\nd\re") == "a\\tb\\\\c\\nd\\re"
+
+
+def test_to_date_accepts_iso_and_us_dates():
+    assert ingest.to_date("2025-03-17") == "2025-03-17"
+    assert ingest.to_date("2025-03-17 00:00:00") == "2025-03-17"
+    assert ingest.to_date("3/7/2025") == "2025-03-07"
+    assert ingest.to_date("") == COPY_NULL
+    with pytest.raises(ValueError):
+        ingest.to_date("2/30/2025")
+
+
+def test_to_timestamp():
+    assert ingest.to_timestamp("3/7/2025 8:05") == "2025-03-07 08:05:00"
+    assert ingest.to_timestamp("2025-03-07T18:05:09") == "2025-03-07 18:05:09"
+    assert ingest.to_timestamp("3/7/2025") == "2025-03-07 00:00:00"
+    assert ingest.to_timestamp(" ") == COPY_NULL
+    with pytest.raises(ValueError):
+        ingest.to_timestamp("3/7/2025 24:00")
+
+
+# ---------------- Header Mapping ----------------
+def test_map_header_matches_loosely_and_reports_extras():
+    mapping, ignored = ingest.map_header("claims", ["\ufeffClaim_ID", "Food ID", "STATUS", "Notes"])
+    assert [(index, column) for index, column, _ in mapping] == [(0, "claim_id"), (1, "food_id"), (2, "status")]
+    assert mapping[0][2] is ingest.to_int
+    assert ignored == ["Notes"]
+
+
+def test_map_header_needs_the_primary_key():
+    with pytest.raises(ingest.IngestError, match="claim_id"):
+        ingest.map_header("claims", ["Food_ID", "Status"])
+
+
+# ---------------- Merge SQL ----------------
+def test_merge_sql_skips_existing_ids_and_checks_parents():
+    statements, fk_count = ingest._merge_sql("claims", ["claim_id", "food_id", "status"], "skip")
+    check = "(s.food_id IS NULL OR EXISTS (SELECT 1 FROM food_listings p WHERE p.food_id = s.food_id))"
+    source = (f"(SELECT DISTINCT ON (s.claim_id) s.claim_id, s.food_id, s.status FROM ingest_claims s "
+              f"WHERE {check})")
+    assert statements == [f"INSERT INTO claims (claim_id, food_id, status) SELECT * FROM {source} s "
+                          f"WHERE NOT EXISTS (SELECT 1 FROM claims t WHERE t.claim_id = s.claim_id)"]
+    assert fk_count == f"SELECT COUNT(*) FROM ingest_claims s WHERE NOT ({check})"
+
+
+def test_merge_sql_update_overwrites_existing_ids_first():
+    statements, _ = ingest._merge_sql("providers", ["provider_id", "name", "city"], "update")
+    assert len(statements) == 2
+    assert statements[0].startswith("UPDATE providers t SET name = s.name, city = s.city FROM (SELECT DISTINCT ON")
+    assert statements[0].endswith("WHERE TRUE) s WHERE t.provider_id = s.provider_id")
+    assert statements[1].startswith("INSERT INTO providers")
+    statements, _ = ingest._merge_sql("providers", ["provider_id"], "update")
+    assert [s.split()[0] for s in statements] == ["INSERT"]
+
+
+def test_merge_sql_probes_key_tables_for_ids():
+    keys = {"food_listings": "listing_keys", "claims": "claim_keys"}
+    statements, fk_count = ingest._merge_sql("claims", ["claim_id", "food_id", "receiver_id"], "skip", keys)
+    assert "EXISTS (SELECT 1 FROM listing_keys p WHERE p.food_id = s.food_id)" in fk_count
+    assert "EXISTS (SELECT 1 FROM receivers p WHERE p.receiver_id = s.receiver_id)" in fk_count
+    assert statements[-1].endswith("WHERE NOT EXISTS (SELECT 1 FROM claim_keys t WHERE t.claim_id = s.claim_id)")
+
+
+# ---------------- Loader ----------------
+def test_load_reports_bad_rows_by_line():
+    pool, report = load("food_listings", "Food_ID,Food_Name,Quantity,Expiry_Date,Extra\n"
+                                         "1,Rice,10,3/17/2025,x\n"
+                                         "2,Bread,ten,3/17/2025,x\n"
+                                         ",,,,\n"
+                                         "3,Milk,5,3/40/2025,x\n"
+                                         "4,Tea\\Chai,7,2025-03-18,x\n")
+    assert (report.rows_read, report.rows_loaded, report.bad_rows, report.duplicates) == (4, 2, 2, 0)
+    assert [line for line, _ in report.errors] == [3, 5]
+    assert report.ignored_columns == ["Extra"]
+    assert pool.cur.copied == [["1", "Rice", "10", "2025-03-17"], ["4", "Tea\\\\Chai", "7", "2025-03-18"]]
+
+
+def test_blank_id_is_a_bad_row():
+    pool, report = load("providers", "Provider_ID,Name\n1,Annapurna\n ,Nameless\n2,Roti Bank\n")
+    assert (report.rows_loaded, report.bad_rows) == (2, 1)
+    assert report.errors == [(3, "provider_id is blank")]
+    assert [row[0] for row in pool.cur.copied] == ["1", "2"]
+
+
+def test_load_stages_in_batches_and_counts_duplicates():
+    rows = "".join(f"{i % 7},name {i}\n" for i in range(20))
+    progress = []
+    _, report = load("receivers", "Receiver_ID,Name\n" + rows, batch_rows=8, progress=progress.append)
+    assert report.batches == 3
+    assert (report.rows_read, report.rows_loaded, report.duplicates) == (20, 7, 13)
+    assert len(progress) == 3
+
+
+def test_each_full_batch_is_committed_unless_single_transaction():
+    rows = "Receiver_ID,Name\n" + "".join(f"{i},name {i}\n" for i in range(20))
+    pool, _ = load("receivers", rows, batch_rows=8)
+    assert pool.commits == 2                     # the last, partial batch commits with the connection
+    assert pool.cur.statements[-1] == "DROP TABLE ingest_receivers"
+    pool, report = load("receivers", rows, batch_rows=8, single_transaction=True)
+    assert pool.commits == 0
+    assert report.rows_loaded == 20
+
+
+def test_load_fills_missing_trailing_fields_with_null():
+    pool, report = load("providers", "Provider_ID,Name,City\n1,Annapurna\n")
+    assert report.bad_rows == 0
+    assert pool.cur.copied == [["1", "Annapurna", COPY_NULL]]
+
+
+@pytest.mark.parametrize("table, text, kwargs", [
+    ("users", "id\n1\n", {}),
+    ("providers", "Provider_ID\n1\n", {"on_conflict": "replace"}),
+    ("providers", "", {}),
+])
+def test_load_rejects_bad_requests(table, text, kwargs):
+    with pytest.raises(ingest.IngestError):
+        load(table, text, **kwargs)
+
+
+def test_load_claims_reserves_each_row(monkeypatch):
+    batches = []
+
+    def reserve_many(pool, claims):
+        batches.append(claims)
+        return [ingest.reservations.ReservationError(f"only 1 unit(s) left on listing {c['food_id']}")
+                if c["quantity"] > 1 else ingest.reservations.Reservation(1, c["food_id"], c["quantity"], 0)
+                for c in claims]
+
+    monkeypatch.setattr(ingest.reservations, "reserve_many", reserve_many)
+    report = ingest.load_claims(None, io.StringIO(
+        "Claim_ID,Food_ID,Receiver_ID,Status,Timestamp,Quantity\n"
+        "1,10,5,Pending,3/5/2025 5:26,\n"
+        "2,11,5,Completed,,3\n"
+        "3,,5,Pending,,\n"
+        "4,12,6,Done,,\n"
+        "\n"
+        "5,13,7,,,1\n"), batch_rows=2)
+    assert batches == [
+        [{"food_id": 10, "receiver_id": 5, "quantity": 1, "status": "Pending",
+          "timestamp": ingest.datetime(2025, 3, 5, 5, 26)},
+         {"food_id": 11, "receiver_id": 5, "quantity": 3, "status": "Completed", "timestamp": None}],
+        [{"food_id": 13, "receiver_id": 7, "quantity": 1, "status": "Pending", "timestamp": None}],
+    ]
+    assert (report.rows_read, report.rows_loaded, report.bad_rows, report.refused) == (5, 2, 2, 1)
+    assert report.errors == [(3, "only 1 unit(s) left on listing 11"), (4, "food_id is blank"),
+                             (5, "unknown status 'Done'")]
+    assert "1 refused" in report.summary()
+
+
+def test_load_claims_needs_listing_and_receiver_columns():
+    with pytest.raises(ingest.IngestError, match="food_id and receiver_id"):
+        ingest.load_claims(None, io.StringIO("Claim_ID,Food_ID\n1,2\n"))
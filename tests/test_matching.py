@@ -0,0 +1,144 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import matching
+
+TODAY = date(2025, 3, 17)
+CITIES = ["Pune", "Delhi", "Agra", "Kochi"]
+CAPACITY = {"NGO": 60, "Shelter": 25, "Individual": 5}
+
+
+def make_inputs(listings=300, receivers=40, seed=3):
+    rng = np.random.default_rng(seed)
+    listing_frame = pd.DataFrame({
+        "food_id": rng.permutation(np.arange(1, listings + 1)),
+        "quantity": rng.integers(0, 40, listings),
+        "expiry_date": [TODAY + timedelta(days=int(d)) for d in rng.integers(0, 12, listings)],
+        "city": rng.choice(CITIES + ["Nowhere"], listings),
+    })
+    receiver_frame = pd.DataFrame({
+        "receiver_id": rng.permutation(np.arange(1, receivers + 1)),
+        "type": rng.choice(["NGO", "Shelter", "Individual", "Club"], receivers),
+        "city": rng.choice(CITIES, receivers),
+        "pending_quantity": rng.integers(0, 20, receivers),
+    })
+    return listing_frame, receiver_frame
+
+
+def capacities(receivers):
+    return {row.receiver_id: max(CAPACITY.get(row.type, matching.DEFAULT_CAPACITY) - row.pending_quantity, 0)
+            for row in receivers.itertuples()}
+
+
+def brute_force(listings, receivers, order):
+    """The allocation rules spelled out with plain loops: whole listings, receivers in the listing's city."""
+    room = capacities(receivers)
+    city_of = dict(zip(receivers["receiver_id"], receivers["city"]))
+    rows = list(listings.itertuples(index=False))
+    if order == "fcfs":
+        rows.sort(key=lambda r: r.food_id)
+    else:
+        qmax = max(1, int(listings["quantity"].max()))
+        days = {r.food_id: (r.expiry_date - TODAY).days for r in rows}
+        rows.sort(key=lambda r: (days[r.food_id], -(r.quantity / qmax / max(days[r.food_id], 1))))
+    out = []
+    for r in rows:
+        if r.quantity <= 0:
+            continue
+        local = sorted(rid for rid in room if city_of[rid] == r.city and room[rid] > 0)
+        if order == "fcfs":
+            fits = [rid for rid in local if room[rid] >= r.quantity]
+            chosen = fits[0] if fits else None
+        else:
+            best = min(local, key=lambda rid: (-room[rid], rid), default=None)
+            chosen = best if best is not None and room[best] >= r.quantity else None
+        if chosen is not None:
+            room[chosen] -= r.quantity
+            out.append((r.food_id, chosen, r.quantity))
+    return out
+
+
+def allocated(allocation):
+    return list(zip(allocation.food_ids.tolist(), allocation.receiver_ids.tolist(), allocation.quantities.tolist()))
+
+
+@pytest.mark.parametrize("order", ["fcfs", "priority"])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_allocation_matches_brute_force(order, seed):
+    listings, receivers = make_inputs(seed=seed)
+    allocation = matching.allocate(listings, receivers, TODAY, order, CAPACITY)
+    assert allocation.complete
+    assert allocated(allocation) == brute_force(listings, receivers, order)
+
+
+def test_receivers_never_exceed_capacity():
+    listings, receivers = make_inputs(listings=2000)
+    room = capacities(receivers)
+    for order in ("fcfs", "priority"):
+        frame = matching.allocate(listings, receivers, TODAY, order, CAPACITY).frame()
+        taken = frame.groupby("receiver_id")["quantity"].sum()
+        assert all(taken[rid] <= room[rid] for rid in taken.index)
+        assert frame["food_id"].is_unique
+
+
+def test_listings_without_a_receiver_in_town_are_not_considered():
+    listings, receivers = make_inputs()
+    allocation = matching.allocate(listings, receivers, TODAY, "fcfs", CAPACITY)
+    served = set(receivers["city"])
+    assert allocation.considered == int((listings["city"].isin(served) & (listings["quantity"] > 0)).sum())
+
+
+def test_time_budget_stops_the_pass():
+    listings, receivers = make_inputs()
+    ticks = iter(range(0, 1000, 100))
+    allocation = matching.allocate(listings, receivers, TODAY, "fcfs", CAPACITY, time_budget=50,
+                                   clock=lambda: next(ticks))
+    assert not allocation.complete
+    assert len(allocation) == 0
+
+
+def test_first_fit_tree_takes_from_the_first_receiver_with_room():
+    rng = np.random.default_rng(5)
+    room = rng.integers(0, 30, 37).tolist()
+    tree = matching._FirstFit(list(range(100, 137)), list(room))
+    for need in rng.integers(1, 35, 200).tolist():
+        first = next((i for i, r in enumerate(room) if r >= need), None)
+        assert tree.take(need) == (None if first is None else 100 + first)
+        if first is not None:
+            room[first] -= need
+    assert tree.tree[1] == max(room)
+
+
+def test_match_shares_one_time_budget():
+    listings, receivers = make_inputs()
+    report = matching.match(listings, receivers, TODAY, capacity_by_type=CAPACITY, time_budget=-1)
+    assert not report.allocation.complete and not report.baseline.complete
+    assert report.summary().endswith("; baseline cut short by the time budget)")
+    assert matching.match(listings, receivers, TODAY, capacity_by_type=CAPACITY, time_budget=None).baseline.complete
+
+
+def test_wasted_quantity_counts_unmatched_listings_in_the_horizon():
+    listings = pd.DataFrame({"food_id": [1, 2, 3, 4], "quantity": [5, 7, 11, 13],
+                             "expiry_date": [TODAY, TODAY + timedelta(days=3), TODAY + timedelta(days=9),
+                                             TODAY - timedelta(days=1)],
+                             "city": ["Pune"] * 4})
+    allocation = matching.Allocation("fcfs")
+    allocation.food_ids = np.array([1])
+    assert matching.wasted_quantity(listings, allocation, TODAY, horizon_days=7) == 7
+
+
+def test_match_reports_waste_against_the_baseline():
+    listings, receivers = make_inputs()
+    report = matching.match(listings, receivers, TODAY, capacity_by_type=CAPACITY)
+    assert report.waste_avoided == report.wasted_fcfs - report.wasted
+    assert allocated(report.baseline) == brute_force(listings, receivers, "fcfs")
+    assert f"({report.waste_avoided:,} avoided)" in report.summary()
+
+
+def test_unknown_order():
+    listings, receivers = make_inputs()
+    with pytest.raises(ValueError):
+        matching.allocate(listings, receivers, TODAY, "random")
@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+import pagination
+
+COLUMNS = ["provider_id", "name", "city"]
+ROWS = [(i, f"p{i}", [None, "Pune", "Delhi", "Agra", "Delhi"][i % 5]) for i in range(1, 38)]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE providers (provider_id INTEGER PRIMARY KEY, name TEXT, city TEXT)")
+    conn.executemany("INSERT INTO providers VALUES (?, ?, ?)", ROWS)
+    yield conn
+    conn.close()
+
+
+def fetch_page(conn, sql, params, page_size):
+    """``pagination.fetch_page`` on sqlite (qmark placeholders, no server-side cursor)."""
+    cur = conn.execute(sql.replace("%s", "?"), params)
+    rows = cur.fetchall()
+    return [d[0] for d in cur.description], rows[:page_size], len(rows) > page_size
+
+
+def all_pages(conn, sort_by, descending, page_size, start_id=None):
+    pages, after = [], None
+    while True:
+        sql, params = pagination.build_page_query("providers", COLUMNS, sort_by, descending, after, page_size,
+                                                  start_id)
+        columns, rows, has_next = fetch_page(conn, sql, params, page_size)
+        pages.append(rows)
+        if not has_next:
+            return pages
+        after = pagination.page_key("providers", columns, rows[-1], sort_by)
+
+
+def expected(sort_by, descending):
+    index = COLUMNS.index(sort_by)
+    present = sorted((r for r in ROWS if r[index] is not None), key=lambda r: (r[index], r[0]), reverse=descending)
+    missing = sorted((r for r in ROWS if r[index] is None), key=lambda r: r[0], reverse=descending)
+    return present + missing                                   # NULLs last in both directions
+
+
+@pytest.mark.parametrize("sort_by", ["provider_id", "city"])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [5, 10, 37, 50])
+def test_pages_cover_every_row_once_in_order(conn, sort_by, descending, page_size):
+    pages = all_pages(conn, sort_by, descending, page_size)
+    assert [row for page in pages for row in page] == expected(sort_by, descending)
+    assert all(len(page) == page_size for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= page_size
+    assert len(pages) == -(-len(ROWS) // page_size)
+
+
+def test_start_id_jumps_in_key_order(conn):
+    pages = all_pages(conn, "provider_id", False, 10, start_id=30)
+    assert [row[0] for page in pages for row in page] == list(range(30, 38))
+    pages = all_pages(conn, "provider_id", True, 10, start_id=12)
+    assert [row[0] for page in pages for row in page] == list(range(12, 0, -1))
+
+
+def test_rejects_unknown_table_and_column():
+    with pytest.raises(ValueError):
+        pagination.build_page_query("users", COLUMNS)
+    with pytest.raises(ValueError):
+        pagination.build_page_query("providers", COLUMNS, sort_by="password")
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from parallel import QueryExecutor, QueryTimeout, SessionLimit
+
+
+class FakePool:
+    """Records cancel() calls and releases whatever the cancelled thread is blocked on."""
+
+    def __init__(self):
+        self.cancelled = []
+        self.release = threading.Event()
+
+    def cancel(self, thread):
+        self.cancelled.append(thread)
+        self.release.set()
+        return 1
+
+
+@pytest.fixture
+def pool():
+    return FakePool()
+
+
+@pytest.fixture
+def executor(pool):
+    executor = QueryExecutor(pool, workers=8, timeout=5)
+    yield executor
+    executor.shutdown()
+
+
+def fail():
+    raise ValueError("relation \"nope\" does not exist")
+
+
+def test_results_and_errors_are_reported_per_task(executor):
+    error = ValueError("boom")
+
+    def raise_it():
+        raise error
+
+    results = {name: (result, err) for name, result, err in
+               executor.run({"a": lambda: 1, "b": raise_it, "c": lambda: "three"})}
+    assert results == {"a": (1, None), "b": (None, error), "c": ("three", None)}
+
+
+def test_run_all_raises_the_first_error(executor):
+    assert executor.run_all({"a": lambda: 1, "b": lambda: 2}) == {"a": 1, "b": 2}
+    with pytest.raises(ValueError, match="nope"):
+        executor.run_all({"a": lambda: 1, "b": fail})
+
+
+def test_session_limit_caps_concurrency(executor):
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def task(i):
+        def run():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return i
+        return run
+
+    results = executor.run_all({i: task(i) for i in range(7)}, limit=SessionLimit(2))
+    assert results == {i: i for i in range(7)}
+    assert peak[0] == 2
+
+
+def test_tasks_wait_for_slots_an_earlier_batch_holds(executor):
+    limit = SessionLimit(1)
+    assert limit.acquire()                    # a query from an interrupted rerun, still running
+    threading.Timer(0.05, limit.release).start()
+    assert executor.run_all({"a": lambda: 1}, limit=limit) == {"a": 1}
+
+    assert limit.acquire()
+    started = []
+    outcome = list(executor.run({"a": lambda: started.append("a")}, limit=limit, timeout=0.05))
+    assert started == []
+    assert [(name, type(error)) for name, _, error in outcome] == [("a", QueryTimeout)]
+    limit.release()
+
+
+def test_deadline_cancels_running_queries_on_the_server(executor, pool):
+    threads = []
+
+    def slow():
+        threads.append(threading.get_ident())
+        pool.release.wait(5)
+        return "late"
+
+    outcome = list(executor.run({"slow": slow, "fast": lambda: 1}, timeout=0.1))
+    assert outcome[0] == ("fast", 1, None)
+    name, result, error = outcome[1]
+    assert (name, result, type(error)) == ("slow", None, QueryTimeout)
+    assert pool.cancelled == threads
+
+
+def test_wrap_is_applied_to_every_task(pool):
+    wrapped = []
+
+    def wrap(fn):
+        wrapped.append(fn)
+        return lambda: ("wrapped", fn())
+
+    executor = QueryExecutor(pool, workers=2, wrap=wrap)
+    try:
+        assert executor.run_all({"a": lambda: 1}) == {"a": ("wrapped", 1)}
+    finally:
+        executor.shutdown()
+    assert len(wrapped) == 1
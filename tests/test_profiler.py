@@ -0,0 +1,47 @@
+import json
+
+from profiler import QueryProfiler
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_profiler():
+    clock = Clock()
+    profiler = QueryProfiler(window=600, slow_ms=0, clock=clock)
+    for page, ms in (("Dashboard", 10), ("EDA", 20), ("Dashboard", 30)):
+        profiler.record("SELECT * FROM providers", page=page, total_ms=ms)
+        clock.now += 100
+    return profiler, clock
+
+
+def test_window_and_retention():
+    profiler, clock = make_profiler()
+    assert [s["total_ms"] for s in profiler.samples()] == [10, 20, 30]
+    assert [s["total_ms"] for s in profiler.samples(window=150)] == [30]
+    clock.now += 450
+    assert [s["total_ms"] for s in profiler.samples()] == [30]
+
+
+def test_since_hides_earlier_samples_without_dropping_them():
+    profiler, _ = make_profiler()
+    since = 1100.0
+    assert [s["total_ms"] for s in profiler.samples(since=since)] == [20, 30]
+    assert [p["statements"] for p in profiler.page_summary(since=since)] == [1, 1]
+    assert profiler.summary("Dashboard", since=since)[0]["calls"] == 1
+    assert profiler.summary("Dashboard")[0]["calls"] == 2
+    assert len(json.loads(profiler.export_json(since=1300.0))["samples"]) == 0
+    assert profiler.export_csv(since=since).count("\n") == 3
+
+
+def test_slow_plans_since():
+    profiler, _ = make_profiler()
+    profiler.plans.appendleft({"at": 1250.0, "query": "b"})
+    profiler.plans.append({"at": 1050.0, "query": "a"})
+    assert [p["query"] for p in profiler.slow_plans()] == ["b", "a"]
+    assert [p["query"] for p in profiler.slow_plans(1100.0)] == ["b"]
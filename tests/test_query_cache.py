@@ -0,0 +1,175 @@
+import numpy as np
+import pytest
+
+from query_cache import QueryCache, normalize_sql, tables_read, tables_written
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Blob:
+    """A cached value whose size frame_size() reads like a DataFrame's."""
+
+    def __init__(self, name, size=100):
+        self.name = name
+        self.size = size
+
+    def memory_usage(self, index=True, deep=True):
+        return np.array([self.size])
+
+
+def load(cache, query, value, params=None, **kwargs):
+    calls = []
+
+    def loader():
+        calls.append(query)
+        return value
+
+    return cache.get_or_load(query, params, loader, **kwargs), bool(calls)
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT *\n  FROM  claims -- all of them\n;") == "SELECT * FROM claims"
+    assert normalize_sql("SELECT /* ids */ claim_id FROM claims;;") == "SELECT claim_id FROM claims"
+    # text inside quotes is part of the statement, not a comment or whitespace to collapse
+    assert normalize_sql("SELECT * FROM claims WHERE status = 'a--b'") != normalize_sql(
+        "SELECT * FROM claims WHERE status = 'a--c'")
+    assert normalize_sql("SELECT 'two  spaces' /* x */") == "SELECT 'two  spaces'"
+
+
+def test_tables_read_and_written():
+    query = "SELECT * FROM public.claims c JOIN food_listings f ON f.food_id = c.food_id"
+    assert tables_read(query) == {"claims", "food_listings"}
+    assert tables_written("  insert into claims (food_id) values (1)") == {"claims"}
+    assert tables_written("UPDATE public.providers SET city = 'x'") == {"providers"}
+    assert tables_written("DELETE FROM receivers WHERE receiver_id = 1") == {"receivers"}
+    assert tables_written("TRUNCATE TABLE food_listings") == {"food_listings"}
+    assert tables_written("SELECT * FROM claims") == set()
+
+
+def test_tables_in_from_lists_ctes_and_literals():
+    assert tables_read("SELECT * FROM claims c, food_listings AS f, providers WHERE 1 = 1") == {
+        "claims", "food_listings", "providers"}
+    assert tables_read("SELECT 'from receivers' FROM claims") == {"claims"}
+    assert tables_written("WITH moved AS (DELETE FROM claims RETURNING *) "
+                          "INSERT INTO claims_archive SELECT * FROM moved") == {"claims", "claims_archive"}
+    assert tables_written("WITH c AS (SELECT * FROM claims FOR UPDATE SKIP LOCKED) SELECT * FROM c") == set()
+    assert tables_written("UPDATE claims SET status = 'delete from providers'") == {"claims"}
+
+
+def test_hit_until_ttl_expires():
+    clock = Clock()
+    cache = QueryCache(default_ttl=10, clock=clock)
+    first = Blob("first")
+    assert load(cache, "SELECT * FROM claims", first) == (first, True)
+    clock.now = 9.9
+    assert load(cache, "SELECT *  FROM claims;", Blob("second")) == (first, False)
+    clock.now = 10
+    second = Blob("second")
+    assert load(cache, "SELECT * FROM claims", second) == (second, True)
+
+
+def test_params_are_part_of_the_key():
+    cache = QueryCache(clock=Clock())
+    query = "SELECT * FROM claims WHERE status = %(status)s AND food_id = %(food_id)s"
+    load(cache, query, Blob("a"), {"status": "Pending", "food_id": 1})
+    assert load(cache, query, Blob("b"), {"food_id": 1, "status": "Pending"})[1] is False
+    assert load(cache, query, Blob("c"), {"food_id": 2, "status": "Pending"})[1] is True
+
+
+def test_ttl_zero_bypasses_the_cache():
+    cache = QueryCache(clock=Clock())
+    load(cache, "SELECT * FROM claims", Blob("a"), ttl=0)
+    assert len(cache) == 0
+    assert load(cache, "SELECT * FROM claims", Blob("b"), ttl=0)[1] is True
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = QueryCache(max_bytes=300, clock=Clock())
+    for table in ("a", "b", "c"):
+        load(cache, f"SELECT * FROM {table}", Blob(table))
+    load(cache, "SELECT * FROM a", Blob("a"))                  # a is now the most recent
+    load(cache, "SELECT * FROM d", Blob("d"))
+    assert cache.bytes_used == 300
+    assert cache.evictions == 1
+    assert load(cache, "SELECT * FROM a", Blob("a"))[1] is False
+    assert load(cache, "SELECT * FROM b", Blob("b"))[1] is True
+
+
+def test_oversized_results_are_not_cached():
+    cache = QueryCache(max_bytes=50, clock=Clock())
+    load(cache, "SELECT * FROM claims", Blob("big"))
+    assert len(cache) == 0
+    assert cache.bytes_used == 0
+
+
+def test_write_drops_only_results_reading_the_table():
+    cache = QueryCache(clock=Clock())
+    load(cache, "SELECT * FROM claims", Blob("claims"))
+    load(cache, "SELECT * FROM claims c JOIN food_listings f ON f.food_id = c.food_id", Blob("both"))
+    load(cache, "SELECT * FROM providers", Blob("providers"))
+    assert cache.invalidate_for("UPDATE food_listings SET quantity = 1") == {"food_listings"}
+    assert len(cache) == 2
+    assert cache.invalidations == 1
+    cache.invalidate(["public.claims"])
+    assert len(cache) == 1
+    assert load(cache, "SELECT * FROM providers", Blob("providers"))[1] is False
+
+
+def test_page_stats():
+    cache = QueryCache(clock=Clock())
+    load(cache, "SELECT * FROM claims", Blob("a"), page="Dashboard")
+    load(cache, "SELECT * FROM claims", Blob("a"), page="Dashboard")
+    load(cache, "SELECT * FROM claims", Blob("a"), page="EDA")
+    assert cache.stats("Dashboard") == {"hits": 1, "misses": 1}
+    totals = cache.stats()
+    assert (totals["hits"], totals["misses"], totals["entries"], totals["bytes"]) == (2, 1, 1, 100)
+
+
+def test_clear():
+    cache = QueryCache(clock=Clock())
+    load(cache, "SELECT * FROM claims", Blob("a"))
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.bytes_used == 0
+
+
+@pytest.mark.parametrize("query", ["SELECT * FROM claims", "SELECT 1"])
+def test_loader_errors_are_not_cached(query):
+    cache = QueryCache(clock=Clock())
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load(query, None, fail)
+    assert len(cache) == 0
+
+
+def test_load_that_raced_a_write_is_not_cached():
+    cache = QueryCache(clock=Clock())
+
+    def loader():
+        cache.invalidate_for("DELETE FROM claims WHERE claim_id = 1")   # a write lands mid-load
+        return Blob("stale")
+
+    cache.get_or_load("SELECT * FROM claims", None, loader)
+    assert len(cache) == 0
+    load(cache, "SELECT * FROM claims", Blob("fresh"))
+    assert len(cache) == 1
+
+
+def test_clear_discards_loads_in_flight():
+    cache = QueryCache(clock=Clock())
+
+    def loader():
+        cache.clear()
+        return Blob("stale")
+
+    cache.get_or_load("SELECT * FROM providers", None, loader)
+    assert len(cache) == 0
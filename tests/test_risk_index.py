@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import eda
+from risk_index import RiskIndex
+
+TODAY = date(2025, 3, 17)
+CITIES = ["Pune", "Delhi", "Agra", "Unknown"]
+
+
+def make_rows(n=400, seed=7):
+    """LISTING_ROWS_SQL rows: food_id, food_name, quantity, expiry_date, provider_id, city, claimed."""
+    rng = np.random.default_rng(seed)
+    return [(food_id, f"food {food_id % 23}", int(rng.integers(1, 200)),
+             TODAY + timedelta(days=int(rng.integers(-3, 40))), int(rng.integers(1, 50)),
+             CITIES[int(rng.integers(len(CITIES)))], False)
+            for food_id in range(1, n + 1)]
+
+
+def pandas_result(rows, city=None, today=TODAY):
+    """What the EDA page's pandas path computes over the same listings."""
+    listings = pd.DataFrame([row[:6] for row in rows],
+                            columns=["food_id", "food_name", "quantity", "expiry_date", "provider_id", "city"])
+    listings["expiry_date"] = pd.to_datetime(listings["expiry_date"])
+    claims = pd.DataFrame(columns=["claim_id", "food_id", "receiver_id", "status", "timestamp", "food_name",
+                                   "quantity", "expiry_date", "city"])
+    return eda.pandas_aggregates(lambda query: claims if "FROM claims" in query else listings,
+                                 city=city, today=today)
+
+
+def build(rows, today=TODAY):
+    index = RiskIndex(today=today)
+    index.build(rows, today=today)
+    return index
+
+
+def assert_same_ranking(ours, theirs):
+    """Equal scores in the same order; ties on the last score may be cut differently."""
+    assert ours["risk_score"].tolist() == theirs["risk_score"].tolist()
+    last = ours["risk_score"].iloc[-1]
+    assert set(ours.loc[ours["risk_score"] > last, "food_id"]) == set(theirs.loc[theirs["risk_score"] > last,
+                                                                               "food_id"])
+
+
+@pytest.mark.parametrize("city", [None, "Pune", "Unknown"])
+def test_top_k_matches_the_pandas_path(city):
+    rows = make_rows()
+    expected = pandas_result(rows, city)["risk"]
+    ours = build(rows).top_k(eda.TOP_N, city=city, today=TODAY)
+    assert list(ours.columns) == list(expected.columns)
+    assert_same_ranking(ours, expected)
+
+
+@pytest.mark.parametrize("city", [None, "Delhi"])
+def test_expiring_matches_the_pandas_path(city):
+    rows = make_rows()
+    expected = pandas_result(rows, city)["near_expiry"]
+    ours = build(rows).expiring(eda.NEAR_EXPIRY_DAYS, city=city, today=TODAY)
+
+    def key(df):
+        return sorted(zip(df["days_left"], -df["quantity"], df["food_id"]))
+
+    assert key(ours) == key(expected)
+    assert ours["days_left"].is_monotonic_increasing
+
+
+def test_unknown_city_is_empty():
+    index = build(make_rows())
+    assert index.top_k(5, city="Atlantis", today=TODAY).empty
+    assert index.expiring(7, city="Atlantis", today=TODAY).empty
+
+
+def test_updates_match_a_rebuild():
+    rows = make_rows()
+    index = build(rows)
+    changed = {row[0]: row for row in rows}
+    updates = [(5, "food 5", 500, TODAY, 3, "Pune", False),           # new largest quantity
+               (6, "food 6", 20, TODAY + timedelta(days=2), 4, "Agra", True),    # collected
+               (7, "food 7", 40, TODAY + timedelta(days=3), 4, "Lucknow", False),  # new city
+               (401, "new", 150, TODAY + timedelta(days=1), 9, "Delhi", False)]
+    index.upsert(updates)
+    index.delete([8, 9])
+    changed.update((row[0], row) for row in updates)
+    del changed[8], changed[9]
+    fresh = build(list(changed.values()))
+    for city in (None, "Pune", "Agra", "Lucknow"):
+        pd.testing.assert_frame_equal(index.top_k(15, city=city, today=TODAY), fresh.top_k(15, city=city, today=TODAY))
+        pd.testing.assert_frame_equal(index.expiring(10, city=city, today=TODAY),
+                                      fresh.expiring(10, city=city, today=TODAY))
+    assert 6 not in set(index.top_k(len(changed), today=TODAY)["food_id"])
+    assert 6 in set(index.expiring(10, today=TODAY)["food_id"])
+
+
+@pytest.mark.parametrize("days", [4, -2])
+def test_day_roll_matches_a_rebuild(days):
+    rows = make_rows()
+    index = build(rows)
+    later = TODAY + timedelta(days=days)
+    pd.testing.assert_frame_equal(index.top_k(25, today=later), build(rows, today=later).top_k(25, today=later))
+    assert_same_ranking(index.top_k(eda.TOP_N, today=later), pandas_result(rows, today=later)["risk"])
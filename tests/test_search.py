@@ -0,0 +1,112 @@
+import re
+
+import pytest
+
+import search
+
+
+class FakePool:
+    """Answers search.py's three statements from canned candidates/values and in-memory rows."""
+
+    def __init__(self, candidates, values, rows, pg_trgm=True):
+        self.pg_trgm = pg_trgm
+        self.candidates = candidates      # [(term, word, score)]
+        self.values = values              # [(table, field, value, score)]
+        self.rows = rows                  # {(table, field): [(id, value)]}
+        self.params = {}
+        self.queries = []
+
+    def fetch(self, query, params=None):
+        self.queries.append(query)
+        if query.startswith("SELECT to_regclass('idx_search_words_trgm')"):
+            return ["exists"], [(self.pg_trgm,)]
+        if query in (search.CANDIDATES_SQL, search.FALLBACK_CANDIDATES_SQL):
+            return ["term", "word", "score"], self.candidates
+        if query is search.VALUES_SQL:
+            self.params = params
+            return ["table_name", "field", "value", "score"], self.values
+        table = re.search(r"FROM (\w+)", query).group(1)
+        field = re.search(r"WHERE (\w+) =", query).group(1)
+        matching = sorted(row_id for row_id, value in self.rows[table, field]
+                          if value == params["value"] and row_id > params["after"])
+        return ["id", "title", "detail"], [(row_id, f"{table} {row_id}", "") for row_id in matching][:params["limit"]]
+
+
+def test_edit_similarity():
+    assert search.edit_similarity("rice", "rice") == 1
+    assert search.edit_similarity("chiken", "chicken") == pytest.approx(1 - 1 / 7)
+    assert search.edit_similarity("jonson", "johnson") == search.edit_similarity("johnson", "jonson")
+    assert search.edit_similarity("", "") == 1
+    assert search.edit_similarity("", "abc") == 0
+    assert search.edit_similarity("kitten", "sitting") == pytest.approx(1 - 3 / 7)
+
+
+def test_cursor():
+    assert search._cursor(None) == (0, 0)
+    assert search._cursor("3:17") == (3, 17)
+    with pytest.raises(ValueError, match="not a search cursor"):
+        search._cursor("page-2")
+
+
+def test_tsquery_quotes_each_word():
+    found = {"it's": [("it's", 1.0)], "b": [("bread", 0.9), ("bun", 0.9)]}
+    assert search._tsquery(found) == "('it''s') & ('bread' | 'bun')"
+
+
+def test_candidates_rank_misspellings_by_edit_distance():
+    pool = FakePool([("chiken", "chicken", 0), ("chiken", "chick", 0), ("rice", "rice", 1.0),
+                     ("rice", "ricebowl", 0.9), ("xyz", None, None)], [], {})
+    found = search.candidates(pool, "chiken rice xyz")
+    assert found["rice"] == [("rice", 1.0), ("ricebowl", 0.9)]
+    assert [word for word, _ in found["chiken"]] == ["chicken", "chick"]
+    assert found["chiken"][0][1] == pytest.approx(0.6 * (1 - 1 / 7))
+    assert found["xyz"] == []
+
+
+@pytest.mark.parametrize("pg_trgm, sql", [(True, search.CANDIDATES_SQL), (False, search.FALLBACK_CANDIDATES_SQL)])
+def test_candidates_use_pg_trgm_when_its_index_exists(pg_trgm, sql):
+    pool = FakePool([("rice", "rice", 1.0)], [], {}, pg_trgm=pg_trgm)
+    assert search.candidates(pool, "rice") == {"rice": [("rice", 1.0)]}
+    search.candidates(pool, "rice")
+    assert pool.queries.count(sql) == 2
+    assert sum(query.startswith("SELECT to_regclass") for query in pool.queries) == 1
+    assert "similarity(" in search.CANDIDATES_SQL and "search_word_trigrams" in search.FALLBACK_CANDIDATES_SQL
+
+
+def test_a_word_nothing_matches_means_no_results():
+    pool = FakePool([("rice", "rice", 1.0), ("xyz", None, None)], [("food_listings", "food_name", "Rice", 1.0)], {})
+    assert search.ranked_values(pool, "rice xyz") == []
+    assert pool.params == {}
+
+
+def test_strong_query_only_when_every_word_has_a_close_match():
+    pool = FakePool([("ri", "rice", 0.9), ("chiken", "chicken", 0)], [], {})
+    search.ranked_values(pool, "ri chiken", tables=["food_listings"])
+    assert pool.params["strong"] is None
+    assert pool.params["tsquery"] == "('rice') & ('chicken')"
+    assert pool.params["tables"] == ["food_listings"]
+    assert pool.params["weight_fields"] == ["food_name"]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 50])
+def test_pages_list_every_row_once(limit):
+    values = [("food_listings", "food_name", "Rice", 1.0), ("providers", "city", "Rice Town", 0.8),
+              ("food_listings", "food_name", "Rice Bowl", 0.7)]
+    rows = {("food_listings", "food_name"): [(4, "Rice"), (9, "Rice Bowl"), (2, "Rice"), (7, "Rice"), (1, "Bread")],
+            ("providers", "city"): [(3, "Rice Town"), (5, "Rice Town")]}
+    pool = FakePool([("rice", "rice", 1.0)], values, rows)
+    seen, after = [], None
+    while True:
+        items, after = search.search(pool, "rice", limit=limit, after=after)
+        assert len(items) <= limit
+        seen += [(item["table"], item["id"]) for item in items]
+        if after is None:
+            break
+        assert len(items) == limit
+    assert seen == [("food_listings", 2), ("food_listings", 4), ("food_listings", 7),
+                    ("providers", 3), ("providers", 5), ("food_listings", 9)]
+
+
+def test_blank_query_searches_nothing():
+    pool = FakePool([], [], {})
+    assert search.search(pool, "   ") == ([], None)
@@ -0,0 +1,62 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic
+
+
+@pytest.fixture(scope="module")
+def profile():
+    return synthetic.SeedProfile()
+
+
+def generate(profile, scale, **kwargs):
+    generator = synthetic.Generator(scale, profile=profile, **kwargs)
+    return generator, {table: pd.concat(list(generator.frames(table)), ignore_index=True)
+                       for table in ("providers", "receivers", "food_listings", "claims")}
+
+
+def test_row_counts_follow_the_scale(profile):
+    generator, frames = generate(profile, 2.5)
+    for table, frame in frames.items():
+        assert len(frame) == round(profile.sizes[table] * 2.5) == generator.counts[table]
+        pk = frame.columns[0]
+        assert frame[pk].tolist() == list(range(1, len(frame) + 1))
+    assert synthetic.Generator(0.0001, profile=profile).counts["providers"] == 1
+
+
+def test_same_seed_same_data(profile):
+    _, first = generate(profile, 0.5)
+    _, second = generate(profile, 0.5)
+    for table in first:
+        pd.testing.assert_frame_equal(first[table], second[table])
+    _, other = generate(profile, 0.5, seed=1)
+    assert not first["claims"].equals(other["claims"])
+
+
+def test_references_and_provider_attributes_are_consistent(profile):
+    _, frames = generate(profile, 1)
+    providers, listings, claims = frames["providers"], frames["food_listings"], frames["claims"]
+    assert listings["provider_id"].between(1, len(providers)).all()
+    assert claims["food_id"].between(1, len(listings)).all()
+    assert claims["receiver_id"].between(1, len(frames["receivers"])).all()
+    joined = listings.merge(providers, on="provider_id")
+    assert (joined["provider_type"] == joined["type"]).all()
+    assert (joined["location"] == joined["city"]).all()
+
+
+def test_values_come_from_the_seed_files(profile):
+    _, frames = generate(profile, 1)
+    assert set(frames["providers"]["city"]) <= set(profile.provider_city[0])
+    assert set(frames["food_listings"]["food_name"]) <= set(profile.food_name[0])
+    assert set(frames["claims"]["status"]) <= set(profile.status[0])
+
+
+def test_anchor_moves_the_calendar(profile):
+    anchor = date(2030, 1, 1)
+    _, frames = generate(profile, 1, anchor=anchor)
+    expiry = pd.to_datetime(frames["food_listings"]["expiry_date"])
+    span = (profile.expiry_offset[0].min(), profile.expiry_offset[0].max())
+    assert expiry.min() >= pd.Timestamp(anchor) + pd.Timedelta(days=int(span[0]))
+    assert expiry.max() <= pd.Timestamp(anchor) + pd.Timedelta(days=int(span[1]))
@@ -0,0 +1,23 @@
+"""The app's pages, one module each, imported the first time they are shown.
+
+App.py draws the menu from ``PAGES`` and calls ``render`` with the choice;
+only that page's module (and the modules it needs, e.g. plotly for charts)
+is imported, once per server process. Every rerun after that calls the
+page's ``render()`` again.
+"""
+import importlib
+
+PAGES = {
+    "Dashboard": "views.dashboard",
+    "Main Dashboard": "views.main_dashboard",
+    "Search": "views.search",
+    "View Tables": "views.tables",
+    "Add/Update/Delete Data": "views.manage",
+    "Run Queries": "views.queries",
+    "EDA & Predictions": "views.predictions",
+    "Query Profile": "views.query_profile",
+}
+
+
+def render(page):
+    importlib.import_module(PAGES[page]).render()
@@ -0,0 +1,124 @@
+import time
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import change_feed
+import chart_data
+from views import shared
+from views.shared import load_many, show_chart
+
+
+@st.fragment(run_every=change_feed.LIVE_REFRESH)
+def live_kpis():
+    """The Dashboard KPIs from the change feed; redrawn on a timer without a query or a full rerun."""
+    kpi_feed = shared.kpi_feed
+    kpis = kpi_feed.kpis()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("🍲 Total Listings", kpis["listings"])
+    col2.metric("✅ Total Claims", kpis["claims"])
+    col3.metric("📦 Total Food Quantity", kpis["quantity"])
+    col4.metric("🎯 Claimed Quantity", kpis["claimed"])
+    statuses = sorted(kpis["statuses"].items(), key=lambda item: -item[1])
+    st.caption(("🟢 Live" if kpi_feed.ready else "🟠 Reconnecting to the change feed") + " · claims by status: "
+               + " · ".join(f"{status or 'No status'} {count:,}" for status, count in statuses))
+
+
+def render():
+    use_snapshot = shared.use_snapshot()
+    table_snapshot = shared.table_snapshot
+    st.subheader("📊 Food Wastage Insights")
+    # Lay out the KPI metrics and charts first, then fill each in as soon as its data is in.
+    live = not use_snapshot and shared.kpi_feed.ready
+    if live:
+        live_kpis()
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+    chart_col1, chart_col2 = st.columns(2)
+    started = time.perf_counter()
+    if use_snapshot:
+        snap_listings = table_snapshot.frame("food_listings")
+        snap_claims = table_snapshot.frame("claims")
+        # units each claim took, for claims on a listing in the snapshot
+        claim_quantity = snap_claims["quantity"].where(snap_claims["food_id"].isin(snap_listings["food_id"]))
+        receiver_names = table_snapshot.frame("receivers").set_index("receiver_id")["name"]
+        dashboard_data = {
+            "listing_totals": pd.DataFrame({"listings": [len(snap_listings)],
+                                            "quantity": [int(snap_listings["quantity"].sum())]}),
+            "claim_totals": pd.DataFrame({"claims": [len(snap_claims)]}),
+            "claimed": pd.DataFrame({"claimed_qty": [claim_quantity.sum()]}),
+            "food_chart": chart_data.top_n(
+                snap_listings.groupby("food_name", observed=True)["quantity"].sum().reset_index(),
+                "food_name", "quantity"),
+            "receiver_chart": chart_data.top_n(
+                pd.DataFrame({"receiver_name": snap_claims["receiver_id"].map(receiver_names),
+                              "total_claimed": claim_quantity})
+                .dropna().groupby("receiver_name")["total_claimed"].sum().reset_index(),
+                "receiver_name", "total_claimed"),
+        }.items()
+    else:
+        # Claimed Quantity = the units taken by the claims on a listing
+        if shared.aggregates_available():
+            claimed_sql = "SELECT SUM(claimed_quantity) AS claimed_qty FROM mv_claims_by_listing"
+            receiver_totals = """
+                SELECT name AS receiver_name, SUM(claimed_quantity) AS total_claimed
+                FROM mv_receiver_claim_totals
+                WHERE matched_claims > 0
+                GROUP BY name
+            """
+        else:
+            # before migrations/V005 there is no claims.quantity: a claim took the whole listing
+            claim_quantity = "c.quantity" if shared.reservations_available() else "f.quantity"
+            claimed_sql = f"""
+                SELECT SUM({claim_quantity}) AS claimed_qty
+                FROM claims c
+                JOIN food_listings f ON c.food_id = f.food_id
+            """
+            receiver_totals = f"""
+                SELECT r.name AS receiver_name, SUM({claim_quantity}) AS total_claimed
+                FROM claims c
+                JOIN receivers r ON c.receiver_id = r.receiver_id
+                JOIN food_listings f ON c.food_id = f.food_id
+                GROUP BY r.name
+            """
+        dashboard_queries = {
+            "listing_totals": "SELECT COUNT(*) AS listings, COALESCE(SUM(quantity), 0) AS quantity FROM food_listings",
+            "claim_totals": "SELECT COUNT(*) AS claims FROM claims",
+            "claimed": claimed_sql,
+            "food_chart": chart_data.top_n_sql(
+                "SELECT food_name, SUM(quantity) AS quantity FROM food_listings GROUP BY food_name",
+                "food_name", "quantity"),
+            "receiver_chart": chart_data.top_n_sql(receiver_totals, "receiver_name", "total_claimed"),
+        }
+        if live:
+            # the KPIs are already drawn from the change feed
+            dashboard_queries = {name: sql for name, sql in dashboard_queries.items() if name.endswith("_chart")}
+        dashboard_data = load_many(dashboard_queries)
+
+    for name, df in dashboard_data:
+        # --- KPI Metrics ---
+        if name == "listing_totals":
+            col1.metric("🍲 Total Listings", int(df["listings"].iloc[0]))
+            col3.metric("📦 Total Food Quantity", int(df["quantity"].iloc[0]))
+        elif name == "claim_totals":
+            col2.metric("✅ Total Claims", int(df["claims"].iloc[0]))
+        elif name == "claimed":
+            col4.metric("🎯 Claimed Quantity", int(df["claimed_qty"].fillna(0).iloc[0]) if not df.empty else 0)
+        # --- Charts ---
+        elif name == "food_chart":
+            with chart_col1:
+                if not df.empty:
+                    fig1 = px.bar(df, x="food_name", y="quantity",
+                                  title="Available Food Listings")
+                    show_chart(fig1, started)
+                else:
+                    st.info("No Food Listings data available.")
+        elif name == "receiver_chart":
+            with chart_col2:
+                if not df.empty:
+                    fig2 = px.pie(df, names="receiver_name", values="total_claimed",
+                                  title="Food Claimed by Receivers")
+                    show_chart(fig2, started)
+                else:
+                    st.info("No Claims data available for chart.")
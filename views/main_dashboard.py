@@ -0,0 +1,73 @@
+import time
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import chart_data
+import facets
+from views import shared
+from views.shared import built_facet_index, load_many, profile, show_chart
+
+
+def render():
+    st.subheader("📊 Food Wastage Insights")
+
+    # Sidebar Filters: options and "listings left" counts come from the facet index, cross-filtered
+    # by the other selections, so changing a filter costs no table scan.
+    facet_start = time.perf_counter()
+    facet_index = built_facet_index()
+    facet_counts = facet_index.counts({name: st.session_state.get(f"facet_{name}") for name in facets.FACETS})
+    profile("facet counts", None, "index", (time.perf_counter() - facet_start) * 1000, explain=False)
+
+    def facet_filter(label, name):
+        options = facet_counts[name]
+        labels = dict(zip(options["value"], (f"{l} ({n:,})" for l, n in zip(options["label"], options["count"]))))
+        return st.sidebar.multiselect(label, options["value"].tolist(), key=f"facet_{name}",
+                                      format_func=lambda v: labels.get(v, v))
+
+    location_filter = facet_filter("Filter by Location", "location")
+    provider_filter = facet_filter("Filter by Provider", "provider_id")
+    food_filter = facet_filter("Filter by Food Type", "food_type")
+    meal_filter = facet_filter("Filter by Meal Type", "meal_type")
+    selection = dict(zip(facets.FACETS, (location_filter, provider_filter, food_filter, meal_filter)))
+    st.sidebar.caption(f"{facet_index.total(selection):,} listings match")
+
+    where = " WHERE 1=1"
+    if location_filter:
+        where += f" AND location IN ({','.join(['%s']*len(location_filter))})"
+    if provider_filter:
+        where += f" AND provider_id IN ({','.join(['%s']*len(provider_filter))})"
+    if food_filter:
+        where += f" AND food_type IN ({','.join(['%s']*len(food_filter))})"
+    if meal_filter:
+        where += f" AND meal_type IN ({','.join(['%s']*len(meal_filter))})"
+    filter_params = tuple(location_filter + provider_filter + food_filter + meal_filter)
+
+    started = time.perf_counter()
+    if shared.use_snapshot():
+        snap_listings = shared.table_snapshot.frame("food_listings")
+        keep = pd.Series(True, index=snap_listings.index)
+        for col, chosen in (("location", location_filter), ("provider_id", provider_filter),
+                            ("food_type", food_filter), ("meal_type", meal_filter)):
+            if chosen:
+                keep &= snap_listings[col].isin(chosen)
+        df_listings = snap_listings[keep]
+        df_chart = chart_data.top_n(
+            df_listings.groupby(["food_name", "food_type"], observed=True)["quantity"].sum().reset_index(),
+            "food_name", "quantity", extra=("food_type",))
+    else:
+        # the chart query runs alongside the listing query rather than after it
+        results = dict(load_many({
+            "listings": ("SELECT * FROM food_listings" + where, filter_params),
+            "chart": (chart_data.top_n_sql(
+                f"SELECT food_name, food_type, SUM(quantity) AS quantity FROM food_listings{where} GROUP BY food_name, food_type",
+                "food_name", "quantity", extra=("food_type",)), filter_params),
+        }))
+        df_listings, df_chart = results["listings"], results["chart"]
+
+    st.dataframe(df_listings)
+
+    if not df_listings.empty:
+        fig = px.bar(df_chart, x="food_name", y="quantity", color="food_type", title="Food Listings Overview")
+        show_chart(fig, started)
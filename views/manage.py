@@ -0,0 +1,282 @@
+import io
+import time
+
+import pandas as pd
+import streamlit as st
+
+import ingest
+import matching
+import reservations
+from views import shared
+from views.shared import (FACET_TABLES, LOCALITY_TABLES, add_claim, add_provider, built_locality_index, profile,
+                          profiled_fetch, render_table_browser, run_listing_write, run_query, tables_changed,
+                          update_claim)
+
+
+def render():
+    st.subheader("➕ Manage Records")
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Providers", "Receivers", "Food Listings", "Claims", "Upload CSV"])
+    with tab1:
+        providers_tab()
+    with tab2:
+        receivers_tab()
+    with tab3:
+        food_listings_tab()
+    with tab4:
+        claims_tab()
+    with tab5:
+        upload_tab()
+
+
+# ---------------- Providers ----------------
+def providers_tab():
+    st.write("Add / Update / Delete Providers")
+
+    # Add Provider
+    with st.expander("➕ Add Provider"):
+        name = st.text_input("Provider Name")
+        type_ = st.text_input("Provider Type")
+        address = st.text_input("Provider Address")
+        city = st.text_input("Provider City")
+        contact = st.text_input("Provider Contact")
+        if st.button("Add Provider"):
+            add_provider(name, type_, address, city, contact)
+            st.success("✅ Provider Added")
+
+    # Update Provider
+    with st.expander("✏️ Update Provider"):
+        pid = st.number_input("Provider ID", min_value=1, step=1)
+        new_city = st.text_input("New City")
+        if st.button("Update Provider"):
+            run_query("UPDATE providers SET city=%s WHERE provider_id=%s", (new_city, pid))
+            st.success("✅ Provider Updated")
+
+    # Delete Provider
+    with st.expander("🗑️ Delete Provider"):
+        pid_del = st.number_input("Delete Provider ID", min_value=1, step=1)
+        if st.button("Delete Provider"):
+            run_query("DELETE FROM providers WHERE provider_id=%s", (pid_del,))
+            st.success("✅ Provider Deleted")
+
+    render_table_browser("providers", key="crud_providers", editable=True)
+
+
+# ---------------- Receivers ----------------
+def receivers_tab():
+    st.write("Add / Update / Delete Receivers")
+
+    # Add Receiver
+    with st.expander("➕ Add Receiver"):
+        rname = st.text_input("Receiver Name")
+        rtype = st.text_input("Receiver Type")
+        rcity = st.text_input("Receiver City")
+        rcontact = st.text_input("Receiver Contact")
+        if st.button("Add Receiver"):
+            run_query("INSERT INTO receivers (name, type, city, contact) VALUES (%s,%s,%s,%s)",
+                      (rname, rtype, rcity, rcontact))
+            st.success("✅ Receiver Added")
+
+    # Update Receiver
+    with st.expander("✏️ Update Receiver"):
+        rid = st.number_input("Receiver ID", min_value=1, step=1)
+        new_city = st.text_input("New City (Receiver)")
+        if st.button("Update Receiver"):
+            run_query("UPDATE receivers SET city=%s WHERE receiver_id=%s", (new_city, rid))
+            st.success("✅ Receiver Updated")
+
+    # Delete Receiver
+    with st.expander("🗑️ Delete Receiver"):
+        rid_del = st.number_input("Delete Receiver ID", min_value=1, step=1)
+        if st.button("Delete Receiver"):
+            run_query("DELETE FROM receivers WHERE receiver_id=%s", (rid_del,))
+            st.success("✅ Receiver Deleted")
+
+    render_table_browser("receivers", key="crud_receivers", editable=True)
+
+
+# ---------------- Food Listings ----------------
+def food_listings_tab():
+    st.write("Add / Update / Delete Food Listings")
+
+    # Add Food Listing
+    with st.expander("➕ Add Food Listing"):
+        pid = st.number_input("Provider ID (FK)", min_value=1, step=1)
+        food_name = st.text_input("Food Name")
+        qty = st.number_input("Quantity", min_value=1, step=1)
+        expiry = st.date_input("Expiry Date")
+        if st.button("Add Food Listing"):
+            run_listing_write("INSERT INTO food_listings (provider_id, food_name, quantity, expiry_date) VALUES (%s,%s,%s,%s) RETURNING food_id",
+                              (pid, food_name, qty, expiry))
+            st.success("✅ Food Listing Added")
+
+    # Update Food Listing
+    with st.expander("✏️ Update Food Listing"):
+        fid = st.number_input("Food ID", min_value=1, step=1)
+        new_qty = st.number_input("New Quantity", min_value=1, step=1)
+        if st.button("Update Food Listing"):
+            run_listing_write("UPDATE food_listings SET quantity=%s WHERE food_id=%s RETURNING food_id", (new_qty, fid))
+            st.success("✅ Food Listing Updated")
+
+    # Delete Food Listing
+    with st.expander("🗑️ Delete Food Listing"):
+        fid_del = st.number_input("Delete Food ID", min_value=1, step=1)
+        if st.button("Delete Food Listing"):
+            run_listing_write("DELETE FROM food_listings WHERE food_id=%s RETURNING food_id", (fid_del,))
+            st.success("✅ Food Listing Deleted")
+
+    render_table_browser("food_listings", key="crud_food_listings", editable=True)
+
+
+# ---------------- Claims ----------------
+def claims_tab():
+    pool = shared.pool
+    st.write("Add / Update / Delete Claims")
+
+    # Add Claim
+    with st.expander("➕ Add Claim"):
+        fid = st.number_input("Food ID (FK)", min_value=1, step=1)
+        rid = st.number_input("Receiver ID (FK)", min_value=1, step=1)
+        claim_qty = st.number_input("Quantity", min_value=1, step=1, key="claim_quantity")
+        status = st.selectbox("Status", ["Pending", "Completed", "Cancelled"])
+        if shared.reservations_available():
+            left = reservations.remaining(pool, [int(fid)]).get(int(fid))
+            st.caption(f"{left:,} unit(s) left on listing {fid}" if left is not None else f"No listing {fid}")
+        else:
+            st.caption("Claims need the listing_stock table: run `python migrate.py`.")
+        if st.button("Add Claim"):
+            try:
+                reservation = add_claim(int(fid), int(rid), int(claim_qty), status)
+                st.success(f"✅ Claim {reservation.claim_id} Added"
+                           + (f" ({reservation.remaining:,} unit(s) left)" if reservation.remaining is not None
+                              else ""))
+            except reservations.ReservationError as e:
+                st.error(f"❌ {e}")
+
+    # Update Claim
+    with st.expander("✏️ Update Claim"):
+        cid = st.number_input("Claim ID", min_value=1, step=1)
+        new_status = st.selectbox("New Status", ["Pending", "Completed", "Cancelled"])
+        if st.button("Update Claim"):
+            try:
+                update_claim(int(cid), new_status)
+                st.success("✅ Claim Updated")
+            except reservations.ReservationError as e:
+                st.error(f"❌ {e}")
+
+    # Delete Claim
+    with st.expander("🗑️ Delete Claim"):
+        cid_del = st.number_input("Delete Claim ID", min_value=1, step=1)
+        if st.button("Delete Claim"):
+            run_listing_write("DELETE FROM claims WHERE claim_id=%s RETURNING food_id", (cid_del,))
+            st.success("✅ Claim Deleted")
+
+    # Auto-match open listings to receivers in the same city
+    with st.expander("🤝 Match Listings to Receivers"):
+        st.caption("Allocates every open listing (not expired, not claimed) to a receiver in its city, "
+                   "soonest expiry and highest risk first; receiver capacity per run depends on its type.")
+        horizon = st.number_input("Count waste for listings expiring within (days)", min_value=1,
+                                  value=matching.HORIZON_DAYS, step=1, key="match_horizon")
+        if st.button("Propose matches", key="match_propose"):
+            start = time.perf_counter()
+            listings, receivers = matching.load_inputs(pool)
+            st.session_state["match_report"] = matching.match(listings, receivers, horizon_days=horizon)
+            profile("matching: propose claims", None, "match", (time.perf_counter() - start) * 1000,
+                    rows=len(listings) + len(receivers), explain=False)
+        match_report = st.session_state.get("match_report")
+        if match_report is not None:
+            st.info(match_report.summary())
+            proposals = match_report.allocation.frame()
+            st.dataframe(proposals.head(200), use_container_width=True)
+            if len(proposals) and st.button(f"Write {len(proposals):,} proposed claims", key="match_write"):
+                start = time.perf_counter()
+                try:
+                    written = matching.write_claims(pool, match_report.allocation)
+                    profile("matching: write claims", None, "batch", (time.perf_counter() - start) * 1000,
+                            rows=written, explain=False)
+                finally:
+                    tables_changed(["claims"])
+                    shared.risk_index.invalidate()
+                del st.session_state["match_report"]
+                st.success(f"✅ {written:,} claims added as Pending "
+                           f"({len(proposals) - written:,} listings were claimed meanwhile)")
+
+    # Listings within a radius of a receiver's city, nearest first
+    with st.expander("📍 Listings Near a Receiver"):
+        if not shared.localities_available():
+            st.info("No localities loaded: run `python migrate.py`, then `python locality.py`.")
+        else:
+            near_receiver = st.number_input("Receiver ID", min_value=1, step=1, key="near_receiver")
+            radius_km = st.slider("Within (km)", min_value=5, max_value=500, value=50, step=5, key="near_km")
+            if st.button("🔄 Reload gazetteer", key="near_reload",
+                         help="Rebuild the index after `python locality.py` loaded new localities"):
+                shared.locality_index.invalidate()
+            index = built_locality_index()
+            _, found = profiled_fetch("SELECT name, city FROM receivers WHERE receiver_id = %s",
+                                      (int(near_receiver),))
+            point = index.geocode(found[0][1]) if found else None
+            if not found:
+                st.warning("No receiver with that ID")
+            elif point is None:
+                st.warning(f"{found[0][1]!r} is not in the gazetteer")
+            else:
+                start = time.perf_counter()
+                food_ids, km = index.within(*point, radius_km)
+                lookup_ms = (time.perf_counter() - start) * 1000
+                st.caption(f"{len(food_ids):,} listings within {radius_km} km of {found[0][0]} "
+                           f"({found[0][1]}); lookup {lookup_ms:.2f} ms over {index.geocoded:,} "
+                           f"geocoded listings ({index.ungeocoded:,} not geocoded)")
+                if len(food_ids):
+                    nearest = pd.DataFrame({"food_id": food_ids[:200], "distance_km": km[:200].round(1)})
+                    colnames, rows = profiled_fetch("""
+                        SELECT f.food_id, f.food_name, f.quantity, f.expiry_date, f.location,
+                               p.name AS provider
+                        FROM food_listings f
+                        LEFT JOIN providers p ON f.provider_id = p.provider_id
+                        WHERE f.food_id = ANY(%s)
+                    """, (nearest["food_id"].tolist(),))
+                    st.dataframe(nearest.merge(pd.DataFrame(rows, columns=colnames), on="food_id"),
+                                 use_container_width=True)
+
+    # read-only: a claim made or reactivated here has to fit in its listing's units left (Add / Update Claim)
+    render_table_browser("claims", key="crud_claims")
+
+
+# ---------------- Upload CSV ----------------
+def upload_tab():
+    st.write("Bulk-load a CSV into a table (headers like Provider_ID, Expiry_Date are matched to columns)")
+    upload_table = st.selectbox("Target Table", list(ingest.TABLES), key="upload_table")
+    upload_file = st.file_uploader("CSV File", type=["csv"], key="upload_file")
+    if upload_table == "claims":
+        st.caption("Each row becomes a new claim only if its quantity (default 1) fits in the units left on "
+                   "its listing; Claim_ID is ignored and rows that don't fit are listed as refused.")
+        overwrite = False
+    else:
+        overwrite = st.checkbox("Overwrite rows whose ID already exists", key="upload_overwrite")
+    if upload_file is not None and st.button("Load CSV", key="upload_csv"):
+        progress = st.empty()
+        stream = io.TextIOWrapper(upload_file, encoding="utf-8-sig", newline="")
+
+        def show_progress(r):
+            progress.caption(f"{r.rows_read:,} rows read, {r.rows_per_sec:,.0f} rows/s")
+
+        try:
+            if upload_table == "claims":
+                report = ingest.load_claims(shared.pool, stream, progress=show_progress)
+            else:
+                report = ingest.load_csv(shared.pool, upload_table, stream,
+                                         on_conflict="update" if overwrite else "skip", progress=show_progress)
+            st.success(f"✅ {report.summary()}")
+            if report.ignored_columns:
+                st.warning(f"Ignored columns: {', '.join(report.ignored_columns)}")
+            if report.errors:
+                st.dataframe(pd.DataFrame(report.errors, columns=["line", "error"]))
+        except ingest.IngestError as e:
+            st.error(f"❌ {e}")
+        finally:
+            tables_changed([upload_table])
+            shared.risk_index.invalidate()
+            if upload_table in FACET_TABLES:
+                shared.facet_index.invalidate()
+            if upload_table in LOCALITY_TABLES:
+                shared.locality_index.invalidate()
@@ -0,0 +1,210 @@
+import time
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import chart_data
+import eda
+import forecast
+import rollups
+from query_cache import frame_size
+from views import shared
+from views.shared import built_risk_index, load_data, load_many, session_limit, show_chart
+
+
+def render():
+    table_snapshot = shared.table_snapshot
+    st.subheader("🔎 EDA (Exploratory Data Analysis) & 🔮 Predictions")
+
+    # --- Filters (sidebar) ---
+    st.sidebar.markdown("### Filters (EDA)")
+    # City list (from providers)
+    try:
+        df_cities = load_data("SELECT DISTINCT city FROM providers WHERE city IS NOT NULL ORDER BY city")
+        cities = ["All"] + df_cities["city"].dropna().astype(str).tolist()
+    except Exception:
+        cities = ["All"]
+
+    city_filter = st.sidebar.selectbox("City", options=cities, index=0)
+    engine = st.sidebar.radio("Compute with", ["SQL (pushdown)", "pandas (legacy)", "Snapshot (Arrow)"],
+                              index=2 if shared.use_snapshot() else 0, key="eda_engine",
+                              help="SQL filters and aggregates in Postgres; pandas loads every row first; "
+                                   "Snapshot runs the pandas code on the memory-mapped Arrow files.")
+
+    t0 = time.perf_counter()
+    city = None if city_filter == "All" else city_filter
+    if engine.startswith("SQL"):
+        eda_data = eda.sql_aggregates(load_data, city, index=built_risk_index(),
+                                      load_all=lambda named: dict(load_many(named)),
+                                      rollups=shared.rollups_available())
+    elif engine.startswith("Snapshot"):
+        if not table_snapshot.exists:
+            table_snapshot.refresh(shared.pool)
+        eda_data = eda.frame_aggregates(*eda.snapshot_raw(table_snapshot), city=city)
+    else:
+        eda_data = eda.pandas_aggregates(load_data, city)
+    fetched = sum(frame_size(df) for df in eda_data["source_frames"])
+    st.sidebar.caption(f"⏱️ {engine}: {(time.perf_counter() - t0) * 1000:.0f} ms, "
+                       f"{fetched / 1024:,.0f} KiB fetched")
+
+    # --- KPIs ---
+    kpis = eda_data["kpis"]
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("📦 Total Quantity", kpis["total_quantity"])
+    c2.metric("🧾 Listings", kpis["listings"])
+    c3.metric("✅ Claims", kpis["claims"])
+    c4.metric("🏁 Completed", kpis["completed"])
+
+    st.markdown("---")
+
+    # --- EDA Charts ---
+    colA, colB = st.columns(2)
+
+    # 1) Top Foods by Quantity
+    with colA:
+        started = time.perf_counter()
+        top_foods = eda_data["top_foods"]
+        if not top_foods.empty:
+            fig = px.bar(top_foods, x="food_name", y="quantity",
+                         title="🍽️ Top Foods by Quantity", text="quantity")
+            fig.update_layout(xaxis_title="", yaxis_title="Qty")
+            show_chart(fig, started)
+        else:
+            st.info("No listings available for this filter.")
+
+    # 2) Listings by City
+    with colB:
+        started = time.perf_counter()
+        by_city = chart_data.top_n(eda_data["by_city"], "city", "listings")
+        if not by_city.empty:
+            fig = px.bar(by_city, x="city", y="listings", title="🏙️ Listings by City", text="listings")
+            fig.update_layout(xaxis_title="", yaxis_title="Listings")
+            show_chart(fig, started)
+        else:
+            st.info("No city data found.")
+
+    # 3) Expiry Calendar (near-expiry focus)
+    st.markdown(f"#### ⏳ Near-Expiry Items (next {eda.NEAR_EXPIRY_DAYS} days)")
+    soon = eda_data["near_expiry"]
+    if kpis["listings"]:
+        if not soon.empty:
+            started = time.perf_counter()
+            bubbles = chart_data.largest(soon, "quantity")
+            fig = px.scatter(bubbles, x="expiry_date", y="quantity", size="quantity",
+                             hover_data=["food_name", "city", "provider_id", "days_left"],
+                             title="Next 7 Days Expiries (bubble ~ quantity)")
+            show_chart(fig, started)
+            if len(bubbles) < len(soon):
+                st.caption(f"Chart shows the {len(bubbles):,} largest of {len(soon):,} items.")
+            st.dataframe(soon)
+        else:
+            st.info("No items expiring in next 7 days.")
+    else:
+        st.info("Expiry data not available.")
+
+    # 4) Claims Status Pie
+    st.markdown("#### 🥧 Claims Status Distribution")
+    pie = eda_data["status"]
+    if not pie.empty:
+        started = time.perf_counter()
+        fig = px.pie(chart_data.top_n(pie, "status", "count"), names="status", values="count", title="Claims Status")
+        show_chart(fig, started)
+    else:
+        st.info("No claims data available.")
+
+    st.markdown("---")
+
+    # --- Simple Predictions / Risk Scoring ---
+    st.subheader("🔮 Predictions & Smart Alerts")
+
+    # A) High Waste Risk (heuristic): High qty & fewer days to expiry
+    alerts = eda_data["risk"]
+    if not alerts.empty:
+        st.markdown("**🚨 High Waste Risk Items (Top 10)**")
+        if engine.startswith("SQL"):
+            st.caption("Listings with a completed claim are excluded; they have been collected.")
+        st.dataframe(alerts[["food_id", "food_name", "city", "quantity", "expiry_date", "days_to_expiry", "risk_score"]])
+
+        started = time.perf_counter()
+        fig = px.bar(alerts, x="food_name", y="risk_score", hover_data=["quantity", "expiry_date", "city"],
+                     title="High Waste Risk Score")
+        show_chart(fig, started)
+    else:
+        st.info("Risk scoring requires valid expiry dates.")
+
+    # B) Donation trend + exponential-smoothing forecast, scored against the naive last-3 mean
+    st.markdown("#### 📈 Donation Trend & Forecast")
+    use_rollups = shared.rollups_available()
+    if use_rollups:
+        grain = st.radio("Period", rollups.GRAINS, index=2, horizontal=True, key="trend_grain",
+                         format_func=str.title)
+        trend = load_data(*rollups.series_sql("listings", grain, city=city))
+    else:
+        grain = "month"
+        trend = eda_data["monthly"].assign(period=lambda df: pd.to_datetime(df["month"]),
+                                           listings=lambda df: df["donations"])
+    season, horizon = rollups.SEASON[grain], rollups.HORIZON[grain]
+    _, periods, values = rollups.panel(trend, "listings", grain)
+    if len(periods):
+        started = time.perf_counter()
+        history = pd.DataFrame({"period": periods, "donations": values[0], "series": "actual"})
+        naive_next = forecast.naive(values, 1)[0, 0]
+        if len(periods) >= forecast.MIN_PERIODS:
+            fitted = forecast.fit(values, season)
+            future = pd.DataFrame({"period": pd.date_range(periods[-1], periods=horizon + 1,
+                                                           freq=rollups.FREQ[grain])[1:],
+                                   "donations": fitted.forecast(horizon)[0], "series": "forecast"})
+            history = pd.concat([chart_data.downsample(history, "period", "donations"), future])
+            model = "Holt-Winters" if fitted.seasonal else "Holt (damped)"
+            st.success(f"🔮 Next-{grain} forecast ({model}): **{future['donations'].iloc[0]:,.0f} donations** "
+                       f"· naive (avg last 3): {naive_next:,.0f}")
+        else:
+            st.success(f"🔮 Next-{grain} naive forecast (avg last 3): **{naive_next:,.0f} donations**")
+        fig = px.line(history, x="period", y="donations", color="series", markers=True,
+                      title=f"Donations per {grain}")
+        show_chart(fig, started)
+        if len(periods) > horizon + 1:
+            metrics, _ = forecast.backtest(values, horizon, season)
+            st.caption(f"Backtest: fitted without the last {horizon} {grain}s, scored on them "
+                       "(vs_naive < 1 beats the naive forecast).")
+            st.dataframe(metrics.round(3), hide_index=True)
+    else:
+        st.info("Not enough data for a donation trend.")
+
+    # C) Every city x food type series fitted in one batch
+    if use_rollups:
+        with st.expander(f"🗺️ Forecast every city × food type, per {grain}"):
+            by = ["city", "food_type"]
+            keys, periods, values = rollups.panel(load_data(*rollups.series_sql("listings", grain, by=by, city=city)),
+                                                  "listings", grain, by=by)
+            if len(periods) > horizon + 1:
+                metrics, _ = forecast.backtest(values, horizon, season)
+                fitted = forecast.fit(values, season)
+                ahead = fitted.forecast(horizon)
+                st.caption(f"{len(keys):,} series × {len(periods):,} {grain}s fitted in "
+                           f"{fitted.seconds * 1000:,.0f} ms. Backtest on the last {horizon} {grain}s:")
+                st.dataframe(metrics.round(3), hide_index=True)
+                st.dataframe(keys.assign(last=values[:, -1], next=ahead[:, 0].round(1),
+                                         **{f"next_{horizon}": ahead.sum(axis=1).round(1)})
+                             .sort_values(f"next_{horizon}", ascending=False), hide_index=True)
+            else:
+                st.info(f"Need more than {horizon + 1} {grain}s of history to fit and score the series.")
+
+    st.markdown("---")
+
+    # --- Contact Helpers (quick actions) ---
+    st.subheader("📞 Quick Contacts")
+    st.caption("Providers & Receivers contact details for coordination")
+
+    contacts = {table: (df, error) for table, df, error in shared.executor.run({
+        "providers": lambda: load_data("SELECT provider_id, name, city, contact FROM providers ORDER BY city, name"),
+        "receivers": lambda: load_data("SELECT receiver_id, name, city, contact FROM receivers ORDER BY city, name"),
+    }, session_limit())}
+    for table in ("providers", "receivers"):
+        df_contact, error = contacts[table]
+        if error is None:
+            st.write(f"**{table.title()}**")
+            st.dataframe(df_contact)
+        else:
+            st.info(f"{table.title()} table not accessible.")
@@ -0,0 +1,113 @@
+import streamlit as st
+
+import adhoc
+from predefined_queries import predefined_queries
+from views import shared
+from views.shared import load_data
+
+
+def wait_for(job, label):
+    """Block this run until ``job`` is done; a click on Cancel reruns the script, which stops the wait."""
+    status = st.empty()
+    while not job.wait(0.25):
+        status.caption(f"⏳ {label}... {job.elapsed:.1f}s")
+    status.empty()
+
+
+def render():
+    profiler = shared.profiler
+    use_aggregates = shared.aggregates_available()
+    queries = predefined_queries(use_aggregates)
+    st.subheader("📝 Predefined & Custom Queries")
+
+    # Predefined queries dropdown
+    query_name = st.selectbox("Choose a predefined query", list(queries.keys()))
+    if use_aggregates:
+        aggregate_refresher = shared.aggregate_refresher
+        pending = aggregate_refresher.dirty
+        st.caption("Aggregated reports are served from materialized views"
+                   + (f" (refresh pending for {', '.join(sorted(pending))})" if pending else
+                      f" (up to date with this server's writes, and never more than "
+                      f"{aggregate_refresher.max_age // 60:g} minutes old)"))
+        if pending and st.button("Refresh aggregates now", key="refresh_aggregates"):
+            aggregate_refresher.refresh_if_due(shared.pool, force=True)
+            st.rerun()
+    if st.button("Run Selected Query", key="run_predefined"):
+        try:
+            df = load_data(queries[query_name])
+            st.dataframe(df)
+            if not df.empty:
+                st.bar_chart(df.select_dtypes(include="number"))
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
+
+    st.markdown("---")
+    st.subheader("🔎 Custom SQL Query")
+    st.caption(f"Runs read-only on its own connection, never the app's pool; each statement is stopped after "
+               f"{adhoc.STATEMENT_TIMEOUT:g}s ({adhoc.EXPORT_TIMEOUT:g}s for exports).")
+    query = st.text_area("Enter SQL Query", key="custom_sql")
+    adhoc_query = st.session_state.get("adhoc_query")
+    adhoc_export = st.session_state.get("adhoc_export")
+
+    def record_adhoc(job):
+        rows = job.rows_written if isinstance(job, adhoc.AdhocExport) else len(job.rows)
+        profiler.record(job.query, "Run Queries", "adhoc", job.seconds * 1000, job.seconds * 1000, rows=rows)
+
+    run_col, cancel_col = st.columns(2)
+    if run_col.button("Run Custom", key="run_sql"):
+        for job in (adhoc_query, adhoc_export):
+            if job is not None:
+                job.cancel()
+                job.close()
+        st.session_state.pop("adhoc_export", None)
+        adhoc_export = None
+        try:
+            adhoc_query = st.session_state["adhoc_query"] = adhoc.AdhocQuery(query, on_done=record_adhoc).start()
+        except adhoc.AdhocError as e:
+            st.session_state.pop("adhoc_query", None)
+            adhoc_query = None
+            st.error(f"❌ {e}")
+    running = [job for job in (adhoc_query, adhoc_export) if job is not None and job.running]
+    if cancel_col.button("Cancel", key="adhoc_cancel", disabled=not running):
+        for job in running:
+            job.cancel()
+
+    if adhoc_query is not None:
+        wait_for(adhoc_query, "Running query")
+        if adhoc_query.can_fetch_more and st.session_state.get("adhoc_more"):
+            wait_for(adhoc_query.fetch_more(), "Fetching more rows")
+        if adhoc_query.status == "cancelled":
+            st.warning("Query cancelled.")
+        elif adhoc_query.error is not None:
+            st.error(f"❌ Error: {adhoc_query.error}")
+        if adhoc_query.rows or adhoc_query.columns:
+            st.dataframe(adhoc_query.frame())
+            if adhoc_query.exhausted:
+                st.caption(f"All {len(adhoc_query.rows):,} rows ({adhoc_query.seconds:.2f}s)")
+            elif len(adhoc_query.rows) >= adhoc_query.max_rows:
+                st.caption(f"First {len(adhoc_query.rows):,} rows; the preview stops here, export the full result below")
+            else:
+                st.caption(f"First {len(adhoc_query.rows):,} rows; more are available")
+                st.button("Fetch more", key="adhoc_more")
+
+        # Full results go straight from COPY to a file, never through a DataFrame.
+        export_col, download_col = st.columns(2)
+        fmt = export_col.radio("Export format", list(adhoc.EXPORT_FORMATS), horizontal=True, key="adhoc_format")
+        if export_col.button("Prepare export", key="adhoc_export_start"):
+            if adhoc_export is not None:
+                adhoc_export.close()
+                adhoc_export.discard()
+            adhoc_export = st.session_state["adhoc_export"] = adhoc.AdhocExport(adhoc_query.query, fmt,
+                                                                                   on_done=record_adhoc).start()
+        if adhoc_export is not None:
+            wait_for(adhoc_export, f"Exporting {adhoc_export.fmt.upper()}")
+            if adhoc_export.status == "done":
+                with open(adhoc_export.path, "rb") as export_file:
+                    download_col.download_button(
+                        f"⬇️ Download {adhoc_export.fmt.upper()} ({adhoc_export.rows_written:,} rows, "
+                        f"{adhoc_export.bytes / 2**20:,.1f} MiB)", export_file,
+                        file_name=f"query.{adhoc_export.fmt}", mime=adhoc_export.mime, key="adhoc_download")
+            elif adhoc_export.status == "cancelled":
+                download_col.warning("Export cancelled.")
+            else:
+                download_col.error(f"❌ Export failed: {adhoc_export.error}")
@@ -0,0 +1,57 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+import views
+from views import shared
+
+
+def render():
+    profiler = shared.profiler
+    st.subheader("🩺 Query Profile")
+    st.caption(f"Every statement run by any session in the last {profiler.window // 60} minutes. "
+               "Times are wall-clock per call (cache hits included); database and DataFrame times "
+               "are averaged over cache misses.")
+
+    # The threshold and retention window are the server's (SLOW_QUERY_MS, PROFILE_WINDOW_SECONDS) and shared
+    # by every session, so they are shown here, not edited; the time range below is this session's view only.
+    c1, c2, c3 = st.columns([1, 1, 2])
+    c1.metric("Slow-query threshold", f"{profiler.slow_ms:.0f} ms" if profiler.slow_ms > 0 else "off",
+              help="Set with SLOW_QUERY_MS; statements at least this slow get an EXPLAIN captured")
+    window_min = c2.number_input("Show the last (minutes)", min_value=1, max_value=max(1, profiler.window // 60),
+                                 value=max(1, profiler.window // 60), key="profile_window")
+    page_options = ["All pages"] + [p for p in views.PAGES if p != "Query Profile"]
+    page_filter = c3.selectbox("Page", page_options)
+
+    # Reset only moves this session's starting point: the samples are every session's
+    since = st.session_state.get("profile_since")
+    window = int(window_min) * 60
+    summary = pd.DataFrame(profiler.summary(None if page_filter == "All pages" else page_filter, window, since))
+    pages = pd.DataFrame(profiler.page_summary(window, since))
+    if summary.empty:
+        st.info("No statements recorded yet - use the other pages first.")
+    else:
+        st.markdown("#### Per page")
+        st.dataframe(pages.round(1), hide_index=True)
+        st.markdown("#### Per statement (slowest p95 first)")
+        st.dataframe(summary.assign(query=summary["query"].str.slice(0, 120)), hide_index=True)
+
+    st.markdown(f"#### Slow statements (≥ {profiler.slow_ms:.0f} ms) with EXPLAIN (ANALYZE, BUFFERS); writes get a plain EXPLAIN")
+    plans = profiler.slow_plans(since)
+    if not plans:
+        st.info("No slow statements captured.")
+    for plan in plans:
+        with st.expander(f"{plan['ms']:.0f} ms · {plan['page']} · {plan['query'][:90]}"):
+            st.code(plan["query"], language="sql")
+            st.caption(f"params: {plan['params']}")
+            st.code(plan["plan"])
+
+    d1, d2, d3, d4 = st.columns(4)
+    d1.download_button("⬇️ JSON", profiler.export_json(since), "query_profile.json", "application/json")
+    d2.download_button("⬇️ Samples CSV", profiler.export_csv(since=since), "query_samples.csv", "text/csv")
+    d3.download_button("⬇️ Summary CSV", profiler.export_csv(summary=True, since=since), "query_summary.csv",
+                       "text/csv")
+    if d4.button("Reset", help="Show only statements from now on, in this session; other sessions keep theirs"):
+        st.session_state["profile_since"] = time.time()
+        st.rerun()
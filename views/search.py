@@ -0,0 +1,49 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+import search
+from views import shared
+
+
+def render():
+    st.subheader("🔎 Search")
+    if not shared.search_available():
+        st.info("Search isn't set up on this database: run `python migrate.py`.")
+        return
+    c1, c2 = st.columns([3, 2])
+    query = c1.text_input("Food, provider or receiver", key="search_query",
+                          placeholder="e.g. chicken, johnson, port peter").strip()
+    tables = c2.multiselect("In", list(search.FIELDS), default=list(search.FIELDS), key="search_tables")
+    if not query or not tables:
+        st.caption("Matches whole words, the start or middle of a word, and words one or two typos away; "
+                   "best matches first.")
+        return
+
+    # cursors of the pages shown so far for this search; a new search starts again at page 1
+    state = st.session_state.setdefault("search_pages", {"key": None, "cursors": [None]})
+    key = (query, tuple(tables))
+    if state["key"] != key:
+        state.update(key=key, cursors=[None])
+    cursors = state["cursors"]
+
+    start = time.perf_counter()
+    items, next_cursor = search.search(shared.pool, query, after=cursors[-1], tables=tables)
+    shared.profile("search", None, "read", (time.perf_counter() - start) * 1000, rows=len(items), explain=False)
+    if not items:
+        st.info(f'Nothing matches "{query}".')
+        return
+    st.caption(f"Page {len(cursors)} · {(time.perf_counter() - start) * 1000:.0f} ms")
+    st.dataframe(pd.DataFrame([(item["table"], item["id"], item["title"], item["detail"],
+                                f"{item['field']}: {item['value']}", item["score"]) for item in items],
+                              columns=["table", "id", "name", "details", "matched", "score"]),
+                 hide_index=True)
+
+    b1, b2, _ = st.columns([1, 1, 6])
+    if b1.button("◀ Previous", disabled=len(cursors) == 1, key="search_previous"):
+        cursors.pop()
+        st.rerun()
+    if b2.button("Next ▶", disabled=next_cursor is None, key="search_next"):
+        cursors.append(next_cursor)
+        st.rerun()
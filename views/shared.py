@@ -0,0 +1,590 @@
+"""Process-wide resources and the helpers every page uses.
+
+The pool, caches and indexes are ``st.cache_resource`` objects, created the
+first time a page asks for one (``shared.pool``, ``shared.risk_index``, ...)
+and looked up on every access, so clearing the resource cache replaces them.
+Modules that only some resources or pages need are imported where they are
+used.
+"""
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import db
+from query_cache import QueryCache, frame_size, tables_written
+
+
+# ---------------- Shared Resources ----------------
+# One bounded pool per server process, shared by every session and rerun.
+@st.cache_resource(on_release=db.ConnectionPool.closeall)
+def init_connection():
+    return db.create_pool()
+
+
+# Result cache shared by all sessions; writes below invalidate the tables they touch.
+@st.cache_resource
+def init_query_cache():
+    return QueryCache()
+
+
+# Materialized aggregates are refreshed in the background after writes to their tables.
+@st.cache_resource
+def init_aggregate_refresher():
+    import aggregates
+    return aggregates.AggregateRefresher(on_refresh=init_query_cache().invalidate)
+
+
+@st.cache_resource(ttl=60)
+def aggregates_available():
+    import aggregates
+    try:
+        return aggregates.available(init_connection())
+    except Exception:
+        return False
+
+
+@st.cache_resource(ttl=60)
+def rollups_available():
+    import rollups
+    try:
+        return rollups.available(init_connection())
+    except Exception:
+        return False
+
+
+@st.cache_resource(ttl=60)
+def reservations_available():
+    import reservations
+    try:
+        return reservations.available(init_connection())
+    except Exception:
+        return False
+
+
+@st.cache_resource(ttl=60)
+def localities_available():
+    import locality
+    try:
+        return locality.available(init_connection())
+    except Exception:
+        return False
+
+
+@st.cache_resource(ttl=60)
+def search_available():
+    import search
+    try:
+        return search.available(init_connection())
+    except Exception:
+        return False
+
+
+# Per-statement timings behind the "Query Profile" page.
+@st.cache_resource
+def init_profiler():
+    from profiler import QueryProfiler
+    return QueryProfiler()
+
+
+# Standing waste-risk index; listing/claim writes below update it row by row.
+@st.cache_resource
+def init_risk_index():
+    from risk_index import RiskIndex
+    return RiskIndex()
+
+
+RISK_TABLES = {"providers", "food_listings", "claims"}
+
+
+# Arrow snapshot of the four tables; analytic pages can read it instead of Postgres.
+@st.cache_resource
+def init_snapshot():
+    from snapshot import Snapshot
+    return Snapshot()
+
+
+# Dashboard KPIs kept in memory from the LISTEN/NOTIFY change feed; one listener per server process.
+@st.cache_resource(on_release=lambda feed: feed.stop())
+def init_change_feed():
+    import change_feed
+    return change_feed.ChangeFeed().start()
+
+
+# Distinct values and cross-filtered counts for the Main Dashboard filters; listing writes update it row by row.
+@st.cache_resource
+def init_facet_index():
+    import facets
+    return facets.FacetIndex()
+
+
+FACET_TABLES = {"providers", "food_listings"}
+
+
+# Listings placed on a lat/lon grid through the localities gazetteer; listing writes update it row by row.
+@st.cache_resource
+def init_locality_index():
+    import locality
+    return locality.LocalityIndex()
+
+
+LOCALITY_TABLES = {"providers", "food_listings"}
+
+
+# Independent queries of a page run at once on worker threads, each on its own pooled connection.
+def with_script_context(fn):
+    """Let ``fn`` see the calling session (session_state, page name for the profiler) on a worker thread."""
+    ctx = get_script_run_ctx()
+
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn()
+    return run
+
+
+@st.cache_resource(on_release=lambda executor: executor.shutdown())
+def init_executor():
+    import parallel
+    return parallel.QueryExecutor(init_connection(), wrap=with_script_context)
+
+
+RESOURCES = {
+    "pool": init_connection,
+    "query_cache": init_query_cache,
+    "aggregate_refresher": init_aggregate_refresher,
+    "profiler": init_profiler,
+    "risk_index": init_risk_index,
+    "table_snapshot": init_snapshot,
+    "kpi_feed": init_change_feed,
+    "facet_index": init_facet_index,
+    "locality_index": init_locality_index,
+    "executor": init_executor,
+}
+
+
+def __getattr__(name):
+    # shared.pool, shared.risk_index, ...: the cached resource, created on first use
+    if name in RESOURCES:
+        return RESOURCES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def current_page():
+    return st.session_state.get("menu")
+
+
+def use_snapshot():
+    """The sidebar's "Read dashboards from snapshot" toggle."""
+    return bool(st.session_state.get("use_snapshot"))
+
+
+def profile(query, params, kind, total_ms, db_ms=None, frame_ms=0.0, rows=0, nbytes=0, cache="miss",
+            explain=True):
+    """Record one statement; slow ones (database time over the threshold) get an EXPLAIN captured."""
+    db_ms = total_ms if db_ms is None else db_ms
+    page = current_page()
+    profiler = init_profiler()
+    profiler.record(query, page, kind, total_ms, db_ms, frame_ms, rows, nbytes, cache)
+    if explain and cache != "hit" and profiler.is_slow(db_ms):
+        profiler.maybe_explain(init_connection(), query, params, page, db_ms)
+
+
+def profiled_fetch(query, params=None, kind="read"):
+    start = time.perf_counter()
+    colnames, rows = init_connection().fetch(query, params)
+    profile(query, params, kind, (time.perf_counter() - start) * 1000, rows=len(rows))
+    return colnames, rows
+
+
+def tables_changed(tables):
+    import rollups
+    # Rollups are written by triggers on the base tables, so their cached reads go stale too.
+    init_query_cache().invalidate(set(tables) | rollups.tables_depending_on(tables))
+    init_aggregate_refresher().mark_dirty(tables)
+    init_snapshot().mark_dirty(tables)
+
+
+def built_facet_index():
+    import facets
+    facet_index = init_facet_index()
+    if not facet_index.built:
+        _, rows = profiled_fetch(facets.FACET_ROWS_SQL, kind="index")
+        facet_index.build(rows)
+    if not facet_index.labels_built:
+        _, rows = profiled_fetch(facets.PROVIDER_NAMES_SQL, kind="index")
+        facet_index.set_labels("provider_id", rows)
+    return facet_index
+
+
+def built_risk_index():
+    from risk_index import LISTING_ROWS_SQL
+    risk_index = init_risk_index()
+    if not risk_index.built:
+        _, rows = profiled_fetch(LISTING_ROWS_SQL, kind="index")
+        risk_index.build(rows)
+    return risk_index
+
+
+def built_locality_index():
+    import locality
+    locality_index = init_locality_index()
+    if not locality_index.built:
+        _, places = profiled_fetch(locality.LOCALITIES_SQL, kind="index")
+        _, rows = profiled_fetch(locality.LISTING_ROWS_SQL, kind="index")
+        locality_index.build(rows, places)
+    return locality_index
+
+
+def refresh_listings(food_ids, facets_too=True):
+    """Re-read ``food_ids`` into the risk index (and the facet and locality indexes) after they were written."""
+    food_ids = list({f for f in food_ids if f is not None})
+    if not food_ids:
+        return
+    risk_index, facet_index, locality_index = init_risk_index(), init_facet_index(), init_locality_index()
+    if risk_index.built:
+        from risk_index import LISTING_ROWS_SQL
+        _, rows = profiled_fetch(LISTING_ROWS_SQL + " WHERE f.food_id = ANY(%s)", (food_ids,), kind="index")
+        risk_index.upsert(rows)
+        risk_index.delete(set(food_ids) - {row[0] for row in rows})
+    if facets_too and facet_index.built:
+        import facets
+        _, rows = profiled_fetch(facets.FACET_ROWS_SQL + " WHERE f.food_id = ANY(%s)", (food_ids,), kind="index")
+        facet_index.upsert(rows)
+        facet_index.delete(set(food_ids) - {row[0] for row in rows})
+    if facets_too and locality_index.built:
+        import locality
+        _, rows = profiled_fetch(locality.LISTING_ROWS_SQL + " WHERE f.food_id = ANY(%s)", (food_ids,),
+                                 kind="index")
+        locality_index.upsert(rows)
+        locality_index.delete(set(food_ids) - {row[0] for row in rows})
+
+
+def invalidate_indexes(tables):
+    """Drop the in-memory indexes built from ``tables`` after a write that can't say which rows it touched."""
+    tables = set(tables)
+    if tables & RISK_TABLES:
+        init_risk_index().invalidate()
+    if "food_listings" in tables:
+        init_facet_index().invalidate()
+    if "providers" in tables:
+        init_facet_index().invalidate_labels()
+    if tables & LOCALITY_TABLES:
+        init_locality_index().invalidate()
+
+
+# ---------------- Charts ----------------
+def show_chart(fig, started):
+    """Draw ``fig`` and record its payload size and the time since ``started`` (query + build + render)."""
+    import chart_data
+    st.plotly_chart(fig, use_container_width=True)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    st.session_state.setdefault("chart_stats", []).append(
+        (fig.layout.title.text or "chart", chart_data.payload_bytes(fig), elapsed_ms))
+
+
+# ---------------- Load Data ----------------
+def load_data(query, params=None, ttl=None):
+    import frames
+    timing = {}
+
+    def fetch():
+        # reads stream straight into typed columns (frames.py); anything else takes the tuple path
+        t0 = time.perf_counter()
+        if frames.is_read(query):
+            table = frames.fetch_arrow(init_connection(), query, params)
+            t1 = time.perf_counter()
+            df = frames.to_pandas(table)
+        else:
+            colnames, rows = init_connection().fetch(query, params)
+            t1 = time.perf_counter()
+            df = pd.DataFrame(rows, columns=colnames)
+        timing.update(db_ms=(t1 - t0) * 1000, frame_ms=(time.perf_counter() - t1) * 1000)
+        return df
+
+    start = time.perf_counter()
+    df = init_query_cache().get_or_load(query, params, fetch, ttl=ttl, page=current_page())
+    profile(query, params, "read", (time.perf_counter() - start) * 1000, rows=len(df),
+            nbytes=frame_size(df) if timing else 0,
+            cache="bypass" if ttl == 0 else "miss" if timing else "hit", **timing)
+    return df
+
+
+def session_limit():
+    if "query_limit" not in st.session_state:
+        import parallel
+        st.session_state["query_limit"] = parallel.SessionLimit()
+    return st.session_state["query_limit"]
+
+
+def load_many(queries, ttl=None):
+    """``load_data`` for each of ``{name: sql or (sql, params)}`` concurrently; yields ``(name, df)`` as they finish."""
+    tasks = {name: lambda q=q: load_data(*(q if isinstance(q, tuple) else (q, None)), ttl=ttl)
+             for name, q in queries.items()}
+    for name, df, error in init_executor().run(tasks, session_limit()):
+        if error is not None:
+            raise error
+        yield name, df
+
+
+# ---------------- CRUD Functions ----------------
+def run_query(query, params=None):
+    start = time.perf_counter()
+    try:
+        rowcount = init_connection().execute(query, params)
+        profile(query, params, "write", (time.perf_counter() - start) * 1000, rows=rowcount)
+        return rowcount
+    finally:
+        tables = tables_written(query)
+        tables_changed(tables)
+        invalidate_indexes(tables)
+
+
+def run_listing_write(query, params=None):
+    """Run a food_listings/claims write that RETURNs the affected food_id(s); keeps the risk index in step."""
+    start = time.perf_counter()
+    try:
+        rows = init_connection().execute_returning(query, params)
+        profile(query, params, "write", (time.perf_counter() - start) * 1000, rows=len(rows))
+    finally:
+        tables = tables_written(query)
+        tables_changed(tables)
+    refresh_listings((food_id for row in rows for food_id in row), facets_too="food_listings" in tables)
+    return len(rows)
+
+
+def add_provider(name, type_, address, city, contact):
+    run_query("INSERT INTO providers (name, type, address, city, contact) VALUES (%s,%s,%s,%s,%s)",
+              (name, type_, address, city, contact))
+
+
+def update_provider(provider_id, name, type_, address, city, contact):
+    run_query("""UPDATE providers
+                 SET name=%s, type=%s, address=%s, city=%s, contact=%s
+                 WHERE provider_id=%s""",
+              (name, type_, address, city, contact, provider_id))
+
+
+def delete_provider(provider_id):
+    run_query("DELETE FROM providers WHERE provider_id=%s", (provider_id,))
+
+
+def add_receiver(name, type_, city, contact):
+    run_query("INSERT INTO receivers (name, type, city, contact) VALUES (%s,%s,%s,%s)",
+              (name, type_, city, contact))
+
+
+def update_receiver(receiver_id, name, type_, city, contact):
+    run_query("""UPDATE receivers
+                 SET name=%s, type=%s, city=%s, contact=%s
+                 WHERE receiver_id=%s""",
+              (name, type_, city, contact, receiver_id))
+
+
+def delete_receiver(receiver_id):
+    run_query("DELETE FROM receivers WHERE receiver_id=%s", (receiver_id,))
+
+
+def add_food_listing(provider_id, food_name, quantity, expiry_date, food_type, meal_type, location):
+    run_listing_write("""INSERT INTO food_listings
+                 (provider_id, food_name, quantity, expiry_date, food_type, meal_type, location)
+                 VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING food_id""",
+              (provider_id, food_name, quantity, expiry_date, food_type, meal_type, location))
+
+
+def update_food_listing(food_id, provider_id, food_name, quantity, expiry_date, food_type, meal_type, location):
+    run_listing_write("""UPDATE food_listings
+                 SET provider_id=%s, food_name=%s, quantity=%s, expiry_date=%s, food_type=%s, meal_type=%s, location=%s
+                 WHERE food_id=%s RETURNING food_id""",
+              (provider_id, food_name, quantity, expiry_date, food_type, meal_type, location, food_id))
+
+
+def delete_food_listing(food_id):
+    run_listing_write("DELETE FROM food_listings WHERE food_id=%s RETURNING food_id", (food_id,))
+
+
+def add_claim(food_id, receiver_id, quantity, status="Pending", timestamp=None):
+    """Reserve ``quantity`` units of the listing as a new claim; raises ReservationError if they aren't left."""
+    import reservations
+    start = time.perf_counter()
+    reservation = reservations.reserve(init_connection(), food_id, receiver_id, quantity, status, timestamp)
+    profile("reserve claim", None, "write", (time.perf_counter() - start) * 1000, rows=1, explain=False)
+    tables_changed(["claims"])
+    refresh_listings([food_id], facets_too=False)
+    return reservation
+
+
+def update_claim(claim_id, status):
+    """Set a claim's status; reactivating a cancelled claim raises ReservationError if its units are gone."""
+    import reservations
+    start = time.perf_counter()
+    food_id = reservations.set_status(init_connection(), claim_id, status)
+    profile("claim status", None, "write", (time.perf_counter() - start) * 1000, rows=1, explain=False)
+    tables_changed(["claims"])
+    refresh_listings([food_id], facets_too=False)
+
+
+def delete_claim(claim_id):
+    run_listing_write("DELETE FROM claims WHERE claim_id=%s RETURNING food_id", (claim_id,))
+
+
+# ---------------- Batch Writes ----------------
+def write_batch(table, inserts=(), updates=(), deletes=()):
+    """Apply inserts, updates and deletes to ``table`` in one transaction; returns the BatchResults.
+
+    Claims are not written here: each one has to fit in the units left on its
+    listing, which only ``reservations`` checks (``add_claim``, ``add_claims``).
+    """
+    import batch
+    if table == "claims":
+        raise ValueError("claims are made with add_claim / add_claims so they are checked against the units left")
+    results = []
+    start = time.perf_counter()
+    try:
+        results = batch.apply(init_connection(), table, inserts, updates, deletes)
+        profile(f"batch {table}: {len(inserts)} inserts, {len(updates)} updates, {len(deletes)} deletes",
+                None, "batch", (time.perf_counter() - start) * 1000, rows=sum(r.applied for r in results),
+                explain=False)
+    finally:
+        tables_changed([table])
+        if table == "food_listings":
+            refresh_listings([*(i for r in results for i in r.ids), *deletes])
+        elif table == "providers":
+            init_risk_index().invalidate()
+            init_facet_index().invalidate_labels()
+            init_locality_index().invalidate()
+    return results
+
+
+def add_providers(records):
+    return write_batch("providers", inserts=records)[0]
+
+
+def add_receivers(records):
+    return write_batch("receivers", inserts=records)[0]
+
+
+def add_food_listings(records):
+    return write_batch("food_listings", inserts=records)[0]
+
+
+def add_claims(records):
+    """Reserve every claim in ``records`` in one transaction; returns a Reservation or ReservationError per claim."""
+    import reservations
+    start = time.perf_counter()
+    results = reservations.reserve_many(init_connection(), records)
+    made = [r for r in results if isinstance(r, reservations.Reservation)]
+    profile(f"reserve {len(records)} claims", None, "batch", (time.perf_counter() - start) * 1000,
+            rows=len(made), explain=False)
+    tables_changed(["claims"])
+    refresh_listings([r.food_id for r in made], facets_too=False)
+    return results
+
+
+def _plain(value):
+    """numpy/pandas scalars -> Python values psycopg2 can adapt."""
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def save_editor_changes(table, df, changes):
+    """Write st.data_editor's diff (edited/added/deleted rows of ``df``) as one transaction."""
+    import pagination
+    pk = pagination.PRIMARY_KEYS[table]
+    ids = df[pk].map(_plain).tolist()
+    deletes = [ids[i] for i in changes.get("deleted_rows", [])]
+    updates = [{pk: ids[int(i)], **{c: _plain(v) for c, v in cols.items()}}
+               for i, cols in changes.get("edited_rows", {}).items() if int(i) < len(ids)]
+    inserts = [{c: _plain(v) for c, v in row.items()} for row in changes.get("added_rows", [])]
+    inserts = [row for row in inserts if any(v is not None for v in row.values())]
+    return write_batch(table, inserts, updates, deletes)
+
+
+# ---------------- Table Browser ----------------
+def load_page(table, columns, sort_by, descending, after, page_size, start_id=None):
+    import pagination
+    sql, params = pagination.build_page_query(table, columns, sort_by, descending, after, page_size, start_id)
+
+    timing = {}
+
+    def fetch():
+        t0 = time.perf_counter()
+        colnames, rows, has_next = pagination.fetch_page(init_connection(), sql, params, page_size)
+        t1 = time.perf_counter()
+        next_key = pagination.page_key(table, colnames, rows[-1], sort_by) if rows else None
+        df = pd.DataFrame(rows, columns=colnames)
+        timing.update(db_ms=(t1 - t0) * 1000, frame_ms=(time.perf_counter() - t1) * 1000)
+        return df, has_next, next_key
+
+    start = time.perf_counter()
+    result = init_query_cache().get_or_load(sql, params, fetch, page=current_page(), tables={table})
+    profile(sql, params, "page", (time.perf_counter() - start) * 1000, rows=len(result[0]),
+            nbytes=frame_size(result[0]) if timing else 0, cache="miss" if timing else "hit", **timing)
+    return result
+
+
+def render_table_browser(table, key, editable=False):
+    """Keyset-paginated view of ``table``; only the current page is fetched.
+
+    With ``editable`` the page is shown in a data editor and "Save changes"
+    submits only the edited, added and deleted rows as batches.
+    """
+    import pagination
+    columns = load_data(pagination.COLUMNS_SQL, (table,), ttl=3600)["column_name"].tolist()
+    state = st.session_state.setdefault(f"{key}_pager", {"starts": [None], "start_id": None})
+
+    def reset():
+        state["starts"], state["start_id"] = [None], None
+
+    if state.pop("sort_by_id", False):
+        st.session_state[f"{key}_sort"] = pagination.PRIMARY_KEYS[table]
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 2])
+    sort_by = c1.selectbox("Sort by", columns, key=f"{key}_sort", on_change=reset)
+    descending = c2.checkbox("Descending", key=f"{key}_desc", on_change=reset)
+    page_size = c3.selectbox("Rows per page", pagination.PAGE_SIZES, index=1, key=f"{key}_size", on_change=reset)
+    with c4:
+        jump_id = st.number_input("Jump to ID", min_value=1, step=1, value=None, key=f"{key}_jump")
+        if st.button("Go", key=f"{key}_go") and jump_id is not None:
+            reset()
+            state["start_id"] = int(jump_id)
+            state["sort_by_id"] = True
+            st.rerun()
+
+    df, has_next, next_key = load_page(table, columns, sort_by, descending, state["starts"][-1],
+                                       page_size, state["start_id"])
+    if not editable:
+        st.dataframe(df)
+    else:
+        import batch
+        for level, message in state.pop("flash", []):
+            getattr(st, level)(message)
+        editor_key = f"{key}_editor_{state.setdefault('editor_rev', 0)}"
+        st.data_editor(df, key=editor_key, num_rows="dynamic", disabled=[pagination.PRIMARY_KEYS[table]],
+                       hide_index=True)
+        changes = st.session_state.get(editor_key, {})
+        pending = sum(len(changes.get(k, ())) for k in ("edited_rows", "added_rows", "deleted_rows"))
+        if st.button(f"💾 Save changes ({pending})", key=f"{key}_save", disabled=not pending):
+            try:
+                results = save_editor_changes(table, df, changes)
+                state["flash"] = [("success", f"✅ {r.summary()}") for r in results]
+                state["editor_rev"] += 1
+            except batch.BatchError as e:
+                state["flash"] = [("error", f"❌ {e} - nothing was saved")] + [
+                    ("caption", f"{action} row {index + 1}: {message}") for action, index, message in e.errors]
+            except ValueError as e:
+                state["flash"] = [("error", f"❌ {e}")]
+            st.rerun()
+
+    page_no = len(state["starts"])
+    approx_rows = load_data(pagination.APPROX_COUNT_SQL, {"table": table}, ttl=60)
+    estimate = int(approx_rows.iloc[0, 0] or approx_rows.iloc[0, 1]) if not approx_rows.empty else 0
+    n1, n2, n3 = st.columns([1, 1, 4])
+    if n1.button("◀ Prev", key=f"{key}_prev", disabled=page_no == 1):
+        state["starts"].pop()
+        st.rerun()
+    if n2.button("Next ▶", key=f"{key}_next", disabled=not has_next):
+        state["starts"].append(next_key)
+        st.rerun()
+    n3.caption(f"Page {page_no} · ~{estimate:,} rows (planner estimate)")
@@ -0,0 +1,9 @@
+import streamlit as st
+
+from views.shared import render_table_browser
+
+
+def render():
+    st.subheader("📋 Database Tables")
+    table = st.selectbox("Select Table", ["providers", "receivers", "food_listings", "claims"], key="view_table")
+    render_table_browser(table, key=f"view_{table}")